@@ -0,0 +1,184 @@
+'''
+Lightmap atlas planning for the Light Baking Tool.
+Small Render Sets that bake the same RenderLayers with the same blend modes and uvSet share lightmap pages.
+Every Render Set keeps its own UV layout and gets a square slot on a page, the material maps its UVs into the slot
+with a scale/offset. Resolutions are powers of two, so the slots are packed with a quadtree without any waste.
+The layout is kept on the Render Sets ('atlas'), so the next bake puts every set back in the same slot and
+unchanged pages are reused by the bake manifest. Maya is not needed in here.
+'''
+import json
+import hashlib
+from collections import OrderedDict
+
+'''
+Global variables
+'''
+ATLAS_PAGE_RESOLUTIONS = [1024, 2048]
+ATLAS_PAGE_RESOLUTION = 1024
+# Render Sets at this resolution or smaller go on the atlas pages.
+ATLAS_MAX_SET_RESOLUTION = 128
+# Pixels kept empty inside every slot edge, so texture filtering does not pick up the neighbours.
+ATLAS_SLOT_PADDING = 2
+ATLAS_PAGE_PREFIX = 'Atlas'
+# A page with fewer Render Sets than this is not worth it, they are baked on their own.
+ATLAS_MIN_SETS = 2
+
+
+'''Return the page group of a Render Set, sets can only share a page when their RenderLayers and uvSet match.'''
+def ReturnAtlasKey(setDict, uvSet):
+	data = [[str(x), setDict['renderLayers'][x]] for x in setDict['renderLayers']] + [uvSet]
+	return hashlib.sha1(json.dumps(data).encode('utf-8')).hexdigest()[:12]
+
+
+'''
+Return [scaleU, scaleV, offsetU, offsetV] that maps a Render Set's 0-1 UVs into slot = [x, y, size] on a page.
+x and y are pixels from the bottom left of the page, like UV space.
+'''
+def ReturnScaleOffset(slot, pageResolution, padding=ATLAS_SLOT_PADDING):
+	scale = float(slot[2] - 2 * padding) / pageResolution
+	return [scale, scale, float(slot[0] + padding) / pageResolution, float(slot[1] + padding) / pageResolution]
+
+
+'''Packs power of two squares into a square page, the free space is kept as a list of [x, y, size] squares.'''
+class QuadPacker(object):
+	def __init__(self, resolution):
+		self.resolution = resolution
+		self.free = [[0, 0, resolution]]
+
+	'''Take the square x, y, size out of the free space. Returns False if any of it is taken or it is not aligned.'''
+	def Reserve(self, x, y, size):
+		if size <= 0 or x % size or y % size:
+			return False
+
+		for square in self.free:
+			if square[0] <= x and square[1] <= y and x + size <= square[0] + square[2] and y + size <= square[1] + square[2]:
+				break
+		else:
+			return False
+
+		self.free.remove(square)
+
+		# split into quarters until the square is the size asked for, the other quarters stay free
+		while square[2] > size:
+			half = square[2] // 2
+
+			for quarter in [[square[0] + dx, square[1] + dy, half] for dy in (0, half) for dx in (0, half)]:
+				if quarter[0] <= x < quarter[0] + half and quarter[1] <= y < quarter[1] + half:
+					target = quarter
+				else:
+					self.free.append(quarter)
+
+			square = target
+
+		return True
+
+	'''Return the [x, y, size] slot a square of size went into, None if the page is full.'''
+	def Insert(self, size):
+		candidates = [x for x in self.free if x[2] >= size]
+
+		if not candidates:
+			return None
+
+		# smallest free square first keeps the big ones free for big sets
+		square = min(candidates, key=lambda x: (x[2], x[1], x[0]))
+		self.Reserve(square[0], square[1], size)
+		return [square[0], square[1], size]
+
+
+'''
+Plan the atlas pages for renderSets.
+uvSetFunc(renderSet) returns the uvSet the set is baked with, resolutions are the Render Set 'resolution' sizes.
+Page mates of renderSets from the last layout are added as well, since a page is always baked whole.
+eligibleFunc(renderSet) can keep small sets off the pages as well, it is only asked about sets small enough for one.
+Returns {pageName:{'key', 'resolution', 'renderSets':{renderSet:[x, y, size]}}}, sets not on a page bake on their own.
+'''
+def PlanAtlas(renderSetsDict, renderSets, uvSetFunc, resolutions, pageResolution=ATLAS_PAGE_RESOLUTION, maxSetResolution=ATLAS_MAX_SET_RESOLUTION, eligibleFunc=None):
+	def Size(renderSet):
+		return resolutions[renderSetsDict[renderSet]['resolution']]
+
+	def Eligible(renderSet):
+		setDict = renderSetsDict[renderSet]
+		if not setDict.get('renderLayers') or not setDict.get('objects') or Size(renderSet) > min(maxSetResolution, pageResolution // 2):
+			return False
+
+		return eligibleFunc is None or eligibleFunc(renderSet)
+
+	# renderSet -> atlas key
+	eligible = OrderedDict((x, ReturnAtlasKey(renderSetsDict[x], uvSetFunc(x))) for x in renderSets if Eligible(x))
+	storedPages = set(renderSetsDict[x]['atlas']['page'] for x in eligible if renderSetsDict[x].get('atlas'))
+
+	for renderSet in renderSetsDict:
+		stored = renderSetsDict[renderSet].get('atlas')
+
+		if renderSet not in eligible and stored and stored['page'] in storedPages and Eligible(renderSet):
+			eligible[renderSet] = ReturnAtlasKey(renderSetsDict[renderSet], uvSetFunc(renderSet))
+
+	usedNames = set(x['atlas']['page'] for x in renderSetsDict.values() if x.get('atlas'))
+	pages = OrderedDict()
+	packers = {}
+	# page name -> atlas key, a page only takes sets of one key
+	pageKeys = {}
+
+	def NewPage(key):
+		index = 0
+
+		while ATLAS_PAGE_PREFIX + str(index) in usedNames:
+			index += 1
+
+		name = ATLAS_PAGE_PREFIX + str(index)
+		usedNames.add(name)
+		return name
+
+	def Assign(renderSet, pageName, slot):
+		pages.setdefault(pageName, {'key':eligible[renderSet], 'resolution':pageResolution, 'renderSets':OrderedDict()})
+		pages[pageName]['renderSets'][renderSet] = slot
+
+	unplaced = []
+
+	# put the sets back where they were, biggest first
+	for renderSet in sorted(eligible, key=lambda x: -Size(x)):
+		stored = renderSetsDict[renderSet].get('atlas')
+		key = eligible[renderSet]
+
+		if stored and stored['pageResolution'] == pageResolution and stored['slot'][2] == Size(renderSet) and stored.get('key') == key:
+			pageName = stored['page']
+
+			if pageKeys.setdefault(pageName, key) == key:
+				packer = packers.setdefault(pageName, QuadPacker(pageResolution))
+
+				if packer.Reserve(*stored['slot']):
+					Assign(renderSet, pageName, list(stored['slot']))
+					continue
+
+		unplaced.append(renderSet)
+
+	# then the new and moved sets, biggest first, into the pages of their key before starting new ones
+	for renderSet in unplaced:
+		key = eligible[renderSet]
+		slot = None
+
+		for pageName in [x for x in packers if pageKeys[x] == key]:
+			slot = packers[pageName].Insert(Size(renderSet))
+
+			if slot:
+				break
+
+		if not slot:
+			pageName = NewPage(key)
+			pageKeys[pageName] = key
+			packers[pageName] = QuadPacker(pageResolution)
+			slot = packers[pageName].Insert(Size(renderSet))
+
+		Assign(renderSet, pageName, slot)
+
+	return OrderedDict((x, pages[x]) for x in pages
+					   if len(pages[x]['renderSets']) >= ATLAS_MIN_SETS and any(y in renderSets for y in pages[x]['renderSets']))
+
+
+'''Return the 'atlas' value stored on a Render Set for its slot on pageName.'''
+def ReturnAtlasEntry(pageName, page, renderSet):
+	return {'page':pageName,
+			'key':page['key'],
+			'pageResolution':page['resolution'],
+			'slot':list(page['renderSets'][renderSet]),
+			'scaleOffset':ReturnScaleOffset(page['renderSets'][renderSet], page['resolution'])}
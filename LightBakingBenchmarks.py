@@ -0,0 +1,665 @@
+'''
+Benchmarks for the Light Baking Tool.
+Run with plain Python or mayapy:  python LightBakingBenchmarks.py exr|notes|views|composite|startup
+The bake proxy, uvSet and mesh data benchmarks need mayapy:  mayapy LightBakingBenchmarks.py proxy|uvsets|meshdata
+The tool startup timings need a Maya GUI session:  import LightBakingBenchmarks; LightBakingBenchmarks.BenchToolStartup()
+'''
+import os
+import sys
+import time
+import shutil
+import argparse
+import json
+import tempfile
+import subprocess
+import LightBakingData
+import LightBakingImageUtils
+
+'''
+Global variables
+'''
+EXR_BENCH_SIZES = [512, 1024, 2048, 4096]
+NOTES_BENCH_MESH_COUNTS = [10, 1000, 100000]
+VIEWS_BENCH_MESH_COUNT = 10000
+PROXY_BENCH_MESH_COUNTS = [10, 50, 200]
+PROXY_BENCH_LAYER_COUNT = 5
+UVSETS_BENCH_MESH_COUNTS = [100, 1000, 5000]
+MESH_DATA_BENCH_MESH_COUNTS = [100, 1000, 5000]
+COMPOSITE_BENCH_SIZES = [1024, 2048, 4096]
+COMPOSITE_BENCH_LAYER_COUNT = 3
+STARTUP_BENCH_MODULES = ['LightBakingSceneData', 'LightBakingData', 'LightBakingImageUtils', 'LightBakingEngine', 'LightBakingTool']
+
+
+'''Time func() over a number of repeats, returns the best and average time in seconds.'''
+def TimeIt(func, repeats=3):
+	times = []
+
+	for i in range(repeats):
+		start = time.perf_counter()
+		func()
+		times.append(time.perf_counter() - start)
+
+	return min(times), sum(times) / len(times)
+
+
+'''For printing a table of rows where the first row is the header.'''
+def PrintTable(rows):
+	widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+
+	for index, row in enumerate(rows):
+		print('  '.join(str(cell).rjust(widths[i]) for i, cell in enumerate(row)))
+
+		if index == 0:
+			print('  '.join('-' * x for x in widths))
+
+
+'''Compare the in process numpy EXR to TIF conversion against spawning magick.'''
+def BenchExrConversion(sizes=EXR_BENCH_SIZES, repeats=3):
+	np = LightBakingImageUtils.np
+	backends = []
+
+	if LightBakingImageUtils.NumpyBackendAvailable():
+		backends.append(LightBakingImageUtils.EXR_BACKEND_NUMPY)
+	else:
+		print('numpy backend not available, needs numpy and OpenImageIO or OpenEXR.')
+		return
+
+	if shutil.which('magick'):
+		backends.append(LightBakingImageUtils.EXR_BACKEND_MAGICK)
+	else:
+		print('magick not found on PATH, only timing the numpy backend.')
+
+	tempDir = tempfile.mkdtemp(prefix='lightBakeBench_')
+	rows = [['size', 'backend', 'best (s)', 'avg (s)', 'MB/s']]
+
+	try:
+		for size in sizes:
+			exrPath = os.path.join(tempDir, 'bench_{}.exr'.format(size))
+			tifPath = os.path.join(tempDir, 'bench_{}.tif'.format(size))
+			pixels = np.random.random_sample((size, size, 4)).astype(np.float32)
+			LightBakingImageUtils.WriteExr(exrPath, pixels)
+			megaBytes = pixels.nbytes / (1024.0 * 1024.0)
+
+			for backend in backends:
+				if backend == LightBakingImageUtils.EXR_BACKEND_NUMPY:
+					func = lambda: LightBakingImageUtils.ConvertExrToTifNumpy(exrPath, tifPath)
+				else:
+					func = lambda: LightBakingImageUtils.ConvertExrToTifMagick(exrPath, tifPath)
+
+				best, average = TimeIt(func, repeats)
+				rows.append([size, backend, '{:.3f}'.format(best), '{:.3f}'.format(average), '{:.1f}'.format(megaBytes / best)])
+	finally:
+		shutil.rmtree(tempDir, ignore_errors=True)
+
+	PrintTable(rows)
+
+
+'''Stand in for the few maya.cmds calls RenderSetsStore makes, the notes attribute is just a string.'''
+class FakeNotesCmds(object):
+	def __init__(self):
+		self.notes = ''
+
+	def objExists(self, node):
+		return True
+
+	def attributeQuery(self, attr, n=None, exists=False):
+		return True
+
+	def getAttr(self, attr):
+		return self.notes
+
+	def setAttr(self, attr, value, type=None):
+		self.notes = value
+
+
+'''Build a renderSets dict with meshCount meshes spread over Render Sets of up to 50 meshes.'''
+def BuildRenderSets(meshCount, meshesPerSet=50):
+	renderSets = {}
+
+	for index in range(meshCount):
+		setName = 'RS_{:05d}_LM'.format(index // meshesPerSet)
+
+		if setName not in renderSets:
+			renderSets[setName] = {'resolution':4,
+								   'colorMode':0,
+								   'fillTextureSeams':3.0,
+								   'lightMapPrefix':'BAKE',
+								   'renderMe':True,
+								   'layoutUVs':False,
+								   'objects':{},
+								   'renderLayers':{'Sun':0, 'Interior':0, 'AO':1}}
+
+		renderSets[setName]['objects']['|Level|Room_{0:05d}|Geo|mesh_{0:06d}'.format(index)] = index % 3
+
+	return renderSets
+
+
+'''Compare the legacy repr()/eval() notes against the versioned json store.'''
+def BenchRenderSetsNotes(meshCounts=NOTES_BENCH_MESH_COUNTS, repeats=3):
+	rows = [['meshes', 'format', 'size (KB)', 'write (s)', 'read (s)', 'cached read (s)']]
+
+	for meshCount in meshCounts:
+		renderSets = BuildRenderSets(meshCount)
+		legacy = str(renderSets)
+		legacyWrite = TimeIt(lambda: str(renderSets), repeats)[0]
+		rows.append([meshCount, 'legacy eval', len(legacy) // 1024, '{:.4f}'.format(legacyWrite),
+					 '{:.4f}'.format(TimeIt(lambda: eval(legacy), repeats)[0]), '-'])
+		rows.append([meshCount, 'legacy literal', len(legacy) // 1024, '{:.4f}'.format(legacyWrite),
+					 '{:.4f}'.format(TimeIt(lambda: LightBakingData.DecodeRenderSets(legacy), repeats)[0]), '-'])
+
+		for name, threshold in [['json', 0], ['json + zlib', 1]]:
+			fakeCmds = FakeNotesCmds()
+			store = LightBakingData.RenderSetsStore(mayaCmds=fakeCmds, compressThreshold=threshold)
+			write = TimeIt(lambda: store.Write(renderSets), repeats)[0]
+			notes = fakeCmds.notes
+			read = TimeIt(lambda: LightBakingData.DecodeRenderSets(notes), repeats)[0]
+			# an unchanged string after the generation moved, plus a fully cached read
+			store.Invalidate()
+			cached = TimeIt(store.Read, repeats)[0]
+			rows.append([meshCount, name, len(notes) // 1024, '{:.4f}'.format(write), '{:.4f}'.format(read), '{:.6f}'.format(cached)])
+
+	PrintTable(rows)
+
+
+'''Time updateFunc() plus a full repaint of the views.'''
+def TimeRedraw(app, views, updateFunc, repeats=3):
+	def Redraw():
+		updateFunc()
+		app.processEvents()
+
+		for view in views:
+			view.viewport().repaint()
+
+	return TimeIt(Redraw, repeats)[0]
+
+
+'''Return a function that flips between filling with itemsA and itemsB, so every call is a real change.'''
+def ReturnFlipUpdate(fillFunc, itemsA, itemsB):
+	state = {'flip':False}
+
+	def Update():
+		state['flip'] = not state['flip']
+		fillFunc(itemsB if state['flip'] else itemsA)
+
+	return Update
+
+
+'''
+Compare the old clear and refill QListWidget/QTreeWidget updates against the incremental models.
+The scene has meshCount meshes, in Render Sets of 50 for the Render Set list and all in the objects view.
+'''
+def BenchRenderSetViews(meshCount=VIEWS_BENCH_MESH_COUNT, repeats=3):
+	os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+	try:
+		import LightBakingModels as models
+	except ImportError:
+		print('PySide not found, run this with mayapy or install PySide6.')
+		return
+
+	app = models.QApplication.instance() or models.QApplication([])
+	uvSets = ['map1', 'uvSet', 'uvSet1']
+	renderSets = BuildRenderSets(meshCount)
+	objects = {}
+
+	for renderSet in renderSets.values():
+		objects.update(renderSet['objects'])
+
+	target = list(objects)[len(objects) // 2]
+	addedObjects = dict(objects)
+	addedObjects['|Level|Extra|Geo|mesh_extra'] = 0
+	uvObjects = dict(objects)
+	uvObjects[target] = (objects[target] + 1) % len(uvSets)
+
+	# the old way, everything is cleared and rebuilt
+	listWidget = models.QListWidget()
+	treeWidget = models.QTreeWidget()
+	treeWidget.setHeaderLabels(['Mesh', 'uvSet'])
+
+	def FillWidgets(items):
+		listWidget.clear()
+		treeWidget.clear()
+
+		for renderSet in sorted(renderSets):
+			item = models.QListWidgetItem(renderSet)
+			item.setFlags(item.flags() | models.Qt.ItemIsUserCheckable)
+			item.setCheckState(models.Qt.Checked)
+			listWidget.addItem(item)
+
+		treeWidget.addTopLevelItems([models.QTreeWidgetItem([mesh, uvSets[items[mesh]]]) for mesh in items])
+
+	def SelectWidgetItem(name):
+		for index in range(treeWidget.topLevelItemCount()):
+			if treeWidget.topLevelItem(index).text(0) == name:
+				treeWidget.setCurrentItem(treeWidget.topLevelItem(index))
+				break
+
+	# the new way, only the rows that changed are touched
+	setsModel = models.RenderSetsModel()
+	objectsModel = models.RenderSetItemsModel(['Mesh', 'uvSet'], uvSets)
+	listView = models.QListView()
+	listView.setUniformItemSizes(True)
+	listView.setModel(setsModel)
+	treeView = models.QTreeView()
+	treeView.setRootIsDecorated(False)
+	treeView.setUniformRowHeights(True)
+	treeView.setModel(objectsModel)
+
+	def FillModels(items):
+		setsModel.SetRenderSets(renderSets)
+		objectsModel.SetItems(items)
+
+	def ResetModels(items):
+		setsModel.SetRenderSets({})
+		objectsModel.SetItems({})
+		FillModels(items)
+
+	def SelectModelRow(name):
+		treeView.selectionModel().setCurrentIndex(objectsModel.IndexOf(name), models.QItemSelectionModel.ClearAndSelect)
+
+	widgets = [listWidget, treeWidget]
+	views = [listView, treeView]
+
+	for view in widgets + views:
+		view.resize(400, 600)
+		view.show()
+
+	FillWidgets(objects)
+	FillModels(objects)
+	tests = [['full populate', lambda: FillWidgets(objects), lambda: ResetModels(objects)],
+			 ['add 1 mesh', ReturnFlipUpdate(FillWidgets, objects, addedObjects), ReturnFlipUpdate(FillModels, objects, addedObjects)],
+			 ['change 1 uvSet', ReturnFlipUpdate(FillWidgets, objects, uvObjects), ReturnFlipUpdate(FillModels, objects, uvObjects)],
+			 ['reselect by name', lambda: SelectWidgetItem(target), lambda: SelectModelRow(target)]]
+	rows = [['meshes', 'update', 'widgets (s)', 'models (s)', 'speed up']]
+
+	for name, widgetFunc, modelFunc in tests:
+		widgetTime = TimeRedraw(app, widgets, widgetFunc, repeats)
+		modelTime = TimeRedraw(app, views, modelFunc, repeats)
+		rows.append([len(objects), name, '{:.4f}'.format(widgetTime), '{:.4f}'.format(modelTime), '{:.1f}x'.format(widgetTime / max(modelTime, 1e-9))])
+
+	for view in widgets + views:
+		view.close()
+
+	PrintTable(rows)
+
+
+'''
+Compare a combined bake mesh per RenderLayer against one bake proxy per Render Set reused across the RenderLayers.
+Only the geometry work is timed, there is no arnoldRenderToTexture call. Needs mayapy.
+'''
+def BenchBakeProxies(meshCounts=PROXY_BENCH_MESH_COUNTS, layerCount=PROXY_BENCH_LAYER_COUNT, repeats=3):
+	try:
+		import maya.standalone
+	except ImportError:
+		print('Maya not found, run this with mayapy.')
+		return
+
+	import LightBakingEngine
+	cmds = LightBakingEngine.InitializeMaya()
+	renderSetup = LightBakingEngine._RenderSetup()
+	rows = [['meshes', 'layers', 'per layer (s)', 'proxy (s)', 'speedup']]
+
+	for meshCount in meshCounts:
+		cmds.file(new=True, force=True)
+		meshes = [cmds.polySphere(name='benchMesh{}'.format(x), subdivisionsX=40, subdivisionsY=20)[0] for x in range(meshCount)]
+		renderLayers = []
+
+		for index in range(layerCount):
+			renderSetup.instance().createRenderLayer('benchLayer{}'.format(index))
+			renderLayers.append('rs_benchLayer{}'.format(index))
+
+		engine = LightBakingEngine.BakeEngine({}, mayaCmds=cmds)
+
+		def PerLayer():
+			for renLayer in renderLayers:
+				cmds.editRenderLayerGlobals(currentRenderLayer=renLayer)
+				combined = engine.CreateCombinedBakeMesh(meshes, 3.0, 'bench_{}_LM'.format(renLayer), renLayer, 'map1', False)
+				engine.FinishCombinedBakeMeshes([combined], renLayer, '', False)
+
+		def Proxy():
+			for renLayer in renderLayers:
+				cmds.editRenderLayerGlobals(currentRenderLayer=renLayer)
+				combinedName = 'bench_{}_LM'.format(renLayer)
+				combined = engine.ReturnBakeProxy('bench', combinedName, renLayer,
+												  lambda: engine.CreateCombinedBakeMesh(meshes, 3.0, combinedName, renLayer, 'map1', False))
+				engine.FinishCombinedBakeMeshes([combined], renLayer, '', False, True)
+
+			engine.DeleteBakeProxies()
+
+		perLayer = TimeIt(PerLayer, repeats)[0]
+		proxy = TimeIt(Proxy, repeats)[0]
+		rows.append([meshCount, layerCount, '{:.3f}'.format(perLayer), '{:.3f}'.format(proxy), '{:.1f}x'.format(perLayer / proxy)])
+
+	PrintTable(rows)
+
+
+'''
+Compare the per mesh polyUVSet loop against the bulk uvSet sync, on meshes that are already set (the usual case
+before a bake) and on meshes that all need their current uvSet changed. Needs mayapy.
+'''
+def BenchUvSetSync(meshCounts=UVSETS_BENCH_MESH_COUNTS, repeats=3):
+	try:
+		import maya.standalone
+	except ImportError:
+		print('Maya not found, run this with mayapy.')
+		return
+
+	import LightBakingEngine
+	cmds = LightBakingEngine.InitializeMaya()
+	uvSets = ['map1', 'uvSet', 'uvSet1']
+	rows = [['meshes', 'state', 'per mesh (s)', 'bulk (s)', 'speedup', 'touched']]
+
+	for meshCount in meshCounts:
+		cmds.file(new=True, force=True)
+		meshes = [cmds.polyCube(name='benchMesh{}'.format(x))[0] for x in range(meshCount)]
+		wanted = dict((x, 'uvSet1') for x in meshes)
+
+		for mesh in meshes:
+			for uvSet in uvSets[1:]:
+				cmds.polyUVSet(mesh, create=True, uvSet=uvSet)
+
+		def PerMesh():
+			for mesh in meshes:
+				if not cmds.objExists(mesh):
+					continue
+
+				existing = cmds.polyUVSet(mesh, q=True, allUVSets=True)
+
+				for uvSet in uvSets:
+					if uvSet not in existing:
+						cmds.polyUVSet(mesh, create=True, uvSet=uvSet)
+
+				cmds.polyUVSet(mesh, currentUVSet=True, uvSet=wanted[mesh])
+
+		def Bulk():
+			changes = LightBakingData.PlanUvSetChanges(wanted, LightBakingData.ReturnMeshUvSets(meshes, cmds), uvSets)
+			return LightBakingData.ApplyUvSetChanges(changes, cmds)
+
+		def Reset():
+			for mesh in meshes:
+				cmds.polyUVSet(mesh, currentUVSet=True, uvSet='map1')
+
+		for state in ['changed', 'in sync']:
+			timings = []
+
+			for func in [PerMesh, Bulk]:
+				best = None
+
+				for i in range(repeats):
+					if state == 'changed':
+						Reset()
+					else:
+						Bulk()
+
+					start = time.perf_counter()
+					func()
+					seconds = time.perf_counter() - start
+					best = seconds if best is None else min(best, seconds)
+
+				timings.append(best)
+
+			if state == 'changed':
+				Reset()
+			else:
+				Bulk()
+
+			rows.append([meshCount, state, '{:.3f}'.format(timings[0]), '{:.3f}'.format(timings[1]), '{:.1f}x'.format(timings[0] / timings[1]), Bulk()])
+
+	PrintTable(rows)
+
+
+'''
+Compare per mesh maya.cmds queries against one MeshData pass, for the shape, uvSets, current uvSet, triangle
+count, shadingEngines and exact world bounding box of every mesh. Needs mayapy.
+'''
+def BenchMeshData(meshCounts=MESH_DATA_BENCH_MESH_COUNTS, repeats=3):
+	try:
+		import maya.standalone
+	except ImportError:
+		print('Maya not found, run this with mayapy.')
+		return
+
+	import LightBakingEngine
+	import LightBakingSceneData
+	cmds = LightBakingEngine.InitializeMaya()
+	rows = [['meshes', 'cmds (s)', 'MeshData (s)', 'speedup']]
+
+	for meshCount in meshCounts:
+		cmds.file(new=True, force=True)
+		meshes = [cmds.polySphere(name='benchMesh{}'.format(x), subdivisionsX=20, subdivisionsY=10)[0] for x in range(meshCount)]
+
+		def Cmds():
+			for mesh in meshes:
+				shape = cmds.listRelatives(mesh, shapes=True, noIntermediate=True, fullPath=True, type='mesh')[0]
+				cmds.polyUVSet(mesh, query=True, allUVSets=True)
+				cmds.polyUVSet(mesh, query=True, currentUVSet=True)
+				cmds.polyEvaluate(mesh, triangle=True)
+				cmds.listConnections(shape, type='shadingEngine')
+				cmds.exactWorldBoundingBox(mesh)
+
+		def Bulk():
+			meshData = LightBakingSceneData.MeshData()
+			meshData.Read(meshes)
+			meshData.ReturnBoundingBoxes(meshes)
+
+		perMesh = TimeIt(Cmds, repeats)[0]
+		bulk = TimeIt(Bulk, repeats)[0]
+		rows.append([meshCount, '{:.3f}'.format(perMesh), '{:.3f}'.format(bulk), '{:.1f}x'.format(perMesh / bulk)])
+
+	PrintTable(rows)
+
+
+'''Return the peak resident memory of this process in bytes, None where it can not be found out.'''
+def ReturnPeakRss():
+	# Linux keeps ru_maxrss across exec, so a child would report its parent's peak, VmHWM starts again
+	if os.path.isfile('/proc/self/status'):
+		with open('/proc/self/status') as statusFile:
+			for line in statusFile:
+				if line.startswith('VmHWM:'):
+					return int(line.split()[1]) * 1024
+
+	try:
+		import resource
+	except ImportError:
+		try:
+			import psutil
+		except ImportError:
+			return None
+		# Windows
+		return psutil.Process().memory_info().peak_wset
+
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# kilobytes on Linux, bytes on macOS
+	return peak if sys.platform == 'darwin' else peak * 1024
+
+
+'''
+Compare compositing lightmap layers in memory against the streaming band compositor, both writing a PNG.
+Every run is its own process, so the peak RSS is that of the composite alone.
+'''
+def BenchComposite(sizes=COMPOSITE_BENCH_SIZES, layerCount=COMPOSITE_BENCH_LAYER_COUNT, repeats=3):
+	if LightBakingImageUtils.np is None:
+		print('numpy not found, can not run the composite benchmark.')
+		return
+
+	np = LightBakingImageUtils.np
+	folder = os.path.dirname(os.path.abspath(__file__))
+	tempDir = tempfile.mkdtemp(prefix='lightBakeBench_')
+	code = '\n'.join(['import sys, time, json',
+					  'import LightBakingImageUtils, LightBakingBenchmarks',
+					  'layers, pngPath, mode = json.loads(sys.argv[1])',
+					  'start = time.perf_counter()',
+					  'if mode == "memory":',
+					  '	LightBakingImageUtils.WritePng(pngPath, LightBakingImageUtils.CompositeLayers(layers))',
+					  'else:',
+					  '	LightBakingImageUtils.CompositeLayersToFile(layers, pngPath)',
+					  'print(json.dumps([time.perf_counter() - start, LightBakingBenchmarks.ReturnPeakRss()]))'])
+
+	def Run(layers, pngPath, mode):
+		output = subprocess.check_output([sys.executable, '-c', code, json.dumps([layers, pngPath, mode])], cwd=folder)
+		return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+	def Megabytes(value):
+		return 'n/a' if value is None else '{:.0f}'.format(value / 1048576.0)
+
+	rows = [['size', 'layers', 'mode', 'best (s)', 'MPix/s', 'peak RSS (MB)']]
+
+	try:
+		for size in sizes:
+			layers = []
+
+			for index in range(layerCount):
+				tifPath = os.path.join(tempDir, 'layer{}_{}.tif'.format(index, size))
+				# the pixels go in through a memmap a band at a time, so 8K layers do not need to fit in memory
+				LightBakingImageUtils.WriteTif(tifPath, np.zeros((size, size, 4), dtype=np.float32))
+
+				reader = LightBakingImageUtils.TifReader(tifPath)
+				memmap = np.memmap(tifPath, dtype=reader.dtype, mode='r+', offset=reader.stripOffsets[0], shape=(size, size, 4))
+				reader.Close()
+
+				for start in range(0, size, 256):
+					memmap[start:start + 256] = np.random.random((min(256, size - start), size, 4)).astype(np.float32)
+
+				memmap.flush()
+				del memmap
+				layers.append([tifPath, index % 2])
+
+			pngPath = os.path.join(tempDir, 'composite_{}.png'.format(size))
+
+			for mode in ['memory', 'stream']:
+				results = [Run(layers, pngPath, mode) for i in range(repeats)]
+				best = min(x[0] for x in results)
+				peak = max(x[1] for x in results) if results[0][1] is not None else None
+				rows.append([size, layerCount, mode, '{:.3f}'.format(best), '{:.1f}'.format(size * size / best / 1000000.0), Megabytes(peak)])
+	finally:
+		shutil.rmtree(tempDir, ignore_errors=True)
+
+	PrintTable(rows)
+
+
+'''Time a cold import of every module in a fresh interpreter, what opening the tool pays before the window shows.'''
+def BenchModuleImports(modules=STARTUP_BENCH_MODULES, repeats=3):
+	folder = os.path.dirname(os.path.abspath(__file__))
+	rows = [['module', 'best (s)', 'average (s)']]
+
+	for module in modules:
+		code = 'import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)'.format(module)
+		times = []
+
+		for i in range(repeats):
+			try:
+				output = subprocess.check_output([sys.executable, '-c', code], cwd=folder, stderr=subprocess.STDOUT)
+			except subprocess.CalledProcessError as e:
+				# the Tool needs Maya and PySide, run this with mayapy to include it
+				times = None
+				print('<<<<<< WARNING - Could not import {}: {} >>>>>>'.format(module, e.output.decode('utf-8', 'replace').strip().splitlines()[-1]))
+				break
+
+			times.append(float(output.decode('utf-8').strip().splitlines()[-1]))
+
+		if times:
+			rows.append([module, '{:.3f}'.format(min(times)), '{:.3f}'.format(sum(times) / len(times))])
+
+	PrintTable(rows)
+
+
+'''
+Open the tool in a Maya GUI session and print how long it takes until the window is built, first painted and
+done with the startup validation and uvSets. Uses the timings the tool keeps in startupTimes.
+'''
+def BenchToolStartup():
+	try:
+		import maya.cmds as cmds
+	except ImportError:
+		print('Maya not found, run this in a Maya GUI session.')
+		return
+
+	if cmds.about(batch=True):
+		print('The window is not painted in batch mode, run this in a Maya GUI session.')
+		return
+
+	import LightBakingTool
+
+	start = time.perf_counter()
+	tool = LightBakingTool.LightBakingTool()
+	tool.show()
+
+	# the idle startup chunks and the first paint only run while Qt processes events
+	while tool.startupJob is not None or 'firstPaint' not in tool.startupTimes:
+		# the tool picks PySide6 or PySide2
+		LightBakingTool.QApplication.processEvents()
+
+	rows = [['stage', 'seconds']]
+	rows.append(['construct', '{:.3f}'.format(tool.startupTimes['init'])])
+	rows.append(['first paint', '{:.3f}'.format(tool.startupTimes['firstPaint'])])
+	rows.append(['ready', '{:.3f}'.format(tool.startupTimes['ready'])])
+	rows.append(['total', '{:.3f}'.format(time.perf_counter() - start)])
+	PrintTable(rows)
+	tool.close()
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Light Baking Tool benchmarks.')
+	subParsers = parser.add_subparsers(dest='bench')
+
+	exrParser = subParsers.add_parser('exr', help='EXR to TIF conversion, numpy vs magick.')
+	exrParser.add_argument('--sizes', type=int, nargs='+', default=EXR_BENCH_SIZES)
+	exrParser.add_argument('--repeats', type=int, default=3)
+
+	notesParser = subParsers.add_parser('notes', help='renderSets notes serialization, legacy eval vs json store.')
+	notesParser.add_argument('--meshes', type=int, nargs='+', default=NOTES_BENCH_MESH_COUNTS)
+	notesParser.add_argument('--repeats', type=int, default=3)
+
+	viewsParser = subParsers.add_parser('views', help='Render Set/object view redraws, QTreeWidget refills vs incremental models.')
+	viewsParser.add_argument('--meshes', type=int, default=VIEWS_BENCH_MESH_COUNT)
+	viewsParser.add_argument('--repeats', type=int, default=3)
+
+	proxyParser = subParsers.add_parser('proxy', help='Combined bake mesh per RenderLayer vs one bake proxy per Render Set, needs mayapy.')
+	proxyParser.add_argument('--meshes', type=int, nargs='+', default=PROXY_BENCH_MESH_COUNTS)
+	proxyParser.add_argument('--layers', type=int, default=PROXY_BENCH_LAYER_COUNT)
+	proxyParser.add_argument('--repeats', type=int, default=3)
+
+	uvSetsParser = subParsers.add_parser('uvsets', help='Per mesh polyUVSet loop vs the bulk uvSet sync, needs mayapy.')
+	uvSetsParser.add_argument('--meshes', type=int, nargs='+', default=UVSETS_BENCH_MESH_COUNTS)
+	uvSetsParser.add_argument('--repeats', type=int, default=3)
+
+	meshDataParser = subParsers.add_parser('meshdata', help='Per mesh maya.cmds queries vs one OpenMaya MeshData pass, needs mayapy.')
+	meshDataParser.add_argument('--meshes', type=int, nargs='+', default=MESH_DATA_BENCH_MESH_COUNTS)
+	meshDataParser.add_argument('--repeats', type=int, default=3)
+
+	compositeParser = subParsers.add_parser('composite', help='Lightmap composite peak memory and throughput, in memory vs streamed bands.')
+	compositeParser.add_argument('--sizes', type=int, nargs='+', default=COMPOSITE_BENCH_SIZES)
+	compositeParser.add_argument('--layers', type=int, default=COMPOSITE_BENCH_LAYER_COUNT)
+	compositeParser.add_argument('--repeats', type=int, default=3)
+
+	startupParser = subParsers.add_parser('startup', help='Cold import time of the tool modules, BenchToolStartup() times the window in Maya.')
+	startupParser.add_argument('--modules', nargs='+', default=STARTUP_BENCH_MODULES)
+	startupParser.add_argument('--repeats', type=int, default=3)
+
+	args = parser.parse_args(argv)
+
+	if args.bench == 'exr':
+		BenchExrConversion(args.sizes, args.repeats)
+	elif args.bench == 'notes':
+		BenchRenderSetsNotes(args.meshes, args.repeats)
+	elif args.bench == 'views':
+		BenchRenderSetViews(args.meshes, args.repeats)
+	elif args.bench == 'proxy':
+		BenchBakeProxies(args.meshes, args.layers, args.repeats)
+	elif args.bench == 'uvsets':
+		BenchUvSetSync(args.meshes, args.repeats)
+	elif args.bench == 'meshdata':
+		BenchMeshData(args.meshes, args.repeats)
+	elif args.bench == 'composite':
+		BenchComposite(args.sizes, args.layers, args.repeats)
+	elif args.bench == 'startup':
+		BenchModuleImports(args.modules, args.repeats)
+	else:
+		parser.print_help()
+		return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,147 @@
+'''
+Content addressed bake cache for the Light Baking Tool.
+Baked lightmap TIFs are kept under the hash of what went into the bake: the Render Set geometry and UVs, the light
+rig and the RenderLayer settings, without any scene or node names. The same props baked in another scene, or by
+another artist sharing the cache folder, are hard linked (or copied) out of the cache instead of baked again.
+The cache is trimmed to a size limit, the least recently used lightmaps go first. Maya is not needed in here.
+'''
+import os
+import shutil
+
+'''
+Global variables
+'''
+# Shared cache folder for everyone, when the tool has none set.
+BAKE_CACHE_ENV = 'LIGHTBAKE_CACHE_DIR'
+DEFAULT_CACHE_MAX_GB = 20
+# Bump when the bake itself changes, so old lightmaps are not picked up again.
+BAKE_CACHE_VERSION = 1
+CACHE_EXT = '.tif'
+
+
+'''Return the cache folder from the LIGHTBAKE_CACHE_DIR environment variable, empty if it is not set.'''
+def ReturnDefaultCacheFolder():
+	return os.environ.get(BAKE_CACHE_ENV, '')
+
+
+'''Hard link source to target, copy it when linking is not possible (other drive, network share). Replaces target.'''
+def LinkOrCopy(source, target):
+	temp = '{}.{}.tmp'.format(target, os.getpid())
+
+	if os.path.isfile(temp):
+		os.remove(temp)
+
+	try:
+		os.link(source, temp)
+	except (OSError, AttributeError):
+		shutil.copy2(source, temp)
+
+	# a linked target is removed rather than written through, that would change the cached file as well
+	if os.path.isfile(target):
+		os.remove(target)
+
+	os.rename(temp, target)
+
+
+'''
+Lightmap TIFs by cache key, in cacheFolder/<first 2 key characters>/<key>.tif.
+The file times are the LRU clock, a hit touches the file, so several Mayas can share a folder without an index file.
+'''
+class BakeCache(object):
+	def __init__(self, cacheFolder, maxBytes=DEFAULT_CACHE_MAX_GB * 1073741824):
+		self.cacheFolder = cacheFolder
+		self.maxBytes = maxBytes
+		self.hits = 0
+		self.misses = 0
+		self.stored = 0
+
+	def ReturnPath(self, key):
+		return os.path.join(self.cacheFolder, key[:2], key + CACHE_EXT)
+
+	def Contains(self, key):
+		return os.path.isfile(self.ReturnPath(key))
+
+	'''Link the lightmap of key to targetPath. Returns False if it is not in the cache.'''
+	def Fetch(self, key, targetPath):
+		path = self.ReturnPath(key)
+
+		try:
+			LinkOrCopy(path, targetPath)
+			os.utime(path, None)
+		except (IOError, OSError):
+			self.misses += 1
+			return False
+
+		self.hits += 1
+		return True
+
+	'''Add the baked lightmap sourcePath under key, nothing happens when it is already there.'''
+	def Store(self, key, sourcePath):
+		path = self.ReturnPath(key)
+
+		if os.path.isfile(path):
+			return
+
+		try:
+			if not os.path.isdir(os.path.dirname(path)):
+				os.makedirs(os.path.dirname(path))
+
+			LinkOrCopy(sourcePath, path)
+		except (IOError, OSError) as e:
+			print('<<<<<< WARNING - Could not add {} to the bake cache: {} >>>>>>'.format(sourcePath, e))
+			return
+
+		self.stored += 1
+
+	'''Return [[mtime, size, path], ...] of every cached lightmap.'''
+	def ReturnEntries(self):
+		entries = []
+
+		if not os.path.isdir(self.cacheFolder):
+			return entries
+
+		for folder in os.listdir(self.cacheFolder):
+			folderPath = os.path.join(self.cacheFolder, folder)
+
+			if not os.path.isdir(folderPath):
+				continue
+
+			for fileName in os.listdir(folderPath):
+				if not fileName.endswith(CACHE_EXT):
+					continue
+
+				path = os.path.join(folderPath, fileName)
+
+				try:
+					stat = os.stat(path)
+				except OSError:
+					continue
+
+				entries.append([stat.st_mtime, stat.st_size, path])
+
+		return entries
+
+	'''Remove the least recently used lightmaps until the cache fits in maxBytes. Returns [files removed, bytes removed].'''
+	def Evict(self):
+		entries = sorted(self.ReturnEntries())
+		total = sum(x[1] for x in entries)
+		removed = [0, 0]
+
+		for mtime, size, path in entries:
+			if total <= self.maxBytes:
+				break
+
+			try:
+				os.remove(path)
+			except OSError:
+				# another Maya got to it first
+				pass
+
+			total -= size
+			removed[0] += 1
+			removed[1] += size
+
+		return removed
+
+	def ReturnDict(self):
+		return {'folder':self.cacheFolder, 'hits':self.hits, 'misses':self.misses, 'stored':self.stored}
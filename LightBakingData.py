@@ -0,0 +1,606 @@
+'''
+Render Set data helpers for the Light Baking Tool.
+Maya is optional in here, so the serialization can be used and benchmarked outside of Maya.
+'''
+import ast
+import json
+import zlib
+import base64
+import string
+import LightBakingSceneData
+from collections import OrderedDict
+
+try:
+	import maya.cmds as cmds
+except ImportError:
+	cmds = None
+
+try:
+	import maya.api.OpenMaya as om
+except ImportError:
+	om = None
+
+'''
+Global variables
+'''
+RENDER_SETS_SCHEMA_VERSION = 2
+RENDER_SETS_HEADER = '#LightBakingTool'
+RENDER_SETS_JSON = 'json'
+RENDER_SETS_ZLIB = 'zlib'
+# Compress the notes string once the json is bigger than this many characters, 0 to never compress.
+RENDER_SETS_COMPRESS_THRESHOLD = 256 * 1024
+# Render Set keys that are checked against the scene by ValidateRenderSets().
+VALIDATE_KEYS = ['objects', 'renderLayers']
+# Light shape node types, 'light' covers the Maya lights, the Arnold ones only exist with mtoa loaded.
+LIGHT_TYPES = ['light']
+ARNOLD_LIGHT_TYPES = ['aiAreaLight', 'aiSkyDomeLight', 'aiMeshLight', 'aiPhotometricLight', 'aiLightPortal']
+# Maya calls a mesh to material lookup takes without the MaterialIndex: listRelatives, listConnections x2 and ls.
+MESH_LOOKUP_CALLS = 4
+
+
+'''
+Encode the renderSets dict for the notes attribute.
+Format: #LightBakingTool:<schema version>:<json|zlib>:<payload>, zlib payloads are base64 encoded.
+'''
+def EncodeRenderSets(renderSets, compressThreshold=RENDER_SETS_COMPRESS_THRESHOLD):
+	payload = json.dumps(renderSets, separators=(',', ':'))
+	encoding = RENDER_SETS_JSON
+
+	if compressThreshold and len(payload) > compressThreshold:
+		payload = base64.b64encode(zlib.compress(payload.encode('utf-8'), 6)).decode('ascii')
+		encoding = RENDER_SETS_ZLIB
+
+	return '{}:{}:{}:{}'.format(RENDER_SETS_HEADER, RENDER_SETS_SCHEMA_VERSION, encoding, payload)
+
+
+'''
+Decode a notes attribute string back to the renderSets dict.
+Handles the current format and the legacy repr() strings, which are parsed without eval().
+'''
+def DecodeRenderSets(notes):
+	if not notes:
+		return {}
+
+	if not notes.startswith(RENDER_SETS_HEADER + ':'):
+		return LiteralEval(notes)
+
+	header, version, encoding, payload = notes.split(':', 3)
+
+	if int(version) > RENDER_SETS_SCHEMA_VERSION:
+		raise ValueError('renderSets schema version {} is newer than this tool supports ({}), please update the tool!'.format(version, RENDER_SETS_SCHEMA_VERSION))
+
+	if encoding == RENDER_SETS_ZLIB:
+		payload = zlib.decompress(base64.b64decode(payload)).decode('utf-8')
+	elif encoding != RENDER_SETS_JSON:
+		raise ValueError('Unknown renderSets encoding: ' + encoding)
+
+	return json.loads(payload)
+
+
+'''
+ast.literal_eval for the legacy notes strings.
+They can also hold OrderedDict([...]) calls, from reordered RenderLayers, which are rebuilt here.
+'''
+def LiteralEval(text):
+	return _LiteralNode(ast.parse(text.strip(), mode='eval').body)
+
+
+def _LiteralNode(node):
+	if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'OrderedDict' and not node.keywords:
+		if not node.args:
+			return OrderedDict()
+		if len(node.args) == 1:
+			return OrderedDict(_LiteralNode(node.args[0]))
+
+	if isinstance(node, ast.Dict):
+		return dict((_LiteralNode(k), _LiteralNode(v)) for k, v in zip(node.keys, node.values))
+	if isinstance(node, ast.List):
+		return [_LiteralNode(x) for x in node.elts]
+	if isinstance(node, ast.Tuple):
+		return tuple(_LiteralNode(x) for x in node.elts)
+
+	return ast.literal_eval(node)
+
+
+'''
+Reads and writes the renderSets dict on the renderSets node notes attribute.
+The parsed dict is cached, and only read again when the generation counter says it may have changed.
+The generation goes up on every Write() and, once Watch() has been called, whenever the attribute
+changes in the scene (undo, a user edit...). A changed generation still only re-parses if the string is different.
+'''
+class RenderSetsStore(object):
+	def __init__(self, nodeName='renderSets', mayaCmds=None, compressThreshold=RENDER_SETS_COMPRESS_THRESHOLD):
+		self.nodeName = nodeName
+		self.cmds = mayaCmds or cmds
+		self.compressThreshold = compressThreshold
+		self.generation = 0
+		self.cacheGeneration = -1
+		self.cacheString = None
+		self.cache = {}
+		self.scriptJob = None
+
+	def Attr(self):
+		return self.nodeName + '.notes'
+
+	'''Return True if the renderSets node and its notes attribute exist.'''
+	def Exists(self):
+		return self.cmds.objExists(self.nodeName) and self.cmds.attributeQuery('notes', n=self.nodeName, exists=True)
+
+	'''Mark the cache as possibly out of date.'''
+	def Invalidate(self, *args):
+		self.generation += 1
+
+	'''Bump the generation whenever the notes attribute changes, the scriptJob dies with parent.'''
+	def Watch(self, parent=None):
+		if self.scriptJob is not None and self.cmds.scriptJob(exists=self.scriptJob):
+			return
+
+		if not self.Exists():
+			return
+
+		kwargs = {'attributeChange':[self.Attr(), self.Invalidate]}
+
+		if parent:
+			kwargs['parent'] = parent
+
+		self.scriptJob = self.cmds.scriptJob(**kwargs)
+
+	'''Return the renderSets dict, shared with the cache so treat it as read only.'''
+	def Read(self):
+		if self.cacheGeneration == self.generation:
+			return self.cache
+
+		generation = self.generation
+		notes = ''
+
+		if self.Exists():
+			notes = self.cmds.getAttr(self.Attr()) or ''
+
+		if notes != self.cacheString:
+			self.cache = DecodeRenderSets(notes)
+			self.cacheString = notes
+
+		self.cacheGeneration = generation
+		return self.cache
+
+	'''Write the renderSets dict to the notes attribute, the dict becomes the cache.'''
+	def Write(self, renderSets):
+		notes = EncodeRenderSets(renderSets, self.compressThreshold)
+
+		if notes != self.cacheString or self.cacheGeneration != self.generation:
+			self.cmds.setAttr(self.Attr(), notes, type='string')
+
+		self.generation += 1
+		self.cache = renderSets
+		self.cacheString = notes
+		self.cacheGeneration = self.generation
+
+
+'''
+Snapshot of the scene for validating Render Sets, gathered with a few bulk ls calls.
+Object names are looked up the way cmds.objExists would, so short names and partial paths work.
+'''
+class SceneIndex(object):
+	def __init__(self, mayaCmds=None):
+		self.cmds = mayaCmds or cmds
+		self.transforms = {}
+		self.meshAncestors = set()
+		self.renderLayers = set(self.cmds.ls(type='renderLayer') or [])
+		self.lookups = 0
+		self.cache = {}
+
+		for transform in self.cmds.ls(type='transform', long=True) or []:
+			self._AddPath(transform)
+
+		for mesh in self.cmds.ls(type='mesh', long=True, noIntermediate=True, allPaths=True) or []:
+			parts = mesh.split('|')
+			# '|grp|geo|geoShape' -> '|grp', '|grp|geo'
+			for index in range(2, len(parts)):
+				self.meshAncestors.add('|'.join(parts[:index]))
+
+	'''Index every partial path of a long transform path, a|b|c is found as c, b|c, a|b|c and |a|b|c.'''
+	def _AddPath(self, longPath):
+		parts = longPath.lstrip('|').split('|')
+
+		for index in range(len(parts)):
+			self.transforms.setdefault('|'.join(parts[index:]), []).append(longPath)
+
+		self.transforms.setdefault(longPath, []).append(longPath)
+
+	'''Return None if obj is a transform with a mesh under it, otherwise 'missing' or 'noMesh'.'''
+	def ObjectProblem(self, obj):
+		if obj in self.cache:
+			return self.cache[obj]
+
+		self.lookups += 1
+		longPaths = self.transforms.get(obj)
+		problem = None
+
+		if not longPaths:
+			problem = 'missing'
+		elif not any(x in self.meshAncestors for x in longPaths):
+			problem = 'noMesh'
+
+		self.cache[obj] = problem
+		return problem
+
+	'''Return None if renLayer exists, otherwise 'missing'.'''
+	def RenderLayerProblem(self, renLayer):
+		if renLayer in self.renderLayers:
+			return None
+		return 'missing'
+
+
+'''
+Check every Render Set's objects and renderLayers against the scene.
+Returns one result per Render Set, in renderSets order:
+{'renderSet':name, 'valid':bool, 'objects':[invalid objects], 'renderLayers':[invalid layers], 'problems':{name:'missing'|'noMesh'}}
+Objects that are in several Render Sets are only looked up once.
+'''
+def ValidateRenderSets(renderSets, sceneIndex=None, mayaCmds=None):
+	sceneIndex = sceneIndex or SceneIndex(mayaCmds)
+	results = []
+
+	for renderSet in renderSets:
+		result = {'renderSet':renderSet, 'valid':True, 'objects':[], 'renderLayers':[], 'problems':{}}
+
+		for key in VALIDATE_KEYS:
+			for obj in renderSets[renderSet].get(key) or []:
+				if key == 'objects':
+					problem = sceneIndex.ObjectProblem(obj)
+				else:
+					problem = sceneIndex.RenderLayerProblem(obj)
+
+				if problem:
+					result['valid'] = False
+					result[key].append(obj)
+					result['problems'][obj] = problem
+
+		results.append(result)
+
+	return results
+
+
+'''
+Return {mesh:[uvSet names, current uvSet]} for the mesh transforms in objects, gathered in one pass with MeshData.
+Objects that do not exist or have no mesh under them are left out. Falls back to polyUVSet without OpenMaya.
+'''
+def ReturnMeshUvSets(objects, mayaCmds=None, meshData=None):
+	meshData = meshData or LightBakingSceneData.ReturnMeshData(mayaCmds)
+
+	if meshData is not None:
+		return meshData.ReturnUvSets(objects)
+
+	mayaCmds = mayaCmds or cmds
+	meshUvSets = {}
+
+	for obj in objects:
+		if not mayaCmds.objExists(obj):
+			continue
+
+		current = mayaCmds.polyUVSet(obj, query=True, currentUVSet=True) or [None]
+		meshUvSets[obj] = [mayaCmds.polyUVSet(obj, query=True, allUVSets=True) or [], current[0]]
+
+	return meshUvSets
+
+
+'''
+Work out the fewest uvSet edits that give every mesh all of uvSets, with wanted[mesh] as the current uvSet.
+meshUvSets is from ReturnMeshUvSets(), meshes not in it and meshes without any uvSets are skipped.
+Returns [[mesh, [uvSets to create], uvSet to make current or None], ...] for the meshes that need an edit.
+'''
+def PlanUvSetChanges(wanted, meshUvSets, uvSets):
+	changes = []
+
+	for mesh in wanted:
+		if not meshUvSets.get(mesh, [None])[0]:
+			continue
+
+		existing, current = meshUvSets[mesh]
+		create = [x for x in uvSets if x not in existing]
+		makeCurrent = wanted[mesh] if wanted[mesh] != current else None
+
+		if create or makeCurrent:
+			changes.append([mesh, create, makeCurrent])
+
+	return changes
+
+
+'''Apply the PlanUvSetChanges() edits in one undo chunk. Returns the number of meshes touched.'''
+def ApplyUvSetChanges(changes, mayaCmds=None):
+	mayaCmds = mayaCmds or cmds
+
+	if not changes:
+		return 0
+
+	mayaCmds.undoInfo(openChunk=True, chunkName='LightBakingToolUvSets')
+
+	try:
+		for mesh, create, makeCurrent in changes:
+			for uvSet in create:
+				mayaCmds.polyUVSet(mesh, create=True, uvSet=uvSet)
+
+			if makeCurrent:
+				mayaCmds.polyUVSet(mesh, currentUVSet=True, uvSet=makeCurrent)
+	finally:
+		mayaCmds.undoInfo(closeChunk=True)
+
+	return len(changes)
+
+
+'''
+Finds the light transforms in the scene with type filtered ls calls, the result is cached.
+Once Watch() has been called, node added/removed callbacks for the light types clear the cache,
+so it is only looked up again when the scene's lights change.
+'''
+class LightIndex(object):
+	def __init__(self, mayaCmds=None, lightTypes=LIGHT_TYPES + ARNOLD_LIGHT_TYPES):
+		self.cmds = mayaCmds or cmds
+		self.lightTypes = lightTypes
+		self.lights = None
+		self.callbackIds = []
+		self.lookups = 0
+
+	'''Return the light types that exist right now, the Arnold ones need mtoa.'''
+	def ReturnLightTypes(self):
+		lightTypes = []
+
+		for lightType in self.lightTypes:
+			try:
+				if self.cmds.nodeType(lightType, isTypeName=True):
+					lightTypes.append(lightType)
+			except RuntimeError:
+				pass
+
+		return lightTypes
+
+	'''Clear the cache, takes any callback arguments.'''
+	def Invalidate(self, *args):
+		self.lights = None
+
+	'''Return the long names of all light transforms.'''
+	def Lights(self):
+		if self.lights is None:
+			self.lookups += 1
+			lightShapes = []
+			lightTypes = self.ReturnLightTypes()
+
+			if lightTypes:
+				lightShapes = self.cmds.ls(type=lightTypes, long=True) or []
+
+			lightTransforms = []
+
+			if lightShapes:
+				lightTransforms = self.cmds.listRelatives(lightShapes, parent=True, fullPath=True) or []
+
+			self.lights = sorted(set(lightTransforms))
+
+		return list(self.lights)
+
+	'''Clear the cache whenever a light is added or removed. Returns True if the callbacks are active.'''
+	def Watch(self):
+		if self.callbackIds:
+			return True
+
+		if om is None:
+			return False
+
+		for lightType in self.ReturnLightTypes():
+			try:
+				self.callbackIds.append(om.MDGMessage.addNodeAddedCallback(self.Invalidate, lightType))
+				self.callbackIds.append(om.MDGMessage.addNodeRemovedCallback(self.Invalidate, lightType))
+			except RuntimeError:
+				pass
+
+		# the cache could be from before the callbacks
+		self.Invalidate()
+		return bool(self.callbackIds)
+
+	def Unwatch(self):
+		if self.callbackIds and om is not None:
+			om.MMessage.removeCallbacks(self.callbackIds)
+
+		self.callbackIds = []
+
+
+'''
+Return items, a {name:value} dict, with oldName renamed to newName in the same order, None if nothing was renamed.
+With partialPaths the names are DAG paths, so a renamed parent renames its part of the path as well.
+'''
+def RenameItems(items, oldName, newName, partialPaths=True):
+	def Rename(name):
+		if not partialPaths:
+			return newName if name == oldName else name
+		return '|'.join(newName if x == oldName else x for x in name.split('|'))
+
+	names = [Rename(x) for x in items]
+
+	if names == list(items):
+		return None
+
+	return type(items)((name, items[x]) for name, x in zip(names, items))
+
+
+'''
+Collects the scene changes the Render Sets care about with OpenMaya callbacks: transforms and RenderLayers that
+are renamed, deleted or created (an undone delete is a create). Nothing is looked up inside the callbacks,
+onChange() is called and the changes are kept until Take(), so they can be handled all at once when Maya is done.
+'''
+class SceneWatcher(object):
+	def __init__(self, onChange=None):
+		self.onChange = onChange
+		self.callbackIds = []
+		self.Clear()
+
+	def Clear(self):
+		# [[old name, new name, is a RenderLayer], ...]
+		self.renamed = []
+		# short names of the deleted nodes
+		self.removed = set()
+		self.added = False
+
+	def Pending(self):
+		return bool(self.renamed or self.removed or self.added)
+
+	'''Return [renamed, removed, added] since the last call and start collecting again.'''
+	def Take(self):
+		changes = [self.renamed, self.removed, self.added]
+		self.Clear()
+		return changes
+
+	def _Changed(self):
+		if self.onChange:
+			self.onChange()
+
+	def NodeRenamed(self, node, prevName, *args):
+		# new nodes are named as they are created, nothing can use them yet
+		if not prevName or prevName.startswith('__'):
+			return
+
+		renderLayer = node.hasFn(om.MFn.kRenderLayer)
+
+		if not renderLayer and not node.hasFn(om.MFn.kTransform):
+			return
+
+		self.renamed.append([prevName, om.MFnDependencyNode(node).name(), renderLayer])
+		self._Changed()
+
+	def NodeRemoved(self, node, *args):
+		self.removed.add(om.MFnDependencyNode(node).name())
+		self._Changed()
+
+	def NodeAdded(self, node, *args):
+		self.added = True
+		self._Changed()
+
+	'''Start the callbacks. Returns True if they are active.'''
+	def Watch(self):
+		if self.callbackIds:
+			return True
+
+		if om is None:
+			return False
+
+		self.callbackIds.append(om.MNodeMessage.addNameChangedCallback(om.MObject.kNullObj, self.NodeRenamed))
+
+		for nodeType in ['transform', 'renderLayer']:
+			self.callbackIds.append(om.MDGMessage.addNodeRemovedCallback(self.NodeRemoved, nodeType))
+			self.callbackIds.append(om.MDGMessage.addNodeAddedCallback(self.NodeAdded, nodeType))
+
+		return True
+
+	def Unwatch(self):
+		if self.callbackIds and om is not None:
+			om.MMessage.removeCallbacks(self.callbackIds)
+
+		self.callbackIds = []
+		self.Clear()
+
+
+'''
+Resolves meshes to their materials for the light map hook up, mesh -> shape -> shadingEngines -> materials.
+Every mesh and shadingEngine is only looked up once, however many times it is asked for.
+The shapes and shadingEngines come from a MeshData when OpenMaya is there, the materials from maya.cmds.
+calls counts the Maya calls made, lookups the meshes asked for, each of which used to cost MESH_LOOKUP_CALLS.
+Each MeshData read of a mesh counts as a call, meshReads has how many of the calls they were.
+'''
+class MaterialIndex(object):
+	def __init__(self, mayaCmds=None, meshData=None):
+		self.cmds = mayaCmds or cmds
+		self.meshData = meshData or LightBakingSceneData.ReturnMeshData(mayaCmds)
+		# mesh -> [materials]
+		self.meshMaterials = {}
+		# shadingEngine -> [materials]
+		self.shadingEngineMaterials = {}
+		self.calls = 0
+		self.meshReads = 0
+		self.lookups = 0
+
+	'''Return the shape of mesh, Orig shapes are left out. None if there is not exactly one.'''
+	def ReturnShape(self, mesh):
+		self.calls += 1
+		shapes = self.cmds.listRelatives(mesh, shapes=True, fullPath=True)
+
+		if not shapes:
+			print('<<<<<< WARNING - No shapeNode found, skipping ' +  mesh + ' >>>>>>')
+			return None
+
+		if len(shapes) > 1:
+			shapes = [x for x in shapes if not x.rstrip(string.digits).endswith('Orig')]
+
+		if len(shapes) != 1:
+			print('<<<<<< WARNING - No shapeNode or more than one found, skipping ' +  mesh + ' >>>>>>')
+			return None
+
+		return shapes[0]
+
+	'''Return the shadingEngines of mesh, None if it has no usable shape.'''
+	def ReturnShadingEngines(self, mesh):
+		if self.meshData is not None:
+			reads = self.meshData.reads
+			shadingEngines = self.meshData.ReturnShadingEngines(mesh)
+			self.meshReads += self.meshData.reads - reads
+			self.calls += self.meshData.reads - reads
+
+			if shadingEngines is None:
+				print('<<<<<< WARNING - No shapeNode or more than one found, skipping ' +  mesh + ' >>>>>>')
+
+			return shadingEngines
+
+		shape = self.ReturnShape(mesh)
+
+		if not shape:
+			return None
+
+		self.calls += 1
+		return list(OrderedDict.fromkeys(self.cmds.listConnections(shape, type='shadingEngine') or []))
+
+	'''Return the materials of shadingEngine.'''
+	def ReturnShadingEngineMaterials(self, shadingEngine):
+		if shadingEngine not in self.shadingEngineMaterials:
+			self.calls += 1
+			connections = self.cmds.listConnections(shadingEngine) or []
+			materials = []
+
+			# ls with an empty list would return every material in the scene
+			if connections:
+				self.calls += 1
+				materials = self.cmds.ls(connections, materials=True) or []
+
+			self.shadingEngineMaterials[shadingEngine] = materials
+
+		return self.shadingEngineMaterials[shadingEngine]
+
+	'''Return the materials assigned to mesh, an empty list if it has none or no usable shape.'''
+	def ReturnMaterials(self, mesh):
+		self.lookups += 1
+
+		if mesh in self.meshMaterials:
+			return self.meshMaterials[mesh]
+
+		materials = []
+		shadingEngines = self.ReturnShadingEngines(mesh)
+
+		if shadingEngines is not None:
+			for shadingEngine in shadingEngines:
+				materials += [x for x in self.ReturnShadingEngineMaterials(shadingEngine) if x not in materials]
+
+			if not materials:
+				print('<<<<<< WARNING - No Materials found, skipping ' +  mesh + ' >>>>>>')
+
+		self.meshMaterials[mesh] = materials
+		return materials
+
+	'''Return {material:[meshes]} for meshes, each material once, in the order they are first found.'''
+	def ReturnMaterialMeshes(self, meshes):
+		materialMeshes = OrderedDict()
+
+		for mesh in meshes:
+			for material in self.ReturnMaterials(mesh):
+				materialMeshes.setdefault(material, []).append(mesh)
+
+		return materialMeshes
+
+	'''Return the Maya calls saved against looking up every mesh on its own.'''
+	def ReturnCallsSaved(self):
+		return self.lookups * MESH_LOOKUP_CALLS - self.calls
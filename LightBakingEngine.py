@@ -0,0 +1,2117 @@
+'''
+UI free light baking engine for the Light Baking Tool.
+BakeEngine runs the same bake as the Light Baking Tool BAKE button, driven by a BakeOptions object,
+so it can run inside the tool, from mayapy on a render node, or against a stand in for maya.cmds.
+
+Command line, a JSON report is written and the exit code says how it went (see the EXIT_ codes):
+	mayapy LightBakingEngine.py scenes/level.mb --render-sets RS_A RS_B --layers Sun --report bake.json
+'''
+import os
+import sys
+import copy
+import json
+import time
+import hashlib
+import argparse
+import traceback
+import LightBakingData
+import LightBakingAtlas
+import LightBakingCache
+import LightBakingProfile
+import LightBakingImageUtils
+import LightBakingSchedule
+import LightBakingSceneData
+from collections import OrderedDict
+from functools import partial
+
+try:
+	import maya.cmds as cmds
+except ImportError:
+	cmds = None
+
+'''
+Global variables
+'''
+# Render Set 'resolution' is an index into this list, same as the tool's Resolution combo box.
+RESOLUTIONS = [64, 128, 256, 512, 1024, 2048]
+# Render Set object uvSet values are an index into this list.
+UV_SETS = ['map1', 'uvSet', 'uvSet1']
+BAKE_MANIFEST_NAME = 'lightMapManifest.json'
+# Group the combined bake meshes are kept in while their Render Set bakes its RenderLayers.
+BAKE_PROXY_GROUP = 'lightBakeProxies'
+# Average seconds of a single arnoldRenderToTexture call per resolution, for the batch bake report.
+BAKE_TIMES_OPTIONVAR = 'LightBakingTool_singleBakeSeconds'
+# Report status of each baked RenderLayer.
+LAYER_BAKED = 'baked'
+LAYER_REUSED = 'reused'
+LAYER_CACHED = 'cached'
+LAYER_FAILED = 'failed'
+# Light map attributes HookUpLightMaps sets on the materials, once UseLightmap/UseLockedLightmap are on.
+LIGHTMAP_ATTRS = ['LightmapMap', 'Lightmap']
+LOCKED_LIGHTMAP_ATTRS = ['LockLM']
+# Scale/offset of the light map UVs, [scaleU, scaleV, offsetU, offsetV], for Render Sets on an atlas page.
+LIGHTMAP_SCALE_OFFSET_ATTR = 'LightmapScaleOffset'
+IDENTITY_SCALE_OFFSET = [1.0, 1.0, 0.0, 0.0]
+# How long the hook up waits for ShaderFX to pick up the UseLightmap settings, and how often it checks.
+HOOKUP_TIMEOUT_SECONDS = 10.0
+HOOKUP_POLL_SECONDS = 0.1
+# Command line exit codes.
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INVALID = 2
+EXIT_ERROR = 3
+
+
+'''For printing a message with flare....'''
+def PrintMessage(text):
+	print('')
+	print('-=' * 40)
+	print('=-' * 40)
+	print(text)
+	print('-=' * 40)
+	print('=-' * 40)
+	print('')
+
+
+'''Return a stable hash for any json friendly data.'''
+def ReturnHash(data):
+	return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+'''Return data without its 'name' entries, so the render setup data of two scenes can be compared.'''
+def ReturnUnnamedData(data):
+	if isinstance(data, dict):
+		return dict((key, ReturnUnnamedData(value)) for key, value in data.items() if key != 'name')
+	if isinstance(data, list):
+		return [ReturnUnnamedData(x) for x in data]
+	return data
+
+
+'''Make sure RenderLayer Name is not the old system nameing'''
+def ReturnRenderSetupLayerName(layerName):
+	if layerName.startswith('rs_'):
+		layerName = layerName[3:]
+
+	return layerName
+
+
+'''Return the most common uvSet of the objects of a Render Set dict.'''
+def ReturnCommonUvSet(setDict):
+	uvSets = []
+
+	for obj in setDict['objects']:
+		uvSets.append(UV_SETS[setDict['objects'][obj]])
+
+	return max(set(uvSets), key = uvSets.count)
+
+
+'''Return the Render Sets to bake in renderSetsDict order, renderSets = names to bake, None for every renderMe Render Set.'''
+def ReturnRenderSetsToBake(renderSetsDict, renderSets=None):
+	if renderSets is None:
+		return [x for x in renderSetsDict if renderSetsDict[x].get('renderMe', True)]
+
+	return [x for x in renderSetsDict if x in renderSets]
+
+
+'''Return the .py path of a module, for running it as a script.'''
+def ReturnModulePath(module):
+	return os.path.splitext(os.path.abspath(module.__file__))[0] + '.py'
+
+
+'''Let Maya run its idle queue, where ShaderFX rebuilds edited graphs. Does nothing outside of Maya.'''
+def _ProcessIdleEvents():
+	try:
+		import maya.utils
+	except ImportError:
+		return
+
+	maya.utils.processIdleEvents()
+
+
+'''Return the renderSetup module, None outside of Maya. Imported late so mayapy can initialize first.'''
+def _RenderSetup():
+	try:
+		import maya.app.renderSetup.model.renderSetup as renderSetup
+	except ImportError:
+		return None
+
+	return renderSetup
+
+
+'''comtypes is only needed for Photoshop, import it on first use. Returns None if it is missing.'''
+def _Comtypes():
+	try:
+		import comtypes.client
+	except ImportError:
+		return None
+
+	return comtypes
+
+
+'''
+Records the input hash of every baked (renderSet, renLayer) pair and of every composited Render Set,
+so an incremental bake only redoes what changed. Saved as json next to textures/lightMap.
+'''
+class BakeManifest(object):
+	VERSION = 1
+
+	def __init__(self, manifestPath):
+		self.manifestPath = manifestPath
+		self.layers = {}
+		self.composites = {}
+		self.Load()
+
+	def Load(self):
+		if not os.path.isfile(self.manifestPath):
+			return
+		try:
+			with open(self.manifestPath, 'r') as manifestFile:
+				data = json.load(manifestFile)
+		except (IOError, ValueError) as e:
+			print('<<<<<< WARNING - Could not read {}, doing a full bake: {} >>>>>>'.format(self.manifestPath, e))
+			return
+
+		if data.get('version') != self.VERSION:
+			return
+
+		self.layers = data.get('layers', {})
+		self.composites = data.get('composites', {})
+
+	def Save(self):
+		with open(self.manifestPath, 'w') as manifestFile:
+			json.dump({'version':self.VERSION, 'layers':self.layers, 'composites':self.composites}, manifestFile, indent=1, sort_keys=True)
+
+	'''Return the lightmap name baked for these inputs if the TIF still exists, otherwise None.'''
+	def ReturnBakedLightMap(self, renderSet, renLayer, inputHash, dirPath):
+		entry = self.layers.get(renderSet + '|' + renLayer)
+
+		if entry and entry['hash'] == inputHash and os.path.isfile('{}/{}.tif'.format(dirPath, entry['lightMapName'])):
+			return entry['lightMapName']
+
+		return None
+
+	def SetBaked(self, renderSet, renLayer, inputHash, lightMapName):
+		self.layers[renderSet + '|' + renLayer] = {'hash':inputHash, 'lightMapName':lightMapName}
+
+	def RemoveBaked(self, renderSet, renLayer):
+		self.layers.pop(renderSet + '|' + renLayer, None)
+
+	'''Return True if the Render Set needs compositing again.'''
+	def CompositeChanged(self, renderSet, compositeHash, pngLoc):
+		return self.composites.get(renderSet) != compositeHash or not os.path.isfile(pngLoc)
+
+	def SetComposited(self, renderSet, compositeHash):
+		self.composites[renderSet] = compositeHash
+
+'''
+Everything the bake needs to know that used to come from the tool's widgets.
+renderSets = Render Set names to bake, None bakes every Render Set with renderMe on.
+renderLayers = only bake these RenderLayers, None bakes them all. PSDs/PNGs need every RenderLayer of a set.
+manifestName = file name of the BakeManifest in the textures folder, farm workers each get their own.
+atlas = bake the small Render Sets on shared atlas pages, see LightBakingAtlas.
+atlasPageResolution / atlasMaxResolution = atlas page size, and the biggest Render Set that goes on a page.
+bakeCacheFolder = bake cache folder shared between scenes and artists, see LightBakingCache. Empty for no cache.
+bakeCacheMaxBytes = the bake cache is trimmed to this size after the bake.
+hookUpTimeout = seconds the hook up waits for ShaderFX to enable UseLightmap on the materials.
+profileName = file name of the bake profile (Chrome trace) in the textures folder, empty to not write it.
+profiler = LightBakingProfile.Profiler to add the spans to, for callers that time stages before the bake.
+longestFirst = bake the Render Sets with the longest predicted bake time first, see LightBakingSchedule.
+recordBakeTimes = save the bake timings for the cost model, farm workers leave that to the coordinator.
+askRenderLayers = called with a Render Set name, returns the RenderLayers to bake or None to skip the set.
+progressCallback = called with (done, total, text) while the post bake images are processed.
+'''
+class BakeOptions(object):
+	def __init__(self, **kwargs):
+		self.renderSets = None
+		self.renderLayers = None
+		self.textureFolder = None
+		self.useMentalRay = False
+		self.createPsd = False
+		self.combineImages = True
+		self.pngPrefix = ''
+		self.pngSuffix = ''
+		self.hookUpLightMaps = True
+		self.hookUpTimeout = HOOKUP_TIMEOUT_SECONDS
+		self.createUvSnapshots = False
+		self.parallelPostBake = True
+		self.onlyBakeChanges = True
+		self.batchBake = False
+		self.atlas = False
+		self.atlasPageResolution = LightBakingAtlas.ATLAS_PAGE_RESOLUTION
+		self.atlasMaxResolution = LightBakingAtlas.ATLAS_MAX_SET_RESOLUTION
+		self.bakeCacheFolder = LightBakingCache.ReturnDefaultCacheFolder()
+		self.bakeCacheMaxBytes = LightBakingCache.DEFAULT_CACHE_MAX_GB * 1073741824
+		self.manifestName = BAKE_MANIFEST_NAME
+		self.profileName = LightBakingProfile.BAKE_PROFILE_NAME
+		self.profiler = None
+		self.longestFirst = True
+		self.recordBakeTimes = True
+		self.exrBackend = LightBakingImageUtils.EXR_BACKEND_NUMPY
+		self.askRenderLayers = None
+		self.progressCallback = None
+
+		for key, value in kwargs.items():
+			if not hasattr(self, key):
+				raise TypeError('Unknown bake option: ' + key)
+			setattr(self, key, value)
+
+	'''Return the options that can go in a JSON report.'''
+	def ReturnDict(self):
+		return dict((key, value) for key, value in self.__dict__.items() if not callable(value) and key != 'profiler')
+
+
+'''
+Bakes the lightmaps for a renderSets dict, one lightmap per Render Set RenderLayer,
+then makes the PSDs, PNGs and uvSnapshots and hooks the PNGs up to the materials.
+Run() returns a report dict, the same one the command line writes out.
+'''
+class BakeEngine(object):
+	def __init__(self, renderSetsDict, options=None, mayaCmds=None, lightIndex=None):
+		self.renderSetsDict = renderSetsDict
+		self.options = options or BakeOptions()
+		self.cmds = mayaCmds or cmds
+		self.lightIndex = lightIndex or LightBakingData.LightIndex(self.cmds)
+		self.profiler = self.options.profiler or LightBakingProfile.Profiler()
+		self.bakeHashCache = {}
+		self.bakeCache = None
+		# key -> combined bake mesh kept across RenderLayers, see ReturnBakeProxy
+		self.bakeProxies = OrderedDict()
+		self.postBakeQueue = None
+		self.report = {}
+		self.costModel = None
+		# (renderSet, renLayer) -> LightBakingSchedule.BakeTask
+		self.bakeTasks = OrderedDict()
+		# renderSet -> triangle count
+		self.triangleCounts = {}
+		# OpenMaya mesh queries, None with a stand in for maya.cmds
+		self.meshData = LightBakingSceneData.ReturnMeshData(mayaCmds)
+		# resolution -> [total seconds, bake count] of single Render Set bakes
+		self.singleBakeSeconds = {}
+		# Maya calls made by the material hook up, and what a mesh by mesh hook up would have made
+		self.hookUpCalls = {'calls':0, 'perMesh':0}
+		# material -> has LIGHTMAP_SCALE_OFFSET_ATTR, see ReturnAtlasReady
+		self.atlasMaterials = {}
+		self.atlasMaterialIndex = None
+
+		if self.cmds.optionVar(exists=BAKE_TIMES_OPTIONVAR):
+			try:
+				self.singleBakeSeconds = json.loads(self.cmds.optionVar(q=BAKE_TIMES_OPTIONVAR))
+			except (TypeError, ValueError):
+				pass
+
+	def PrintMessage(self, text):
+		PrintMessage(text)
+
+	def CreateDir(self, path):
+		if not os.path.exists(path):
+			os.makedirs(path)
+
+	'''Return the texture resolution in pixels for renderSet.'''
+	def ReturnResolution(self, renderSet):
+		return RESOLUTIONS[self.renderSetsDict[renderSet]['resolution']]
+
+	'''Return the triangle count of the Render Set meshes, cached for the engine's lifetime.'''
+	def ReturnTriangles(self, renderSet):
+		if renderSet not in self.triangleCounts:
+			objects = list(self.renderSetsDict[renderSet].get('objects') or [])
+			triangles = 0
+
+			if objects and self.meshData is not None:
+				triangles = self.meshData.ReturnTriangles(objects)
+			elif objects:
+				try:
+					triangles = self.cmds.polyEvaluate(objects, triangle=True)
+				except RuntimeError:
+					pass
+
+			# polyEvaluate returns a message string when nothing could be counted
+			self.triangleCounts[renderSet] = triangles if isinstance(triangles, int) else 0
+
+		return self.triangleCounts[renderSet]
+
+	'''Return the cost model of textureFolder, seeded with the single bake timings.'''
+	def ReturnCostModel(self, textureFolder):
+		return LightBakingSchedule.CostModel(textureFolder + '/' + LightBakingSchedule.BAKE_TIMES_NAME, self.singleBakeSeconds)
+
+	'''Create a BakeTask for every RenderLayer of renderSets, returns them in renderSets order.'''
+	def ReturnBakeTasks(self, renderSets, lightCount):
+		tasks = []
+
+		for renderSet in renderSets:
+			for renLayer in self.renderSetsDict[renderSet].get('renderLayers') or []:
+				if self.options.renderLayers is not None and renLayer not in self.options.renderLayers:
+					continue
+
+				task = LightBakingSchedule.BakeTask(renderSet, renLayer, self.ReturnTriangles(renderSet), self.ReturnResolution(renderSet), lightCount)
+				self.bakeTasks[(renderSet, renLayer)] = task
+				tasks.append(task)
+
+		return tasks
+
+	'''Return renderSets with the longest predicted bake first.'''
+	def ScheduleRenderSets(self, renderSets):
+		predicted = {}
+
+		for task in self.bakeTasks.values():
+			predicted[task.renderSet] = predicted.get(task.renderSet, 0.0) + self.costModel.Predict(task)
+
+		scheduled = sorted(renderSets, key=lambda x: -predicted.get(x, 0.0))
+		self.PrintMessage('Bake order, longest predicted first:\n' + '\n'.join('{} ~{:.1f}s'.format(x, predicted.get(x, 0.0)) for x in scheduled))
+		return scheduled
+
+	'''Return the textures folder, next to the scene's folder unless the options say otherwise.'''
+	def ReturnTextureFolder(self):
+		if self.options.textureFolder:
+			return self.options.textureFolder.replace('\\', '/')
+
+		fileLoc = self.cmds.file(q=True, sn=True)
+		currentFolder = os.path.dirname(fileLoc)
+		return os.path.dirname(currentFolder) + '/textures'
+
+	'''Return the Render Sets to bake, in renderSetsDict order.'''
+	def ReturnRenderSetsToBake(self):
+		return ReturnRenderSetsToBake(self.renderSetsDict, self.options.renderSets)
+
+	'''Return the RenderLayers of renderSet to bake, None to skip it.'''
+	def ReturnRenderLayersToBake(self, renderSet):
+		renLayers = list(self.renderSetsDict[renderSet]['renderLayers'].keys())
+
+		if self.options.askRenderLayers:
+			renLayers = self.options.askRenderLayers(renderSet)
+
+			if renLayers is None:
+				return None
+
+		if self.options.renderLayers is not None:
+			renLayers = [x for x in renLayers if x in self.options.renderLayers]
+
+		return renLayers
+
+	'''Return most common uvSet'''
+	def ReturnCommonUvSet(self, renderSet):
+		return ReturnCommonUvSet(self.renderSetsDict[renderSet])
+
+	'''Return the combined PNG path for a Render Set, with the PNG Prefix/Suffix.'''
+	def ReturnPngLocation(self, renderSet, textureFolder):
+		prefix = ''
+		suffix = ''
+
+		if self.options.pngPrefix:
+			prefix = self.options.pngPrefix + '_'
+		if self.options.pngSuffix:
+			suffix = '_' + self.options.pngSuffix
+
+		pngName = prefix + renderSet + suffix
+		return textureFolder + '/LM/' + pngName + '.png'
+
+	'''Add a RenderLayer result to the report.'''
+	def ReportLayer(self, renderSet, renLayer, status, fileName=None):
+		setReport = self.report['renderSets'].setdefault(renderSet, {'status':'baked', 'renderLayers':OrderedDict()})
+		setReport['renderLayers'][renLayer] = {'status':status, 'file':fileName}
+
+	'''Set the report status and any output files of renderSet.'''
+	def ReportRenderSet(self, renderSet, status=None, **files):
+		setReport = self.report['renderSets'].setdefault(renderSet, {'status':'baked', 'renderLayers':OrderedDict()})
+
+		if status:
+			setReport['status'] = status
+
+		setReport.update(files)
+
+	'''Bake the Render Sets, returns the report dict. The post bake workers are always shut down.'''
+	def Run(self):
+		self.report = {'renderSets':OrderedDict(), 'failed':[], 'batches':[], 'options':self.options.ReturnDict()}
+		start = time.time()
+
+		try:
+			self.Bake()
+		finally:
+			if self.postBakeQueue:
+				self.postBakeQueue.Shutdown()
+				self.postBakeQueue = None
+
+			if self.bakeProxies:
+				self.DeleteBakeProxies()
+
+			self.WriteProfile()
+
+		self.report['seconds'] = time.time() - start
+		return self.report
+
+	'''Print the slowest Render Sets and write the bake profile next to the bake manifest.'''
+	def WriteProfile(self):
+		self.profiler.PrintSummary()
+
+		if not self.options.profileName or not self.report.get('textureFolder'):
+			return
+
+		profilePath = self.report['textureFolder'] + '/' + self.options.profileName
+
+		try:
+			self.profiler.Write(profilePath)
+			self.report['profile'] = profilePath
+		except (IOError, OSError) as e:
+			self.PrintMessage('Could not write the bake profile {}: {}'.format(profilePath, e))
+
+	'''Bake out the light maps for each RenderSet. There will be 1 lightmap per RenderLayers in RenderSet'''
+	def Bake(self):
+		useMentalRay = self.options.useMentalRay
+
+		if useMentalRay:
+			import maya.mel as mel
+			# Check is the initBakeSets exsist yet, if not, create them.
+			if not self.cmds.objExists('initialTextureBakeSet'):
+				mel.eval('createBakeSet("initialTextureBakeSet", "textureBakeSet");')
+			if not self.cmds.objExists('initialVertexBakeSet'):
+				mel.eval('createBakeSet("initialVertexBakeSet", "textureBakeSet");')
+
+		# gather all light transforms, cached until a light is added or removed
+		if not self.lightIndex.Watch():
+			self.lightIndex.Invalidate()
+
+		# get current RenderLayer
+		currentRenderLayer = self.cmds.editRenderLayerGlobals(query=True, currentRenderLayer=True)
+		# hook up lightmap textures dict.
+		hookUpLMTexturesDict = {}
+		# Failed lightmap List #
+		failedLightMap = self.report['failed']
+		# Image processing runs in worker processes while Maya bakes, Arnold only.
+		postBakeQueue = None
+
+		if not useMentalRay and self.options.parallelPostBake and LightBakingImageUtils.np is not None:
+			postBakeQueue = LightBakingImageUtils.PostBakeQueue(progressCallback=self.options.progressCallback, profiler=self.profiler)
+			self.postBakeQueue = postBakeQueue
+		# Only re-bake (renderSet, renLayer) pairs whose inputs changed, Arnold only.
+		bakeManifest = None
+		# (renderSet, renLayer) -> [inputHash, lightMapName, tifFile, cacheKey] baked this time, cacheKey is None for cache hits
+		bakedThisRun = {}
+		# renderSet -> [compositeHash, pngLoc] composited this time
+		compositedThisRun = {}
+		self.bakeHashCache = {}
+		renderSets = self.ReturnRenderSetsToBake()
+
+		if not renderSets:
+			return
+
+		# create textures/LM folder structure if needed
+		textureFolder = self.ReturnTextureFolder()
+		self.CreateDir(textureFolder)
+		self.report['textureFolder'] = textureFolder
+
+		if not useMentalRay:
+			self.costModel = self.ReturnCostModel(textureFolder)
+			self.ReturnBakeTasks(renderSets, len(self.lightIndex.Lights()))
+
+			for task in self.bakeTasks.values():
+				self.costModel.Predict(task)
+
+			if self.options.longestFirst:
+				renderSets = self.ScheduleRenderSets(renderSets)
+
+		if not useMentalRay and self.options.onlyBakeChanges:
+			bakeManifest = BakeManifest(textureFolder + '/' + self.options.manifestName)
+		# Lightmaps baked before in any scene, Arnold only.
+		if not useMentalRay and self.options.bakeCacheFolder:
+			self.bakeCache = LightBakingCache.BakeCache(self.options.bakeCacheFolder, self.options.bakeCacheMaxBytes)
+		# Render Sets baked on the shared atlas pages, up front
+		atlasSets = []
+
+		if not useMentalRay and self.options.atlas:
+			if self.options.askRenderLayers is not None or self.options.renderLayers is not None:
+				self.cmds.warning('Atlas pages need every RenderLayer and Just do it all! checked, baking one Render Set at a time.')
+			elif LightBakingImageUtils.np is None:
+				self.cmds.warning('Atlas pages need numpy for the PNGs, baking one Render Set at a time.')
+			else:
+				atlasSets = self.ArnoldAtlasBake(renderSets, textureFolder, bakeManifest, hookUpLMTexturesDict)
+
+		# (renderSet, renLayer) -> lightMapName of the Render Sets baked together up front
+		batchedLightMaps = {}
+
+		if not useMentalRay and self.options.batchBake:
+			if self.options.askRenderLayers is None:
+				batchedLightMaps = self.ArnoldBatchBake([x for x in renderSets if x not in atlasSets], textureFolder, bakeManifest, postBakeQueue is None)
+			else:
+				self.cmds.warning('Batch Bake needs Just do it all! checked, baking one Render Set at a time.')
+
+		setSpan = None
+
+		for renderSet in renderSets:
+			# a span per Render Set, ended when the next one starts since the loop body is full of continues
+			self.profiler.End(setSpan)
+			setSpan = self.profiler.Begin('renderSet', renderSet)
+
+			if renderSet in atlasSets:
+				continue
+
+			if not self.renderSetsDict[renderSet].get('renderLayers'):
+				self.PrintMessage(renderSet + ' is being skipped due to NO Renderlayers being loaded!')
+				self.ReportRenderSet(renderSet, 'skipped')
+				continue
+
+			if not self.renderSetsDict[renderSet].get('objects'):
+				self.PrintMessage(renderSet + ' is being skipped due to NO Objects loaded!')
+				self.ReportRenderSet(renderSet, 'skipped')
+				continue
+
+			allRenLayers = list(self.renderSetsDict[renderSet]['renderLayers'].keys())
+			renLayersReturn = self.ReturnRenderLayersToBake(renderSet)
+
+			if renLayersReturn is None:
+				self.PrintMessage(renderSet + ' is being skipped!')
+				self.ReportRenderSet(renderSet, 'skipped')
+				continue
+
+			# PSDs and PNGs need every RenderLayer
+			partialRenderSet = len(renLayersReturn) != len(allRenLayers)
+
+			self.cmds.select(cl=True)
+			# get texture resolution
+			res = self.ReturnResolution(renderSet)
+			padding = self.renderSetsDict[renderSet]['fillTextureSeams']
+
+			if useMentalRay:
+				# create temp bake set
+				tmpBakeSet = mel.eval('createBakeSet("' + renderSet + 'TexturesBakeSet", "textureBakeSet");')
+				# add objects to temp bake set.
+				for mesh in self.renderSetsDict[renderSet]['objects']:
+					mel.eval('assignBakeSet("' + tmpBakeSet + '", "' + mesh + '");')
+
+				# set texture res of temp bake set
+				self.cmds.setAttr(tmpBakeSet + '.xResolution', res)
+				self.cmds.setAttr(tmpBakeSet + '.yResolution', res)
+				# set Color Mode of bake set
+				self.cmds.setAttr(tmpBakeSet + '.colorMode', self.renderSetsDict[renderSet]['colorMode'])
+				# set Fill Texture Seams value for bake set
+				self.cmds.setAttr(tmpBakeSet + '.fillTextureSeams', padding)
+				# set To TIFF defaultFileSaveType
+				self.cmds.setAttr(tmpBakeSet + '.fileFormat', 6)
+				# make sure there is only one map
+				self.cmds.setAttr(tmpBakeSet + '.bakeToOneMap', 1)
+
+			imageFileInfo = []
+			tifFileList = []
+			layerIndex = 0
+			renderSetRebaked = False
+
+			for renLayer in renLayersReturn:
+				setLayerString = '{}_{}'.format(renderSet, renLayer)
+				lightMapName = self.renderSetsDict[renderSet]['lightMapPrefix'] + '_' + setLayerString + '_LM'
+				self.cmds.editRenderLayerGlobals(currentRenderLayer=renLayer)
+				self.AddObjectsToRenderLayer(renderSet, renLayer)
+
+				ext = '.tif'
+
+				if useMentalRay:
+					# Select the temp bake set
+					self.cmds.setAttr(tmpBakeSet + '.prefix', lightMapName, type='string')
+					self.cmds.select(tmpBakeSet)
+					# do some sweet magic
+					self.cmds.convertLightmapSetup(camera='persp', sh=True, keepOrgSG=True, showcpv=True, prj=textureFolder)
+				else:
+					# Add ShaderOverride to Collections if needed.
+					self.AddShaderOverridesIfNeeded()
+					meshes = list(self.renderSetsDict[renderSet]['objects'].keys())
+					exrPath = textureFolder + '/lightMap'
+					uvSet = self.ReturnCommonUvSet(renderSet)
+					self.CreateDir(exrPath)
+					layoutUVs = self.renderSetsDict[renderSet].get('layoutUVs', False)
+					lights = self.lightIndex.Lights()
+					inputHash = None
+					cacheKey = None
+
+					# hashing reads every vertex and UV, only done for the manifest and the bake cache
+					if bakeManifest or self.bakeCache:
+						with self.profiler.Span('inputHash', renderLayer=renLayer):
+							if bakeManifest:
+								inputHash = self.ReturnBakeInputHash(renderSet, renLayer, uvSet, res, padding, layoutUVs, lights)
+
+							if self.bakeCache:
+								cacheKey = self.ReturnBakeCacheKey(renderSet, renLayer, uvSet, res, padding, layoutUVs, lights)
+
+					bakedLightMap = None
+
+					if bakeManifest:
+						bakedLightMap = bakeManifest.ReturnBakedLightMap(renderSet, renLayer, inputHash, exrPath)
+
+					if bakedLightMap:
+						lightMapName = bakedLightMap
+						fileName = '{}/lightMap/{}{}'.format(textureFolder, lightMapName, ext)
+						self.PrintMessage(setLayerString + ' is unchanged, reusing: ' + fileName)
+						self.ReportLayer(renderSet, renLayer, LAYER_REUSED, os.path.abspath(fileName))
+						tifFileList.append(os.path.abspath(fileName))
+						imageFileInfo.append([fileName, renLayer, layerIndex])
+						layerIndex += 1
+						continue
+
+					renderSetRebaked = True
+
+					if cacheKey and (renderSet, renLayer) not in batchedLightMaps:
+						fileName = '{}/lightMap/{}{}'.format(textureFolder, lightMapName, ext)
+
+						with self.profiler.Span('bakeCache', renderLayer=renLayer):
+							cached = self.bakeCache.Fetch(cacheKey, fileName)
+
+						if cached:
+							self.PrintMessage(setLayerString + ' is in the bake cache, linked to: ' + fileName)
+							self.ReportLayer(renderSet, renLayer, LAYER_CACHED, os.path.abspath(fileName))
+							bakedThisRun[(renderSet, renLayer)] = [inputHash, lightMapName, os.path.abspath(fileName), None]
+							tifFileList.append(os.path.abspath(fileName))
+							imageFileInfo.append([fileName, renLayer, layerIndex])
+							layerIndex += 1
+							continue
+
+					if (renderSet, renLayer) in batchedLightMaps:
+						lightMapName = batchedLightMaps[(renderSet, renLayer)]
+					else:
+						start = time.time()
+
+						with self.profiler.Span('bakeLayer', renderLayer=renLayer):
+							lightMapName = self.ArnoldLightmapBake(meshes,
+																   res,
+																   padding,
+																   lightMapName,
+																   renLayer,
+																   exrPath,
+																   uvSet,
+																   lights,
+																   layoutUVs,
+																   postBakeQueue is None,
+																   renderSet)
+						self.RecordTaskTime(renderSet, renLayer, time.time() - start)
+
+				fileName = '{}/lightMap/{}{}'.format(textureFolder, lightMapName, ext)
+				bakedExt = ext
+
+				# the TIF is made by the postBakeQueue, check the EXR instead
+				if postBakeQueue:
+					bakedExt = '.exr'
+
+				if not os.path.isfile('{}/lightMap/{}{}'.format(textureFolder, lightMapName, bakedExt)):
+					self.PrintMessage('{} has been Skipped, {}{} could not be created!'.format(setLayerString,
+																								lightMapName,
+																								bakedExt))
+					failedLightMap.append('{}_{} ---> {}{}'.format(renderSet, renLayer, lightMapName, bakedExt))
+					self.ReportLayer(renderSet, renLayer, LAYER_FAILED)
+
+					if bakeManifest:
+						bakeManifest.RemoveBaked(renderSet, renLayer)
+					continue
+
+				if not useMentalRay:
+					bakedThisRun[(renderSet, renLayer)] = [inputHash, lightMapName, os.path.abspath(fileName), cacheKey]
+
+				if postBakeQueue:
+					postBakeQueue.AddConversion(renderSet,
+												setLayerString,
+												os.path.abspath('{}/lightMap/{}.exr'.format(textureFolder, lightMapName)),
+												os.path.abspath(fileName),
+												self.options.exrBackend)
+					postBakeQueue.Poll()
+
+				tifFileList.append(os.path.abspath(fileName))
+				self.PrintMessage(setLayerString + ' has been baked and saved to: ' + fileName)
+				self.ReportLayer(renderSet, renLayer, LAYER_BAKED, os.path.abspath(fileName))
+
+				imageFileInfo.append([fileName, renLayer, layerIndex])
+				layerIndex += 1
+
+			# the Render Set has baked all its RenderLayers
+			if self.bakeProxies:
+				self.DeleteBakeProxies()
+
+			if useMentalRay:
+				# delete the bakeSet
+				self.cmds.delete(tmpBakeSet)
+
+			psdLoc = textureFolder + '/lightMap/' + renderSet + '.psd'
+			psdPathExists = False
+
+			if not tifFileList:
+				self.PrintMessage(renderSet + '.psd creation has been skipped, no tif files created to use!!!')
+				self.ReportRenderSet(renderSet, 'failed')
+				continue
+
+			# [tifFile, blendType] in Render Set order, first RenderLayer is the top layer like in the PSD
+			compositeLayers = [[os.path.abspath(info[0]), self.renderSetsDict[renderSet]['renderLayers'][info[1]]]
+							   for info in sorted(imageFileInfo, key=lambda x: allRenLayers.index(x[1]))]
+			pngLoc = self.ReturnPngLocation(renderSet, textureFolder)
+			compositeHash = ReturnHash([compositeLayers, pngLoc, self.options.createPsd])
+
+			# nothing was re-baked, only hook up the existing PNG
+			if bakeManifest and not renderSetRebaked and not bakeManifest.CompositeChanged(renderSet, compositeHash, pngLoc):
+				self.PrintMessage(renderSet + ' is unchanged, skipping PSD/PNG creation!')
+				self.ReportRenderSet(renderSet, 'reused', png=pngLoc)
+
+				if self.options.combineImages and self.options.hookUpLightMaps:
+					self.SetAtlasEntry(renderSet, None)
+					hookUpLMTexturesDict.update({renderSet:{}})
+
+					for mesh in self.renderSetsDict[renderSet]['objects']:
+						hookUpLMTexturesDict[renderSet].setdefault(mesh, pngLoc)
+				continue
+
+			if os.path.exists(psdLoc):
+				psdPathExists = True
+
+			# create PSD
+			if self.options.createPsd:
+				if partialRenderSet:
+					self.PrintMessage(renderSet + '.psd creation has been skipped, must have all RenderLayers selected to create!!!')
+					self.ReportRenderSet(renderSet, 'partial')
+					continue
+
+				if psdPathExists:
+					self.PrintMessage('=== Overwriting PSD===')
+
+				if postBakeQueue:
+					# The PSD needs the TIFs on disk
+					with self.profiler.Span('postBakeWait'):
+						postBakeQueue.WaitForConversions(renderSet)
+					imageFileInfo = [x for x in imageFileInfo if os.path.isfile(x[0])]
+					tifFileList = [x for x in tifFileList if os.path.isfile(x)]
+
+					for index, info in enumerate(imageFileInfo):
+						info[2] = index
+
+					if not imageFileInfo:
+						self.PrintMessage(renderSet + '.psd creation has been skipped, no tif files created to use!!!')
+						continue
+
+				if self.CreatePsd(renderSet, psdLoc, res, imageFileInfo, tifFileList):
+					psdPathExists = True
+					self.ReportRenderSet(renderSet, psd=psdLoc)
+
+			# Create PNG from the RenderLayer TIFs
+			if self.options.combineImages:
+				if partialRenderSet:
+					self.PrintMessage(renderSet + '.png creation has been skipped, must have all RenderLayers selected to create!!!')
+					self.ReportRenderSet(renderSet, 'partial')
+					continue
+
+				if LightBakingImageUtils.np is None and not psdPathExists:
+					self.PrintMessage('numpy is not available and ' + renderSet + '.psd does not exsist, Skipping PNG Creation!!!')
+					continue
+
+				# create LM folder if needed
+				self.CreateDir(textureFolder + '/LM')
+				compositedThisRun[renderSet] = [compositeHash, pngLoc]
+
+				if postBakeQueue:
+					# Composited in a worker once this RenderSet's TIFs are done
+					postBakeQueue.AddComposite(renderSet, compositeLayers, pngLoc)
+					self.PrintMessage(pngLoc + ' has been queued!!!')
+				elif LightBakingImageUtils.np is not None:
+					# Composite the layers here, no PSD or Photoshop needed
+					with self.profiler.Span('pngComposite'):
+						LightBakingImageUtils.CompositeLightmapPng(compositeLayers, pngLoc)
+					self.PrintMessage(pngLoc + ' has been created or updated!!!')
+					self.ReportRenderSet(renderSet, png=pngLoc)
+				else:
+					with self.profiler.Span('pngExport'):
+						self.cmds.psdExport(ifn=psdLoc, ofn=pngLoc, format='png')
+					self.PrintMessage(pngLoc + ' has been created or updated!!!')
+					self.ReportRenderSet(renderSet, png=pngLoc)
+
+				if self.options.hookUpLightMaps:
+					self.SetAtlasEntry(renderSet, None)
+					hookUpLMTexturesDict.update({renderSet:{}})
+
+					for mesh in self.renderSetsDict[renderSet]['objects']:
+						hookUpLMTexturesDict[renderSet].setdefault(mesh, pngLoc)
+
+			if self.options.createUvSnapshots:
+				uvSnapShotsFolder = textureFolder + '/uvSnapshots'
+				uvSnapshotName = uvSnapShotsFolder + '/' + renderSet + '_uvSnap' + '.png'
+
+				# create uvSnapshots folder if needed
+				self.CreateDir(uvSnapShotsFolder)
+
+				self.cmds.select(cl=True)
+				self.cmds.select(list(self.renderSetsDict[renderSet]['objects'].keys()))
+				print('------------=======<<<<<<< uvSnapshot render >>>>>>>=======------------')
+				with self.profiler.Span('uvSnapshot'):
+					self.cmds.uvSnapshot(n=uvSnapshotName, aa=True, xr=res, yr=res, o=True, ff='png')
+				print('------------=======<<<<<<< uvSnapshot render >>>>>>>=======------------\n')
+				self.cmds.select(cl=True)
+				self.ReportRenderSet(renderSet, uvSnapshot=uvSnapshotName)
+
+		self.profiler.End(setSpan)
+		# set back to the current render layer
+		self.cmds.editRenderLayerGlobals(currentRenderLayer=currentRenderLayer)
+
+		if postBakeQueue:
+			self.PrintMessage('Waiting for the image processing to finish!')
+
+			with self.profiler.Span('postBakeWait'):
+				postBakeQueue.Wait()
+
+			for failed in postBakeQueue.failed:
+				self.PrintMessage(failed + ' has Failed!')
+			failedLightMap += postBakeQueue.failed
+
+			# only hook up the PNGs that were created
+			for renderSet in list(hookUpLMTexturesDict.keys()):
+				if renderSet not in postBakeQueue.completedPngs:
+					hookUpLMTexturesDict.pop(renderSet)
+
+			for renderSet, pngLoc in postBakeQueue.completedPngs.items():
+				self.PrintMessage(pngLoc + ' has been created or updated!!!')
+				self.ReportRenderSet(renderSet, png=pngLoc)
+
+			for renderSet in list(compositedThisRun.keys()):
+				if renderSet not in postBakeQueue.completedPngs:
+					compositedThisRun.pop(renderSet)
+					self.ReportRenderSet(renderSet, 'failed')
+
+		if bakeManifest:
+			for key, value in bakedThisRun.items():
+				if os.path.isfile(value[2]):
+					bakeManifest.SetBaked(key[0], key[1], value[0], value[1])
+				else:
+					bakeManifest.RemoveBaked(key[0], key[1])
+
+			for renderSet, value in compositedThisRun.items():
+				bakeManifest.SetComposited(renderSet, value[0])
+
+			bakeManifest.Save()
+
+		if self.bakeCache:
+			self.UpdateBakeCache(bakedThisRun)
+
+		if self.bakeTasks:
+			tasks = list(self.bakeTasks.values())
+			self.report['timings'] = [x.ReturnDict() for x in tasks if x.seconds is not None]
+			LightBakingSchedule.PrintPredictionReport(tasks)
+
+			if self.options.recordBakeTimes and self.report['timings']:
+				self.costModel.Save()
+
+		if hookUpLMTexturesDict:
+			self.HookUpPngs(hookUpLMTexturesDict)
+
+		self.PrintMessage('            --== BAKE COMPLETE, PLEASE LOOK ABOVE FOR DETAILS! ==--')
+
+
+	'''Add the lightmaps baked this time to the bake cache, then trim it to its size.'''
+	def UpdateBakeCache(self, bakedThisRun):
+		with self.profiler.Span('bakeCache'):
+			for inputHash, lightMapName, tifFile, cacheKey in bakedThisRun.values():
+				if cacheKey and os.path.isfile(tifFile):
+					self.bakeCache.Store(cacheKey, tifFile)
+
+			evicted = self.bakeCache.Evict()
+
+		self.report['bakeCache'] = self.bakeCache.ReturnDict()
+		self.report['bakeCache']['evicted'] = evicted[0]
+		self.PrintMessage('Bake cache: {} lightmaps linked, {} added, {} old ones removed ({:.1f}MB)'.format(self.bakeCache.hits,
+																											self.bakeCache.stored,
+																											evicted[0],
+																											evicted[1] / 1048576.0))
+
+	'''Record how long the bake of (renderSet, renLayer) took, for the cost model.'''
+	def RecordTaskTime(self, renderSet, renLayer, seconds):
+		task = self.bakeTasks.get((renderSet, renLayer))
+
+		if task is None:
+			return
+
+		task.seconds = seconds
+		print('>-----=====| {}_{} predicted {:.1f}s, took {:.1f}s |=====-----<'.format(renderSet, renLayer, task.predicted, seconds))
+		self.costModel.AddSample(task)
+
+
+	'''
+	Turn on UseLightmap and hook the PNGs up, hookUpDict = {renderSet:{mesh:pngLoc}}.
+	Returns the materials that were still not ready after options.hookUpTimeout, they are hooked up anyway.
+	'''
+	def HookUpPngs(self, hookUpDict):
+		self.cmds.editRenderLayerGlobals(currentRenderLayer='defaultRenderLayer')
+		# Enable EuseLightmap if needed.
+		# shared by both passes, so every mesh is only resolved to its materials once
+		materialIndex = LightBakingData.MaterialIndex(self.cmds)
+		self.hookUpCalls = {'calls':0, 'perMesh':0}
+
+		with self.profiler.Span('enableUseLightmap'):
+			enabledMaterials = self.EnableUseLightmap(hookUpDict, materialIndex)
+		# The enabled settings need a moment to register, wait until the light map attributes are there. #
+		with self.profiler.Span('useLightmapWait', materials=len(enabledMaterials)):
+			notReady = self.WaitForLightmapSettings(enabledMaterials, self.options.hookUpTimeout)
+
+		if notReady:
+			self.report['materialsNotReady'] = notReady
+			self.PrintMessage('These materials were not ready after {}s, hooking them up anyway:\n'.format(self.options.hookUpTimeout) + '\n'.join(notReady))
+			self.cmds.warning('{} materials were not ready for the light map hook up, see the Script Editor.'.format(len(notReady)))
+		# Hook up the lightmap png files back to the materials.
+		with self.profiler.Span('hookUpLightMaps'):
+			self.HookUpLightMaps(hookUpDict, materialIndex)
+
+		self.hookUpCalls['calls'] += materialIndex.calls
+		self.hookUpCalls['meshReads'] = materialIndex.meshReads
+		self.hookUpCalls['perMesh'] += materialIndex.lookups * LightBakingData.MESH_LOOKUP_CALLS
+		self.hookUpCalls['saved'] = self.hookUpCalls['perMesh'] - self.hookUpCalls['calls']
+		self.hookUpCalls['meshes'] = len(materialIndex.meshMaterials)
+		self.hookUpCalls['materials'] = len(set(x for materials in materialIndex.meshMaterials.values() for x in materials))
+		self.report['hookUpCalls'] = self.hookUpCalls
+		print('>-----=====| Hooked up {meshes} meshes with {materials} materials in {calls} Maya calls ({meshReads} OpenMaya mesh reads), saved {saved} |=====-----<'.format(**self.hookUpCalls))
+		return notReady
+
+	'''
+	Return True once every ShaderFX setting of material is on and one of attrs exists on it.
+	The attribute only shows up after ShaderFX has rebuilt the graph for the setting.
+	'''
+	def ReturnLightmapReady(self, material, settings, attrs):
+		try:
+			for setting in settings:
+				nodeId = self.cmds.shaderfx(sfxnode=material, getNodeIDByName=setting)
+
+				if not self.cmds.shaderfx(sfxnode=material, getPropertyValue=(int(nodeId), 'value')):
+					return False
+		except Exception:
+			return False
+
+		return any(self.cmds.attributeQuery(attr, node=material, exists=True) for attr in attrs)
+
+	'''
+	Poll the materials EnableUseLightmap changed until they are all ready, or timeout seconds have passed.
+	materials = {material:[settings, attrs]}, returns the materials that never became ready.
+	'''
+	def WaitForLightmapSettings(self, materials, timeout=HOOKUP_TIMEOUT_SECONDS):
+		pending = OrderedDict(materials)
+		start = time.time()
+		polls = 0
+
+		while pending:
+			_ProcessIdleEvents()
+			polls += 1
+
+			for material in list(pending.keys()):
+				if self.ReturnLightmapReady(material, *pending[material]):
+					pending.pop(material)
+
+			if not pending or time.time() - start >= timeout:
+				break
+
+			time.sleep(HOOKUP_POLL_SECONDS)
+
+		if materials:
+			print('>-----=====| {} of {} materials ready in {:.2f}s, {} checks |=====-----<'.format(len(materials) - len(pending),
+																								 len(materials),
+																								 time.time() - start,
+																								 polls))
+		return list(pending.keys())
+
+	'''
+	Return the members of renLayer that are not in any Render Set, or bake proxies, sorted.
+	The bake adds Render Set objects to the RenderLayer as it goes, so they would make the membership depend on the
+	bake order and on earlier bakes. Each Render Set's own objects are hashed with its meshes instead.
+	'''
+	def ReturnOutsideMembers(self, renLayer):
+		membersKey = ('outsideMembers', renLayer)
+
+		if membersKey in self.bakeHashCache:
+			return self.bakeHashCache[membersKey]
+
+		renderSetObjects = self.ReturnRenderSetObjects()
+		outsideMembers = []
+
+		for member in self.cmds.editRenderLayerMembers(renLayer, query=True, fullNames=True) or []:
+			path = member.split('|')
+			# the member, or one of its parents, is a Render Set object
+			if any('|'.join(path[:x]) in renderSetObjects for x in range(2, len(path) + 1)):
+				continue
+
+			if len(path) > 1 and path[1] == BAKE_PROXY_GROUP:
+				continue
+
+			outsideMembers.append(member)
+
+		self.bakeHashCache[membersKey] = sorted(outsideMembers)
+		return self.bakeHashCache[membersKey]
+
+	'''Return the full paths of every Render Set object, Render Set objects can be short names.'''
+	def ReturnRenderSetObjects(self):
+		objectsKey = ('renderSetObjects',)
+
+		if objectsKey not in self.bakeHashCache:
+			objects = list(OrderedDict.fromkeys(x for setDict in self.renderSetsDict.values() for x in setDict.get('objects') or []))
+			self.bakeHashCache[objectsKey] = set(self.cmds.ls(objects, long=True) or []) if objects else set()
+
+		return self.bakeHashCache[objectsKey]
+
+	'''Return [world matrix, world points, uvs] of mesh, the uvs of uvSet or of the current uvSet.'''
+	def ReturnMeshInputData(self, mesh, uvSet=None):
+		uvArgs = {'uvSetName':uvSet} if uvSet else {}
+		return [self.cmds.xform(mesh, q=True, ws=True, m=True),
+				self.cmds.xform(mesh + '.vtx[*]', q=True, ws=True, t=True),
+				self.cmds.polyEditUV(mesh + '.map[*]', q=True, **uvArgs)]
+
+	'''
+	Return a hash of the geometry of the renLayer members outside the Render Sets, the occluders and bounce geometry.
+	Every mesh in or under a member is hashed without its name, so the same surroundings match in another scene.
+	'''
+	def ReturnOutsideContentHash(self, renLayer):
+		contentKey = ('outsideContent', renLayer)
+
+		if contentKey not in self.bakeHashCache:
+			renderSetObjects = self.ReturnRenderSetObjects()
+			meshes = set()
+
+			for member in self.ReturnOutsideMembers(renLayer):
+				shapes = self.cmds.listRelatives(member, allDescendents=True, type='mesh', fullPath=True, noIntermediate=True) or []
+				meshes.update(x.rsplit('|', 1)[0] for x in shapes)
+
+			self.bakeHashCache[contentKey] = ReturnHash(sorted(ReturnHash(self.ReturnMeshInputData(x)) for x in meshes if x not in renderSetObjects))
+
+		return self.bakeHashCache[contentKey]
+
+	'''
+	Hash everything that goes into baking renderSet in renLayer.
+	Meshes, RenderLayers and lights are only hashed once per bake, see self.bakeHashCache.
+	'''
+	def ReturnBakeInputHash(self, renderSet, renLayer, uvSet, res, padding, layoutUVs, lights):
+		meshKey = ('meshes', renderSet)
+		layerKey = ('renderLayer', renLayer)
+		lightsKey = ('lights', renLayer)
+
+		if meshKey not in self.bakeHashCache:
+			meshData = []
+
+			for mesh in sorted(self.renderSetsDict[renderSet]['objects']):
+				meshData.append([mesh] + self.ReturnMeshInputData(mesh, uvSet))
+
+			self.bakeHashCache[meshKey] = ReturnHash(meshData)
+			self.bakeHashCache[('meshContent', renderSet)] = ReturnHash(sorted(ReturnHash(x[1:]) for x in meshData))
+
+		if layerKey not in self.bakeHashCache:
+			members = self.ReturnOutsideMembers(renLayer)
+			overrides = None
+
+			try:
+				overrides = _RenderSetup().instance().getRenderLayer(ReturnRenderSetupLayerName(renLayer)).encode()
+			except Exception:
+				pass
+
+			self.bakeHashCache[layerKey] = ReturnHash([members, overrides])
+			self.bakeHashCache[('renderLayerContent', renLayer)] = ReturnHash(ReturnUnnamedData(overrides))
+
+		if lightsKey not in self.bakeHashCache:
+			lightData = []
+
+			for light in sorted(lights):
+				attrData = []
+
+				for shape in self.cmds.listRelatives(light, shapes=True, fullPath=True) or []:
+					for attr in self.cmds.listAttr(shape, keyable=True) or []:
+						try:
+							attrData.append([attr, self.cmds.getAttr(shape + '.' + attr)])
+						except Exception:
+							pass
+
+				lightData.append([light, self.cmds.xform(light, q=True, ws=True, m=True), attrData])
+
+			self.bakeHashCache[lightsKey] = ReturnHash(lightData)
+			self.bakeHashCache[('lightsContent', renLayer)] = ReturnHash(sorted(ReturnHash(x[1:]) for x in lightData))
+
+		return ReturnHash([self.bakeHashCache[meshKey],
+								self.bakeHashCache[layerKey],
+								self.bakeHashCache[lightsKey],
+								uvSet, res, padding, layoutUVs,
+								self.renderSetsDict[renderSet]['lightMapPrefix']])
+
+	'''
+	Return the bake cache key of renderSet in renLayer. It is ReturnBakeInputHash without any names in it, so the same
+	geometry, UVs, light rig and RenderLayer settings in another scene find the lightmap. Where the bake manifest
+	only has the names of the RenderLayer members outside the Render Sets, the key has their geometry, since the
+	lightmap of the same prop with other surroundings is not the same.
+	'''
+	def ReturnBakeCacheKey(self, renderSet, renLayer, uvSet, res, padding, layoutUVs, lights):
+		self.ReturnBakeInputHash(renderSet, renLayer, uvSet, res, padding, layoutUVs, lights)
+		return ReturnHash([LightBakingCache.BAKE_CACHE_VERSION,
+						   self.bakeHashCache[('meshContent', renderSet)],
+						   self.bakeHashCache[('renderLayerContent', renLayer)],
+						   self.ReturnOutsideContentHash(renLayer),
+						   self.bakeHashCache[('lightsContent', renLayer)],
+						   res, padding, layoutUVs])
+
+	'''Add the Render Set objects to renLayer if they are not members yet.'''
+	def AddObjectsToRenderLayer(self, renderSet, renLayer):
+		setMembers = self.cmds.editRenderLayerMembers(renLayer, query=True)
+
+		if setMembers is None:
+			setMembers = []
+
+		objsToAdd = []
+		# add object to render layer if needed
+		for obj in self.renderSetsDict[renderSet]['objects']:
+			if obj not in setMembers:
+				objsToAdd.append(obj)
+				print('>-----=====| ' + obj + ' added to RenderLayer ' + renLayer + ' |=====-----<')
+
+		if objsToAdd:
+			#self.AddObjectToCollection(renLayer, MISSING_OBJ_COL, objsToAdd)
+			self.cmds.editRenderLayerMembers(renLayer, objsToAdd, nr=True)
+
+	'''
+	Bake Lightmaps using Arnold.
+	proxyKey = keep the combined mesh for the next RenderLayer under this key, see ReturnBakeProxy. None deletes it.
+	'''
+	def ArnoldLightmapBake(self, meshes, resolution, padding, combinedName,renderLayer, dirPath, uvSet, lights, layoutUVs, convertExr=True, proxyKey=None):
+		if not meshes:
+			return
+		# switch to current render layer
+		self.cmds.editRenderLayerGlobals(currentRenderLayer=renderLayer)
+
+		if proxyKey is None:
+			combined = self.CreateCombinedBakeMesh(meshes, padding, combinedName, renderLayer, uvSet, layoutUVs)
+		else:
+			combined = self.ReturnBakeProxy(proxyKey, combinedName, renderLayer,
+											partial(self.CreateCombinedBakeMesh, meshes, padding, combinedName, renderLayer, uvSet, layoutUVs))
+		# select combined geometry
+		self.cmds.select(combined, replace=True)
+		# render those lightmaps
+		start = time.time()
+
+		with self.profiler.Span('arnoldRenderToTexture', resolution=resolution):
+			self.cmds.arnoldRenderToTexture(f=dirPath,uvs=uvSet,r=resolution,ee=True)
+		self.RecordSingleBakeTime(resolution, time.time() - start)
+		return self.FinishCombinedBakeMeshes([combined], renderLayer, dirPath, convertExr, proxyKey is not None)[0]
+
+	'''
+	Return the combined bake mesh of key in renderLayer, createFunc() makes it the first time.
+	Duplicating, uniting and transferring the UVs is the same for every RenderLayer, so the mesh is made once and kept
+	in BAKE_PROXY_GROUP until DeleteBakeProxies(). It is renamed to combinedName for each RenderLayer, Arnold names
+	the EXR after the shape.
+	'''
+	def ReturnBakeProxy(self, key, combinedName, renderLayer, createFunc):
+		combined = self.bakeProxies.get(key)
+
+		if combined is None or not self.cmds.objExists(combined):
+			combined = createFunc()
+			combined = self.cmds.parent(combined, self.ReturnBakeProxyGroup())[0]
+
+		combined = self.cmds.rename(combined, combinedName)
+		shapes = self.cmds.listRelatives(combined, shapes=True, noIntermediate=True) or []
+
+		if shapes:
+			self.cmds.rename(shapes[0], combinedName + 'Shape')
+
+		self.cmds.editRenderLayerMembers(renderLayer, combined, noRecurse=True)
+		self.bakeProxies[key] = combined
+		return combined
+
+	'''Return the group the bake proxies are kept in, made on first use.'''
+	def ReturnBakeProxyGroup(self):
+		if not self.cmds.objExists(BAKE_PROXY_GROUP):
+			self.cmds.group(empty=True, world=True, name=BAKE_PROXY_GROUP)
+			# only hidden in the Outliner, a hidden group would hide the proxies from Arnold as well
+			self.cmds.setAttr(BAKE_PROXY_GROUP + '.hiddenInOutliner', True)
+
+		return BAKE_PROXY_GROUP
+
+	'''Delete the bake proxies of keys, or all of them and their group when keys is None.'''
+	def DeleteBakeProxies(self, keys=None):
+		if keys is None:
+			keys = list(self.bakeProxies.keys())
+
+		with self.profiler.Span('deleteProxies'):
+			for key in keys:
+				combined = self.bakeProxies.pop(key, None)
+
+				if combined and self.cmds.objExists(combined):
+					self.cmds.lockNode(combined, lock=False)
+					self.cmds.delete(combined)
+
+			if not self.bakeProxies and self.cmds.objExists(BAKE_PROXY_GROUP):
+				self.cmds.delete(BAKE_PROXY_GROUP)
+
+	'''
+	Duplicate and combine meshes into one mesh named combinedName, with the uvSet UVs, in renderLayer.
+	renderLayer must be the current render layer.
+	'''
+	def CreateCombinedBakeMesh(self, meshes, padding, combinedName, renderLayer, uvSet, layoutUVs):
+		# triggered if 'Auto Layout Lightmap UVs' is checked
+		if layoutUVs:
+			with self.profiler.Span('autoLayout'):
+				for mesh in meshes:
+					uvSets = self.cmds.polyUVSet(mesh, query=True, allUVSets=True)
+					self.cmds.polyCopyUV(mesh, uvSetNameInput=uvSets[0], uvSetName=uvSet, ch=True)
+				self.cmds.polyMultiLayoutUV(meshes, lm=1, sc=1, rbf=1, fr=True, ps=padding, l=2, gu=1, gv=1, psc=0, su=1, ou=0, ov=0)
+		# duplicate objects
+		with self.profiler.Span('duplicate'):
+			dups = self.cmds.duplicate(meshes)
+		# if only one object, name it combined. For multiple objects combine all duplicates
+		with self.profiler.Span('polyUnite'):
+			if len(dups) == 1:
+				combined = self.cmds.rename(dups[0], combinedName)
+			else:
+				combined = self.cmds.polyUnite(dups, ch=True, mergeUVSets=True, centerPivot=True, name=combinedName)[0]
+		# copy UVs from each mesh to the combined mesh
+		with self.profiler.Span('transferAttributes', meshes=len(meshes)):
+			for mesh in meshes:
+				self.cmds.transferAttributes(mesh, combined, transferPositions=False, transferNormals=False, transferUVs=2, sampleSpace=4)
+		# apply uv set
+		self.cmds.polyUVSet(combined, currentUVSet=True, uvSet=uvSet)
+		# remove combined mesh history
+		self.cmds.delete(combined, constructionHistory=True)
+		# delete any leftover groups from the original duplicates
+		for dup in dups:
+			try:
+				if self.cmds.objExists(dup):
+					self.cmds.delete(dup)
+					parentGroup = self.cmds.listRelatives(dup, parent=True, fullPath=True)
+					if parentGroup:
+						children = self.cmds.listRelatives(parentGroup[0], children=True) or []
+						if not children:
+							self.cmds.delete(parentGroup[0])
+			except:
+				pass
+		# add combined mesh to renderlayer
+		self.cmds.select(combined, replace=True)
+		self.cmds.editRenderLayerMembers(renderLayer, combined, noRecurse=True)
+		return combined
+
+	'''
+	After arnoldRenderToTexture: convert the EXRs and delete the combined meshes, keepMeshes leaves bake proxies alone.
+	Returns the lightmap names, the combined shape names, in combinedMeshes order.
+	'''
+	def FinishCombinedBakeMeshes(self, combinedMeshes, renderLayer, dirPath, convertExr=True, keepMeshes=False):
+		exportNames = []
+
+		for combined in combinedMeshes:
+			# return shape nodes, there should only be one
+			shape = self.cmds.listRelatives(combined, shapes=True)
+			# get object name from shape node
+			exportName = combined
+			if shape:
+				exportName = shape[0]
+			# run the conversion for EXR to TIF, in process unless magick has been chosen.
+			# convertExr is False when the postBakeQueue does it instead.
+			if convertExr:
+				exrFilePath = os.path.join(dirPath, exportName + ".exr")
+				tifFilePath = os.path.join(dirPath, exportName + ".tif")
+
+				# Arnold wrote nothing, the caller reports the lightmap as failed, not the TIF of an older bake
+				if not os.path.isfile(exrFilePath):
+					if os.path.isfile(tifFilePath):
+						os.remove(tifFilePath)
+
+					self.cmds.editRenderLayerMembers(renderLayer, combined, remove=True)
+					exportNames.append(exportName)
+					continue
+
+				with self.profiler.Span('exrToTif'):
+					LightBakingImageUtils.ConvertExrToTif(exrFilePath, tifFilePath, self.options.exrBackend)
+				# remove the exr file
+				os.remove(exrFilePath)
+			# remove combined mesh from render layer
+			self.cmds.editRenderLayerMembers(renderLayer, combined, remove=True)
+			exportNames.append(exportName)
+		# prep combined meshes for deletion
+		self.cmds.editRenderLayerGlobals(currentRenderLayer='defaultRenderLayer')
+
+		for combined in [] if keepMeshes else combinedMeshes:
+			self.cmds.lockNode(combined, lock=False)
+			# delete combined mesh
+			self.cmds.delete(combined)
+		# clear selection
+		self.cmds.select(cl=True)
+		return exportNames
+
+	'''Remember how long a single Render Set bake took, per resolution, across sessions.'''
+	def RecordSingleBakeTime(self, resolution, seconds):
+		total, count = self.singleBakeSeconds.get(str(resolution), [0.0, 0])
+		self.singleBakeSeconds[str(resolution)] = [total + seconds, count + 1]
+		self.cmds.optionVar(sv=(BAKE_TIMES_OPTIONVAR, json.dumps(self.singleBakeSeconds)))
+
+	'''Return the average seconds of a single Render Set bake at resolution, None if there are no timings yet.'''
+	def ReturnSingleBakeEstimate(self, resolution):
+		total, count = self.singleBakeSeconds.get(str(resolution), [0.0, 0])
+
+		if not count:
+			return None
+		return total / count
+
+	'''
+	Bake every group of Render Sets that share a RenderLayer, resolution and uvSet with one arnoldRenderToTexture call.
+	This saves the scene translation and render start up per Render Set, which is most of the time for small maps.
+	Pairs the bakeManifest says are unchanged, or that are in the bake cache, are left out. Returns (renderSet, renLayer) -> lightMapName.
+	'''
+	def ArnoldBatchBake(self, renderSets, textureFolder, bakeManifest=None, convertExr=True):
+		exrPath = textureFolder + '/lightMap'
+		self.CreateDir(exrPath)
+		# (renLayer, res, uvSet) -> [[renderSet, lightMapName, padding, layoutUVs], ...]
+		batches = OrderedDict()
+		batchedLightMaps = {}
+
+		for renderSet in renderSets:
+			setDict = self.renderSetsDict[renderSet]
+
+			if not setDict.get('renderLayers') or not setDict.get('objects'):
+				continue
+
+			res = self.ReturnResolution(renderSet)
+			padding = setDict['fillTextureSeams']
+			uvSet = self.ReturnCommonUvSet(renderSet)
+			layoutUVs = setDict.get('layoutUVs', False)
+
+			for renLayer in setDict['renderLayers']:
+				# the same RenderLayer filter as ReturnRenderLayersToBake
+				if self.options.renderLayers is not None and renLayer not in self.options.renderLayers:
+					continue
+
+				lightMapName = setDict['lightMapPrefix'] + '_{}_{}_LM'.format(renderSet, renLayer)
+
+				if bakeManifest:
+					inputHash = self.ReturnBakeInputHash(renderSet, renLayer, uvSet, res, padding, layoutUVs, self.lightIndex.Lights())
+
+					if bakeManifest.ReturnBakedLightMap(renderSet, renLayer, inputHash, exrPath):
+						continue
+
+				# cached lightmaps are linked in by the Render Set loop
+				if self.bakeCache and self.bakeCache.Contains(self.ReturnBakeCacheKey(renderSet, renLayer, uvSet, res, padding, layoutUVs, self.lightIndex.Lights())):
+					continue
+
+				batches.setdefault((renLayer, res, uvSet), []).append([renderSet, lightMapName, padding, layoutUVs])
+
+		batches = OrderedDict((key, batch) for key, batch in batches.items() if len(batch) >= 2)
+		# renderSet -> the last batch it is in, its bake proxy is deleted after that one
+		lastBatch = dict((entry[0], index) for index, batch in enumerate(batches.values()) for entry in batch)
+
+		for batchIndex, ((renLayer, res, uvSet), batch) in enumerate(batches.items()):
+			self.cmds.editRenderLayerGlobals(currentRenderLayer=renLayer)
+			self.AddShaderOverridesIfNeeded()
+			combinedMeshes = []
+
+			for renderSet, lightMapName, padding, layoutUVs in batch:
+				self.AddObjectsToRenderLayer(renderSet, renLayer)
+				meshes = list(self.renderSetsDict[renderSet]['objects'].keys())
+
+				with self.profiler.Span('combinedMesh', renderSet, renLayer):
+					combinedMeshes.append(self.ReturnBakeProxy(renderSet, lightMapName, renLayer,
+															   partial(self.CreateCombinedBakeMesh, meshes, padding, lightMapName, renLayer, uvSet, layoutUVs)))
+
+			self.cmds.select(combinedMeshes, replace=True)
+			start = time.time()
+
+			with self.profiler.Span('arnoldRenderToTexture', renderLayer=renLayer, resolution=res, renderSets=[x[0] for x in batch]):
+				self.cmds.arnoldRenderToTexture(f=exrPath,uvs=uvSet,r=res,ee=True)
+			seconds = time.time() - start
+
+			with self.profiler.Span('batchFinish', renderLayer=renLayer):
+				exportNames = self.FinishCombinedBakeMeshes(combinedMeshes, renLayer, exrPath, convertExr, True)
+				self.DeleteBakeProxies([x[0] for x in batch if lastBatch[x[0]] == batchIndex])
+
+			for entry, exportName in zip(batch, exportNames):
+				batchedLightMaps[(entry[0], renLayer)] = exportName
+
+			message = 'Batch baked {} Render Sets in {} at {}px in {:.1f}s'.format(len(batch), renLayer, res, seconds)
+			estimate = self.ReturnSingleBakeEstimate(res)
+
+			if estimate is not None:
+				message += '\nAs single bakes about {:.1f}s, saved {:.1f}s'.format(estimate * len(batch), estimate * len(batch) - seconds)
+			else:
+				message += '\nNo single bake timings at {}px yet to compare against.'.format(res)
+
+			self.PrintMessage(message)
+
+		return batchedLightMaps
+
+	'''
+	Set the 'atlas' layout stored on renderSet, None removes it once the set has its own lightmap again.
+	The report gets atlasChanged so the caller knows to save the Render Sets.
+	'''
+	def SetAtlasEntry(self, renderSet, entry):
+		if self.renderSetsDict[renderSet].get('atlas') == entry:
+			return
+
+		if entry is None:
+			self.renderSetsDict[renderSet].pop('atlas')
+		else:
+			self.renderSetsDict[renderSet]['atlas'] = entry
+
+		self.report['atlasChanged'] = True
+
+	'''
+	Bake the small Render Sets onto shared atlas pages, see LightBakingAtlas. Every page RenderLayer is one bake
+	of one mesh, the Render Set meshes with their UVs moved into their slots, then the page PNG is composited.
+	Unchanged page RenderLayers are reused through the bakeManifest, under the page name.
+	Adds the page PNGs to hookUpDict and returns the Render Sets that were done, including page mates of renderSets.
+	'''
+	def ArnoldAtlasBake(self, renderSets, textureFolder, bakeManifest, hookUpDict):
+		pages = LightBakingAtlas.PlanAtlas(self.renderSetsDict,
+										   renderSets,
+										   self.ReturnCommonUvSet,
+										   RESOLUTIONS,
+										   self.options.atlasPageResolution,
+										   self.options.atlasMaxResolution,
+										   self.ReturnAtlasReady)
+		exrPath = textureFolder + '/lightMap'
+		self.CreateDir(exrPath)
+		self.CreateDir(textureFolder + '/LM')
+		lights = self.lightIndex.Lights()
+		atlasSets = []
+		self.report['atlas'] = OrderedDict()
+
+		for pageName, page in pages.items():
+			members = list(page['renderSets'].keys())
+			firstSet = self.renderSetsDict[members[0]]
+			uvSet = self.ReturnCommonUvSet(members[0])
+			compositeLayers = []
+			pageFailed = False
+			pageRebaked = False
+
+			for renLayer in firstSet['renderLayers']:
+				lightMapName = '{}_{}_{}_LM'.format(firstSet['lightMapPrefix'], pageName, renLayer)
+				inputHash = None
+				bakedLightMap = None
+
+				if bakeManifest:
+					inputHash = ReturnHash([[self.ReturnBakeInputHash(x,
+																	  renLayer,
+																	  uvSet,
+																	  page['renderSets'][x][2],
+																	  self.renderSetsDict[x]['fillTextureSeams'],
+																	  self.renderSetsDict[x].get('layoutUVs', False),
+																	  lights), page['renderSets'][x]] for x in members] + [page['resolution']])
+					bakedLightMap = bakeManifest.ReturnBakedLightMap(pageName, renLayer, inputHash, exrPath)
+
+				if bakedLightMap:
+					lightMapName = bakedLightMap
+					self.PrintMessage('{}_{} is unchanged, reusing: {}.tif'.format(pageName, renLayer, lightMapName))
+				else:
+					pageRebaked = True
+
+					with self.profiler.Span('atlasPage', pageName, renLayer, renderSets=members):
+						lightMapName = self.ArnoldAtlasPageBake(page, pageName, lightMapName, renLayer, exrPath, uvSet)
+
+				tifFile = os.path.abspath('{}/{}.tif'.format(exrPath, lightMapName))
+
+				if not os.path.isfile(tifFile):
+					self.PrintMessage('{}_{} has been Skipped, {}.tif could not be created!'.format(pageName, renLayer, lightMapName))
+					self.report['failed'].append('{}_{} ---> {}.tif'.format(pageName, renLayer, lightMapName))
+					pageFailed = True
+
+					if bakeManifest:
+						bakeManifest.RemoveBaked(pageName, renLayer)
+					continue
+
+				if bakeManifest:
+					bakeManifest.SetBaked(pageName, renLayer, inputHash, lightMapName)
+
+				compositeLayers.append([tifFile, firstSet['renderLayers'][renLayer]])
+
+				for renderSet in members:
+					self.ReportLayer(renderSet, renLayer, LAYER_REUSED if bakedLightMap else LAYER_BAKED, tifFile)
+
+			self.DeleteBakeProxies([('atlas', pageName)])
+
+			if pageFailed:
+				for renderSet in members:
+					self.ReportRenderSet(renderSet, 'failed', atlasPage=pageName)
+
+				atlasSets += members
+				continue
+
+			pngLoc = self.ReturnPngLocation(pageName, textureFolder)
+			compositeHash = ReturnHash([compositeLayers, pngLoc])
+
+			if pageRebaked or not bakeManifest or bakeManifest.CompositeChanged(pageName, compositeHash, pngLoc):
+				with self.profiler.Span('pngComposite', pageName):
+					LightBakingImageUtils.CompositeLightmapPng(compositeLayers, pngLoc)
+
+				self.PrintMessage(pngLoc + ' has been created or updated!!!')
+
+				if bakeManifest:
+					bakeManifest.SetComposited(pageName, compositeHash)
+
+			self.report['atlas'][pageName] = {'resolution':page['resolution'], 'png':pngLoc, 'renderSets':OrderedDict()}
+
+			for renderSet in members:
+				entry = LightBakingAtlas.ReturnAtlasEntry(pageName, page, renderSet)
+				self.report['atlas'][pageName]['renderSets'][renderSet] = entry['scaleOffset']
+				self.ReportRenderSet(renderSet, 'atlas', atlasPage=pageName, png=pngLoc)
+
+				if self.options.combineImages and self.options.hookUpLightMaps:
+					self.SetAtlasEntry(renderSet, entry)
+					hookUpDict[renderSet] = OrderedDict((x, pngLoc) for x in self.renderSetsDict[renderSet]['objects'])
+
+			atlasSets += members
+			self.PrintMessage('{} baked {} Render Sets on one {}px page.'.format(pageName, len(members), page['resolution']))
+
+		return atlasSets
+
+	'''
+	Return True if every material of renderSet has LIGHTMAP_SCALE_OFFSET_ATTR. A material without it would sample the
+	whole atlas page with its own UVs, so the set is kept off the pages and gets its own lightmap.
+	'''
+	def ReturnAtlasReady(self, renderSet):
+		self.atlasMaterialIndex = self.atlasMaterialIndex or LightBakingData.MaterialIndex(self.cmds)
+		missing = []
+
+		for material in self.atlasMaterialIndex.ReturnMaterialMeshes(self.renderSetsDict[renderSet]['objects']):
+			if material not in self.atlasMaterials:
+				self.atlasMaterials[material] = self.cmds.attributeQuery(LIGHTMAP_SCALE_OFFSET_ATTR, node=material, exists=True)
+
+			if not self.atlasMaterials[material]:
+				missing.append(material)
+
+		if missing:
+			self.cmds.warning('{} is baked on its own, these materials have no {} for an atlas page: {}'.format(renderSet,
+																												LIGHTMAP_SCALE_OFFSET_ATTR,
+																												', '.join(missing)))
+		return not missing
+
+	'''
+	Bake one RenderLayer of an atlas page at the page resolution, the page mesh is kept for the next RenderLayer
+	until ArnoldAtlasBake deletes it. Returns the lightmap name.
+	'''
+	def ArnoldAtlasPageBake(self, page, pageName, lightMapName, renLayer, exrPath, uvSet):
+		self.cmds.editRenderLayerGlobals(currentRenderLayer=renLayer)
+		self.AddShaderOverridesIfNeeded()
+
+		for renderSet in page['renderSets']:
+			self.AddObjectsToRenderLayer(renderSet, renLayer)
+
+		pageMesh = self.ReturnBakeProxy(('atlas', pageName), lightMapName, renLayer, partial(self.CreateAtlasPageMesh, page, lightMapName, renLayer, uvSet))
+		self.cmds.select(pageMesh, replace=True)
+
+		with self.profiler.Span('arnoldRenderToTexture', resolution=page['resolution']):
+			self.cmds.arnoldRenderToTexture(f=exrPath,uvs=uvSet,r=page['resolution'],ee=True)
+
+		return self.FinishCombinedBakeMeshes([pageMesh], renLayer, exrPath, True, True)[0]
+
+	'''
+	Return the mesh of an atlas page: a combined mesh per Render Set with its UVs scaled into its slot,
+	united into one mesh named lightMapName. renLayer must be the current render layer.
+	'''
+	def CreateAtlasPageMesh(self, page, lightMapName, renLayer, uvSet):
+		combinedMeshes = []
+
+		for renderSet, slot in page['renderSets'].items():
+			setDict = self.renderSetsDict[renderSet]
+
+			with self.profiler.Span('combinedMesh', renderSet, renLayer):
+				combined = self.CreateCombinedBakeMesh(list(setDict['objects'].keys()),
+													   setDict['fillTextureSeams'],
+													   renderSet + '_atlasTemp',
+													   renLayer,
+													   uvSet,
+													   setDict.get('layoutUVs', False))
+
+			scaleU, scaleV, offsetU, offsetV = LightBakingAtlas.ReturnScaleOffset(slot, page['resolution'])
+			# move the Render Set UVs into its slot on the page
+			self.cmds.polyEditUV(combined + '.map[*]', uvSetName=uvSet, pivotU=0, pivotV=0, scaleU=scaleU, scaleV=scaleV)
+			self.cmds.polyEditUV(combined + '.map[*]', uvSetName=uvSet, u=offsetU, v=offsetV)
+			combinedMeshes.append(combined)
+
+		with self.profiler.Span('polyUnite'):
+			pageMesh = self.cmds.polyUnite(combinedMeshes, ch=True, mergeUVSets=True, centerPivot=True, name=lightMapName)[0]
+			self.cmds.polyUVSet(pageMesh, currentUVSet=True, uvSet=uvSet)
+			self.cmds.delete(pageMesh, constructionHistory=True)
+
+			for combined in combinedMeshes:
+				if self.cmds.objExists(combined):
+					self.cmds.lockNode(combined, lock=False)
+					self.cmds.delete(combined)
+
+		return pageMesh
+
+	'''
+	Add Shader Override collection and Override if needed.
+	'''
+	def AddShaderOverridesIfNeeded(self):
+		renderSetup = _RenderSetup()
+
+		if renderSetup is None:
+			return
+
+		rs = renderSetup.instance()
+		layers = rs.getRenderLayers()
+
+		for layer in layers:
+			collections = layer.getCollections()
+
+			for collection in collections:
+				shadingEng = collection.getCollections()
+				createOverrideMat = True
+
+				for shade in shadingEng:
+					type = shade.getSelector().getFilterType()
+
+					if type == 11:
+						createOverrideMat = False
+
+				if not createOverrideMat:
+					continue
+				# Check if set to all #
+				currentType = collection.getSelector().getFilterType()
+				tempTypeChange = False
+				# Set to transform instead #
+				if currentType == 0:
+					collection.getSelector().setFilterType(1)
+					tempTypeChange = True
+				# Create aiLambert_OverrideShader if needed #
+				if not self.cmds.objExists('aiLambert_OverrideShader'):
+					self.cmds.createNode('aiLambert', n='aiLambert_OverrideShader')
+
+				shaderOverride = collection.createOverride('aiLambert', 'shaderOverride')
+				overrideName = shaderOverride.name()
+				self.cmds.connectAttr('aiLambert_OverrideShader.outColor', '{}.attrValue'.format(overrideName), f=True)
+
+				if tempTypeChange:
+					collection.getSelector().setFilterType(currentType)
+
+	'''
+	Build the Render Set PSD from the RenderLayer TIFs with psdTextureFile, then set it up in Photoshop.
+	imageFileInfo = [[tifFile, renLayer, layerIndex], ...]
+	'''
+	def CreatePsd(self, renderSet, psdLoc, res, imageFileInfo, tifFileList):
+		comtypes = _Comtypes()
+
+		if comtypes is None:
+			self.PrintMessage(renderSet + '.psd creation has been skipped, comtypes is not available!!!')
+			return False
+
+		# Reverse it so the Psd layers are the correct order
+		maxIndex = max(sublist[2] for sublist in imageFileInfo)
+		for sublist in imageFileInfo:
+			sublist[2] = maxIndex - sublist[2]
+
+		# Close and delete the existing psd to allow for canvas size override
+		photoshopSpan = self.profiler.Begin('photoshop', renderSet)
+
+		try:
+			print ("Linking to Photoshop instance")
+			psApp = comtypes.client.GetActiveObject('Photoshop.Application', dynamic=True)
+		except Exception as e:
+			print ("Creating Photoshop instance")
+			psApp = comtypes.client.CreateObject('Photoshop.Application', dynamic=True)
+			psApp.Visible = True
+		if psApp:
+			document_count = psApp.Documents.Count
+			for i in range(document_count):
+				doc = psApp.Documents[i+1]
+				try:
+					normalizedDocPath = os.path.normpath(doc.FullName).lower()
+					normalizedPsdPath = os.path.normpath(psdLoc).lower()
+				except Exception as e:
+					print(f"Skipped doc {doc.Name}: {e}")
+					continue
+				if normalizedDocPath == normalizedPsdPath:
+					try:
+						doc.Close(2)
+						if os.path.exists(psdLoc):
+							os.remove(psdLoc)
+					except Exception as e:
+						pass
+					break
+
+		self.profiler.End(photoshopSpan)
+
+		# Add TIFFs to PSD
+		with self.profiler.Span('psdTextureFile', renderSet):
+			self.cmds.psdTextureFile(xr=res, yr=res, ifn=(imageFileInfo), psf=psdLoc)
+
+		self.PrintMessage('A PSD has been created and saved to: ' + psdLoc)
+
+		# Make adjustments to PSD
+		with self.profiler.Span('photoshop', renderSet):
+			self.ProcessPSDFile(os.path.normpath(psdLoc), OrderedDict([(str(k), v) for k, v in list(self.renderSetsDict[renderSet]['renderLayers'].items())]), tifFileList,)
+		return True
+
+	'''
+	Set the PSD File Layer Blend Mode then Save and close if needed.
+	layers = OrderedDict
+	'''
+	def ProcessPSDFile(self, psdFile, layers=OrderedDict(), tifFiles=[]):
+		comtypes = _Comtypes()
+
+		if layers and psdFile:
+			try:
+				psApp = comtypes.client.GetActiveObject('Photoshop.Application', dynamic=True)
+			except:
+				psApp = comtypes.client.CreateObject('Photoshop.Application', dynamic=True)
+			try:
+				psApp.DisplayDialogs = 3
+			except:
+				pass
+
+			psd = psApp.Open(psdFile)
+			doc = psApp.Application.ActiveDocument
+
+			# Make the document 32-bits/channel
+			s2t = psApp.StringIDToTypeID
+			desc = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
+			desc.putClass(s2t('to'), s2t('RGBColorMode'))
+			desc.putInteger(s2t('depth'), 32)
+			desc.putBoolean(s2t('merge'), False)
+			psApp.ExecuteAction(s2t('convertMode'), desc, 3)
+	
+			maxRetries = 5
+
+			for attempt in range(maxRetries):
+				try:
+					for index, layer in enumerate(doc.Layers):
+						if layer.name in layers:
+							if hasattr(layer, 'layers'):
+								gamma_created = False
+								for subLayer in layer.layers:
+									# Convert the sub-layer to a smart object and link the file
+									psApp.activeDocument.activeLayer = subLayer
+									psApp.ExecuteAction(psApp.StringIDToTypeID('newPlacedLayer'), None, 3)
+									desc3 = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
+									desc3.putPath(psApp.CharIDToTypeID('null'), tifFiles[index])
+									desc3.putInteger(psApp.CharIDToTypeID('PgNm'), 1)
+									psApp.ExecuteAction(psApp.StringIDToTypeID('placedLayerRelinkToFile'), desc3, 3)
+
+									# set layer blend mode
+									if list(layers.items())[index][1] == 0:
+										layer.blendMode = 11
+										self.PrintMessage(layer.name + ' Photoshop blendMode set to Additive.')
+									else:
+										layer.blendMode = 5
+										self.PrintMessage(layer.name + ' Photoshop blendMode set to Multiply.')
+
+									# make sure the active layer is inside this folder
+									if not gamma_created:
+										try:
+											if hasattr(layer, 'Layers') and layer.Layers.Count > 0:
+												psApp.activeDocument.activeLayer = layer.Layers[1]
+											elif hasattr(layer, 'artLayers') and layer.artLayers.Count > 0:
+												psApp.activeDocument.activeLayer = layer.artLayers[1]
+											else:
+												psApp.activeDocument.activeLayer = layer
+										except:
+											psApp.activeDocument.activeLayer = layer
+
+										# add gamma correction
+										try:
+											s2t = psApp.StringIDToTypeID
+											makeDesc = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
+											makeRef  = comtypes.client.CreateObject('Photoshop.ActionReference',  dynamic=True)
+											makeRef.putClass(s2t('adjustmentLayer'))
+											makeDesc.putReference(s2t('null'), makeRef)
+											adjDesc  = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
+											expsDesc = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
+											expsDesc.putDouble(s2t('exposure'), 0.0)
+											expsDesc.putDouble(s2t('offset'),   0.0)
+											try:
+												expsDesc.putDouble(s2t('gammaCorrection'), 0.4545)
+											except:
+												expsDesc.putDouble(s2t('gamma'), 0.4545)
+											adjDesc.putObject(s2t('type'), s2t('exposure'), expsDesc)
+											makeDesc.putObject(s2t('using'), s2t('adjustmentLayer'), adjDesc)
+											psApp.ExecuteAction(s2t('make'), makeDesc, 3)
+											psApp.ActiveDocument.ActiveLayer.Name = "Gamma Correction"
+											gamma_created = True
+										except Exception as e2:
+											print(f"Could not add Gamma layer for {getattr(layer, 'name', '(unknown)')}: {e2}")
+
+						elif layer.name == 'Background':
+							try:
+								# set Backgroundlayer to black.
+								blackColor = comtypes.client.CreateObject('Photoshop.SolidColor', dynamic=True)
+								blackColor.RGB.Red = 0
+								blackColor.RGB.Green = 0
+								blackColor.RGB.Blue = 0
+								psApp.activeDocument.activeLayer = (psApp.activeDocument.artLayers['Background'])
+								psApp.activeDocument.selection.selectAll()
+								psApp.activeDocument.selection.Fill(blackColor)
+							except:
+								print('>>>> Could not set Background to Black!!! <<<<')
+					break
+				# add in a retry/delay if photoshop is busy
+				except comtypes.COMError as e:
+					if e.hresult == -2147417846 and attempt < maxRetries - 1:
+						print(f"Photoshop is busy, retrying... (Attempt {attempt + 1}/{maxRetries})")
+						time.sleep(2)
+					else:
+						raise
+
+			doc.Save()
+			psd.Close(1)
+			#psApp.Quit()
+
+			print(('*' * 20) + ' ProcessPSDFile has completed!!! ' + ('*' * 20))
+
+	'''
+	Seems to work better if this is its own function.
+	Note: Not combined with HookUpLightMaps for a reason, ShaderFX needs to pick the settings up first, see WaitForLightmapSettings.
+	Returns {material:[settings, attrs]} for the materials that had a setting turned on.
+	'''
+	def EnableUseLightmap(self, dict={}, materialIndex=None):
+		enabledMaterials = OrderedDict()
+
+		if dict == {}:
+			print('<<<<<<<< Materials Dict is Empty, no Light Maps to hook up!>>>>>>>>')
+			return enabledMaterials
+		print('\n||||||||>>>>>>>> Start Enable UseLightmap <<<<<<<<||||||||\n')
+		materialIndex = materialIndex or LightBakingData.MaterialIndex(self.cmds)
+		# material -> [settings, attrs] of every Render Set it is used in
+		materialSettings = OrderedDict()
+
+		for key in dict:
+			if key.lower().endswith('_locked'):
+				settings = ['UseLightmap', 'UseLockedLightmap']
+				attrs = LOCKED_LIGHTMAP_ATTRS
+			else:
+				settings = ['UseLightmap']
+				attrs = LIGHTMAP_ATTRS
+
+			for material, meshes in materialIndex.ReturnMaterialMeshes(dict[key]).items():
+				entry = materialSettings.setdefault(material, [[], []])
+				entry[0] += [x for x in settings if x not in entry[0]]
+				entry[1] += [x for x in attrs if x not in entry[1]]
+				# each mesh used to check the settings of its materials, 2 shaderfx calls per setting
+				self.hookUpCalls['perMesh'] += 2 * len(settings) * len(meshes)
+
+		for material, (settings, attrs) in materialSettings.items():
+			self.hookUpCalls['calls'] += 2 * len(settings)
+
+			if self.EnableShaderFxSettings(material, settings):
+				enabledMaterials[material] = [settings, attrs]
+
+		print('\n||||||||>>>>>>>> End Enable UseLightmap  <<<<<<<<||||||||\n')
+		return enabledMaterials
+
+	'''
+	Hook the light maps up to there respective material.
+	Every material is set once per Render Set, with the light map of the last of its meshes like a mesh by mesh hook up would.
+	'''
+	def HookUpLightMaps(self, dict={}, materialIndex=None):
+		if dict == {}:
+			print('<<<<<<<< Materials Dict is Empty, no Light Maps to hook up!>>>>>>>>')
+			return
+		print('\n||||||||>>>>>>>> Start LM Hookup <<<<<<<<||||||||\n')
+		materialIndex = materialIndex or LightBakingData.MaterialIndex(self.cmds)
+
+		for key in dict:
+			attrs = LIGHTMAP_ATTRS
+
+			if key.lower().endswith('_locked'):
+				attrs = LOCKED_LIGHTMAP_ATTRS
+
+			for material, meshes in materialIndex.ReturnMaterialMeshes(dict[key]).items():
+				lightMap = dict[key][meshes[-1]]
+				calls = len(attrs)
+
+				for attr in attrs:
+					if self.cmds.attributeQuery(attr, node=material, exists=True):
+						self.cmds.setAttr((material + '.' + attr), lightMap, type='string')
+						print('<<<<<<<< ' + (material + '.' + attr) + ' :: ' + lightMap + ' >>>>>>>>')
+						calls += 1
+
+				# atlas page UVs, every other light map gets the identity so a set that left its page is put right
+				scaleOffset = (self.renderSetsDict.get(key, {}).get('atlas') or {}).get('scaleOffset', IDENTITY_SCALE_OFFSET)
+				calls += 1
+
+				if self.cmds.attributeQuery(LIGHTMAP_SCALE_OFFSET_ATTR, node=material, exists=True):
+					self.cmds.setAttr(material + '.' + LIGHTMAP_SCALE_OFFSET_ATTR, *scaleOffset)
+					calls += 1
+				elif scaleOffset != IDENTITY_SCALE_OFFSET:
+					self.cmds.warning('{} has no {}, it shows the whole atlas page {}'.format(material, LIGHTMAP_SCALE_OFFSET_ATTR, lightMap))
+
+				self.hookUpCalls['calls'] += calls
+				self.hookUpCalls['perMesh'] += calls * len(meshes)
+
+		print('\n||||||||>>>>>>>> End LM Hookup <<<<<<<<||||||||\n')
+
+	''' Set ShaderFx Setting bool to True. Returns the settings that were turned on. '''
+	def EnableShaderFxSettings(self, material, settings=[]):
+		enabled = []
+
+		if not settings:
+			return enabled
+
+		for setting in settings:
+			try:
+				temp = self.cmds.shaderfx(sfxnode=material, getNodeIDByName=setting)
+				isEnabled = self.cmds.shaderfx(sfxnode=material, getPropertyValue=(int(temp), 'value'))
+
+				if not isEnabled:
+					self.cmds.shaderfx(sfxnode=material, edit_bool=(int(temp), 'value', True))
+					print('<<<<<<<< ' + material + '.' + setting + ' :: True >>>>>>>>')
+					enabled.append(setting)
+			except:
+				return enabled
+
+		return enabled
+
+
+'''Write the report as JSON, to stdout if there is no path.'''
+def WriteReport(report, reportPath=None):
+	text = json.dumps(report, indent=1, default=str)
+
+	if reportPath:
+		with open(reportPath, 'w') as reportFile:
+			reportFile.write(text)
+	else:
+		print(text)
+
+
+'''Start Maya in this Python, for mayapy. Returns maya.cmds.'''
+def InitializeMaya():
+	import maya.standalone
+	maya.standalone.initialize(name='python')
+	import maya.cmds as mayaCmds
+
+	try:
+		mayaCmds.loadPlugin('mtoa', quiet=True)
+	except RuntimeError:
+		print('<<<<<< WARNING - Could not load mtoa, Arnold bakes will fail! >>>>>>')
+
+	return mayaCmds
+
+
+def ReturnArgParser():
+	parser = argparse.ArgumentParser(description='Bake Light Baking Tool Render Sets without the UI.')
+	parser.add_argument('scene', help='Maya scene with a renderSets node.')
+	parser.add_argument('--render-sets', nargs='+', help='Render Sets to bake, default is every Render Set with renderMe on.')
+	parser.add_argument('--layers', nargs='+', help='Only bake these RenderLayers. PSDs/PNGs are skipped for sets missing layers.')
+	parser.add_argument('--texture-folder', help='Output folder, default is the textures folder next to the scene folder.')
+	parser.add_argument('--report', help='Write the JSON report here instead of stdout.')
+	parser.add_argument('--psd', action='store_true', help='Create PSDs, needs Photoshop.')
+	parser.add_argument('--no-png', action='store_true', help='Do not create the combined PNGs.')
+	parser.add_argument('--png-prefix', default='')
+	parser.add_argument('--png-suffix', default='')
+	parser.add_argument('--no-hookup', action='store_true', help='Do not hook the PNGs up to the materials.')
+	parser.add_argument('--save', action='store_true', help='Save the scene after the bake, for the hook ups.')
+	parser.add_argument('--hookup-timeout', type=float, default=HOOKUP_TIMEOUT_SECONDS, help='Seconds to wait for ShaderFX to enable UseLightmap before hooking up.')
+	parser.add_argument('--uv-snapshots', action='store_true')
+	parser.add_argument('--serial', action='store_true', help='Process the images after each bake instead of in worker processes.')
+	parser.add_argument('--full', action='store_true', help='Bake everything, not only what changed.')
+	parser.add_argument('--batch', action='store_true', help='Bake Render Sets that share a RenderLayer and resolution together.')
+	parser.add_argument('--atlas', action='store_true', help='Bake the small Render Sets on shared atlas pages, --save keeps the layout.')
+	parser.add_argument('--atlas-page', type=int, choices=LightBakingAtlas.ATLAS_PAGE_RESOLUTIONS, default=LightBakingAtlas.ATLAS_PAGE_RESOLUTION)
+	parser.add_argument('--atlas-max-res', type=int, choices=RESOLUTIONS, default=LightBakingAtlas.ATLAS_MAX_SET_RESOLUTION, help='Biggest Render Set resolution that goes on a page.')
+	parser.add_argument('--cache-dir', default=LightBakingCache.ReturnDefaultCacheFolder(), help='Bake cache folder shared between scenes, empty for no cache. Default is $' + LightBakingCache.BAKE_CACHE_ENV + '.')
+	parser.add_argument('--cache-max-gb', type=float, default=LightBakingCache.DEFAULT_CACHE_MAX_GB, help='The bake cache is trimmed to this size after the bake.')
+	parser.add_argument('--exr-backend', choices=LightBakingImageUtils.EXR_BACKENDS, default=LightBakingImageUtils.EXR_BACKEND_NUMPY)
+	parser.add_argument('--manifest', default=BAKE_MANIFEST_NAME, help='Bake manifest file name in the texture folder.')
+	parser.add_argument('--profile', default=LightBakingProfile.BAKE_PROFILE_NAME, help='Bake profile (Chrome trace) file name in the texture folder, empty to not write it.')
+	parser.add_argument('--dump-render-sets', action='store_true', help='Only write the renderSets dict, triangle and light counts to the report, no bake.')
+	parser.add_argument('--dict-order', action='store_true', help='Bake in renderSets order instead of longest predicted first.')
+	parser.add_argument('--no-record-times', action='store_true', help='Do not save the bake timings for the cost model.')
+	parser.add_argument('--remove-invalid', action='store_true', help='Drop missing objects/RenderLayers instead of failing validation.')
+	return parser
+
+
+'''
+Command line entry point, returns an EXIT_ code.
+mayaCmds = stand in for maya.cmds, when given Maya is not started and the scene is not saved.
+'''
+def main(argv=None, mayaCmds=None):
+	args = ReturnArgParser().parse_args(argv)
+	report = {'scene':args.scene, 'status':'error', 'exitCode':EXIT_ERROR}
+
+	try:
+		exitCode = _Bake(args, report, mayaCmds)
+	except Exception as e:
+		report['error'] = '{}: {}'.format(type(e).__name__, e)
+		report['traceback'] = traceback.format_exc()
+		exitCode = EXIT_ERROR
+
+	report['exitCode'] = exitCode
+	WriteReport(report, args.report)
+	return exitCode
+
+
+def _Bake(args, report, mayaCmds):
+	standalone = mayaCmds is None
+
+	if standalone:
+		mayaCmds = InitializeMaya()
+		mayaCmds.file(args.scene, open=True, force=True)
+
+	store = LightBakingData.RenderSetsStore(mayaCmds=mayaCmds)
+
+	if not store.Exists():
+		report['error'] = 'No renderSets node in ' + args.scene
+		return EXIT_ERROR
+
+	renderSets = copy.deepcopy(store.Read())
+
+	if args.dump_render_sets:
+		engine = BakeEngine(renderSets, mayaCmds=mayaCmds)
+		report['renderSetsDict'] = renderSets
+		report['triangles'] = dict((x, engine.ReturnTriangles(x)) for x in renderSets)
+		report['lights'] = len(engine.lightIndex.Lights())
+		report['status'] = 'ok'
+		return EXIT_OK
+
+	unknown = [x for x in args.render_sets or [] if x not in renderSets]
+
+	if unknown:
+		report['error'] = 'Unknown Render Sets: ' + ', '.join(unknown)
+		return EXIT_ERROR
+
+	options = BakeOptions(renderSets=args.render_sets,
+						  renderLayers=args.layers,
+						  textureFolder=args.texture_folder,
+						  createPsd=args.psd,
+						  combineImages=not args.no_png,
+						  pngPrefix=args.png_prefix,
+						  pngSuffix=args.png_suffix,
+						  hookUpLightMaps=not args.no_hookup,
+						  hookUpTimeout=args.hookup_timeout,
+						  createUvSnapshots=args.uv_snapshots,
+						  parallelPostBake=not args.serial,
+						  onlyBakeChanges=not args.full,
+						  batchBake=args.batch,
+						  atlas=args.atlas,
+						  atlasPageResolution=args.atlas_page,
+						  atlasMaxResolution=args.atlas_max_res,
+						  bakeCacheFolder=args.cache_dir,
+						  bakeCacheMaxBytes=int(args.cache_max_gb * 1073741824),
+						  manifestName=args.manifest,
+						  profileName=args.profile,
+						  longestFirst=not args.dict_order,
+						  recordBakeTimes=not args.no_record_times,
+						  exrBackend=args.exr_backend)
+	engine = BakeEngine(renderSets, options, mayaCmds=mayaCmds)
+	toBake = engine.ReturnRenderSetsToBake()
+
+	with engine.profiler.Span('validation'):
+		validation = LightBakingData.ValidateRenderSets(OrderedDict((x, renderSets[x]) for x in toBake), mayaCmds=mayaCmds)
+
+	report['validation'] = validation
+	invalid = [x for x in validation if not x['valid']]
+
+	if invalid:
+		if not args.remove_invalid:
+			report['status'] = 'invalid'
+			report['error'] = 'Render Sets failed validation: ' + ', '.join(x['renderSet'] for x in invalid)
+			return EXIT_INVALID
+
+		for result in invalid:
+			for key in LightBakingData.VALIDATE_KEYS:
+				for obj in result[key]:
+					renderSets[result['renderSet']][key].pop(obj, None)
+
+	report.update(engine.Run())
+
+	if standalone and args.save:
+		if report.get('atlasChanged'):
+			# keep the atlas layout on the Render Sets, renderSets may have had invalid objects dropped
+			storedSets = store.Read()
+
+			for renderSet in storedSets:
+				storedSets[renderSet].pop('atlas', None)
+
+				if renderSets.get(renderSet, {}).get('atlas'):
+					storedSets[renderSet]['atlas'] = renderSets[renderSet]['atlas']
+
+			store.Write(storedSets)
+
+		mayaCmds.file(save=True, force=True)
+
+	if report['failed']:
+		report['status'] = 'failed'
+		return EXIT_FAILED
+
+	report['status'] = 'ok'
+	return EXIT_OK
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,519 @@
+'''
+Local bake farm for the Light Baking Tool.
+FarmCoordinator splits the Render Sets into shards of about the same predicted bake time, bakes every shard in its own
+mayapy worker process (LightBakingEngine.py on a copy of the scene) and retries workers that crash.
+All workers write into the shared textures/lightMap folder, each with its own bake manifest, which are merged
+into the main manifest afterwards. The PNGs and material hook ups are then done once, by a normal incremental
+bake that reuses every lightmap the workers made.
+
+Command line, no Maya needed in this process:
+	python LightBakingFarm.py scenes/level.mb --workers 8 --report farm.json
+	python LightBakingFarm.py standin_scene.json --workers 4 --stand-in    (fake workers, no Maya at all)
+'''
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+import subprocess
+import LightBakingAtlas
+import LightBakingEngine
+import LightBakingSchedule
+
+'''
+Global variables
+'''
+FARM_MANIFEST_PREFIX = 'lightMapManifest_shard'
+FARM_PROFILE_PREFIX = 'lightMapBakeProfile_shard'
+FARM_RETRIES = 2
+FARM_POLL_SECONDS = 0.5
+# Worker exit codes that are a finished bake, anything else is a crash and the shard is retried.
+WORKER_DONE_CODES = [LightBakingEngine.EXIT_OK, LightBakingEngine.EXIT_FAILED, LightBakingEngine.EXIT_INVALID]
+# Stand in worker seconds per million lightmap pixels.
+STAND_IN_SECONDS_PER_MPX = 0.2
+
+
+'''Return the mayapy to run workers with, the MAYAPY environment variable wins.'''
+def ReturnMayapy():
+	if os.environ.get('MAYAPY'):
+		return os.environ['MAYAPY']
+
+	exeName = 'mayapy.exe' if sys.platform == 'win32' else 'mayapy'
+	mayapy = os.path.join(os.path.dirname(sys.executable), exeName)
+
+	if os.path.isfile(mayapy):
+		return mayapy
+
+	return shutil.which('mayapy') or exeName
+
+
+'''Return the LightBakingEngine command line arguments for a BakeOptions, minus the scene and Render Sets.'''
+def ReturnEngineArgs(options):
+	args = ['--exr-backend', options.exrBackend]
+
+	if options.createPsd:
+		args.append('--psd')
+	if not options.combineImages:
+		args.append('--no-png')
+	if options.pngPrefix:
+		args += ['--png-prefix', options.pngPrefix]
+	if options.pngSuffix:
+		args += ['--png-suffix', options.pngSuffix]
+	if not options.hookUpLightMaps:
+		args.append('--no-hookup')
+	if options.hookUpTimeout != LightBakingEngine.HOOKUP_TIMEOUT_SECONDS:
+		args += ['--hookup-timeout', str(options.hookUpTimeout)]
+	if options.createUvSnapshots:
+		args.append('--uv-snapshots')
+	if not options.parallelPostBake:
+		args.append('--serial')
+	if not options.onlyBakeChanges:
+		args.append('--full')
+	if options.batchBake:
+		args.append('--batch')
+	if options.atlas:
+		args += ['--atlas', '--atlas-page', str(options.atlasPageResolution), '--atlas-max-res', str(options.atlasMaxResolution)]
+	if not options.longestFirst:
+		args.append('--dict-order')
+	if options.renderLayers:
+		args += ['--layers'] + list(options.renderLayers)
+
+	# always passed, so an empty folder is not swapped for the worker's $LIGHTBAKE_CACHE_DIR
+	args += ['--cache-dir', options.bakeCacheFolder or '', '--cache-max-gb', str(options.bakeCacheMaxBytes / 1073741824.0)]
+
+	return args
+
+
+'''
+Bakes renderSetsDict from the saved scenePath with a pool of worker processes.
+options = LightBakingEngine.BakeOptions, the workers only bake, PNGs and hook ups are left for Finish.
+workerCommand = the command a worker is started with, the engine arguments are added to it.
+progressCallback = called with (done, total, text) as shards finish.
+triangles = {renderSet:triangle count} and lights = scene light count, for the cost model predictions.
+'''
+class FarmCoordinator(object):
+	def __init__(self, scenePath, renderSetsDict, options=None, workers=4, retries=FARM_RETRIES, workerCommand=None, progressCallback=None, triangles=None, lights=0, costModel=None):
+		self.scenePath = os.path.abspath(scenePath)
+		self.renderSetsDict = renderSetsDict
+		self.options = options or LightBakingEngine.BakeOptions()
+		self.workers = max(int(workers), 1)
+		self.retries = retries
+		self.workerCommand = workerCommand or [ReturnMayapy(), LightBakingEngine.ReturnModulePath(LightBakingEngine)]
+		self.progressCallback = progressCallback
+		self.textureFolder = self.options.textureFolder or os.path.dirname(os.path.dirname(self.scenePath)) + '/textures'
+		self.workDir = None
+		self.shards = []
+		self.triangles = triangles or {}
+		self.lights = lights
+		self.costModel = costModel or LightBakingSchedule.CostModel(self.textureFolder + '/' + LightBakingSchedule.BAKE_TIMES_NAME)
+		# (renderSet, renLayer) -> LightBakingSchedule.BakeTask
+		self.bakeTasks = {}
+
+	def PrintMessage(self, text):
+		LightBakingEngine.PrintMessage(text)
+
+	'''Return the Render Sets for the workers, the atlas pages are left to the finishing bake since a page is baked whole.'''
+	def ReturnRenderSetsToBake(self):
+		renderSets = LightBakingEngine.ReturnRenderSetsToBake(self.renderSetsDict, self.options.renderSets)
+		renderSets = [x for x in renderSets if self.renderSetsDict[x].get('objects') and self.renderSetsDict[x].get('renderLayers')]
+
+		if self.options.atlas:
+			pages = LightBakingAtlas.PlanAtlas(self.renderSetsDict,
+											   renderSets,
+											   lambda x: LightBakingEngine.ReturnCommonUvSet(self.renderSetsDict[x]),
+											   LightBakingEngine.RESOLUTIONS,
+											   self.options.atlasPageResolution,
+											   self.options.atlasMaxResolution)
+			atlasSets = set(x for page in pages.values() for x in page['renderSets'])
+			renderSets = [x for x in renderSets if x not in atlasSets]
+
+		return renderSets
+
+	def ReturnManifestPath(self, name=LightBakingEngine.BAKE_MANIFEST_NAME):
+		return self.textureFolder + '/' + name
+
+	'''Return the command for a shard, each shard gets its own scene copy, report, bake manifest and bake profile.'''
+	def ReturnShardCommand(self, shard):
+		return self.workerCommand + [shard['scene'],
+									 '--render-sets'] + shard['renderSets'] + [
+									 '--texture-folder', self.textureFolder,
+									 '--report', shard['report'],
+									 '--manifest', shard['manifestName'],
+									 '--profile', '{}{}.json'.format(FARM_PROFILE_PREFIX, shard['index']),
+									 '--no-png',
+									 '--no-hookup',
+									 '--no-record-times'] + [x for x in ReturnEngineArgs(self.options) if x not in ['--no-png', '--no-hookup', '--psd', '--uv-snapshots', '--atlas']]
+
+	'''Return a BakeTask for every RenderLayer of renderSets.'''
+	def ReturnBakeTasks(self, renderSets):
+		tasks = []
+
+		for renderSet in renderSets:
+			for renLayer in self.renderSetsDict[renderSet]['renderLayers']:
+				if self.options.renderLayers is not None and renLayer not in self.options.renderLayers:
+					continue
+
+				resolution = LightBakingEngine.RESOLUTIONS[self.renderSetsDict[renderSet]['resolution']]
+				task = LightBakingSchedule.BakeTask(renderSet, renLayer, self.triangles.get(renderSet, 0), resolution, self.lights)
+				self.bakeTasks[(renderSet, renLayer)] = task
+				tasks.append(task)
+
+		return tasks
+
+	'''Pack the Render Sets onto the workers longest predicted bake first, then copy the scene and the main manifest for every shard.'''
+	def PrepareShards(self, renderSets):
+		self.workDir = tempfile.mkdtemp(prefix='lightBakeFarm_')
+		self.shards = []
+
+		if not os.path.exists(self.textureFolder + '/lightMap'):
+			os.makedirs(self.textureFolder + '/lightMap')
+
+		bins, predicted = LightBakingSchedule.PackLongestFirst(self.ReturnBakeTasks(renderSets), self.workers, self.costModel)
+
+		for index, tasks in enumerate(bins):
+			shardSets = []
+
+			for task in tasks:
+				if task.renderSet not in shardSets:
+					shardSets.append(task.renderSet)
+
+			shardDir = os.path.join(self.workDir, 'shard{}'.format(index))
+			os.makedirs(shardDir)
+			scene = os.path.join(shardDir, os.path.basename(self.scenePath))
+			shutil.copy2(self.scenePath, scene)
+			manifestName = '{}{}.json'.format(FARM_MANIFEST_PREFIX, index)
+
+			# seed the shard manifest so unchanged lightmaps are not baked again
+			if self.options.onlyBakeChanges and os.path.isfile(self.ReturnManifestPath()):
+				shutil.copy2(self.ReturnManifestPath(), self.ReturnManifestPath(manifestName))
+			elif os.path.isfile(self.ReturnManifestPath(manifestName)):
+				os.remove(self.ReturnManifestPath(manifestName))
+
+			self.shards.append({'index':index,
+								'renderSets':shardSets,
+								'predicted':predicted[index],
+								'scene':scene,
+								'report':os.path.join(shardDir, 'report.json'),
+								'log':os.path.join(shardDir, 'worker.log'),
+								'manifestName':manifestName,
+								'attempts':0,
+								'exitCode':None,
+								'seconds':0.0,
+								'workerReport':None})
+
+	def StartShard(self, shard):
+		shard['attempts'] += 1
+
+		if os.path.isfile(shard['report']):
+			os.remove(shard['report'])
+
+		self.PrintMessage('Farm shard {} attempt {}: {}'.format(shard['index'], shard['attempts'], ', '.join(shard['renderSets'])))
+		logFile = open(shard['log'], 'a')
+		process = subprocess.Popen(self.ReturnShardCommand(shard), stdout=logFile, stderr=subprocess.STDOUT)
+		return [process, logFile, time.time()]
+
+	'''Read the worker report, None if the worker died before writing one.'''
+	def ReadShardReport(self, shard):
+		try:
+			with open(shard['report'], 'r') as reportFile:
+				return json.load(reportFile)
+		except (IOError, ValueError):
+			return None
+
+	'''Return the end of a worker log, the logs are deleted with the work folder.'''
+	def ReturnLogTail(self, shard, size=2000):
+		try:
+			with open(shard['log'], 'r') as logFile:
+				return logFile.read()[-size:]
+		except IOError:
+			return ''
+
+	'''Run the workers until every shard is done or out of retries. Returns the farm report.'''
+	def Run(self):
+		start = time.time()
+		renderSets = self.ReturnRenderSetsToBake()
+		report = {'workers':self.workers, 'shards':[], 'renderSets':{}, 'failed':[], 'crashed':[]}
+
+		if not renderSets:
+			return report
+
+		self.PrepareShards(renderSets)
+		waiting = list(self.shards)
+		running = {}
+		done = 0
+
+		try:
+			while waiting or running:
+				while waiting and len(running) < self.workers:
+					shard = waiting.pop(0)
+					running[shard['index']] = [shard] + self.StartShard(shard)
+
+				time.sleep(FARM_POLL_SECONDS)
+
+				for index in list(running.keys()):
+					shard, process, logFile, shardStart = running[index]
+
+					if process.poll() is None:
+						continue
+
+					logFile.close()
+					del running[index]
+					shard['seconds'] += time.time() - shardStart
+					shard['exitCode'] = process.returncode
+					shard['workerReport'] = self.ReadShardReport(shard)
+
+					if process.returncode not in WORKER_DONE_CODES or shard['workerReport'] is None:
+						shard['logTail'] = self.ReturnLogTail(shard)
+
+						if shard['attempts'] <= self.retries:
+							self.PrintMessage('Farm shard {} crashed (exit code {}), retrying! See {}'.format(index, process.returncode, shard['log']))
+							waiting.append(shard)
+							continue
+
+						self.PrintMessage('Farm shard {} crashed (exit code {}), giving up! See {}'.format(index, process.returncode, shard['log']))
+						report['crashed'].append(index)
+
+					done += 1
+
+					if self.progressCallback:
+						self.progressCallback(done, len(self.shards), 'Farm Shards')
+		finally:
+			for shard, process, logFile, shardStart in running.values():
+				process.kill()
+				logFile.close()
+
+		for shard in self.shards:
+			workerReport = shard['workerReport'] or {}
+			report['shards'].append(dict((key, value) for key, value in shard.items() if key != 'workerReport'))
+			report['renderSets'].update(workerReport.get('renderSets') or {})
+			report['failed'] += workerReport.get('failed') or []
+
+			if shard['index'] in report['crashed']:
+				report['failed'] += ['{} ---> worker crashed'.format(x) for x in shard['renderSets']]
+
+		self.MergeManifests()
+		self.RecordTimings(report)
+		report['seconds'] = time.time() - start
+		self.PrintMessage('Farm baked {} Render Sets in {} shards in {:.1f}s'.format(len(renderSets), len(self.shards), report['seconds']))
+		return report
+
+	'''Feed the worker bake timings to the cost model and log them against the predictions.'''
+	def RecordTimings(self, report):
+		tasks = []
+
+		for shard in self.shards:
+			self.PrintMessage('Farm shard {}: predicted {:.1f}s, took {:.1f}s over {} attempt(s)'.format(shard['index'], shard['predicted'], shard['seconds'], shard['attempts']))
+
+			for timing in (shard['workerReport'] or {}).get('timings') or []:
+				task = self.bakeTasks.get((timing['renderSet'], timing['renderLayer']))
+
+				if task is None:
+					continue
+
+				task.seconds = timing['seconds']
+				self.costModel.AddSample(task)
+				tasks.append(task)
+
+		report['timings'] = [x.ReturnDict() for x in tasks]
+		LightBakingSchedule.PrintPredictionReport(tasks)
+
+		if tasks:
+			self.costModel.Save()
+
+	'''Merge the shard manifests into the main manifest, so the finishing bake reuses the workers' lightmaps.'''
+	def MergeManifests(self):
+		manifest = LightBakingEngine.BakeManifest(self.ReturnManifestPath())
+
+		for shard in self.shards:
+			shardManifestPath = self.ReturnManifestPath(shard['manifestName'])
+
+			if not os.path.isfile(shardManifestPath):
+				continue
+
+			shardManifest = LightBakingEngine.BakeManifest(shardManifestPath)
+
+			for renderSet in shard['renderSets']:
+				for key, value in shardManifest.layers.items():
+					if key.startswith(renderSet + '|'):
+						manifest.layers[key] = value
+
+			os.remove(shardManifestPath)
+
+		manifest.Save()
+
+	def Cleanup(self):
+		if self.workDir:
+			shutil.rmtree(self.workDir, ignore_errors=True)
+			self.workDir = None
+
+
+'''
+Stand in for a mayapy worker, for running the farm without Maya.
+Takes the LightBakingEngine arguments, the scene is a json file: {"renderSets":{...}}.
+The scene json can also have {"triangles":{renderSet:count}, "lights":count}, which the fake bake times follow.
+Sleeps like a bake would, writes empty TIFs/PNGs, the shard manifest and a report with the timings.
+--crash-rate makes it die without a report that often, to try out the retries.
+'''
+def StandInWorker(argv=None):
+	parser = LightBakingEngine.ReturnArgParser()
+	parser.add_argument('--crash-rate', type=float, default=0.0)
+	parser.add_argument('--seconds-per-mpx', type=float, default=STAND_IN_SECONDS_PER_MPX)
+	args = parser.parse_args(argv)
+
+	if random.random() < args.crash_rate:
+		os._exit(LightBakingEngine.EXIT_ERROR + 10)
+
+	sceneData = ReturnSceneData(args.scene, True)
+	renderSets = sceneData['renderSets']
+
+	textureFolder = args.texture_folder or os.path.dirname(os.path.dirname(os.path.abspath(args.scene))) + '/textures'
+	manifest = LightBakingEngine.BakeManifest(textureFolder + '/' + args.manifest)
+	report = {'scene':args.scene, 'status':'ok', 'exitCode':LightBakingEngine.EXIT_OK, 'renderSets':{}, 'failed':[], 'timings':[]}
+
+	for renderSet in args.render_sets or list(renderSets.keys()):
+		setDict = renderSets[renderSet]
+		resolution = LightBakingEngine.RESOLUTIONS[setDict['resolution']]
+		setReport = report['renderSets'][renderSet] = {'status':'baked', 'renderLayers':{}}
+		tifs = []
+
+		for renLayer in setDict['renderLayers']:
+			if args.layers and renLayer not in args.layers:
+				continue
+
+			lightMapName = '{}_{}_{}_LM'.format(setDict['lightMapPrefix'], renderSet, renLayer)
+			tif = '{}/lightMap/{}.tif'.format(textureFolder, lightMapName)
+			inputHash = LightBakingEngine.ReturnHash([setDict, renLayer])
+
+			if manifest.ReturnBakedLightMap(renderSet, renLayer, inputHash, textureFolder + '/lightMap'):
+				setReport['renderLayers'][renLayer] = {'status':LightBakingEngine.LAYER_REUSED, 'file':tif}
+			else:
+				task = LightBakingSchedule.BakeTask(renderSet, renLayer, sceneData['triangles'].get(renderSet, 0), resolution, sceneData['lights'])
+				start = time.time()
+				time.sleep(args.seconds_per_mpx * (task.Features()[2] * (1 + task.lights) + task.Features()[1]))
+				task.seconds = time.time() - start
+				report['timings'].append(task.ReturnDict())
+				open(tif, 'w').close()
+				manifest.SetBaked(renderSet, renLayer, inputHash, lightMapName)
+				setReport['renderLayers'][renLayer] = {'status':LightBakingEngine.LAYER_BAKED, 'file':tif}
+
+			tifs.append(tif)
+
+		if not args.no_png and tifs:
+			pngDir = textureFolder + '/LM'
+
+			if not os.path.exists(pngDir):
+				os.makedirs(pngDir)
+
+			setReport['png'] = '{}/{}.png'.format(pngDir, renderSet)
+			open(setReport['png'], 'w').close()
+
+	manifest.Save()
+	LightBakingEngine.WriteReport(report, args.report)
+	return LightBakingEngine.EXIT_OK
+
+
+'''
+Return {'renderSets':renderSets dict, 'triangles':{renderSet:count}, 'lights':count} of a scene,
+from the stand in json or with a mayapy --dump-render-sets run.
+'''
+def ReturnSceneData(scenePath, standIn=False):
+	if standIn:
+		with open(scenePath, 'r') as sceneFile:
+			data = json.load(sceneFile)
+
+		return {'renderSets':data['renderSets'], 'triangles':data.get('triangles', {}), 'lights':data.get('lights', 0)}
+
+	tempDir = tempfile.mkdtemp(prefix='lightBakeFarm_')
+	reportPath = os.path.join(tempDir, 'renderSets.json')
+
+	try:
+		subprocess.check_call([ReturnMayapy(), LightBakingEngine.ReturnModulePath(LightBakingEngine),
+							   scenePath, '--dump-render-sets', '--report', reportPath])
+
+		with open(reportPath, 'r') as reportFile:
+			data = json.load(reportFile)
+
+		return {'renderSets':data['renderSetsDict'], 'triangles':data['triangles'], 'lights':data['lights']}
+	finally:
+		shutil.rmtree(tempDir, ignore_errors=True)
+
+
+def main(argv=None):
+	if argv is None:
+		argv = sys.argv[1:]
+
+	if argv and argv[0] == 'standin':
+		return StandInWorker(argv[1:])
+
+	parser = argparse.ArgumentParser(description='Bake Light Baking Tool Render Sets with several mayapy workers.')
+	parser.add_argument('scene', help='Saved Maya scene with a renderSets node, or a stand in json scene.')
+	parser.add_argument('--workers', type=int, default=max((os.cpu_count() or 2) // 8, 2))
+	parser.add_argument('--retries', type=int, default=FARM_RETRIES)
+	parser.add_argument('--render-sets', nargs='+')
+	parser.add_argument('--texture-folder')
+	parser.add_argument('--report', help='Write the JSON farm report here instead of stdout.')
+	parser.add_argument('--full', action='store_true', help='Bake everything, not only what changed.')
+	parser.add_argument('--batch', action='store_true')
+	parser.add_argument('--atlas', action='store_true', help='Bake the small Render Sets on shared atlas pages in the finishing bake.')
+	parser.add_argument('--no-finish', action='store_true', help='Only bake, no PNGs or hook ups.')
+	parser.add_argument('--stand-in', action='store_true', help='Use stand in workers instead of mayapy.')
+	parser.add_argument('--crash-rate', type=float, default=0.0, help='Stand in worker crash rate.')
+	args = parser.parse_args(argv)
+
+	options = LightBakingEngine.BakeOptions(renderSets=args.render_sets,
+											textureFolder=args.texture_folder,
+											onlyBakeChanges=not args.full,
+											batchBake=args.batch,
+											atlas=args.atlas)
+	workerCommand = None
+
+	if args.stand_in:
+		workerCommand = [sys.executable, LightBakingEngine.ReturnModulePath(sys.modules[__name__]), 'standin', '--crash-rate', str(args.crash_rate)]
+
+	sceneData = ReturnSceneData(args.scene, args.stand_in)
+	farm = FarmCoordinator(args.scene,
+						   sceneData['renderSets'],
+						   options,
+						   args.workers,
+						   args.retries,
+						   workerCommand,
+						   triangles=sceneData['triangles'],
+						   lights=sceneData['lights'])
+	exitCode = LightBakingEngine.EXIT_OK
+
+	try:
+		report = farm.Run()
+
+		if not args.no_finish and (report['shards'] or options.atlas):
+			# PNGs and hook ups once, in the real scene, every lightmap is in the manifest now
+			if farm.workDir is None:
+				farm.workDir = tempfile.mkdtemp(prefix='lightBakeFarm_')
+
+			finishCommand = farm.workerCommand + [farm.scenePath, '--texture-folder', farm.textureFolder]
+			finishReport = os.path.join(farm.workDir, 'finish.json')
+
+			if not args.stand_in:
+				finishCommand.append('--save')
+			if options.renderSets:
+				finishCommand += ['--render-sets'] + options.renderSets
+			if options.atlas:
+				finishCommand.append('--atlas')
+
+			exitCode = subprocess.call(finishCommand + ['--report', finishReport])
+			report['finish'] = farm.ReadShardReport({'report':finishReport})
+	finally:
+		farm.Cleanup()
+
+	if report['failed'] or report['crashed']:
+		exitCode = max(exitCode, LightBakingEngine.EXIT_FAILED)
+
+	report['exitCode'] = exitCode
+	LightBakingEngine.WriteReport(report, args.report)
+	return exitCode
+
+
+if __name__ == '__main__':
+	sys.exit(main())
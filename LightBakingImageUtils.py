@@ -0,0 +1,905 @@
+'''
+Image helpers for the Light Baking Tool.
+Nothing in here imports Maya, so it can be used from mayapy, worker processes or plain Python.
+'''
+import os
+import sys
+import zlib
+import time
+import struct
+import threading
+import subprocess
+import multiprocessing
+import concurrent.futures
+from collections import OrderedDict, deque
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# OpenImageIO/OpenEXR are slow to import, LoadExrModules() imports them the first time an image needs them.
+oiio = None
+OpenEXR = None
+Imath = None
+_exrModulesLoaded = False
+
+'''
+Global variables
+'''
+EXR_BACKEND_NUMPY = 'numpy'
+EXR_BACKEND_MAGICK = 'magick'
+EXR_BACKENDS = [EXR_BACKEND_NUMPY, EXR_BACKEND_MAGICK]
+EXR_CHANNELS = ['R', 'G', 'B', 'A']
+TIFF_ROWS_PER_STRIP = 16
+BLEND_ADDITIVE = 0
+BLEND_MULTIPLY = 1
+# Same value the Photoshop exposure adjustment layer used.
+GAMMA_CORRECTION = 0.4545
+# Photoshop encodes 32-bit documents with the display gamma when they are flattened to 8-bit.
+DISPLAY_GAMMA = 2.2
+# Arnold already uses every core while baking, leave room for it.
+POST_BAKE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+# Bake profile stage names of the post bake tasks, the same ones the engine uses when it does them itself.
+POST_BAKE_STAGES = {'tif':'exrToTif', 'png':'pngComposite'}
+# Rows of every layer are composited in bands of about this many bytes, so memory does not grow with the resolution.
+COMPOSITE_BAND_BYTES = 8 * 1048576
+# Threads per composite, the composites themselves already run in POST_BAKE_WORKERS processes.
+COMPOSITE_WORKERS = max(1, min(4, (os.cpu_count() or 2) // POST_BAKE_WORKERS))
+TIFF_FIELD_FORMATS = {1:'B', 3:'H', 4:'I'}
+TIFF_SAMPLE_DTYPES = {(1, 8):'u1', (1, 16):'u2', (1, 32):'u4', (3, 16):'f2', (3, 32):'f4'}
+
+
+'''Import OpenImageIO and OpenEXR, once. Missing ones stay None.'''
+def LoadExrModules():
+	global oiio, OpenEXR, Imath, _exrModulesLoaded
+
+	if _exrModulesLoaded:
+		return
+
+	_exrModulesLoaded = True
+
+	try:
+		import OpenImageIO as oiio
+	except ImportError:
+		oiio = None
+
+	try:
+		import OpenEXR
+		import Imath
+	except ImportError:
+		OpenEXR = None
+		Imath = None
+
+
+'''Return True if EXR files can be read and written without leaving the Python process.'''
+def NumpyBackendAvailable():
+	LoadExrModules()
+	return np is not None and (oiio is not None or OpenEXR is not None)
+
+
+'''Read an EXR file into a float32 (height, width, channels) array.'''
+def ReadExr(exrPath):
+	if np is None:
+		raise RuntimeError('numpy is not available, can not read ' + exrPath)
+
+	LoadExrModules()
+
+	if oiio is not None:
+		return _ReadOiio(exrPath)
+
+	if OpenEXR is not None:
+		exrFile = OpenEXR.InputFile(exrPath)
+		try:
+			header = exrFile.header()
+			dataWindow = header['dataWindow']
+			width = dataWindow.max.x - dataWindow.min.x + 1
+			height = dataWindow.max.y - dataWindow.min.y + 1
+			channelNames = [x for x in EXR_CHANNELS if x in header['channels']]
+
+			if not channelNames:
+				channelNames = sorted(header['channels'].keys())
+
+			floatType = Imath.PixelType(Imath.PixelType.FLOAT)
+			pixels = np.empty((height, width, len(channelNames)), dtype=np.float32)
+
+			for index, channel in enumerate(channelNames):
+				pixels[:, :, index] = np.frombuffer(exrFile.channel(channel, floatType), dtype=np.float32).reshape(height, width)
+		finally:
+			exrFile.close()
+
+		return pixels
+
+	raise RuntimeError('No EXR reader available (OpenImageIO or OpenEXR), can not read ' + exrPath)
+
+
+'''Write a float32 (height, width, channels) array to an EXR file.'''
+def WriteExr(exrPath, pixels):
+	if np is None:
+		raise RuntimeError('numpy is not available, can not write ' + exrPath)
+
+	pixels = _AsImage(pixels)
+	height, width, channels = pixels.shape
+	LoadExrModules()
+
+	if oiio is not None:
+		spec = oiio.ImageSpec(width, height, channels, 'float')
+		imageOutput = oiio.ImageOutput.create(exrPath)
+
+		if not imageOutput or not imageOutput.open(exrPath, spec):
+			raise IOError('Could not create {}: {}'.format(exrPath, oiio.geterror()))
+		try:
+			imageOutput.write_image(pixels)
+		finally:
+			imageOutput.close()
+		return
+
+	if OpenEXR is not None:
+		channelNames = EXR_CHANNELS[:channels] if channels <= len(EXR_CHANNELS) else [str(x) for x in range(channels)]
+		header = OpenEXR.Header(width, height)
+		floatChannel = Imath.Channel(Imath.PixelType(Imath.PixelType.FLOAT))
+		header['channels'] = dict((x, floatChannel) for x in channelNames)
+		exrFile = OpenEXR.OutputFile(exrPath, header)
+		try:
+			exrFile.writePixels(dict((x, np.ascontiguousarray(pixels[:, :, i]).tobytes()) for i, x in enumerate(channelNames)))
+		finally:
+			exrFile.close()
+		return
+
+	raise RuntimeError('No EXR writer available (OpenImageIO or OpenEXR), can not write ' + exrPath)
+
+
+'''
+Write a float32 (height, width, channels) array to an uncompressed 32-bit float TIFF.
+The pixel data is streamed straight from the array buffer, stored as contiguous strips.
+'''
+def WriteTif(tifPath, pixels):
+	pixels = _AsImage(pixels)
+	height, width, channels = pixels.shape
+	rowBytes = width * channels * 4
+	rowsPerStrip = min(TIFF_ROWS_PER_STRIP, height)
+	stripCount = (height + rowsPerStrip - 1) // rowsPerStrip
+
+	entries = [
+		(256, 4, 1, width),
+		(257, 4, 1, height),
+		(258, 3, channels, [32] * channels),
+		(259, 3, 1, 1),
+		(262, 3, 1, 2 if channels >= 3 else 1),
+		(273, 4, stripCount, None),
+		(277, 3, 1, channels),
+		(278, 4, 1, rowsPerStrip),
+		(279, 4, stripCount, None),
+		(284, 3, 1, 1),
+	]
+
+	if channels in (2, 4):
+		# unassociated alpha
+		entries.append((338, 3, 1, 2))
+
+	entries.append((339, 3, channels, [3] * channels))
+
+	ifdSize = 2 + len(entries) * 12 + 4
+	extraOffset = 8 + ifdSize
+	extraData = b''
+	arrayOffsets = {}
+
+	# values that do not fit in the 4 byte entry slot go after the IFD
+	for tag, fieldType, count, value in entries:
+		size = count * (2 if fieldType == 3 else 4)
+
+		if size > 4:
+			arrayOffsets[tag] = extraOffset + len(extraData)
+			extraData += b'\0' * size
+
+	pixelOffset = extraOffset + len(extraData)
+	pixelOffset += pixelOffset % 2
+	stripOffsets = [pixelOffset + (i * rowsPerStrip * rowBytes) for i in range(stripCount)]
+	stripByteCounts = [min(rowsPerStrip, height - (i * rowsPerStrip)) * rowBytes for i in range(stripCount)]
+	arrayValues = {273: stripOffsets, 279: stripByteCounts}
+
+	ifd = struct.pack('<H', len(entries))
+	extraData = bytearray(extraData)
+
+	for tag, fieldType, count, value in entries:
+		if value is None:
+			value = arrayValues[tag]
+
+		fmt = '<H' if fieldType == 3 else '<I'
+
+		if tag in arrayOffsets:
+			packed = b''.join(struct.pack(fmt, x) for x in value)
+			start = arrayOffsets[tag] - extraOffset
+			extraData[start:start + len(packed)] = packed
+			ifd += struct.pack('<HHII', tag, fieldType, count, arrayOffsets[tag])
+		else:
+			values = value if isinstance(value, list) else [value]
+			packed = b''.join(struct.pack(fmt, x) for x in values)
+			ifd += struct.pack('<HHI', tag, fieldType, count) + packed.ljust(4, b'\0')
+
+	ifd += struct.pack('<I', 0)
+
+	with open(tifPath, 'wb') as tifFile:
+		tifFile.write(b'II' + struct.pack('<HI', 42, 8))
+		tifFile.write(ifd)
+		tifFile.write(bytes(extraData))
+		tifFile.write(b'\0' * (pixelOffset - extraOffset - len(extraData)))
+		pixels.astype('<f4', copy=False).tofile(tifFile)
+
+
+'''Convert an EXR to a 32-bit TIFF inside the Python process.'''
+def ConvertExrToTifNumpy(exrFilePath, tifFilePath):
+	WriteTif(tifFilePath, ReadExr(exrFilePath))
+
+
+'''Convert an EXR to a 32-bit TIFF by spawning ImageMagick.'''
+def ConvertExrToTifMagick(exrFilePath, tifFilePath):
+	subprocess.run(["magick",exrFilePath,"-define", "tiff:bits-per-sample=32","-compress", "none","-depth", "32",tifFilePath])
+
+
+'''
+Convert an EXR to a 32-bit TIFF using the requested backend.
+The numpy backend falls back to magick if it is not available or fails.
+Returns the backend that was actually used.
+'''
+def ConvertExrToTif(exrFilePath, tifFilePath, backend=EXR_BACKEND_NUMPY):
+	# a TIF hard linked from the bake cache is replaced, writing through it would change the cached lightmap
+	if os.path.isfile(tifFilePath):
+		os.remove(tifFilePath)
+
+	if backend == EXR_BACKEND_NUMPY:
+		if NumpyBackendAvailable():
+			try:
+				ConvertExrToTifNumpy(exrFilePath, tifFilePath)
+				return EXR_BACKEND_NUMPY
+			except Exception as e:
+				print('<<<<<< WARNING - numpy EXR conversion failed for {}, falling back to magick: {} >>>>>>'.format(exrFilePath, e))
+		else:
+			print('<<<<<< WARNING - numpy EXR conversion is not available, falling back to magick >>>>>>')
+
+	ConvertExrToTifMagick(exrFilePath, tifFilePath)
+	return EXR_BACKEND_MAGICK
+
+
+'''
+Reads baseline uncompressed TIFFs, like the ones written by WriteTif or magick, without loading the whole file.
+Any range of rows can be read on its own, with a single read when the strips are contiguous.
+'''
+class TifReader(object):
+	def __init__(self, tifPath):
+		self.tifPath = tifPath
+		tags, endian = _ReadTifTags(tifPath)
+
+		self.width = tags[256][0]
+		self.height = tags[257][0]
+		self.channels = tags.get(277, [1])[0]
+		bits = tags.get(258, [1])[0]
+		sampleFormat = tags.get(339, [1])[0]
+		compression = tags.get(259, [1])[0]
+		planar = tags.get(284, [1])[0]
+
+		if compression != 1 or planar != 1 or (sampleFormat, bits) not in TIFF_SAMPLE_DTYPES:
+			raise ValueError('Unsupported TIFF layout in {} (compression {}, planar {}, {} bit)'.format(tifPath, compression, planar, bits))
+
+		self.dtype = np.dtype(endian + TIFF_SAMPLE_DTYPES[(sampleFormat, bits)])
+		self.rowsPerStrip = min(tags.get(278, [self.height])[0], self.height)
+		self.stripOffsets = tags[273]
+		self.rowBytes = self.width * self.channels * self.dtype.itemsize
+		self.contiguous = all(self.stripOffsets[i + 1] == self.stripOffsets[i] + (self.rowsPerStrip * self.rowBytes)
+							  for i in range(len(self.stripOffsets) - 1))
+
+	'''Return rows [start, stop) as a float32 (rows, width, channels) array, integer formats are scaled to 0-1.'''
+	def ReadRows(self, start=0, stop=None):
+		if stop is None or stop > self.height:
+			stop = self.height
+
+		if self.contiguous:
+			# one read per call, a memmap would keep every page read so far resident
+			with open(self.tifPath, 'rb') as tifFile:
+				tifFile.seek(self.stripOffsets[0] + (start * self.rowBytes))
+				pixels = np.fromfile(tifFile, dtype=self.dtype, count=(stop - start) * self.width * self.channels)
+
+			pixels = pixels.reshape(stop - start, self.width, self.channels)
+		else:
+			pixels = np.empty((stop - start, self.width, self.channels), dtype=self.dtype)
+
+			with open(self.tifPath, 'rb') as tifFile:
+				for row in range(start, stop):
+					strip = row // self.rowsPerStrip
+					tifFile.seek(self.stripOffsets[strip] + ((row - (strip * self.rowsPerStrip)) * self.rowBytes))
+					pixels[row - start] = np.frombuffer(tifFile.read(self.rowBytes), dtype=self.dtype).reshape(self.width, self.channels)
+
+		if self.dtype.kind == 'u':
+			return pixels.astype(np.float32) / float(np.iinfo(self.dtype).max)
+
+		return pixels.astype(np.float32, copy=False)
+
+	'''Read the whole image.'''
+	def Read(self):
+		return self.ReadRows(0, self.height)
+
+	def Close(self):
+		pass
+
+
+'''
+Reads rows of a scanline EXR through OpenImageIO or OpenEXR, without loading the whole file.
+Rows can be asked for from several threads, the reads take turns.
+'''
+class ExrReader(object):
+	def __init__(self, exrPath):
+		LoadExrModules()
+		self.exrPath = exrPath
+		self.lock = threading.Lock()
+		self.imageInput = None
+		self.exrFile = None
+
+		if oiio is not None:
+			self.imageInput = oiio.ImageInput.open(exrPath)
+
+			if not self.imageInput:
+				raise IOError('Could not open {}: {}'.format(exrPath, oiio.geterror()))
+
+			spec = self.imageInput.spec()
+			self.width = spec.width
+			self.height = spec.height
+			self.channels = spec.nchannels
+			self.yOrigin = spec.y
+		elif OpenEXR is not None:
+			self.exrFile = OpenEXR.InputFile(exrPath)
+			header = self.exrFile.header()
+			dataWindow = header['dataWindow']
+			self.width = dataWindow.max.x - dataWindow.min.x + 1
+			self.height = dataWindow.max.y - dataWindow.min.y + 1
+			self.yOrigin = dataWindow.min.y
+			self.channelNames = [x for x in EXR_CHANNELS if x in header['channels']]
+
+			if not self.channelNames:
+				self.channelNames = sorted(header['channels'].keys())
+
+			self.channels = len(self.channelNames)
+		else:
+			raise RuntimeError('No EXR reader available (OpenImageIO or OpenEXR), can not read ' + exrPath)
+
+	'''Return rows [start, stop) as a float32 (rows, width, channels) array.'''
+	def ReadRows(self, start=0, stop=None):
+		if stop is None or stop > self.height:
+			stop = self.height
+
+		with self.lock:
+			if self.imageInput is not None:
+				pixels = self.imageInput.read_scanlines(self.yOrigin + start, self.yOrigin + stop, 0, 0, self.channels, 'float')
+
+				if pixels is None:
+					raise IOError('Could not read {}: {}'.format(self.exrPath, self.imageInput.geterror()))
+
+				return np.asarray(pixels, dtype=np.float32).reshape(stop - start, self.width, self.channels)
+
+			floatType = Imath.PixelType(Imath.PixelType.FLOAT)
+			pixels = np.empty((stop - start, self.width, self.channels), dtype=np.float32)
+
+			for index, channel in enumerate(self.channelNames):
+				data = self.exrFile.channel(channel, floatType, self.yOrigin + start, self.yOrigin + stop - 1)
+				pixels[:, :, index] = np.frombuffer(data, dtype=np.float32).reshape(stop - start, self.width)
+
+			return pixels
+
+	def Read(self):
+		return self.ReadRows(0, self.height)
+
+	def Close(self):
+		if self.imageInput is not None:
+			self.imageInput.close()
+			self.imageInput = None
+
+		if self.exrFile is not None:
+			self.exrFile.close()
+			self.exrFile = None
+
+
+'''The reader interface over an image that is already in memory, for the TIFFs TifReader can not stream.'''
+class _ArrayReader(object):
+	def __init__(self, pixels):
+		self.pixels = pixels
+		self.height, self.width, self.channels = pixels.shape
+
+	def ReadRows(self, start=0, stop=None):
+		return self.pixels[start:stop]
+
+	def Read(self):
+		return self.pixels
+
+	def Close(self):
+		self.pixels = None
+
+
+'''Return a row reader for an EXR or TIFF. Compressed TIFFs, that can only be read whole, are read into memory.'''
+def OpenImageReader(imagePath):
+	if os.path.splitext(imagePath)[1].lower() == '.exr':
+		return ExrReader(imagePath)
+
+	try:
+		return TifReader(imagePath)
+	except ValueError:
+		return _ArrayReader(ReadTif(imagePath))
+
+
+'''Read a TIFF into a float32 (height, width, channels) array.'''
+def ReadTif(tifPath):
+	try:
+		reader = TifReader(tifPath)
+	except ValueError:
+		LoadExrModules()
+
+		if oiio is None:
+			raise
+		return _ReadOiio(tifPath)
+
+	try:
+		return reader.Read()
+	finally:
+		reader.Close()
+
+
+'''Read an EXR or TIFF into a float32 (height, width, channels) array.'''
+def ReadImage(imagePath):
+	if os.path.splitext(imagePath)[1].lower() == '.exr':
+		return ReadExr(imagePath)
+
+	return ReadTif(imagePath)
+
+
+'''
+Write a float (height, width, channels) array to an 8-bit PNG.
+Values are clamped to 0-1 and encoded with encodeGamma, an alpha channel is dropped.
+'''
+def WritePng(pngPath, pixels, encodeGamma=DISPLAY_GAMMA):
+	pixels = _AsImage(pixels)
+	pngFile = _PngWriter(pngPath, pixels.shape[1], pixels.shape[0], min(pixels.shape[2], 3))
+	try:
+		pngFile.WriteRows(pixels, encodeGamma)
+	finally:
+		pngFile.Close()
+
+
+'''
+Blend a layer over the composite the same way the Photoshop layer would.
+Additive is Photoshop Linear Dodge, the layer alpha acts as the layer opacity. The layer colour gets the gamma
+correction first, like the exposure adjustment inside each PSD layer group. Gray + alpha layers use the gray as colour.
+'''
+def BlendLayer(base, layer, blendType, gamma=1.0):
+	if layer.shape[2] == 2:
+		color = layer[:, :, :1]
+	else:
+		color = layer[:, :, :3]
+
+	color = ApplyGamma(color, gamma)
+
+	if color.shape[2] == 1:
+		color = np.repeat(color, 3, axis=2)
+
+	if blendType == BLEND_MULTIPLY:
+		blended = base * color
+	else:
+		blended = base + color
+
+	if layer.shape[2] in (2, 4):
+		alpha = layer[:, :, -1:]
+		return base + ((blended - base) * alpha)
+
+	return blended
+
+
+'''
+Composite lightmap layers on a black background, with the gamma correction applied to each layer before it is blended.
+layers = [[imagePath, blendType], ...] top layer first, the same order as the render layers in the Render Set.
+Returns a float32 (height, width, 3) array, all of it is in memory, CompositeLayersToFile streams instead.
+'''
+def CompositeLayers(layers, gamma=GAMMA_CORRECTION):
+	composite = None
+
+	for imagePath, blendType in reversed(layers):
+		pixels = ReadImage(imagePath)
+
+		if composite is None:
+			composite = np.zeros((pixels.shape[0], pixels.shape[1], 3), dtype=np.float32)
+		elif pixels.shape[:2] != composite.shape[:2]:
+			raise ValueError('{} is {}x{}, expected {}x{}'.format(imagePath, pixels.shape[1], pixels.shape[0],
+																   composite.shape[1], composite.shape[0]))
+
+		composite = BlendLayer(composite, pixels, blendType, gamma)
+
+	if composite is None:
+		raise ValueError('No layers to composite!')
+
+	return composite
+
+
+'''Photoshop exposure adjustment gamma correction, negative values are mirrored around zero.'''
+def ApplyGamma(pixels, gamma=GAMMA_CORRECTION):
+	if gamma == 1.0:
+		return pixels
+
+	return np.sign(pixels) * np.power(np.abs(pixels), 1.0 / gamma)
+
+
+'''Composite rows [start, stop) of the layer readers, bottom layer first, each gamma corrected as it is blended.'''
+def _CompositeBand(readers, blendTypes, start, stop, gamma):
+	composite = np.zeros((stop - start, readers[0].width, 3), dtype=np.float32)
+
+	for reader, blendType in zip(readers, blendTypes):
+		composite = BlendLayer(composite, reader.ReadRows(start, stop), blendType, gamma)
+
+	return composite
+
+
+'''
+Composite lightmap layers into outputPath one band of rows at a time, a PNG, or a linear EXR when it ends in .exr.
+layers as CompositeLayers. The bands are composited on a pool of threads and written in order, with only a few
+bands of about bandBytes per layer in memory at once, so the memory used is the same at 1K or 8K.
+'''
+def CompositeLayersToFile(layers, outputPath, gamma=GAMMA_CORRECTION, workers=COMPOSITE_WORKERS, bandBytes=COMPOSITE_BAND_BYTES):
+	if not layers:
+		raise ValueError('No layers to composite!')
+
+	readers = []
+	writer = None
+	finished = False
+
+	try:
+		for imagePath, blendType in reversed(layers):
+			reader = OpenImageReader(imagePath)
+			readers.append(reader)
+
+			if (reader.width, reader.height) != (readers[0].width, readers[0].height):
+				raise ValueError('{} is {}x{}, expected {}x{}'.format(imagePath, reader.width, reader.height,
+																	   readers[0].width, readers[0].height))
+
+		blendTypes = [x[1] for x in reversed(layers)]
+		width = readers[0].width
+		height = readers[0].height
+		# float32 RGBA rows
+		bandRows = max(1, min(height, bandBytes // (width * 16)))
+
+		if os.path.splitext(outputPath)[1].lower() == '.exr':
+			writer = _ExrWriter(outputPath, width, height, 3)
+		else:
+			writer = _PngWriter(outputPath, width, height, 3)
+
+		with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+			pending = deque()
+
+			for start in range(0, height, bandRows):
+				pending.append(executor.submit(_CompositeBand, readers, blendTypes, start, min(start + bandRows, height), gamma))
+
+				# two bands per thread keeps them busy while the oldest band is written
+				if len(pending) >= workers * 2:
+					writer.WriteRows(pending.popleft().result())
+
+			while pending:
+				writer.WriteRows(pending.popleft().result())
+
+		finished = True
+	finally:
+		for reader in readers:
+			reader.Close()
+
+		if writer is not None:
+			writer.Close()
+
+			# a half written image would look like a finished one
+			if not finished and os.path.isfile(outputPath):
+				os.remove(outputPath)
+
+
+'''Composite lightmap layers and save the result as a PNG, replaces the PSD -> Photoshop -> psdExport chain.'''
+def CompositeLightmapPng(layers, pngPath, gamma=GAMMA_CORRECTION):
+	CompositeLayersToFile(layers, pngPath, gamma)
+
+
+'''Post bake worker task, convert the EXR, remove it and return the TIF path.'''
+def ConvertExrToTifTask(exrFilePath, tifFilePath, backend=EXR_BACKEND_NUMPY):
+	ConvertExrToTif(exrFilePath, tifFilePath, backend)
+
+	if not os.path.isfile(tifFilePath):
+		raise IOError(tifFilePath + ' could not be created!')
+
+	os.remove(exrFilePath)
+	return tifFilePath
+
+
+'''Run func in a post bake worker, returns [result, start time, seconds, worker pid] for the bake profile.'''
+def _TimedTask(func, *args):
+	start = time.time()
+	result = func(*args)
+	return [result, start, time.time() - start, os.getpid()]
+
+
+'''
+Runs the image side of a bake (EXR conversion, PNG compositing) in a process pool,
+so Maya can move straight on to the next RenderLayer while the images are processed.
+Everything is driven from the calling thread with Poll() and Wait(),
+progressCallback(done, total, text) is called from there as tasks finish.
+profiler = LightBakingProfile.Profiler, gets a span for every finished task.
+'''
+class PostBakeQueue(object):
+	def __init__(self, workers=POST_BAKE_WORKERS, progressCallback=None, profiler=None):
+		self.workers = workers
+		self.progressCallback = progressCallback
+		self.profiler = profiler
+		self.executor = None
+		# future -> [renderSet, kind, label, outputPath]
+		self.futures = OrderedDict()
+		# renderSet -> [layers, pngPath]
+		self.pendingComposites = OrderedDict()
+		self.failedTifs = set()
+		self.failed = []
+		self.completedPngs = {}
+		self.total = 0
+		self.done = 0
+
+	'''Queue the EXR to TIF conversion for a baked RenderLayer.'''
+	def AddConversion(self, renderSet, label, exrFilePath, tifFilePath, backend=EXR_BACKEND_NUMPY):
+		self._Submit(renderSet, 'tif', label, tifFilePath, ConvertExrToTifTask, exrFilePath, tifFilePath, backend)
+
+	'''
+	Queue the PNG for a RenderSet, it starts once all of its conversions are done.
+	layers = [[tifPath, blendType], ...] in the same order CompositeLayers expects.
+	'''
+	def AddComposite(self, renderSet, layers, pngPath):
+		self.pendingComposites[renderSet] = [layers, pngPath]
+		self.Poll()
+
+	'''Return True while any conversion for renderSet is still running.'''
+	def IsConverting(self, renderSet):
+		return any(info[0] == renderSet and info[1] == 'tif' for info in self.futures.values())
+
+	'''Collect finished tasks and start any composites that are ready, never blocks.'''
+	def Poll(self):
+		for future in [x for x in self.futures if x.done()]:
+			self._Collect(future)
+
+		for renderSet in list(self.pendingComposites.keys()):
+			if self.IsConverting(renderSet):
+				continue
+
+			layers, pngPath = self.pendingComposites.pop(renderSet)
+			layers = [x for x in layers if x[0] not in self.failedTifs]
+
+			if not layers:
+				self.failed.append('{} ---> {} (no TIFs to composite)'.format(renderSet, os.path.basename(pngPath)))
+				continue
+
+			self._Submit(renderSet, 'png', renderSet, pngPath, CompositeLightmapPng, layers, pngPath)
+
+	'''Block until everything queued for renderSet, or everything if renderSet is None, has finished.'''
+	def Wait(self, renderSet=None):
+		while True:
+			self.Poll()
+			futures = [x for x in self.futures if renderSet is None or self.futures[x][0] == renderSet]
+
+			if not futures:
+				if renderSet is None and not self.pendingComposites:
+					return
+				if renderSet is not None and renderSet not in self.pendingComposites:
+					return
+
+			concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+
+	'''Block until the TIFs for renderSet exist, for anything that needs them in Maya like the PSD.'''
+	def WaitForConversions(self, renderSet):
+		futures = [x for x in self.futures if self.futures[x][0] == renderSet and self.futures[x][1] == 'tif']
+		concurrent.futures.wait(futures)
+		self.Poll()
+
+	def Shutdown(self):
+		if self.executor is not None:
+			self.executor.shutdown(wait=True)
+			self.executor = None
+
+	def _Submit(self, renderSet, kind, label, outputPath, func, *args):
+		if self.executor is None:
+			context = multiprocessing.get_context('spawn')
+			context.set_executable(_WorkerExecutable())
+			self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+		future = self.executor.submit(_TimedTask, func, *args)
+		self.futures[future] = [renderSet, kind, label, outputPath]
+		self.total += 1
+		self._Progress('Queued ' + label)
+
+	def _Collect(self, future):
+		renderSet, kind, label, outputPath = self.futures.pop(future)
+		self.done += 1
+
+		try:
+			result, start, seconds, pid = future.result()
+		except Exception as e:
+			if kind == 'tif':
+				self.failedTifs.add(outputPath)
+			self.failed.append('{} ---> {} ({})'.format(label, os.path.basename(outputPath), e))
+			self._Progress('FAILED ' + label)
+			return
+
+		if self.profiler:
+			self.profiler.AddSpan(POST_BAKE_STAGES[kind], start, seconds, renderSet, pid=pid, label=label)
+
+		if kind == 'png':
+			self.completedPngs[renderSet] = outputPath
+
+		self._Progress('Finished ' + label)
+
+	def _Progress(self, text):
+		if self.progressCallback:
+			self.progressCallback(self.done, self.total, text)
+
+
+'''Streams 8-bit RGB/RGBA rows into a PNG file.'''
+class _PngWriter(object):
+	def __init__(self, pngPath, width, height, channels):
+		self.width = width
+		self.channels = channels
+		self.compressor = zlib.compressobj(6)
+		self.pngFile = open(pngPath, 'wb')
+		colorType = {1:0, 2:4, 3:2, 4:6}[channels]
+		self.pngFile.write(b'\x89PNG\r\n\x1a\n')
+		self.WriteChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, colorType, 0, 0, 0))
+
+	def WriteChunk(self, chunkType, data):
+		self.pngFile.write(struct.pack('>I', len(data)))
+		self.pngFile.write(chunkType + data)
+		self.pngFile.write(struct.pack('>I', zlib.crc32(chunkType + data) & 0xffffffff))
+
+	'''Encode float rows to 8-bit and add them to the PNG.'''
+	def WriteRows(self, pixels, encodeGamma=DISPLAY_GAMMA):
+		pixels = np.clip(pixels[:, :, :self.channels], 0.0, 1.0)
+
+		if encodeGamma != 1.0:
+			pixels = np.power(pixels, 1.0 / encodeGamma)
+
+		rows = np.empty((pixels.shape[0], 1 + (self.width * self.channels)), dtype=np.uint8)
+		# filter type 0 for every row
+		rows[:, 0] = 0
+		rows[:, 1:] = ((pixels * 255.0) + 0.5).astype(np.uint8).reshape(pixels.shape[0], -1)
+		data = self.compressor.compress(rows.tobytes())
+
+		if data:
+			self.WriteChunk(b'IDAT', data)
+
+	def Close(self):
+		if self.pngFile.closed:
+			return
+		self.WriteChunk(b'IDAT', self.compressor.flush())
+		self.WriteChunk(b'IEND', b'')
+		self.pngFile.close()
+
+
+'''Streams float rows into a scanline EXR through OpenImageIO or OpenEXR, top row first.'''
+class _ExrWriter(object):
+	def __init__(self, exrPath, width, height, channels):
+		LoadExrModules()
+		self.exrPath = exrPath
+		self.channels = channels
+		self.row = 0
+		self.imageOutput = None
+		self.exrFile = None
+
+		if oiio is not None:
+			spec = oiio.ImageSpec(width, height, channels, 'float')
+			self.imageOutput = oiio.ImageOutput.create(exrPath)
+
+			if not self.imageOutput or not self.imageOutput.open(exrPath, spec):
+				raise IOError('Could not create {}: {}'.format(exrPath, oiio.geterror()))
+		elif OpenEXR is not None:
+			self.channelNames = EXR_CHANNELS[:channels] if channels <= len(EXR_CHANNELS) else [str(x) for x in range(channels)]
+			header = OpenEXR.Header(width, height)
+			floatChannel = Imath.Channel(Imath.PixelType(Imath.PixelType.FLOAT))
+			header['channels'] = dict((x, floatChannel) for x in self.channelNames)
+			self.exrFile = OpenEXR.OutputFile(exrPath, header)
+		else:
+			raise RuntimeError('No EXR writer available (OpenImageIO or OpenEXR), can not write ' + exrPath)
+
+	def WriteRows(self, pixels):
+		pixels = np.ascontiguousarray(pixels[:, :, :self.channels], dtype=np.float32)
+
+		if self.imageOutput is not None:
+			if not self.imageOutput.write_scanlines(self.row, self.row + pixels.shape[0], 0, pixels):
+				raise IOError('Could not write {}: {}'.format(self.exrPath, self.imageOutput.geterror()))
+		else:
+			self.exrFile.writePixels(dict((x, np.ascontiguousarray(pixels[:, :, i]).tobytes()) for i, x in enumerate(self.channelNames)),
+									 pixels.shape[0])
+
+		self.row += pixels.shape[0]
+
+	def Close(self):
+		if self.imageOutput is not None:
+			self.imageOutput.close()
+			self.imageOutput = None
+
+		if self.exrFile is not None:
+			self.exrFile.close()
+			self.exrFile = None
+
+
+'''Return the python executable for worker processes, Maya's GUI executable can not run them so use mayapy.'''
+def _WorkerExecutable():
+	executable = sys.executable
+	name = os.path.basename(executable).lower()
+
+	if name.startswith('maya') and not name.startswith('mayapy'):
+		mayapy = os.path.join(os.path.dirname(executable), 'mayapy' + ('.exe' if os.name == 'nt' else ''))
+
+		if os.path.exists(mayapy):
+			return mayapy
+
+	return executable
+
+
+'''Read any image OpenImageIO understands into a float32 (height, width, channels) array.'''
+def _ReadOiio(imagePath):
+	imageInput = oiio.ImageInput.open(imagePath)
+
+	if not imageInput:
+		raise IOError('Could not open {}: {}'.format(imagePath, oiio.geterror()))
+	try:
+		pixels = imageInput.read_image('float')
+	finally:
+		imageInput.close()
+
+	if pixels is None:
+		raise IOError('Could not read {}'.format(imagePath))
+
+	if pixels.ndim == 2:
+		pixels = pixels[:, :, np.newaxis]
+
+	return np.ascontiguousarray(pixels, dtype=np.float32)
+
+
+'''Return the tags of the first TIFF IFD as {tag:[values]} and the byte order.'''
+def _ReadTifTags(tifPath):
+	tags = {}
+
+	with open(tifPath, 'rb') as tifFile:
+		byteOrder = tifFile.read(2)
+
+		if byteOrder not in (b'II', b'MM'):
+			raise ValueError(tifPath + ' is not a TIFF file')
+
+		endian = '<' if byteOrder == b'II' else '>'
+		magic, ifdOffset = struct.unpack(endian + 'HI', tifFile.read(6))
+
+		if magic != 42:
+			raise ValueError('Unsupported TIFF (BigTIFF?) ' + tifPath)
+
+		tifFile.seek(ifdOffset)
+		entryCount = struct.unpack(endian + 'H', tifFile.read(2))[0]
+
+		for i in range(entryCount):
+			tag, fieldType, count = struct.unpack(endian + 'HHI', tifFile.read(8))
+			valueBytes = tifFile.read(4)
+
+			if fieldType not in TIFF_FIELD_FORMATS:
+				continue
+
+			fmt = TIFF_FIELD_FORMATS[fieldType]
+			size = struct.calcsize(fmt) * count
+
+			if size > 4:
+				position = tifFile.tell()
+				tifFile.seek(struct.unpack(endian + 'I', valueBytes)[0])
+				valueBytes = tifFile.read(size)
+				tifFile.seek(position)
+
+			tags[tag] = list(struct.unpack(endian + (fmt * count), valueBytes[:size]))
+
+	return tags, endian
+
+
+'''Make sure pixels are a float32 (height, width, channels) array.'''
+def _AsImage(pixels):
+	pixels = np.asarray(pixels, dtype=np.float32)
+
+	if pixels.ndim == 2:
+		pixels = pixels[:, :, np.newaxis]
+
+	return np.ascontiguousarray(pixels)
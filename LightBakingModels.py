@@ -0,0 +1,287 @@
+'''
+Qt item models for the Light Baking Tool Render Set, object and RenderLayer views.
+Rows are updated in place, so selections survive edits, and every model keeps a name -> row index.
+Maya is not needed in here, only PySide.
+'''
+try:
+	from PySide6.QtCore import *
+	from PySide6.QtGui import *
+	from PySide6.QtWidgets import *
+except ImportError:
+	try:
+		from PySide2.QtCore import *
+		from PySide2.QtGui import *
+		from PySide2.QtWidgets import *
+	except ImportError:
+		from PySide.QtCore import *
+		from PySide.QtGui import *
+
+'''
+Global variables
+'''
+# When fewer than this fraction of the new rows already exist, reset the model instead of diffing.
+RESET_OVERLAP = 0.5
+# Text colour of the rows that failed validation, missing meshes and RenderLayers.
+PROBLEM_COLOR = '#e06c6c'
+
+
+'''Return a Qt.CheckState as an int for PySide2 and PySide6 enums.'''
+def CheckStateValue(value):
+	try:
+		return int(value)
+	except TypeError:
+		return value.value
+
+
+'''
+Ordered rows keyed by a unique name, with a name -> row index.
+SetNames() works out the smallest set of row removes, moves and inserts to get to the new order.
+'''
+class NameListModel(QAbstractTableModel):
+	def __init__(self, headers, parent=None):
+		super(NameListModel, self).__init__(parent)
+		self.headers = headers
+		self.names = []
+		self.rowIndex = {}
+
+	def rowCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return len(self.names)
+
+	def columnCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return len(self.headers)
+
+	def headerData(self, section, orientation, role=Qt.DisplayRole):
+		if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.headers):
+			return self.headers[section]
+		return None
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		if role == Qt.DisplayRole and index.column() == 0:
+			return self.names[index.row()]
+		return None
+
+	'''Return the row for name, -1 if it is not in the model.'''
+	def Row(self, name):
+		return self.rowIndex.get(name, -1)
+
+	def Name(self, row):
+		return self.names[row]
+
+	def Names(self):
+		return list(self.names)
+
+	'''Return the QModelIndex for name, invalid if it is not in the model.'''
+	def IndexOf(self, name, column=0):
+		row = self.Row(name)
+
+		if row < 0:
+			return QModelIndex()
+
+		return self.index(row, column)
+
+	def _Reindex(self, start=0, stop=None):
+		if stop is None:
+			stop = len(self.names)
+
+		for row in range(start, stop):
+			self.rowIndex[self.names[row]] = row
+
+	'''Update the rows to match names, keeping the rows, and so the selection, of names that stay.'''
+	def SetNames(self, names):
+		names = list(names)
+
+		if names == self.names:
+			return
+
+		newNames = set(names)
+		overlap = len([x for x in names if x in self.rowIndex])
+
+		if not self.names or overlap < len(names) * RESET_OVERLAP:
+			self.beginResetModel()
+			self.names = names
+			self.rowIndex = {}
+			self._Reindex()
+			self.endResetModel()
+			return
+
+		# remove rows that are gone, bottom up in contiguous runs
+		row = len(self.names) - 1
+
+		while row >= 0:
+			if self.names[row] in newNames:
+				row -= 1
+				continue
+
+			last = row
+
+			while row >= 0 and self.names[row] not in newNames:
+				row -= 1
+
+			self.beginRemoveRows(QModelIndex(), row + 1, last)
+			for name in self.names[row + 1:last + 1]:
+				self.rowIndex.pop(name, None)
+			del self.names[row + 1:last + 1]
+			self.endRemoveRows()
+
+		self._Reindex()
+
+		# move or insert so row i holds names[i], new names next to each other go in as one block
+		row = 0
+
+		while row < len(names):
+			name = names[row]
+
+			if row < len(self.names) and self.names[row] == name:
+				row += 1
+				continue
+
+			current = self.rowIndex.get(name, -1)
+
+			if current >= 0:
+				self.beginMoveRows(QModelIndex(), current, current, QModelIndex(), row)
+				self.names.insert(row, self.names.pop(current))
+				self.endMoveRows()
+				self._Reindex(row, current + 1)
+				row += 1
+			else:
+				last = row
+
+				while last + 1 < len(names) and names[last + 1] not in self.rowIndex:
+					last += 1
+
+				self.beginInsertRows(QModelIndex(), row, last)
+				self.names[row:row] = names[row:last + 1]
+				self.endInsertRows()
+				self._Reindex(row)
+				row = last + 1
+
+
+'''Name + value rows, used for the objects (mesh, uvSet) and RenderLayers (layer, blending) views.'''
+class RenderSetItemsModel(NameListModel):
+	def __init__(self, headers, valueLabels, parent=None):
+		super(RenderSetItemsModel, self).__init__(headers, parent)
+		self.valueLabels = valueLabels
+		self.values = {}
+		self.problems = {}
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		if role in (Qt.ForegroundRole, Qt.ToolTipRole) and self.names[index.row()] in self.problems:
+			if role == Qt.ForegroundRole:
+				return QColor(PROBLEM_COLOR)
+			return '{} is {}'.format(self.names[index.row()], self.problems[self.names[index.row()]])
+		if role == Qt.DisplayRole and index.column() == 1:
+			value = self.values.get(self.names[index.row()])
+
+			if isinstance(value, int) and 0 <= value < len(self.valueLabels):
+				return self.valueLabels[value]
+			return value
+		return super(RenderSetItemsModel, self).data(index, role)
+
+	'''Update the rows from an ordered {name:value} dict.'''
+	def SetItems(self, items):
+		items = items or {}
+		oldValues = self.values
+		self.SetNames(list(items.keys()))
+		self.values = dict((name, items[name]) for name in self.names)
+
+		for name in self.names:
+			if name in oldValues and oldValues[name] != self.values[name]:
+				row = self.rowIndex[name]
+				self.dataChanged.emit(self.index(row, 1), self.index(row, 1))
+
+	'''Set the value for name, only repaints the value cell if it changed.'''
+	def SetValue(self, name, value):
+		if self.values.get(name) == value and name in self.values:
+			return
+
+		self.values[name] = value
+		row = self.Row(name)
+
+		if row >= 0:
+			self.dataChanged.emit(self.index(row, 1), self.index(row, 1))
+
+	'''Mark rows as failing validation, problems = {name:'missing'|'noMesh'}. Only the rows that changed repaint.'''
+	def SetProblems(self, problems):
+		oldProblems = self.problems
+		self.problems = dict((x, problems[x]) for x in problems if x in self.rowIndex)
+
+		for name in set(oldProblems) | set(self.problems):
+			if oldProblems.get(name) != self.problems.get(name) and name in self.rowIndex:
+				row = self.rowIndex[name]
+				self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+
+'''Sorted Render Set names with a renderMe check box.'''
+class RenderSetsModel(NameListModel):
+	renderMeChanged = Signal(str, bool)
+
+	def __init__(self, parent=None):
+		super(RenderSetsModel, self).__init__(['Render Set'], parent)
+		self.renderMe = {}
+		self.invalid = set()
+
+	def flags(self, index):
+		flags = super(RenderSetsModel, self).flags(index)
+
+		if index.isValid():
+			flags |= Qt.ItemIsUserCheckable
+		return flags
+
+	def data(self, index, role=Qt.DisplayRole):
+		if index.isValid() and role == Qt.CheckStateRole:
+			return Qt.Checked if self.renderMe.get(self.names[index.row()], True) else Qt.Unchecked
+		if index.isValid() and role == Qt.ForegroundRole and self.names[index.row()] in self.invalid:
+			return QColor(PROBLEM_COLOR)
+		return super(RenderSetsModel, self).data(index, role)
+
+	def setData(self, index, value, role=Qt.EditRole):
+		if not index.isValid() or role != Qt.CheckStateRole:
+			return False
+
+		name = self.names[index.row()]
+		self.SetRenderMe(name, CheckStateValue(value) == CheckStateValue(Qt.Checked))
+		self.renderMeChanged.emit(name, self.renderMe[name])
+		return True
+
+	'''Update the rows from the renderSets dict, sorted by name.'''
+	def SetRenderSets(self, renderSets):
+		oldRenderMe = self.renderMe
+		self.SetNames(sorted(renderSets))
+		self.renderMe = dict((name, renderSets[name].get('renderMe', True)) for name in self.names)
+
+		for name in self.names:
+			if name in oldRenderMe and oldRenderMe[name] != self.renderMe[name]:
+				row = self.rowIndex[name]
+				self.dataChanged.emit(self.index(row, 0), self.index(row, 0))
+
+	def SetRenderMe(self, name, renderMe):
+		if self.renderMe.get(name) == renderMe and name in self.renderMe:
+			return
+
+		self.renderMe[name] = renderMe
+		row = self.Row(name)
+
+		if row >= 0:
+			self.dataChanged.emit(self.index(row, 0), self.index(row, 0))
+
+	def IsRenderMe(self, name):
+		return self.renderMe.get(name, True)
+
+	'''Mark the Render Sets that failed validation, only the rows that changed repaint.'''
+	def SetInvalid(self, names):
+		oldInvalid = self.invalid
+		self.invalid = set(names)
+
+		for name in oldInvalid ^ self.invalid:
+			row = self.Row(name)
+
+			if row >= 0:
+				self.dataChanged.emit(self.index(row, 0), self.index(row, 0))
@@ -0,0 +1,190 @@
+'''
+Bake profiling for the Light Baking Tool.
+Profiler.Span() times a stage of the bake, spans nest and pick up the Render Set and RenderLayer of the span
+around them. The spans are written as a Chrome trace (chrome://tracing or https://ui.perfetto.dev) and summed
+up in a table of the slowest Render Sets. Maya is not needed in here.
+'''
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+'''
+Global variables
+'''
+BAKE_PROFILE_NAME = 'lightMapBakeProfile.json'
+SLOWEST_SETS_COUNT = 10
+
+
+'''
+Records timed spans. Each span is a dict:
+{'name', 'renderSet', 'renderLayer', 'start', 'seconds', 'depth', 'leaf', 'outer', 'args', 'pid', 'tid'}
+start is in seconds from the creation of the Profiler, outer is True for the outermost span of its Render Set.
+'''
+class Profiler(object):
+	def __init__(self):
+		self.origin = time.perf_counter()
+		self.wallOrigin = time.time()
+		self.spans = []
+		self.local = threading.local()
+
+	def _Stack(self):
+		if not hasattr(self.local, 'stack'):
+			self.local.stack = []
+		return self.local.stack
+
+	'''
+	Time the with block as a span called name.
+	renderSet/renderLayer default to the ones of the enclosing span, any other keywords end up in the trace args.
+	'''
+	@contextmanager
+	def Span(self, name, renderSet=None, renderLayer=None, **args):
+		span = self.Begin(name, renderSet, renderLayer, **args)
+
+		try:
+			yield span
+		finally:
+			self.End(span)
+
+	'''Start a span, for code where a with block does not fit, like a loop body full of continues. End() it.'''
+	def Begin(self, name, renderSet=None, renderLayer=None, **args):
+		stack = self._Stack()
+
+		outer = True
+
+		if stack:
+			parent = stack[-1]
+			parent['leaf'] = False
+			renderSet = renderSet or parent['renderSet']
+			renderLayer = renderLayer or parent['renderLayer']
+			outer = parent['renderSet'] != renderSet
+
+		span = {'name':name,
+				'renderSet':renderSet,
+				'renderLayer':renderLayer,
+				'start':time.perf_counter() - self.origin,
+				'seconds':0.0,
+				'depth':len(stack),
+				'leaf':True,
+				'outer':outer,
+				'args':args,
+				'pid':os.getpid(),
+				'tid':threading.current_thread().ident}
+		stack.append(span)
+		return span
+
+	'''Stop span and any spans still open inside it, None is ignored.'''
+	def End(self, span):
+		stack = self._Stack()
+
+		if span is None or not any(x is span for x in stack):
+			return
+
+		while stack:
+			current = stack.pop()
+			current['seconds'] = time.perf_counter() - self.origin - current['start']
+			self.spans.append(current)
+
+			if current is span:
+				return
+
+	'''
+	Record a span timed in a worker process, start is its time.time().
+	It goes on its own trace row and only counts as a stage, the worker runs next to the Maya spans.
+	'''
+	def AddSpan(self, name, start, seconds, renderSet=None, renderLayer=None, pid=None, **args):
+		self.spans.append({'name':name,
+						   'renderSet':renderSet,
+						   'renderLayer':renderLayer,
+						   'start':start - self.wallOrigin,
+						   'seconds':seconds,
+						   'depth':0,
+						   'leaf':True,
+						   'outer':False,
+						   'args':args,
+						   'pid':pid or os.getpid(),
+						   'tid':pid or 0})
+
+	'''Return the spans as Chrome trace events, complete events in microseconds.'''
+	def ReturnTraceEvents(self):
+		events = []
+
+		for span in sorted(self.spans, key=lambda x: x['start']):
+			args = dict(span['args'])
+
+			if span['renderSet']:
+				args['renderSet'] = span['renderSet']
+			if span['renderLayer']:
+				args['renderLayer'] = span['renderLayer']
+
+			events.append({'name':span['name'],
+						   'cat':'bake',
+						   'ph':'X',
+						   'ts':int(span['start'] * 1000000),
+						   'dur':int(span['seconds'] * 1000000),
+						   'pid':span['pid'],
+						   'tid':span['tid'],
+						   'args':args})
+
+		return events
+
+	'''
+	Return per Render Set totals, slowest first: [[renderSet, seconds, {stage:seconds}], ...]
+	The total is the Maya time of the outermost spans of the set, the stages only count leaf spans so nothing is counted twice.
+	'''
+	def ReturnRenderSetTotals(self):
+		totals = {}
+
+		for span in self.spans:
+			if not span['renderSet']:
+				continue
+
+			entry = totals.setdefault(span['renderSet'], [span['renderSet'], 0.0, {}])
+
+			if span['outer']:
+				entry[1] += span['seconds']
+			if span['leaf']:
+				entry[2][span['name']] = entry[2].get(span['name'], 0.0) + span['seconds']
+
+		return sorted(totals.values(), key=lambda x: -x[1])
+
+	'''Return {stage:seconds} over the whole bake, leaf spans only.'''
+	def ReturnStageTotals(self):
+		stages = {}
+
+		for span in self.spans:
+			if span['leaf']:
+				stages[span['name']] = stages.get(span['name'], 0.0) + span['seconds']
+
+		return stages
+
+	'''Write the Chrome trace json, with the summary tables in it as well.'''
+	def Write(self, path):
+		data = {'traceEvents':self.ReturnTraceEvents(),
+				'displayTimeUnit':'ms',
+				'stages':self.ReturnStageTotals(),
+				'renderSets':[{'renderSet':x[0], 'seconds':x[1], 'stages':x[2]} for x in self.ReturnRenderSetTotals()]}
+
+		with open(path, 'w') as profileFile:
+			json.dump(data, profileFile)
+
+	'''Print the slowest Render Sets with their three slowest stages, and the time per stage.'''
+	def PrintSummary(self, count=SLOWEST_SETS_COUNT):
+		if not self.spans:
+			return
+
+		renderSets = self.ReturnRenderSetTotals()
+
+		print('\n---=== Slowest Render Sets ===---')
+
+		for renderSet, seconds, stages in renderSets[:count]:
+			slowest = sorted(stages.items(), key=lambda x: -x[1])[:3]
+			print('{:>8.2f}s  {}  ({})'.format(seconds, renderSet, ', '.join('{} {:.2f}s'.format(x[0], x[1]) for x in slowest)))
+
+		print('\n---=== Time per stage ===---')
+
+		for stage, seconds in sorted(self.ReturnStageTotals().items(), key=lambda x: -x[1]):
+			print('{:>8.2f}s  {}'.format(seconds, stage))
+
+		print('')
@@ -0,0 +1,317 @@
+'''
+Batched mesh queries for the Light Baking Tool, through maya.api.OpenMaya.
+MeshData reads what the tool needs to know about mesh transforms, the shape, uvSets, current uvSet, triangle count
+and shadingEngines, for a whole batch in one pass, with no maya.cmds string parsing per query. World bounding boxes
+and points come back as numpy arrays. Everything is cached until Clear(), so make one per operation.
+The OpenMaya module is passed in, FakeOpenMaya stands in for it so all of this runs without Maya.
+'''
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+try:
+	import maya.cmds as cmds
+except ImportError:
+	cmds = None
+
+try:
+	import maya.api.OpenMaya as om
+except ImportError:
+	om = None
+
+'''
+Global variables
+'''
+# Record keys, see MeshData.Read().
+MESH_DATA_KEYS = ['shape', 'uvSets', 'currentUvSet', 'triangles', 'shadingEngines']
+
+
+'''
+Return a MeshData on maya.api.OpenMaya for callers that take a mayaCmds.
+None without OpenMaya, or when mayaCmds is a stand in for maya.cmds, the caller then sticks to mayaCmds.
+'''
+def ReturnMeshData(mayaCmds=None):
+	if om is None or (mayaCmds is not None and mayaCmds is not cmds):
+		return None
+
+	return MeshData()
+
+
+'''
+Reads and caches mesh transform data. openMaya = maya.api.OpenMaya or a FakeOpenMaya.
+A record is {'shape', 'uvSets', 'currentUvSet', 'triangles', 'shadingEngines'}, shape is the full path of the one
+non intermediate mesh shape, None (and the rest empty) when there is no shape or more than one.
+Transforms that do not exist, or are not unique, have no record.
+'''
+class MeshData(object):
+	def __init__(self, openMaya=None):
+		self.om = openMaya or om
+		self.records = {}
+		# transform -> (n, 3) world space points
+		self.points = {}
+		self.reads = 0
+
+	def Clear(self):
+		self.records = {}
+		self.points = {}
+
+	'''Return the MDagPath of the single mesh shape under transform, None if there is not exactly one.'''
+	def _ReturnShapePath(self, transformPath):
+		fnTransform = self.om.MFnDagNode(transformPath)
+		shapes = []
+
+		for index in range(fnTransform.childCount()):
+			child = fnTransform.child(index)
+
+			if child.hasFn(self.om.MFn.kMesh) and not self.om.MFnDagNode(child).isIntermediateObject:
+				shapes.append(child)
+
+		if len(shapes) != 1:
+			return None
+
+		return self.om.MDagPath.getAPathTo(shapes[0])
+
+	def _ReadRecord(self, shapePath):
+		record = dict((x, []) for x in MESH_DATA_KEYS)
+		record.update({'shape':None, 'currentUvSet':None, 'triangles':0})
+
+		if shapePath is None:
+			return record
+
+		fnMesh = self.om.MFnMesh(shapePath)
+		record['shape'] = shapePath.fullPathName()
+		record['uvSets'] = list(fnMesh.getUVSetNames())
+		record['currentUvSet'] = fnMesh.currentUVSetName() if record['uvSets'] else None
+		record['triangles'] = int(sum(fnMesh.getTriangles()[0]))
+		shadingEngines = fnMesh.getConnectedShaders(shapePath.instanceNumber())[0]
+		record['shadingEngines'] = []
+
+		for index in range(len(shadingEngines)):
+			name = self.om.MFnDependencyNode(shadingEngines[index]).name()
+
+			if name not in record['shadingEngines']:
+				record['shadingEngines'].append(name)
+
+		return record
+
+	'''Read the records of meshes that are not cached yet. Returns {mesh:record} for the meshes that exist.'''
+	def Read(self, meshes):
+		selection = self.om.MSelectionList()
+
+		for mesh in meshes:
+			if mesh in self.records:
+				continue
+
+			selection.clear()
+
+			try:
+				selection.add(mesh)
+				transformPath = selection.getDagPath(0)
+			except (RuntimeError, TypeError):
+				self.records[mesh] = None
+				continue
+
+			self.reads += 1
+			self.records[mesh] = self._ReadRecord(self._ReturnShapePath(transformPath))
+
+		return dict((x, self.records[x]) for x in meshes if self.records.get(x))
+
+	'''Return the record of mesh, None if it does not exist.'''
+	def Record(self, mesh):
+		self.Read([mesh])
+		return self.records[mesh]
+
+	def ReturnShape(self, mesh):
+		record = self.Record(mesh)
+		return record['shape'] if record else None
+
+	'''Return {mesh:[uvSet names, current uvSet]} for the meshes with a shape.'''
+	def ReturnUvSets(self, meshes):
+		records = self.Read(meshes)
+		return dict((x, [list(records[x]['uvSets']), records[x]['currentUvSet']]) for x in records if records[x]['shape'])
+
+	'''Return the current uvSet of mesh, None if it has no shape or uvSets.'''
+	def ReturnCurrentUvSet(self, mesh):
+		record = self.Record(mesh)
+		return record['currentUvSet'] if record else None
+
+	'''Return the triangle count of all meshes together.'''
+	def ReturnTriangles(self, meshes):
+		return sum(x['triangles'] for x in self.Read(meshes).values())
+
+	'''Return the shadingEngines of mesh, None if it has no usable shape.'''
+	def ReturnShadingEngines(self, mesh):
+		record = self.Record(mesh)
+
+		if not record or not record['shape']:
+			return None
+
+		return list(record['shadingEngines'])
+
+	'''Return the (n, 3) world space points of mesh, None if it has no shape.'''
+	def ReturnPoints(self, mesh):
+		if mesh not in self.points:
+			shape = self.ReturnShape(mesh)
+			self.points[mesh] = None
+
+			if shape:
+				selection = self.om.MSelectionList()
+				selection.add(shape)
+				points = self.om.MFnMesh(selection.getDagPath(0)).getPoints(self.om.MSpace.kWorld)
+				# MPointArray -> (n, 4) homogeneous points
+				self.points[mesh] = np.array(points, dtype=np.float64).reshape(-1, 4)[:, :3]
+
+		return self.points[mesh]
+
+	'''
+	Return the exact world bounding boxes of meshes as a (n, 2, 3) array of [min, max] corners, like
+	exactWorldBoundingBox per mesh. Meshes without points are NaN.
+	'''
+	def ReturnBoundingBoxes(self, meshes):
+		boxes = np.full((len(meshes), 2, 3), np.nan)
+
+		for index, mesh in enumerate(meshes):
+			points = self.ReturnPoints(mesh)
+
+			if points is not None and len(points):
+				boxes[index, 0] = points.min(axis=0)
+				boxes[index, 1] = points.max(axis=0)
+
+		return boxes
+
+	'''Return [xmin, ymin, zmin, xmax, ymax, zmax] around all meshes, exactWorldBoundingBox order. None if there are no points.'''
+	def ReturnBoundingBox(self, meshes):
+		boxes = self.ReturnBoundingBoxes(meshes)
+		boxes = boxes[~np.isnan(boxes[:, 0, 0])]
+
+		if not len(boxes):
+			return None
+
+		return boxes[:, 0].min(axis=0).tolist() + boxes[:, 1].max(axis=0).tolist()
+
+
+'''
+Pure Python stand in for the bits of maya.api.OpenMaya that MeshData uses, over a dict scene:
+{transform:{'points':[[x, y, z], ...], 'triangles':int, 'uvSets':[names], 'currentUvSet':name, 'shadingEngines':[names]}}
+Add 'shapes':count to give a transform no shape (0) or several. Pass it as MeshData(FakeOpenMaya(scene)).
+'''
+class FakeOpenMaya(object):
+	class MFn(object):
+		kMesh = 'mesh'
+		kTransform = 'transform'
+
+	class MSpace(object):
+		kWorld = 'world'
+
+	class MPoint(object):
+		def __init__(self, x, y, z, w=1.0):
+			self.x = x
+			self.y = y
+			self.z = z
+			self.w = w
+
+		# a sequence of 4 like the real one, so numpy reads it the same way
+		def __len__(self):
+			return 4
+
+		def __getitem__(self, index):
+			return (self.x, self.y, self.z, self.w)[index]
+
+	def __init__(self, scene):
+		fake = self
+		self.scene = scene
+
+		class MObject(object):
+			def __init__(self, name, nodeType, data=None):
+				self.name = name
+				self.nodeType = nodeType
+				self.data = data
+
+			def hasFn(self, fnType):
+				return self.nodeType == fnType
+
+		class MDagPath(object):
+			def __init__(self, node):
+				self.node = node
+
+			@staticmethod
+			def getAPathTo(node):
+				return MDagPath(node)
+
+			def fullPathName(self):
+				return '|' + self.node.name
+
+			def instanceNumber(self):
+				return 0
+
+		class MSelectionList(object):
+			def __init__(self):
+				self.items = []
+
+			def clear(self):
+				self.items = []
+
+			def add(self, name):
+				name = name.lstrip('|')
+
+				if name in fake.scene:
+					self.items.append(MObject(name, fake.MFn.kTransform, fake.scene[name]))
+				elif name.endswith('Shape') and name[:-len('Shape')] in fake.scene:
+					transform = name[:-len('Shape')]
+					self.items.append(MObject(name, fake.MFn.kMesh, fake.scene[transform]))
+				else:
+					raise RuntimeError('(kInvalidParameter): Object does not exist')
+
+			def getDagPath(self, index):
+				return MDagPath(self.items[index])
+
+		class MFnDagNode(object):
+			def __init__(self, node):
+				self.node = node.node if isinstance(node, MDagPath) else node
+
+			def childCount(self):
+				if self.node.nodeType != fake.MFn.kTransform:
+					return 0
+				return self.node.data.get('shapes', 1)
+
+			def child(self, index):
+				# the extra shapes of 'shapes' > 1 only need to exist
+				return MObject('{}Shape{}'.format(self.node.name, index or ''), fake.MFn.kMesh, self.node.data)
+
+			@property
+			def isIntermediateObject(self):
+				return False
+
+		class MFnDependencyNode(object):
+			def __init__(self, node):
+				self.node = node
+
+			def name(self):
+				return self.node.name
+
+		class MFnMesh(object):
+			def __init__(self, dagPath):
+				self.data = dagPath.node.data
+
+			def getUVSetNames(self):
+				return list(self.data.get('uvSets', []))
+
+			def currentUVSetName(self):
+				return self.data.get('currentUvSet', (self.data.get('uvSets') or [''])[0])
+
+			def getTriangles(self):
+				return [1] * self.data.get('triangles', 0), []
+
+			def getConnectedShaders(self, instance):
+				return [MObject(x, 'shadingEngine') for x in self.data.get('shadingEngines', [])], []
+
+			def getPoints(self, space):
+				return [fake.MPoint(*x) for x in self.data.get('points', [])]
+
+		self.MObject = MObject
+		self.MDagPath = MDagPath
+		self.MSelectionList = MSelectionList
+		self.MFnDagNode = MFnDagNode
+		self.MFnDependencyNode = MFnDependencyNode
+		self.MFnMesh = MFnMesh
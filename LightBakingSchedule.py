@@ -0,0 +1,205 @@
+'''
+Bake cost model and scheduling for the Light Baking Tool.
+CostModel predicts how long a (renderSet, renLayer) bake takes from its triangle count, resolution and light count,
+fitted with least squares to the timings of past bakes, which are kept in a json file next to the bake manifest.
+The tasks are then baked longest first in one Maya, or packed longest first onto the farm workers.
+Maya is not needed in here.
+'''
+import os
+import json
+
+'''
+Global variables
+'''
+BAKE_TIMES_NAME = 'lightMapBakeTimes.json'
+# Only the newest samples are kept, so the model follows hardware and Arnold updates.
+MAX_SAMPLES = 500
+# Fewer samples than this per feature and the model falls back to the per resolution averages.
+SAMPLES_PER_FEATURE = 2
+# Fallback when there are no timings at all, seconds per million lightmap pixels.
+DEFAULT_SECONDS_PER_MPX = 10.0
+MIN_TASK_SECONDS = 0.5
+RIDGE = 1e-6
+
+
+'''One (renderSet, renLayer) bake and what it costs.'''
+class BakeTask(object):
+	def __init__(self, renderSet, renLayer, triangles, resolution, lights):
+		self.renderSet = renderSet
+		self.renderLayer = renLayer
+		self.triangles = triangles
+		self.resolution = resolution
+		self.lights = lights
+		self.predicted = None
+		self.seconds = None
+
+	'''Model inputs: constant, million triangles, million pixels and million pixels x lights.'''
+	def Features(self):
+		megaPixels = self.resolution * self.resolution / 1000000.0
+		return [1.0, self.triangles / 1000000.0, megaPixels, megaPixels * self.lights]
+
+	def ReturnDict(self):
+		return {'renderSet':self.renderSet,
+				'renderLayer':self.renderLayer,
+				'triangles':self.triangles,
+				'resolution':self.resolution,
+				'lights':self.lights,
+				'predicted':self.predicted,
+				'seconds':self.seconds}
+
+
+'''Return a BakeTask from a BakeTask.ReturnDict() dict.'''
+def TaskFromDict(data):
+	task = BakeTask(data['renderSet'], data['renderLayer'], data['triangles'], data['resolution'], data['lights'])
+	task.predicted = data.get('predicted')
+	task.seconds = data.get('seconds')
+	return task
+
+
+'''Solve the square system a x = b with Gaussian elimination, a is changed. Returns None if it is singular.'''
+def Solve(a, b):
+	size = len(b)
+
+	for col in range(size):
+		pivot = max(range(col, size), key=lambda x: abs(a[x][col]))
+
+		if abs(a[pivot][col]) < 1e-12:
+			return None
+
+		a[col], a[pivot] = a[pivot], a[col]
+		b[col], b[pivot] = b[pivot], b[col]
+
+		for row in range(col + 1, size):
+			factor = a[row][col] / a[col][col]
+
+			for index in range(col, size):
+				a[row][index] -= factor * a[col][index]
+			b[row] -= factor * b[col]
+
+	x = [0.0] * size
+
+	for row in reversed(range(size)):
+		x[row] = (b[row] - sum(a[row][index] * x[index] for index in range(row + 1, size))) / a[row][row]
+
+	return x
+
+
+'''
+Predicts bake seconds from past timings.
+seedSeconds = {resolution:[total seconds, bake count]}, the tool's single bake timings, used until there are samples.
+'''
+class CostModel(object):
+	def __init__(self, path=None, seedSeconds=None):
+		self.path = path
+		self.seedSeconds = seedSeconds or {}
+		self.samples = []
+		self.weights = None
+		self.Load()
+
+	def Load(self):
+		if not self.path or not os.path.isfile(self.path):
+			return
+		try:
+			with open(self.path, 'r') as timesFile:
+				self.samples = json.load(timesFile).get('samples', [])
+		except (IOError, ValueError) as e:
+			print('<<<<<< WARNING - Could not read {}: {} >>>>>>'.format(self.path, e))
+
+		self.Fit()
+
+	def Save(self):
+		if not self.path:
+			return
+
+		with open(self.path, 'w') as timesFile:
+			json.dump({'samples':self.samples[-MAX_SAMPLES:]}, timesFile)
+
+	'''Add the measured time of a task, refits the model.'''
+	def AddSample(self, task):
+		if task.seconds is None:
+			return
+
+		self.samples.append([task.triangles, task.resolution, task.lights, task.seconds])
+		self.samples = self.samples[-MAX_SAMPLES:]
+		self.Fit()
+
+	'''Least squares fit of seconds to BakeTask.Features(), weights stay None with too few samples.'''
+	def Fit(self):
+		self.weights = None
+		rows = [[BakeTask('', '', x[0], x[1], x[2]).Features(), x[3]] for x in self.samples]
+
+		if not rows or len(rows) < len(rows[0][0]) * SAMPLES_PER_FEATURE:
+			return
+
+		size = len(rows[0][0])
+		a = [[sum(row[0][i] * row[0][j] for row in rows) + (RIDGE if i == j else 0.0) for j in range(size)] for i in range(size)]
+		b = [sum(row[0][i] * row[1] for row in rows) for i in range(size)]
+		self.weights = Solve(a, b)
+
+	'''Return the average seconds at resolution from the samples or the seed timings, None if there are none.'''
+	def ReturnResolutionAverage(self, resolution):
+		times = [x[3] for x in self.samples if x[1] == resolution]
+
+		if times:
+			return sum(times) / len(times)
+
+		total, count = self.seedSeconds.get(str(resolution), [0.0, 0])
+
+		if count:
+			return total / count
+		return None
+
+	'''Return the predicted seconds of task, also stored on task.predicted.'''
+	def Predict(self, task):
+		if self.weights:
+			seconds = sum(w * f for w, f in zip(self.weights, task.Features()))
+		else:
+			seconds = self.ReturnResolutionAverage(task.resolution)
+
+			if seconds is None:
+				seconds = DEFAULT_SECONDS_PER_MPX * task.Features()[2] * (1 + task.lights)
+
+		task.predicted = max(seconds, MIN_TASK_SECONDS)
+		return task.predicted
+
+
+'''
+Pack the tasks onto binCount workers, longest first onto the least loaded worker.
+groupFunc(task) keeps tasks with the same key on one worker, default is the Render Set since a worker bakes whole sets.
+Returns [[tasks], ...] and the predicted seconds of each bin, without empty bins.
+'''
+def PackLongestFirst(tasks, binCount, costModel, groupFunc=lambda x: x.renderSet):
+	groups = {}
+
+	for task in tasks:
+		groups.setdefault(groupFunc(task), []).append(task)
+
+	bins = [[0.0, []] for x in range(max(binCount, 1))]
+
+	for key in sorted(groups, key=lambda x: -sum(costModel.Predict(task) for task in groups[x])):
+		target = min(bins, key=lambda x: x[0])
+		target[0] += sum(task.predicted for task in groups[key])
+		target[1] += groups[key]
+
+	bins = [x for x in bins if x[1]]
+	return [x[1] for x in bins], [x[0] for x in bins]
+
+
+'''Log predicted against actual seconds of the finished tasks, returns the mean absolute error in seconds.'''
+def PrintPredictionReport(tasks):
+	finished = [x for x in tasks if x.seconds is not None and x.predicted is not None]
+
+	if not finished:
+		return None
+
+	print('\n---=== Bake time predicted vs actual ===---')
+
+	for task in sorted(finished, key=lambda x: -x.seconds):
+		print('{}_{}: predicted {:.1f}s, actual {:.1f}s ({:+.1f}s)'.format(task.renderSet, task.renderLayer, task.predicted, task.seconds, task.seconds - task.predicted))
+
+	error = sum(abs(x.seconds - x.predicted) for x in finished) / len(finished)
+	print('Mean error {:.1f}s over {} bakes, total predicted {:.1f}s, actual {:.1f}s\n'.format(error,
+																							len(finished),
+																							sum(x.predicted for x in finished),
+																							sum(x.seconds for x in finished)))
+	return error
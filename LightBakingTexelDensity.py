@@ -0,0 +1,239 @@
+'''
+Texel density resolution planning for the Light Baking Tool.
+The world space and UV space area of every Render Set is measured from the mesh triangles, then the lightmap
+resolution is picked that gets closest to a target number of texels per world unit, snapped to the tool's sizes.
+An optional memory budget across all Render Sets steps down the sets that are the furthest over the target first.
+The planning itself only needs numpy, the areas need Maya.
+'''
+import math
+import LightBakingSceneData
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+try:
+	import maya.cmds as cmds
+except ImportError:
+	cmds = None
+
+try:
+	import maya.api.OpenMaya as om
+except ImportError:
+	om = None
+
+'''
+Global variables
+'''
+# Lightmap texels per world unit (cm), 0.25 is one texel every 4cm.
+DEFAULT_TEXELS_PER_UNIT = 0.25
+# 8-bit RGBA PNGs at runtime.
+BYTES_PER_TEXEL = 4
+# UV area of a Render Set that is laid out by the bake, or has no UVs in its uvSet yet.
+DEFAULT_UV_FILL = 0.6
+MIN_UV_AREA = 1e-6
+
+
+'''Return the area of every triangle, points is (n, 2) or (n, 3) and triangles (m, 3) indices into it.'''
+def TriangleAreas(points, triangles):
+	if not len(triangles):
+		return np.zeros(0)
+
+	edgeA = points[triangles[:, 1]] - points[triangles[:, 0]]
+	edgeB = points[triangles[:, 2]] - points[triangles[:, 0]]
+
+	if points.shape[1] == 2:
+		return 0.5 * np.abs(edgeA[:, 0] * edgeB[:, 1] - edgeA[:, 1] * edgeB[:, 0])
+
+	return 0.5 * np.linalg.norm(np.cross(edgeA, edgeB), axis=1)
+
+
+'''
+Return the world space points, uvs, vertex triangles and uv triangles of mesh as numpy arrays, with OpenMaya.
+Triangles without UVs in uvSet are left out of the uv triangles, uvs is None if the mesh has no uvSet.
+'''
+def ReturnMeshArrays(mesh, uvSet=None, mayaCmds=None, meshData=None):
+	if meshData is not None:
+		shape = meshData.ReturnShape(mesh)
+		shapes = [shape] if shape else None
+	else:
+		mayaCmds = mayaCmds or cmds
+		shapes = mayaCmds.listRelatives(mesh, shapes=True, noIntermediate=True, fullPath=True, type='mesh')
+
+	if not shapes:
+		return None
+
+	selection = om.MSelectionList()
+	selection.add(shapes[0])
+	fnMesh = om.MFnMesh(selection.getDagPath(0))
+
+	if meshData is not None:
+		points = meshData.ReturnPoints(mesh)
+	else:
+		points = np.array(fnMesh.getPoints(om.MSpace.kWorld), dtype=np.float64).reshape(-1, 4)[:, :3]
+	counts, vertices = fnMesh.getVertices()
+	counts = np.array(counts, dtype=np.int64)
+	triangleCounts, triangleOffsets = fnMesh.getTriangleOffsets()
+	# index of every triangle corner in the face vertex list
+	faceStarts = np.cumsum(counts) - counts
+	faceVertices = np.repeat(faceStarts, np.array(triangleCounts, dtype=np.int64) * 3) + np.array(triangleOffsets, dtype=np.int64)
+	vertexTriangles = np.array(vertices, dtype=np.int64)[faceVertices].reshape(-1, 3)
+
+	try:
+		us, vs = fnMesh.getUVs(uvSet)
+		uvCounts, uvIds = fnMesh.getAssignedUVs(uvSet)
+	except (RuntimeError, TypeError):
+		return points, None, vertexTriangles, None
+
+	uvs = np.column_stack([np.array(us, dtype=np.float64), np.array(vs, dtype=np.float64)])
+	# face vertex -> uv id, -1 for faces without UVs
+	faceVertexUvs = np.full(len(vertices), -1, dtype=np.int64)
+	faceVertexUvs[np.repeat(np.array(uvCounts) > 0, counts)] = np.array(uvIds, dtype=np.int64)
+	uvTriangles = faceVertexUvs[faceVertices].reshape(-1, 3)
+	uvTriangles = uvTriangles[(uvTriangles >= 0).all(axis=1)]
+	return points, uvs, vertexTriangles, uvTriangles
+
+
+'''Return [world area, uv area] of mesh, from its triangles or with polyEvaluate when numpy/OpenMaya are missing.'''
+def ReturnMeshAreas(mesh, uvSet=None, mayaCmds=None, meshData=None):
+	mayaCmds = mayaCmds or cmds
+
+	if np is None or om is None:
+		worldArea = mayaCmds.polyEvaluate(mesh, worldArea=True) or 0.0
+
+		try:
+			uvArea = mayaCmds.polyEvaluate(mesh, uvArea=True, uvSetName=uvSet) or 0.0
+		except (RuntimeError, TypeError):
+			uvArea = 0.0
+
+		return [float(worldArea), float(uvArea)]
+
+	arrays = ReturnMeshArrays(mesh, uvSet, mayaCmds, meshData)
+
+	if arrays is None:
+		return [0.0, 0.0]
+
+	points, uvs, vertexTriangles, uvTriangles = arrays
+	uvArea = 0.0
+
+	if uvs is not None:
+		uvArea = float(TriangleAreas(uvs, uvTriangles).sum())
+
+	return [float(TriangleAreas(points, vertexTriangles).sum()), uvArea]
+
+
+'''
+Return {renderSet:[world area, uv area]} for renderSets.
+uvSets = the uvSet names the Render Set object values index into. Meshes in several sets are only measured once.
+Sets with layoutUVs, or without UVs, get DEFAULT_UV_FILL since their UVs are laid out by the bake.
+'''
+def ReturnRenderSetAreas(renderSetsDict, renderSets, uvSets, mayaCmds=None):
+	meshAreas = {}
+	setAreas = {}
+	# the shapes of all the meshes in one pass
+	meshData = LightBakingSceneData.ReturnMeshData(mayaCmds)
+
+	if meshData is not None:
+		meshData.Read([x for renderSet in renderSets for x in renderSetsDict[renderSet].get('objects') or {}])
+
+	for renderSet in renderSets:
+		objects = renderSetsDict[renderSet].get('objects') or {}
+		worldArea = 0.0
+		uvArea = 0.0
+
+		for obj in objects:
+			uvSet = uvSets[objects[obj]]
+
+			if (obj, uvSet) not in meshAreas:
+				meshAreas[(obj, uvSet)] = ReturnMeshAreas(obj, uvSet, mayaCmds, meshData)
+
+			worldArea += meshAreas[(obj, uvSet)][0]
+			uvArea += meshAreas[(obj, uvSet)][1]
+
+		# the meshes share one lightmap, overlapping UVs can not cover more than all of it
+		uvArea = min(uvArea, 1.0)
+
+		if renderSetsDict[renderSet].get('layoutUVs', False) or uvArea < MIN_UV_AREA:
+			uvArea = DEFAULT_UV_FILL
+
+		setAreas[renderSet] = [worldArea, uvArea]
+
+	return setAreas
+
+
+'''Return the texels per world unit a resolution gives for the areas.'''
+def ReturnTexelDensity(resolution, worldArea, uvArea):
+	if worldArea <= 0.0:
+		return 0.0
+
+	return resolution * math.sqrt(uvArea / worldArea)
+
+
+'''Return the index into resolutions closest to pixels, compared in powers of two.'''
+def SnapResolution(pixels, resolutions):
+	if pixels <= 0:
+		return 0
+
+	return min(range(len(resolutions)), key=lambda x: abs(math.log(resolutions[x], 2) - math.log(pixels, 2)))
+
+
+'''
+Plan the resolution of every Render Set in setAreas = {renderSet:[world area, uv area]}.
+memoryBudget = bytes for all lightmaps together, None for no budget. fixedBytes = bytes of the sets not being planned.
+Returns {renderSet:{'resolution':index, 'pixels', 'ideal', 'density', 'worldArea', 'uvArea', 'bytes'}} and the total bytes.
+'''
+def PlanResolutions(setAreas, resolutions, texelsPerUnit=DEFAULT_TEXELS_PER_UNIT, memoryBudget=None, fixedBytes=0):
+	plan = {}
+
+	for renderSet, (worldArea, uvArea) in setAreas.items():
+		ideal = texelsPerUnit * math.sqrt(worldArea / max(uvArea, MIN_UV_AREA))
+		plan[renderSet] = {'resolution':SnapResolution(ideal, resolutions), 'ideal':ideal, 'worldArea':worldArea, 'uvArea':uvArea}
+
+	def Bytes(index):
+		return resolutions[index] * resolutions[index] * BYTES_PER_TEXEL
+
+	total = fixedBytes + sum(Bytes(x['resolution']) for x in plan.values())
+
+	if memoryBudget:
+		# step down the set with the most texels for its area until everything fits
+		while total > memoryBudget:
+			candidates = [x for x in plan if plan[x]['resolution'] > 0]
+
+			if not candidates:
+				break
+
+			renderSet = max(candidates, key=lambda x: resolutions[plan[x]['resolution']] / max(plan[x]['ideal'], 1.0))
+			total -= Bytes(plan[renderSet]['resolution']) - Bytes(plan[renderSet]['resolution'] - 1)
+			plan[renderSet]['resolution'] -= 1
+
+	for entry in plan.values():
+		entry['pixels'] = resolutions[entry['resolution']]
+		entry['density'] = ReturnTexelDensity(entry['pixels'], entry['worldArea'], entry['uvArea'])
+		entry['bytes'] = Bytes(entry['resolution'])
+
+	return plan, total
+
+
+'''Print the planned resolution and texel density of every Render Set, lowest density first.'''
+def PrintDensityReport(plan, texelsPerUnit, total=None, memoryBudget=None):
+	print('\n---=== Lightmap texel density, target {:.3f} texels per unit ===---'.format(texelsPerUnit))
+
+	for renderSet in sorted(plan, key=lambda x: plan[x]['density']):
+		entry = plan[renderSet]
+		print('{:>6}px  {:>8.3f} texels/unit ({:>4.0f}%)  ideal {:>6.0f}px  area {:.1f}, uv {:.3f}  {}'.format(entry['pixels'],
+																											entry['density'],
+																											100.0 * entry['density'] / texelsPerUnit,
+																											entry['ideal'],
+																											entry['worldArea'],
+																											entry['uvArea'],
+																											renderSet))
+	if total is not None:
+		message = 'Lightmap memory {:.1f}MB'.format(total / 1048576.0)
+
+		if memoryBudget:
+			message += ' of a {:.1f}MB budget'.format(memoryBudget / 1048576.0)
+
+		print(message)
+
+	print('')
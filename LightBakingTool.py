@@ -1,26 +1,40 @@
-import maya.app.renderSetup.model.override as override
-import maya.app.renderSetup.model.selector as selector
-import maya.app.renderSetup.model.collection as collectionTool
-import maya.app.renderSetup.model.renderLayer as renderLayer
-import maya.app.renderSetup.model.renderSetup as renderSetup
 import maya.cmds as cmds
-import maya.mel as mel
 import maya.OpenMayaUI as omui
-import comtypes.client
 import sys
 import ast
 import re
 import os
+import copy
 import time
-import string
+import importlib
 import platform
 import subprocess
+import contextlib
 import SharedUtils
-from wand.image import Image
+import LightBakingImageUtils
+import LightBakingData
+import LightBakingModels
+import LightBakingProfile
+import LightBakingTexelDensity
+import LightBakingSceneData
+import LightBakingAtlas
+import LightBakingCache
+import LightBakingEngine
+import LightBakingFarm
 from collections import OrderedDict
 from functools import partial
 from six.moves import reload_module
 reload_module(SharedUtils)
+reload_module(LightBakingImageUtils)
+reload_module(LightBakingSceneData)
+reload_module(LightBakingData)
+reload_module(LightBakingModels)
+reload_module(LightBakingProfile)
+reload_module(LightBakingTexelDensity)
+reload_module(LightBakingAtlas)
+reload_module(LightBakingCache)
+reload_module(LightBakingEngine)
+reload_module(LightBakingFarm)
 
 maya_version = cmds.about(apiVersion=True)
 
@@ -57,17 +71,60 @@ def getMayaWindow():
 	if pointer != None:
 		return wrapInstance(int(pointer), QWidget)
 
+
+'''
+The renderSetup modules are slow to import and only the RenderLayer collections need them, so they are imported on first use.
+Returns maya.app.renderSetup.model.<name>.
+'''
+def ReturnRenderSetupModule(name):
+	return importlib.import_module('maya.app.renderSetup.model.' + name)
+
 '''
 Global variables
 '''
 GB_STYLE = "QGroupBox { padding: 10px; border: 1px solid grey;}"
 MISSING_OBJ_COL = 'missingObjectsCollection'
 TEMP_COL = 'TempCollection'
+EXR_BACKEND_OPTIONVAR = 'LightBakingTool_exrConversionBackend'
+TEXEL_DENSITY_OPTIONVAR = 'LightBakingTool_texelsPerUnit'
+LIGHTMAP_BUDGET_OPTIONVAR = 'LightBakingTool_lightmapBudgetMB'
+BAKE_CACHE_OPTIONVAR = 'LightBakingTool_bakeCacheFolder'
+BAKE_CACHE_SIZE_OPTIONVAR = 'LightBakingTool_bakeCacheGB'
+# Which widgets need rebuilding after an edit, see LightBakingTool.CommitRenderSets.
+REFRESH_NONE = 0
+REFRESH_SETS = 1
+REFRESH_OBJECTS = 2
+REFRESH_LAYERS = 4
+REFRESH_SETTINGS = 8
+REFRESH_DETAILS = REFRESH_OBJECTS | REFRESH_LAYERS | REFRESH_SETTINGS
+REFRESH_ALL = REFRESH_SETS | REFRESH_DETAILS
+# How long debounced edits wait for more edits before they are written.
+FLUSH_DELAY_MS = 300
+# Startup validation and uvSets run in idle time, this long per timer tick so the UI stays responsive.
+STARTUP_CHUNK_MS = 20
+# Scene changes (renames, deletes, RenderLayers) are gathered for this long before the Render Sets are synced.
+SCENE_SYNC_DELAY_MS = 100
+
 
 class LightBakingTool(QDialog):
 	def __init__(self, parent=getMayaWindow()):
+		# seconds from here to 'init', 'firstPaint' and 'ready', see StartupJob
+		self.startupStart = time.perf_counter()
+		self.startupTimes = {}
+		self.startupJob = None
 		self.renderSetsName = 'renderSets'
 		self.renderSetsDict = {}
+		self.renderSetsStore = LightBakingData.RenderSetsStore(self.renderSetsName)
+		self.renderSetsDirty = False
+		self.pendingRefresh = REFRESH_NONE
+		self.pendingMultiSelectionCheck = True
+		self.editDepth = 0
+		# per Render Set results of the last ValidateRenderSets
+		self.validationResults = []
+		self.lightIndex = LightBakingData.LightIndex()
+		self.sceneWatcher = LightBakingData.SceneWatcher(self.SceneChanged)
+		# the Render Set the details views show
+		self.shownRenderSet = ''
 		self.currentRenderset = ''
 		self.projectDirectory = cmds.workspace(q=True, rd=True)
 		self.mayaVersion = int(cmds.about(v=True))
@@ -75,11 +132,42 @@ class LightBakingTool(QDialog):
 		self.verticalSpacer = QSpacerItem(10, 10, QSizePolicy.Minimum, QSizePolicy.Minimum)
 		self.useMentalRay = False
 		self.renderType = 'Arnold'
+		self.exrConversionBackend = LightBakingImageUtils.EXR_BACKEND_NUMPY
+
+		if cmds.optionVar(exists=EXR_BACKEND_OPTIONVAR):
+			self.exrConversionBackend = cmds.optionVar(q=EXR_BACKEND_OPTIONVAR)
+
+		self.texelsPerUnit = LightBakingTexelDensity.DEFAULT_TEXELS_PER_UNIT
+		self.lightmapBudgetMB = 0
+
+		if cmds.optionVar(exists=TEXEL_DENSITY_OPTIONVAR):
+			self.texelsPerUnit = cmds.optionVar(q=TEXEL_DENSITY_OPTIONVAR)
+		if cmds.optionVar(exists=LIGHTMAP_BUDGET_OPTIONVAR):
+			self.lightmapBudgetMB = cmds.optionVar(q=LIGHTMAP_BUDGET_OPTIONVAR)
+
+		self.bakeCacheFolder = LightBakingCache.ReturnDefaultCacheFolder()
+		self.bakeCacheGB = LightBakingCache.DEFAULT_CACHE_MAX_GB
+
+		if cmds.optionVar(exists=BAKE_CACHE_OPTIONVAR):
+			self.bakeCacheFolder = cmds.optionVar(q=BAKE_CACHE_OPTIONVAR)
+		if cmds.optionVar(exists=BAKE_CACHE_SIZE_OPTIONVAR):
+			self.bakeCacheGB = cmds.optionVar(q=BAKE_CACHE_SIZE_OPTIONVAR)
 
 		cmds.optionVar(iv=("renderSetup_includeAllLights", False))
 
 		super(LightBakingTool, self).__init__(parent)
 
+		self.flushTimer = QTimer(self)
+		self.flushTimer.setSingleShot(True)
+		self.flushTimer.timeout.connect(self.FlushRenderSets)
+
+		self.startupTimer = QTimer(self)
+		self.startupTimer.timeout.connect(self.RunStartupChunk)
+
+		self.sceneSyncTimer = QTimer(self)
+		self.sceneSyncTimer.setSingleShot(True)
+		self.sceneSyncTimer.timeout.connect(self.SyncSceneChanges)
+
 		# ------------------------------
 		# Main Window Initialization.
 		# ------------------------------
@@ -122,14 +210,16 @@ class LightBakingTool(QDialog):
 		self.renderSetDivider.setFrameShape(QFrame().HLine)
 		self.renderSetDivider.setFrameShadow(QFrame().Sunken)
 
-		self.renderSetsListWidget = QListWidget()
-		self.renderSetsListWidget.setLineWidth(0)
-		self.renderSetsListWidget.setSortingEnabled(True)
-		self.renderSetsListWidget.setSelectionMode(QAbstractItemView.ExtendedSelection)
-		# Add right click options for self.renderSetsListWidget
-		self.renderSetsListWidget.setContextMenuPolicy(Qt.CustomContextMenu)
-		#self.renderSetsListWidget.connect(self.renderSetsListWidget, SIGNAL('customContextMenuRequested(QPoint)' ), self.RenderSetsListContextMenu)
-		self.renderSetsListWidget.customContextMenuRequested.connect(self.RenderSetsListContextMenu)
+		# the models are updated in place by GetRenderSets, the views keep their selection across edits
+		self.renderSetsModel = LightBakingModels.RenderSetsModel(self)
+		self.renderSetsListView = QListView()
+		self.renderSetsListView.setModel(self.renderSetsModel)
+		self.renderSetsListView.setLineWidth(0)
+		self.renderSetsListView.setUniformItemSizes(True)
+		self.renderSetsListView.setSelectionMode(QAbstractItemView.ExtendedSelection)
+		# Add right click options for self.renderSetsListView
+		self.renderSetsListView.setContextMenuPolicy(Qt.CustomContextMenu)
+		self.renderSetsListView.customContextMenuRequested.connect(self.RenderSetsListContextMenu)
 
 		self.renderSetsNewButton = QPushButton('New')
 		self.renderSetsDeleteButton = QPushButton('Delete')
@@ -142,7 +232,7 @@ class LightBakingTool(QDialog):
 
 		self.renderSetsGroupBoxLayout.addWidget(self.pngNameReminderLabel)
 		self.renderSetsGroupBoxLayout.addWidget(self.renderSetDivider)
-		self.renderSetsGroupBoxLayout.addWidget(self.renderSetsListWidget)
+		self.renderSetsGroupBoxLayout.addWidget(self.renderSetsListView)
 		self.renderSetsGroupBoxLayout.addWidget(self.renderSetsNewButton)
 		self.renderSetsGroupBoxLayout.addWidget(self.renderSetsDeleteButton)
 		self.renderSetsGroupBoxLayout.addWidget(self.renderSetsRenameButton)
@@ -165,21 +255,17 @@ class LightBakingTool(QDialog):
 		self.objectsGroupBoxLayout = QVBoxLayout()
 		self.objectsGroupBox.setLayout(self.objectsGroupBoxLayout)
 
-		self.objectsGroupTreeWidget = QTreeWidget()
-		self.objectsGroupTreeWidget.setHeaderLabels(['Mesh', 'uvSet'])
-		self.objectsGroupTreeWidget.setColumnWidth(0, 255)
-		self.objectsGroupTreeWidget.setColumnWidth(1, 45)
-		self.objectsGroupTreeWidget.setLineWidth(0)
-		self.objectsGroupTreeWidget.setSelectionMode(QAbstractItemView.ExtendedSelection)
-
 		self.uvSetLayout = QHBoxLayout()
 		self.uvSetLabel = QLabel('uvSet:')
 		self.uvSetLabel.setAlignment(Qt.AlignRight)
 		self.uvSetComboBox = QComboBox()
-		self.uvSets = ['map1', 'uvSet', 'uvSet1']
+		self.uvSets = list(LightBakingEngine.UV_SETS)
 		self.uvSetComboBox.addItems(self.uvSets)
 		self.uvSetComboBox.setCurrentIndex(1)
 
+		self.objectsModel = LightBakingModels.RenderSetItemsModel(['Mesh', 'uvSet'], self.uvSets, self)
+		self.objectsGroupTreeView = self.ReturnItemsTreeView(self.objectsModel, [255, 45])
+
 		self.uvSetLayout.addWidget(self.uvSetLabel)
 		self.uvSetLayout.addWidget(self.uvSetComboBox)
 
@@ -187,7 +273,7 @@ class LightBakingTool(QDialog):
 		self.objectsGroupRemoveButton = QPushButton('Remove Meshes')
 		self.objectsGroupSelectButton = QPushButton('Select Meshes')
 
-		self.objectsGroupBoxLayout.addWidget(self.objectsGroupTreeWidget)
+		self.objectsGroupBoxLayout.addWidget(self.objectsGroupTreeView)
 		self.objectsGroupBoxLayout.addLayout(self.uvSetLayout)
 		self.objectsGroupBoxLayout.addWidget(self.objectsGroupLoadButton)
 		self.objectsGroupBoxLayout.addWidget(self.objectsGroupRemoveButton)
@@ -201,12 +287,6 @@ class LightBakingTool(QDialog):
 		self.renLayerGroupBoxLayout = QVBoxLayout()
 		self.renLayerGroupBox.setLayout(self.renLayerGroupBoxLayout)
 
-		self.renLayerTreeWidget = QTreeWidget()
-		self.renLayerTreeWidget.setHeaderLabels(['Render Layer', 'Blending'])
-		self.renLayerTreeWidget.setColumnWidth(0, 220)
-		self.renLayerTreeWidget.setColumnWidth(1, 40)
-		self.renLayerTreeWidget.setLineWidth(0)
-		self.renLayerTreeWidget.setSelectionMode(QAbstractItemView.ExtendedSelection)
 		self.layerBlendingLayout = QHBoxLayout()
 		self.layerBlendingLabel = QLabel('Layer Blending Type:')
 		self.layerBlendingLabel.setAlignment(Qt.AlignRight)
@@ -215,6 +295,9 @@ class LightBakingTool(QDialog):
 		self.blendTypes = ['Additive', 'Multiply']
 		self.layerBlendingComboBox.addItems(self.blendTypes)
 
+		self.renLayersModel = LightBakingModels.RenderSetItemsModel(['Render Layer', 'Blending'], self.blendTypes, self)
+		self.renLayerTreeView = self.ReturnItemsTreeView(self.renLayersModel, [220, 40])
+
 		self.layerBlendingLayout.addWidget(self.layerBlendingLabel)
 		self.layerBlendingLayout.addWidget(self.layerBlendingComboBox)
 
@@ -230,7 +313,7 @@ class LightBakingTool(QDialog):
 		self.moveItemsRenLayerLayout.addWidget(self.upRenLayerButton)
 		self.moveItemsRenLayerLayout.addWidget(self.downRenLayerButton)
 
-		self.renLayerGroupBoxLayout.addWidget(self.renLayerTreeWidget)
+		self.renLayerGroupBoxLayout.addWidget(self.renLayerTreeView)
 		self.renLayerGroupBoxLayout.addLayout(self.layerBlendingLayout)
 		self.renLayerGroupBoxLayout.addWidget(self.renLayerAddSelectedButton)
 		self.renLayerGroupBoxLayout.addWidget(self.renLayerAddSelectedToAllButton)
@@ -252,13 +335,40 @@ class LightBakingTool(QDialog):
 		self.resLabel.setAlignment(Qt.AlignRight)
 
 		self.resComboBox = QComboBox()
-		texSize = ['64', '128', '256', '512', '1024', '2048']
+		texSize = [str(x) for x in LightBakingEngine.RESOLUTIONS]
 		self.resComboBox.addItems(texSize)
 		self.resComboBox.setCurrentIndex(4)
 
 		self.resLayout.addWidget(self.resLabel)
 		self.resLayout.addWidget(self.resComboBox)
 
+		# ------------------------------
+		# Auto Set Resolution QDoubleSpinBox/QSpinBox Setup.
+		# ------------------------------
+		self.texelDensityLayout = QHBoxLayout()
+		self.texelDensityLabel = QLabel('Auto Res Texels per Unit:')
+		self.texelDensityLabel.setAlignment(Qt.AlignRight)
+
+		self.texelDensitySpinBox = QDoubleSpinBox()
+		self.texelDensitySpinBox.setDecimals(3)
+		self.texelDensitySpinBox.setRange(0.001, 100.0)
+		self.texelDensitySpinBox.setSingleStep(0.05)
+		self.texelDensitySpinBox.setValue(self.texelsPerUnit)
+
+		self.texelDensityLayout.addWidget(self.texelDensityLabel)
+		self.texelDensityLayout.addWidget(self.texelDensitySpinBox)
+
+		self.lightmapBudgetLayout = QHBoxLayout()
+		self.lightmapBudgetLabel = QLabel('Auto Res Budget MB (0 = Off):')
+		self.lightmapBudgetLabel.setAlignment(Qt.AlignRight)
+
+		self.lightmapBudgetSpinBox = QSpinBox()
+		self.lightmapBudgetSpinBox.setRange(0, 65536)
+		self.lightmapBudgetSpinBox.setValue(self.lightmapBudgetMB)
+
+		self.lightmapBudgetLayout.addWidget(self.lightmapBudgetLabel)
+		self.lightmapBudgetLayout.addWidget(self.lightmapBudgetSpinBox)
+
 		# ------------------------------
 		# Color Mode QComboBox Setup.
 		# ------------------------------
@@ -306,6 +416,60 @@ class LightBakingTool(QDialog):
 		self.addPrefixLayout.addWidget(self.addPrefixLabel)
 		self.addPrefixLayout.addWidget(self.addPrefixLineEdit)
 
+		# ------------------------------
+		# EXR to TIF Conversion QComboBox Setup, Arnold Only.
+		# ------------------------------
+		self.exrBackendLayout = QHBoxLayout()
+		self.exrBackendLabel = QLabel('EXR to TIF Conversion:')
+		self.exrBackendLabel.setAlignment(Qt.AlignRight)
+
+		self.exrBackendComboBox = QComboBox()
+		self.exrBackendComboBox.addItems(LightBakingImageUtils.EXR_BACKENDS)
+
+		if self.exrConversionBackend in LightBakingImageUtils.EXR_BACKENDS:
+			self.exrBackendComboBox.setCurrentIndex(LightBakingImageUtils.EXR_BACKENDS.index(self.exrConversionBackend))
+
+		self.exrBackendLayout.addWidget(self.exrBackendLabel)
+		self.exrBackendLayout.addWidget(self.exrBackendComboBox)
+
+		# ------------------------------
+		# Local bake farm QSpinBox Setup, Arnold Only. 0 bakes in this Maya.
+		# ------------------------------
+		self.farmWorkersLayout = QHBoxLayout()
+		self.farmWorkersLabel = QLabel('Farm Workers (0 = Off):')
+		self.farmWorkersLabel.setAlignment(Qt.AlignRight)
+
+		self.farmWorkersSpinBox = QSpinBox()
+		self.farmWorkersSpinBox.setRange(0, 64)
+		self.farmWorkersSpinBox.setValue(0)
+
+		self.farmWorkersLayout.addWidget(self.farmWorkersLabel)
+		self.farmWorkersLayout.addWidget(self.farmWorkersSpinBox)
+
+		# ------------------------------
+		# Bake cache QLineEdit/QSpinBox Setup, Arnold Only. Can be a shared folder.
+		# ------------------------------
+		self.bakeCacheLayout = QHBoxLayout()
+		self.bakeCacheLabel = QLabel('Bake Cache Folder (Empty = Off):')
+		self.bakeCacheLabel.setAlignment(Qt.AlignRight)
+
+		self.bakeCacheLineEdit = QLineEdit()
+		self.bakeCacheLineEdit.setText(self.bakeCacheFolder)
+
+		self.bakeCacheLayout.addWidget(self.bakeCacheLabel)
+		self.bakeCacheLayout.addWidget(self.bakeCacheLineEdit)
+
+		self.bakeCacheSizeLayout = QHBoxLayout()
+		self.bakeCacheSizeLabel = QLabel('Bake Cache Size GB:')
+		self.bakeCacheSizeLabel.setAlignment(Qt.AlignRight)
+
+		self.bakeCacheSizeSpinBox = QSpinBox()
+		self.bakeCacheSizeSpinBox.setRange(1, 10000)
+		self.bakeCacheSizeSpinBox.setValue(self.bakeCacheGB)
+
+		self.bakeCacheSizeLayout.addWidget(self.bakeCacheSizeLabel)
+		self.bakeCacheSizeLayout.addWidget(self.bakeCacheSizeSpinBox)
+
 		# ------------------------------
 		# Auto layout lightmap uvs, Arnold Only.
 		# ------------------------------
@@ -339,8 +503,7 @@ class LightBakingTool(QDialog):
 		self.createPsdLabel = QLabel('Create a Layered PSD file for each Render Set.\n'
 										   'Each Render Layer will be a layer in the PSD file.')
 		self.createPsdLabel.setAlignment(Qt.AlignLeft)
-		self.createPSDtCheckbox = QCheckBox('Create PSD')
-		self.createPSDtCheckbox.setChecked(True)
+		self.createPSDtCheckbox = QCheckBox('Create PSD (Needs Photoshop)')
 		self.combineImgCheckbox = QCheckBox('Combine to PNG')
 		self.combineImgNoteLabel = QLabel('Note: Leave Prefix/Suffix Blank if your RenderSet\nnames already include them!')
 		self.combineImgNoteLabel.setEnabled(False)
@@ -370,6 +533,16 @@ class LightBakingTool(QDialog):
 		self.hookUpLMTexturesCheckbox = QCheckBox('Hook Up Lightmap Textures')
 		self.hookUpLMTexturesCheckbox.setDisabled(True)
 		self.createUvSnapshotsCheckbox = QCheckBox('Create UV uvSnapshots')
+		self.parallelPostBakeCheckbox = QCheckBox('Process Images While Baking')
+		self.parallelPostBakeCheckbox.setChecked(True)
+		self.onlyBakeChangesCheckbox = QCheckBox('Only Bake Changes')
+		self.onlyBakeChangesCheckbox.setChecked(True)
+		self.batchBakeCheckbox = QCheckBox('Batch Bake Sets (Same Layer + Res)')
+		self.batchBakeCheckbox.setChecked(False)
+		self.atlasCheckbox = QCheckBox('Atlas Small Render Sets')
+		self.atlasCheckbox.setChecked(False)
+		self.atlasCheckbox.setToolTip('Render Sets of {}px or smaller with the same RenderLayers share {}px lightmap pages.'.format(LightBakingAtlas.ATLAS_MAX_SET_RESOLUTION,
+																																		  LightBakingAtlas.ATLAS_PAGE_RESOLUTION))
 		self.doItAllCheckbox = QCheckBox('Just do it all!(Non Verbose)')
 		self.doItAllCheckbox.setChecked(True)
 		self.resForTypeLayout = QVBoxLayout()
@@ -394,6 +567,11 @@ class LightBakingTool(QDialog):
 		self.psdCreationGroupBoxLayout.addWidget(self.hookUpLMTexturesCheckbox)
 		self.psdCreationGroupBoxLayout.addItem(self.columnThreeSpacer04)
 		self.psdCreationGroupBoxLayout.addWidget(self.createUvSnapshotsCheckbox)
+		if not self.useMentalRay:
+			self.psdCreationGroupBoxLayout.addWidget(self.parallelPostBakeCheckbox)
+			self.psdCreationGroupBoxLayout.addWidget(self.onlyBakeChangesCheckbox)
+			self.psdCreationGroupBoxLayout.addWidget(self.batchBakeCheckbox)
+			self.psdCreationGroupBoxLayout.addWidget(self.atlasCheckbox)
 		self.psdCreationGroupBoxLayout.addItem(self.columnThreeSpacer08)
 		self.psdCreationGroupBoxLayout.addWidget(self.doItAllCheckbox)
 
@@ -401,10 +579,16 @@ class LightBakingTool(QDialog):
 		# Add everything to the third column.
 		# ------------------------------
 		self.resForTypeLayout.addLayout(self.resLayout)
+		self.resForTypeLayout.addLayout(self.texelDensityLayout)
+		self.resForTypeLayout.addLayout(self.lightmapBudgetLayout)
 		self.resForTypeLayout.addLayout(self.modeLayout)
 		self.resForTypeLayout.addLayout(self.fillSeamsLayout)
 		self.resForTypeLayout.addLayout(self.addPrefixLayout)
 		if not self.useMentalRay:
+			self.resForTypeLayout.addLayout(self.exrBackendLayout)
+			self.resForTypeLayout.addLayout(self.farmWorkersLayout)
+			self.resForTypeLayout.addLayout(self.bakeCacheLayout)
+			self.resForTypeLayout.addLayout(self.bakeCacheSizeLayout)
 			self.resForTypeLayout.addWidget(self.autoLayoutLightmapUVs)
 		self.resForTypeLayout.addWidget(self.bottomLine)
 		self.resForTypeLayout.addWidget(self.psdCreationGroupBox)
@@ -443,11 +627,17 @@ class LightBakingTool(QDialog):
 		self.rightGridGroupBox.setLayout(self.rightGridLayout)
 
 		self.bakeButton = QPushButton('BAKE')
+		self.bakeProgressBar = QProgressBar()
+		self.bakeProgressBar.hide()
+		self.startupProgressBar = QProgressBar()
+		self.startupProgressBar.hide()
 
 		self.rightBoxLayout = QVBoxLayout()
 		self.rightBoxLayout.setContentsMargins(0, 0, 0, 0)
 		self.rightBoxLayout.addWidget(self.rightGridGroupBox)
 		self.rightBoxLayout.addWidget(self.bakeButton)
+		self.rightBoxLayout.addWidget(self.bakeProgressBar)
+		self.rightBoxLayout.addWidget(self.startupProgressBar)
 
 		# ------------------------------
 		# Add to gridLayout.
@@ -459,7 +649,10 @@ class LightBakingTool(QDialog):
 		# ------------------------------
 		# Callback Setup.
 		# ------------------------------
-		self.renderSetsListWidget.itemClicked.connect(self.GetRenderSets)
+		# the current index changes after the selection, so both are needed
+		self.renderSetsListView.selectionModel().selectionChanged.connect(self.RenderSetsSelectionChanged)
+		self.renderSetsListView.selectionModel().currentChanged.connect(self.RenderSetsSelectionChanged)
+		self.renderSetsModel.renderMeChanged.connect(self.RenderMeChanged)
 		self.renderSetsNewButton.clicked.connect(self.CreateNewRenderSet)
 		self.renderSetsDeleteButton.clicked.connect(self.DeleteRenderSet)
 		self.renderSetsRenameButton.clicked.connect(self.RenameRenderSet)
@@ -468,14 +661,14 @@ class LightBakingTool(QDialog):
 		self.validateRenderSetsButton.clicked.connect(self.ValidateRenderSets)
 		self.autoPopulateSetsButton.clicked.connect(self.AutoPopulate)
 
-		self.objectsGroupTreeWidget.itemClicked.connect(self.SingleSelectObject)
+		self.objectsGroupTreeView.clicked.connect(self.SingleSelectObject)
 		self.uvSetRefreshButton.clicked.connect(partial(self.SetAllMeshUvSets, True))
 		self.uvSetComboBox.currentIndexChanged.connect(self.ChangeMeshUvSet)
 		self.objectsGroupLoadButton.clicked.connect(self.AddMeshToRenderSet)
 		self.objectsGroupRemoveButton.clicked.connect(self.DeleteRenderSetMesh)
 		self.objectsGroupSelectButton.clicked.connect(self.SelectMeshInRenderSet )
 
-		self.renLayerTreeWidget.itemClicked.connect(self.SingleSelectRenLayer)
+		self.renLayerTreeView.clicked.connect(self.SingleSelectRenLayer)
 		self.layerBlendingComboBox.currentIndexChanged.connect(self.ChangeRenderLayerBlend)
 		self.renLayerAddSelectedButton.clicked.connect(self.AddSelectedRenderLayer)
 		self.renLayerAddSelectedToAllButton.clicked.connect(partial(self.AddSelectedRenderLayer, True))
@@ -486,11 +679,16 @@ class LightBakingTool(QDialog):
 		self.downRenLayerButton.clicked.connect(partial(self.MoveRenderLayer, False))
 
 		self.resComboBox.currentIndexChanged.connect(self.SetRenderSetResolution)
+		self.texelDensitySpinBox.valueChanged.connect(self.SetAutoResolutionSettings)
+		self.lightmapBudgetSpinBox.valueChanged.connect(self.SetAutoResolutionSettings)
 		self.modeComboBox.currentIndexChanged.connect(self.SetRenderSetColorMode)
 		self.fillSeamsSlider.valueChanged.connect(self.SetRenderFillTextureSeams)
 		self.addPrefixLineEdit.textChanged.connect(self.SetRenderSetLightMapPrefix)
 		if not self.useMentalRay:
 			self.autoLayoutLightmapUVs.clicked.connect(self.SetRenderSetLayoutUVs)
+			self.exrBackendComboBox.currentIndexChanged.connect(self.SetExrConversionBackend)
+			self.bakeCacheLineEdit.editingFinished.connect(self.SetBakeCacheSettings)
+			self.bakeCacheSizeSpinBox.valueChanged.connect(self.SetBakeCacheSettings)
 		self.combineImgCheckbox.clicked.connect(partial(SharedUtils.SetDisabledCheckBoxs,
 																	self.combineImgCheckbox,
 																	[self.hookUpLMTexturesCheckbox,
@@ -503,11 +701,14 @@ class LightBakingTool(QDialog):
 
 		self.bakeButton.clicked.connect(self.BakeRenderLayers)
 
+		# the window opens with the saved Render Sets, validation and the uvSets follow in idle time
 		self.SetRenderSetsDict()
 		self.GetRenderSets()
-		self.ValidateRenderSets()
-		self.SetAllMeshUvSets()
-		SharedUtils.RunFunctionOnTimer(1, self.RenderSetsSelectionCheck, parent=self.mainWindowName)
+		self.startupTimes['init'] = time.perf_counter() - self.startupStart
+		self.startupJob = self.StartupJob()
+		self.startupTimer.start(0)
+		# keep the Render Sets in sync with renames and deletes in the scene
+		self.sceneWatcher.Watch()
 
 		# ------------------------------
 		# Reload UI when new file is opened.
@@ -515,9 +716,135 @@ class LightBakingTool(QDialog):
 		cmds.scriptJob(runOnce=True, event=('deleteAll', 'LightBakingTool.LightBakingTool().show()'), parent=self.mainWindowName)
 
 
-	'''Right click menu for self.renderSetsListWidget'''
+	'''
+	The startup work, validating the Render Sets then setting the mesh uvSets, as a generator that yields
+	(done, total, text) after every bit of work. RunStartupChunk runs it in idle time.
+	'''
+	def StartupJob(self):
+		renderSets = {}
+
+		if self.CheckIfRenderSetsExist():
+			renderSets = self.ReturnRenderSets()
+
+		names = list(renderSets.keys())
+		# the scene is gathered once with bulk ls calls, then the Render Sets are checked a few at a time
+		sceneIndex = LightBakingData.SceneIndex()
+		results = []
+
+		for index, renderSet in enumerate(names):
+			results += LightBakingData.ValidateRenderSets(OrderedDict([(renderSet, renderSets[renderSet])]), sceneIndex)
+			yield index + 1, len(names), 'Validating Render Sets'
+
+		self.ValidateRenderSets(results)
+		yield len(names), len(names), 'Setting uvSets'
+		self.SetAllMeshUvSets()
+
+
+	'''Run the startup job for STARTUP_CHUNK_MS, then give the UI its time back until the next idle tick.'''
+	def RunStartupChunk(self):
+		# the validation dialog runs its own event loop, the timer must not run the job again from in there
+		self.startupTimer.stop()
+
+		if self.startupJob is None:
+			return
+
+		end = time.perf_counter() + STARTUP_CHUNK_MS / 1000.0
+		progress = None
+
+		try:
+			while time.perf_counter() < end:
+				progress = next(self.startupJob)
+		except StopIteration:
+			self.FinishStartupJob()
+			return
+
+		if progress:
+			done, total, text = progress
+			self.startupProgressBar.show()
+			self.startupProgressBar.setMaximum(max(total, 1))
+			self.startupProgressBar.setValue(done)
+			self.startupProgressBar.setFormat('{} - %v / %m'.format(text))
+
+		self.startupTimer.start(0)
+
+
+	def FinishStartupJob(self):
+		self.startupJob = None
+		self.startupTimer.stop()
+		self.startupProgressBar.hide()
+		self.startupTimes['ready'] = time.perf_counter() - self.startupStart
+		print('>-----=====| Light Baking Tool opened in {:.2f}s, ready in {:.2f}s |=====-----<'.format(self.startupTimes.get('firstPaint', self.startupTimes['init']),
+																									  self.startupTimes['ready']))
+
+
+	'''Drop the rest of the startup job, for when the caller validates and sets the uvSets itself.'''
+	def StopStartupJob(self):
+		if self.startupJob is not None:
+			self.startupJob.close()
+			self.FinishStartupJob()
+
+
+	'''Remember when the window first painted, for the startup timings.'''
+	def paintEvent(self, event):
+		if 'firstPaint' not in self.startupTimes:
+			self.startupTimes['firstPaint'] = time.perf_counter() - self.startupStart
+
+		super(LightBakingTool, self).paintEvent(event)
+
+
+	'''Return a flat QTreeView for a RenderSetItemsModel, uniform row heights keep big Render Sets fast.'''
+	def ReturnItemsTreeView(self, model, columnWidths):
+		treeView = QTreeView()
+		treeView.setModel(model)
+		treeView.setRootIsDecorated(False)
+		treeView.setUniformRowHeights(True)
+		treeView.setLineWidth(0)
+		treeView.setSelectionMode(QAbstractItemView.ExtendedSelection)
+
+		for column, width in enumerate(columnWidths):
+			treeView.setColumnWidth(column, width)
+
+		return treeView
+
+
+	'''Return the names of the selected rows in view, in row order.'''
+	def ReturnSelectedNames(self, view):
+		rows = sorted(index.row() for index in view.selectionModel().selectedRows())
+		return [view.model().Name(row) for row in rows]
+
+
+	'''Return the current Render Set name, '' if there is none.'''
+	def ReturnCurrentRenderSet(self):
+		index = self.renderSetsListView.currentIndex()
+
+		if index.isValid():
+			return self.renderSetsModel.Name(index.row())
+		return ''
+
+
+	def ReturnSelectedRenderSets(self):
+		return self.ReturnSelectedNames(self.renderSetsListView)
+
+
+	def ReturnSelectedObjects(self):
+		return self.ReturnSelectedNames(self.objectsGroupTreeView)
+
+
+	def ReturnSelectedRenderLayers(self):
+		return self.ReturnSelectedNames(self.renLayerTreeView)
+
+
+	'''Make setName the current and only selected Render Set.'''
+	def SelectRenderSet(self, setName):
+		index = self.renderSetsModel.IndexOf(setName)
+
+		if index.isValid():
+			self.renderSetsListView.selectionModel().setCurrentIndex(index, QItemSelectionModel.ClearAndSelect)
+
+
+	'''Right click menu for self.renderSetsListView'''
 	def RenderSetsListContextMenu(self):
-		rightMenu = QMenu(self.renderSetsListWidget)
+		rightMenu = QMenu(self.renderSetsListView)
 		# Add LOCKED suffix to selected. #
 		addLockedSuffix = QAction('Add _LOCKED Suffix to Selected', self, triggered=self.AddLockedSuffixToRenderSets)
 		rightMenu.addAction(addLockedSuffix)
@@ -539,13 +866,12 @@ class LightBakingTool(QDialog):
 
 	'''Add _LOCKED Suffix to end of selected renderSets'''
 	def AddLockedSuffixToRenderSets(self):
-		selectedRenderSets = self.renderSetsListWidget.selectedItems()
+		selectedRenderSets = self.ReturnSelectedRenderSets()
 
 		if not selectedRenderSets:
 			return
 
-		for renderSet in selectedRenderSets:
-			setName = renderSet.text()
+		for setName in selectedRenderSets:
 			newSetName = '{}_LOCKED'.format(setName)
 
 			if newSetName in list(self.renderSetsDict.keys()):
@@ -554,13 +880,12 @@ class LightBakingTool(QDialog):
 
 			self.renderSetsDict[newSetName] = self.renderSetsDict.pop(setName)
 
-		cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-		self.GetRenderSets(True, False)
+		self.CommitRenderSets(REFRESH_ALL, False)
 
 
 	'''Duplicate selected renderSets and add suffix'''
 	def DuplicateSelectedRenderSets(self):
-		selectedRenderSets = self.renderSetsListWidget.selectedItems()
+		selectedRenderSets = self.ReturnSelectedRenderSets()
 
 		if not selectedRenderSets:
 			return
@@ -584,28 +909,29 @@ class LightBakingTool(QDialog):
 		if dialogResult == 'Cancel':
 			return
 
-		for renderSet in selectedRenderSets:
-			setName = renderSet.text()
+		for setName in selectedRenderSets:
 			newSetName = '{}{}'.format(setName, prefixName)
 
 			if newSetName in list(self.renderSetsDict.keys()):
 				cmds.warning('||||>>>> {} renderSet already exists, skipping!!! <<<<|||| '.format(newSetName))
 				continue
 
-			self.renderSetsDict[newSetName] = self.renderSetsDict[setName]
+			self.renderSetsDict[newSetName] = copy.deepcopy(self.renderSetsDict[setName])
+			self.renderSetsDict[newSetName].pop('atlas', None)
 
-		cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-		self.GetRenderSets(True, False)
+		self.CommitRenderSets(REFRESH_ALL, False)
 
 
-	'''Check if there are multiple renderSets selected.'''
-	def RenderSetsSelectionCheck(self):
-		if len(self.renderSetsListWidget.selectedItems()) > 1:
-			if self.rightGridGroupBox.isEnabled():
-				self.rightGridGroupBox.setEnabled(False)
-		else:
-			if not self.rightGridGroupBox.isEnabled():
-				self.rightGridGroupBox.setEnabled(True)
+	'''
+	The Render Set selection changed, from a click, the keyboard or the tool itself.
+	The details are disabled while several Render Sets are selected, and only updated when the current one changed.
+	'''
+	def RenderSetsSelectionChanged(self, *args):
+		multiSelected = len(self.renderSetsListView.selectionModel().selectedRows()) > 1
+		self.rightGridGroupBox.setEnabled(not multiSelected)
+
+		if not multiSelected and self.ReturnCurrentRenderSet() != self.shownRenderSet:
+			self.GetRenderSets(False, REFRESH_DETAILS)
 
 
 	'''Check if renderSets Object exists'''
@@ -618,7 +944,6 @@ class LightBakingTool(QDialog):
 	'''Check is Create PSD is Checked.'''
 	def DoNonVerbose(self):
 		if self.doItAllCheckbox.isChecked():
-			self.createPSDtCheckbox.setChecked(True)
 			self.combineImgCheckbox.setChecked(True)
 			self.combineImgPrefixLabel.setEnabled(True)
 			self.combineImgPrefixLineEdit.setEnabled(True)
@@ -633,117 +958,249 @@ class LightBakingTool(QDialog):
 	'''Get and set self.renderSetsDict if a renderSets node already exists in the scene.'''
 	def SetRenderSetsDict(self):
 		if self.CheckIfRenderSetsExist():
-			dictInfo = cmds.getAttr(self.renderSetsName + '.notes')
+			self.renderSetsStore.Watch(self.mainWindowName)
+			self.renderSetsDict = copy.deepcopy(self.renderSetsStore.Read())
 
-			if dictInfo:
-				self.renderSetsDict = eval(dictInfo)
 
+	'''Write self.renderSetsDict to the renderSets node.'''
+	def SaveRenderSetsDict(self):
+		self.renderSetsStore.Write(self.renderSetsDict)
 
-	'''Get the RenderSets and populate the UI.'''
-	def GetRenderSets(self, setRenderMe=True, multiSelectionCheck=True):
-		if self.CheckIfRenderSetsExist():
-			if setRenderMe:
-				self.SetRenderMe()
 
-			currentSel = ''
+	'''
+	Return the renderSets dict saved on the renderSets node, cached so treat it as read only.
+	While there are unwritten edits self.renderSetsDict is returned, it is the newest data.
+	'''
+	def ReturnRenderSets(self):
+		if self.renderSetsDirty:
+			return self.renderSetsDict
+
+		return self.renderSetsStore.Read()
+
 
-			if multiSelectionCheck and len(self.renderSetsListWidget.selectedItems()) > 1:
+	'''
+	Get the RenderSets and populate the UI.
+	refresh = which views to update, see the REFRESH_ flags. The models only change the rows that differ,
+	so the current Render Set and the selected objects/RenderLayers stay selected.
+	'''
+	def GetRenderSets(self, multiSelectionCheck=True, refresh=REFRESH_ALL):
+		if self.CheckIfRenderSetsExist():
+			if multiSelectionCheck and len(self.renderSetsListView.selectionModel().selectedRows()) > 1:
 				self.rightGridGroupBox.setEnabled(False)
 				return
 			else:
 				self.rightGridGroupBox.setEnabled(True)
 
-			if self.renderSetsListWidget.currentItem():
-				currentSel = self.renderSetsListWidget.currentItem().text()
+			renderSets = self.ReturnRenderSets()
 
-			currentSelObj = ''
-			selObjItems = self.objectsGroupTreeWidget.selectedItems()
+			if refresh & REFRESH_SETS:
+				for renderSet in renderSets:
+					if renderSet in self.renderSetsDict:
+						self.renderSetsDict[renderSet].setdefault('renderMe', True)
 
-			currentSelRenLayer = ''
-			selRenLayerItems = self.renLayerTreeWidget.selectedItems()
+				self.renderSetsModel.SetRenderSets(renderSets)
 
-			if len(selObjItems) == 1:
-				for mesh in selObjItems:
-					currentSelObj = mesh.text(0)
+			currentSel = self.ReturnCurrentRenderSet()
+			details = {}
 
-			if len(selRenLayerItems) == 1:
-				for renLayer in selRenLayerItems:
-					currentSelRenLayer = renLayer.text(0)
+			if currentSel and currentSel in self.renderSetsDict:
+				details = self.renderSetsDict[currentSel]
+			# update the objects and renderlayers views
+			if refresh & REFRESH_OBJECTS:
+				self.objectsModel.SetItems(details.get('objects'))
 
-			notesAttr = cmds.getAttr(self.renderSetsName + '.notes')
+			if refresh & REFRESH_LAYERS:
+				self.renLayersModel.SetItems(details.get('renderLayers'))
 
-			if notesAttr:
-				renderSets = eval(notesAttr)
+			if refresh & REFRESH_DETAILS:
+				self.shownRenderSet = currentSel
 
-			self.renderSetsListWidget.clear()
-			self.objectsGroupTreeWidget.clear()
-			self.renLayerTreeWidget.clear()
+			self.UpdateValidationViews()
 
-			if renderSets:
-				for renderSet in renderSets:
-					item = QListWidgetItem(renderSet)
-					item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-
-					if 'renderMe' in renderSets[renderSet]:
-						if renderSets[renderSet]['renderMe'] is True:
-							item.setCheckState(Qt.Checked)
-						else:
-							item.setCheckState(Qt.Unchecked)
-					else:
-						self.renderSetsDict[renderSet].setdefault('renderMe', True)
-						item.setCheckState(Qt.Checked)
+			if details and refresh & REFRESH_SETTINGS:
+				# the setting widgets write back to the dict, so dont let them fire while they are set
+				settingWidgets = [self.resComboBox, self.modeComboBox, self.fillSeamsSlider, self.addPrefixLineEdit]
 
-					self.renderSetsListWidget.addItem(item)
-			# make sure the prevous selected
-			if currentSel and currentSel in self.renderSetsDict:
-				for index in range(self.renderSetsListWidget.count()):
-					renderSetName = self.renderSetsListWidget.item(index).text()
-
-					if renderSetName == currentSel:
-						self.renderSetsListWidget.setCurrentRow(index)
-						# add objects to QListWidget
-						if 'objects' in self.renderSetsDict[renderSetName] and self.renderSetsDict[renderSetName]['objects']:
-							for mesh in self.renderSetsDict[renderSetName]['objects']:
-								uvSet = self.uvSets[self.renderSetsDict[renderSetName]['objects'][mesh]]
-								treeWidgetItem = QTreeWidgetItem([mesh, uvSet])
-								self.objectsGroupTreeWidget.addTopLevelItem(treeWidgetItem)
-						# add renderlayers to QListWidget
-						if 'renderLayers' in self.renderSetsDict[renderSetName] and self.renderSetsDict[renderSetName]['renderLayers']:
-							for renLayer in self.renderSetsDict[renderSetName]['renderLayers']:
-								blendType = self.blendTypes[self.renderSetsDict[renderSetName]['renderLayers'][renLayer]]
-								treeWidgetItem = QTreeWidgetItem([renLayer, blendType])
-								self.renLayerTreeWidget.addTopLevelItem(treeWidgetItem)
-						break
+				if not self.useMentalRay:
+					settingWidgets.append(self.autoLayoutLightmapUVs)
 
+				for widget in settingWidgets:
+					widget.blockSignals(True)
 				# set correct res from dict
-				self.resComboBox.setCurrentIndex(self.renderSetsDict[currentSel]['resolution'])
+				self.resComboBox.setCurrentIndex(details['resolution'])
 				# set correct colorMode from dict
-				self.modeComboBox.setCurrentIndex(self.renderSetsDict[currentSel]['colorMode'])
+				self.modeComboBox.setCurrentIndex(details['colorMode'])
 				# set correct fillTextureSeams from dict
-				self.fillSeamsSlider.setValue(self.renderSetsDict[currentSel]['fillTextureSeams'])
+				self.fillSeamsSlider.setValue(details['fillTextureSeams'])
 				# set correct lightMapPrefix from dict
-				self.addPrefixLineEdit.setText(self.renderSetsDict[currentSel]['lightMapPrefix'])
+				self.addPrefixLineEdit.setText(details['lightMapPrefix'])
 				# set Auto Layout UVs from dict
-				if not self.useMentalRay and 'layoutUVs' in self.renderSetsDict[renderSet]:
-					self.autoLayoutLightmapUVs.setChecked(self.renderSetsDict[currentSel]['layoutUVs'])
+				if not self.useMentalRay and 'layoutUVs' in details:
+					self.autoLayoutLightmapUVs.setChecked(details['layoutUVs'])
+
+				for widget in settingWidgets:
+					widget.blockSignals(False)
 
-			if currentSelObj:
-				iterator = QTreeWidgetItemIterator(self.objectsGroupTreeWidget)
 
-				for item in iterator:
-					objName = item.value().text(0)
+	'''Colour the Render Sets, objects and RenderLayers that failed the last validation.'''
+	def UpdateValidationViews(self):
+		currentSel = self.ReturnCurrentRenderSet()
+		problems = {}
 
-					if objName == currentSelObj:
-						self.objectsGroupTreeWidget.setCurrentItem(item.value())
+		for result in self.validationResults:
+			if result['renderSet'] == currentSel:
+				problems = result['problems']
 
-			if currentSelRenLayer:
-				iterator = QTreeWidgetItemIterator(self.renLayerTreeWidget)
+		self.renderSetsModel.SetInvalid([x['renderSet'] for x in self.validationResults if not x['valid']])
+		self.objectsModel.SetProblems(problems)
+		self.renLayersModel.SetProblems(problems)
 
-				for item in iterator:
-					layerName = item.value().text(0)
 
-					if layerName == currentSelRenLayer:
-						self.renLayerTreeWidget.setCurrentItem(item.value())
+	'''The SceneWatcher saw a change, they are synced together once Maya is done with the command.'''
+	def SceneChanged(self):
+		if not self.sceneSyncTimer.isActive():
+			self.sceneSyncTimer.start(SCENE_SYNC_DELAY_MS)
+
+
+	'''
+	Bring the Render Sets up to date with the scene changes since the last sync.
+	Renamed meshes and RenderLayers are renamed in the Render Sets. Only the Render Sets that use a renamed or
+	deleted node, and after a create the ones with missing nodes, are validated again.
+	'''
+	def SyncSceneChanges(self):
+		renamed, removed, added = self.sceneWatcher.Take()
+
+		if not self.CheckIfRenderSetsExist() or not self.renderSetsDict:
+			return
+
+		checkSets = set()
+
+		for oldName, newName, renderLayer in renamed:
+			key = 'renderLayers' if renderLayer else 'objects'
+
+			for renderSet in self.renderSetsDict:
+				items = self.renderSetsDict[renderSet].get(key)
+
+				if not items:
+					continue
+
+				renamedItems = LightBakingData.RenameItems(items, oldName, newName, not renderLayer)
+
+				if renamedItems is not None:
+					self.renderSetsDict[renderSet][key] = renamedItems
+					checkSets.add(renderSet)
+
+		renamedSets = bool(checkSets)
+
+		for renderSet in self.renderSetsDict:
+			names = set()
+
+			for key in LightBakingData.VALIDATE_KEYS:
+				for name in self.renderSetsDict[renderSet].get(key) or []:
+					names.update(name.split('|'))
+
+			if names & removed:
+				checkSets.add(renderSet)
+
+		# a created or renamed node can be one a Render Set is missing
+		if added or renamed:
+			checkSets.update(x['renderSet'] for x in self.validationResults if not x['valid'])
+
+		if renamedSets:
+			# the rename is in the undo queue already, undoing it renames the Render Sets back through here
+			cmds.undoInfo(stateWithoutFlush=False)
+
+			try:
+				self.CommitRenderSets(REFRESH_DETAILS)
+			finally:
+				cmds.undoInfo(stateWithoutFlush=True)
+
+		checkSets = [x for x in self.renderSetsDict if x in checkSets]
+
+		if not checkSets:
+			return
+
+		results = dict((x['renderSet'], x) for x in self.validationResults)
+
+		for result in LightBakingData.ValidateRenderSets(OrderedDict((x, self.renderSetsDict[x]) for x in checkSets)):
+			results[result['renderSet']] = result
+
+		self.validationResults = [results[x] for x in self.renderSetsDict if x in results]
+		self.UpdateValidationViews()
+
+
+	'''A Render Set renderMe check box was toggled.'''
+	def RenderMeChanged(self, setName, renderMe):
+		if setName in self.renderSetsDict and self.renderSetsDict[setName].get('renderMe') != renderMe:
+			self.renderSetsDict[setName]['renderMe'] = renderMe
+			self.CommitRenderSets(REFRESH_NONE, debounce=True)
+
+
+	'''
+	Group edits to self.renderSetsDict. Everything inside is written once, with a single undo chunk,
+	when the outermost edit ends. Use CommitRenderSets() inside to say what changed.
+	'''
+	@contextlib.contextmanager
+	def RenderSetsEdit(self):
+		self.editDepth += 1
+
+		if self.editDepth == 1:
+			cmds.undoInfo(openChunk=True, chunkName='LightBakingToolEdit')
+		try:
+			yield
+		finally:
+			self.editDepth -= 1
+
+			if self.editDepth == 0:
+				try:
+					self.FlushRenderSets()
+				finally:
+					cmds.undoInfo(closeChunk=True)
+
+
+	'''
+	Mark self.renderSetsDict as changed and write it, unless inside a RenderSetsEdit.
+	refresh = widgets that need rebuilding, debounce = wait for more edits (sliders, typing) before writing.
+	'''
+	def CommitRenderSets(self, refresh=REFRESH_ALL, multiSelectionCheck=True, debounce=False):
+		self.renderSetsDirty = True
+		self.pendingRefresh |= refresh
+		self.pendingMultiSelectionCheck = self.pendingMultiSelectionCheck and multiSelectionCheck
+
+		if self.editDepth:
+			return
+
+		if debounce:
+			self.flushTimer.start(FLUSH_DELAY_MS)
+			return
+
+		self.FlushRenderSets()
+
+
+	'''Write any pending edits and refresh the widgets they touched.'''
+	def FlushRenderSets(self, refreshUi=True):
+		self.flushTimer.stop()
+
+		if self.renderSetsDirty:
+			self.renderSetsDirty = False
+			self.SaveRenderSetsDict()
+
+		if refreshUi and self.pendingRefresh:
+			refresh = self.pendingRefresh
+			multiSelectionCheck = self.pendingMultiSelectionCheck
+			self.pendingRefresh = REFRESH_NONE
+			self.pendingMultiSelectionCheck = True
+			self.GetRenderSets(multiSelectionCheck, refresh)
+
+
+	'''Make sure nothing is left unwritten.'''
+	def closeEvent(self, event):
+		self.StopStartupJob()
+		self.FlushRenderSets(False)
+		self.lightIndex.Unwatch()
+		self.sceneWatcher.Unwatch()
+		self.sceneSyncTimer.stop()
+		super(LightBakingTool, self).closeEvent(event)
 
 
 	'''
@@ -769,7 +1226,8 @@ class LightBakingTool(QDialog):
 		if not cmds.attributeQuery('notes', n=self.renderSetsName, exists=True):
 			cmds.addAttr(self.renderSetsName, ln='notes', dt='string')
 			cmds.setAttr(self.renderSetsName + '.notes', e=True, channelBox=True)
-			cmds.setAttr(self.renderSetsName + '.notes', '{}', type='string')
+			self.renderSetsStore.Write({})
+			self.renderSetsStore.Watch(self.mainWindowName)
 
 
 	'''
@@ -782,10 +1240,7 @@ class LightBakingTool(QDialog):
 		dialogPromptTitle = 'Name RenderSet!'
 		dialogPromptMessage = 'Enter Name:'
 		dialogResult = ''
-		currentRenderSets = []
-
-		for index in range(self.renderSetsListWidget.count()):
-			currentRenderSets.append(self.renderSetsListWidget.item(index).text())
+		currentRenderSets = self.renderSetsModel.Names()
 
 		while name == '' and dialogResult != 'Cancel':
 			dialogResult = cmds.promptDialog(
@@ -839,75 +1294,81 @@ class LightBakingTool(QDialog):
 			# set Auto UV layout
 			self.renderSetsDict[newRenderSetName[1]].setdefault('layoutUVs', False)
 
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-
 			if not bypassGetRenderSets:
-				self.GetRenderSets(True, False)
+				self.CommitRenderSets(REFRESH_ALL, False)
+			else:
+				self.CommitRenderSets(REFRESH_NONE)
 
 
 	'''Delete Selected RenderSet'''
 	def DeleteRenderSet(self):
-		selectedRenderSets = self.renderSetsListWidget.selectedItems()
+		selectedRenderSets = self.ReturnSelectedRenderSets()
 
 		if not selectedRenderSets:
 			return
 
-		for renderSet in selectedRenderSets:
-			setName = renderSet.text()
+		for setName in selectedRenderSets:
 			self.renderSetsDict.pop(setName, None)
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
 
-		self.GetRenderSets(True, False)
+		self.CommitRenderSets(REFRESH_ALL, False)
 
 
-	'''Sort the RenderSet list'''
+	'''Sort the RenderSet list, the model always keeps them sorted so this just updates it.'''
 	def SortRenderSet(self):
-		self.renderSetsListWidget.sortItems()
+		self.GetRenderSets(False, REFRESH_SETS)
 
 
 	'''Rename Selected RenderSet'''
 	def RenameRenderSet(self):
-		if len(self.renderSetsListWidget.selectedItems()) > 1:
+		if len(self.ReturnSelectedRenderSets()) > 1:
 			cmds.warning('Please select a single Render Set to Rename!')
 			return
-		if self.renderSetsListWidget.currentItem():
-			setName = self.renderSetsListWidget.currentItem().text()
-			index = self.renderSetsListWidget.currentRow()
+		setName = self.ReturnCurrentRenderSet()
+
+		if setName:
 			newTagName = self.NewRenderSetDialog()
 
 			if newTagName[0] != 'Cancel':
 				self.renderSetsDict[newTagName[1]] = self.renderSetsDict.pop(setName)
-				cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-				self.GetRenderSets()
+				self.CommitRenderSets(REFRESH_SETS)
+				# keep the renamed Render Set current, the selection change updates the details
+				self.SelectRenderSet(newTagName[1])
 
 
 	'''Add selected mesh objects to current selected RenderSet'''
 	def AddMeshToRenderSet(self, bypassSelected=False, setName='', meshs=[], bypassGetRenderSets=False):
-		currentItem = True
-
 		if not bypassSelected:
 			meshs = cmds.listRelatives(cmds.ls(sl=True, dag=True, ni=True, type='mesh'),type='transform',p=True)
-			currentItem = self.renderSetsListWidget.currentItem()
+			setName = self.ReturnCurrentRenderSet()
 
-		if currentItem and meshs:
-			if not bypassSelected:
-				setName = self.renderSetsListWidget.currentItem().text()
+		if setName and meshs:
 
 			if not 'objects' in self.renderSetsDict[setName]:
 				self.renderSetsDict[setName].setdefault('objects',{})
 
-			for mesh in meshs:
-				self.renderSetsDict[setName]['objects'].setdefault(mesh, self.GetCurrentUvSet(mesh))
+			# the current uvSets of all the meshes in one pass
+			meshData = LightBakingSceneData.ReturnMeshData()
 
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
+			if meshData is not None:
+				meshData.Read(meshs)
+
+			for mesh in meshs:
+				if mesh not in self.renderSetsDict[setName]['objects']:
+					self.renderSetsDict[setName]['objects'][mesh] = self.GetCurrentUvSet(mesh, meshData)
 
 			if not bypassGetRenderSets:
-				self.GetRenderSets()
+				self.CommitRenderSets(REFRESH_OBJECTS)
+			else:
+				self.CommitRenderSets(REFRESH_NONE)
 
 
-	'''Get objects current UVSet'''
-	def GetCurrentUvSet(self, mesh):
-		uvSet = cmds.polyUVSet(mesh, q=True, currentUVSet=True)
+	'''Get objects current UVSet, from meshData when there is one.'''
+	def GetCurrentUvSet(self, mesh, meshData=None):
+		if meshData is not None:
+			uvSet = meshData.ReturnCurrentUvSet(mesh)
+			uvSet = [uvSet] if uvSet else None
+		else:
+			uvSet = cmds.polyUVSet(mesh, q=True, currentUVSet=True)
 
 		if uvSet:
 			index = [i for i, s in enumerate(self.uvSets) if uvSet[0] in s]
@@ -921,23 +1382,25 @@ class LightBakingTool(QDialog):
 
 	'''Delete the selected object(s) from the current RenderSet'''
 	def DeleteRenderSetMesh(self):
-		if self.renderSetsListWidget.currentItem() and self.objectsGroupTreeWidget.selectedItems():
-			setName = self.renderSetsListWidget.currentItem().text()
+		setName = self.ReturnCurrentRenderSet()
+		selectedMeshes = self.ReturnSelectedObjects()
 
-			for mesh in self.objectsGroupTreeWidget.selectedItems():
-				self.renderSetsDict[setName]['objects'].pop(mesh.text(0), None)
+		if setName and selectedMeshes:
+			for mesh in selectedMeshes:
+				self.renderSetsDict[setName]['objects'].pop(mesh, None)
 
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-			self.GetRenderSets()
+			self.CommitRenderSets(REFRESH_OBJECTS)
 
 
 	'''Select the current selected object(s) in the current RenderSet in the scene.'''
 	def SelectMeshInRenderSet(self):
-		if self.renderSetsListWidget.currentItem() and self.objectsGroupTreeWidget.selectedItems():
+		selectedMeshes = self.ReturnSelectedObjects()
+
+		if self.ReturnCurrentRenderSet() and selectedMeshes:
 			cmds.select(cl=True)
 
-			for mesh in self.objectsGroupTreeWidget.selectedItems():
-				cmds.select(mesh.text(0), tgl=True)
+			for mesh in selectedMeshes:
+				cmds.select(mesh, tgl=True)
 
 
 	'''
@@ -945,123 +1408,116 @@ class LightBakingTool(QDialog):
 	This WILL change the UVSet of the actual mesh object.
 	'''
 	def ChangeMeshUvSet(self):
-		if self.renderSetsListWidget.currentItem() and self.objectsGroupTreeWidget.selectedItems():
-			setName = self.renderSetsListWidget.currentItem().text()
+		setName = self.ReturnCurrentRenderSet()
 
-			for mesh in self.objectsGroupTreeWidget.selectedItems():
-				selectedItem = mesh.text(0)
+		if setName and self.ReturnSelectedObjects():
+			with self.RenderSetsEdit():
+				self.ChangeSelectedMeshesUvSet(setName)
 
-				if cmds.objExists(selectedItem):
-					uvSets = cmds.polyUVSet(selectedItem, q=True, allUVSets=True)
 
-					if str(self.uvSetComboBox.currentText()) in uvSets:
-						cmds.polyUVSet(selectedItem, currentUVSet=True, uvSet=str(self.uvSetComboBox.currentText()))
-					elif str(self.uvSetComboBox.currentText()) not in uvSets:
-						if str(self.uvSetComboBox.currentText()) == 'uvSet':
-							cmds.polyUVSet(selectedItem, create=True, uvSet='uvSet')
-							cmds.polyUVSet(selectedItem, currentUVSet=True, uvSet='uvSet')
-						elif str(self.uvSetComboBox.currentText()) == 'uvSet1' and len(uvSets) == 2:
-							cmds.polyUVSet(selectedItem, create=True, uvSet='uvSet1')
-							cmds.polyUVSet(selectedItem, currentUVSet=True, uvSet='uvSet1')
-						elif str(self.uvSetComboBox.currentText()) == 'uvSet1':
-							cmds.polyUVSet(selectedItem, create=True, uvSet='uvSet')
-							cmds.polyUVSet(selectedItem, create=True, uvSet='uvSet1')
-							cmds.polyUVSet(selectedItem, currentUVSet=True, uvSet='uvSet1')
+	'''Set the uvSet combo box uvSet on the selected objects, the object rows are updated in place.'''
+	def ChangeSelectedMeshesUvSet(self, setName):
+		for selectedItem in self.ReturnSelectedObjects():
+			if cmds.objExists(selectedItem):
+				uvSets = cmds.polyUVSet(selectedItem, q=True, allUVSets=True)
 
-					self.renderSetsDict[setName]['objects'][selectedItem] = self.uvSetComboBox.currentIndex()
+				if str(self.uvSetComboBox.currentText()) in uvSets:
+					cmds.polyUVSet(selectedItem, currentUVSet=True, uvSet=str(self.uvSetComboBox.currentText()))
+				elif str(self.uvSetComboBox.currentText()) not in uvSets:
+					if str(self.uvSetComboBox.currentText()) == 'uvSet':
+						cmds.polyUVSet(selectedItem, create=True, uvSet='uvSet')
+						cmds.polyUVSet(selectedItem, currentUVSet=True, uvSet='uvSet')
+					elif str(self.uvSetComboBox.currentText()) == 'uvSet1' and len(uvSets) == 2:
+						cmds.polyUVSet(selectedItem, create=True, uvSet='uvSet1')
+						cmds.polyUVSet(selectedItem, currentUVSet=True, uvSet='uvSet1')
+					elif str(self.uvSetComboBox.currentText()) == 'uvSet1':
+						cmds.polyUVSet(selectedItem, create=True, uvSet='uvSet')
+						cmds.polyUVSet(selectedItem, create=True, uvSet='uvSet1')
+						cmds.polyUVSet(selectedItem, currentUVSet=True, uvSet='uvSet1')
 
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-			self.GetRenderSets()
+				self.renderSetsDict[setName]['objects'][selectedItem] = self.uvSetComboBox.currentIndex()
+				self.objectsModel.SetValue(selectedItem, self.uvSetComboBox.currentIndex())
 
+		self.CommitRenderSets(REFRESH_NONE)
 
-	'''Return most common uvSet'''
-	def ReturnCommonUvSet(self, renderSet):
-		uvSets = []
 
-		for obj in self.renderSetsDict[renderSet]['objects']:
-			uvSets.append(self.uvSets[self.renderSetsDict[renderSet]['objects'][obj]])
+	'''
+	Make sure all meshes are set to the correct uvSet.
+	The uvSets of every mesh are read in one pass and only the meshes that differ are edited, in one undo chunk.
+	Returns the number of meshes touched.
+	'''
+	def SetAllMeshUvSets(self, verbose=False):
+		if not self.CheckIfRenderSetsExist():
+			return 0
 
-		return max(set(uvSets), key = uvSets.count)
+		renderSets = self.ReturnRenderSets()
+		wanted = OrderedDict()
 
+		for renderSet in renderSets:
+			objects = renderSets[renderSet].get('objects') or {}
 
-	'''Make sure all meshes are set to the correct uvSet'''
-	def SetAllMeshUvSets(self, verbose=False):
-		setsCheck = False
+			for obj in objects:
+				wanted[obj] = self.uvSets[objects[obj]]
 
-		if self.CheckIfRenderSetsExist():
-			notesAttr = cmds.getAttr(self.renderSetsName + '.notes')
-			renderSets = eval(notesAttr)
+		if not wanted:
+			return 0
 
-			if not renderSets:
-				return
+		meshUvSets = LightBakingData.ReturnMeshUvSets(list(wanted))
 
-			for renderSet in renderSets:
-				if not 'objects' in self.renderSetsDict:
-					return
-				if self.renderSetsDict[renderSet]['objects']:
-					for obj in self.renderSetsDict[renderSet]['objects']:
-						if not cmds.objExists(obj):
-							continue
+		for obj in wanted:
+			if obj in meshUvSets and not meshUvSets[obj][0]:
+				print('\nWARNING--WARNING--WARNING--WARNING--WARNING--WARNING')
+				print('--> The following object has no uvSets: ' + obj + ' <--')
+				print('WARNING--WARNING--WARNING--WARNING--WARNING--WARNING\n')
 
-						uvSets = cmds.polyUVSet(obj, q=True, allUVSets=True)
+		changes = LightBakingData.PlanUvSetChanges(wanted, meshUvSets, self.uvSets)
+		touched = LightBakingData.ApplyUvSetChanges(changes)
 
-						if not uvSets:
-							print('\nWARNING--WARNING--WARNING--WARNING--WARNING--WARNING')
-							print('--> The following object has no uvSets: ' + obj + ' <--')
-							print('WARNING--WARNING--WARNING--WARNING--WARNING--WARNING\n')
-							continue
+		if verbose:
+			print('\n---=== Setting UVSets for all objects in RenderSets!!! ===---\n')
 
-						for set in self.uvSets:
-							if set not in uvSets:
-								cmds.polyUVSet(obj, create=True, uvSet=set)
+			for mesh, create, makeCurrent in changes:
+				print('--> ' + mesh + ' = ' + (makeCurrent or wanted[mesh]))
 
-						uvSet = self.uvSets[self.renderSetsDict[renderSet]['objects'][obj]]
-						cmds.polyUVSet(obj, currentUVSet=True, uvSet=uvSet)
+		if touched or verbose:
+			print('\n---=== UVSets set on {} of {} objects in RenderSets!!! ===---\n'.format(touched, len(meshUvSets)))
 
-						if verbose:
-							if not setsCheck:
-								print('\n---=== Setting UVSets for all objects in RenderSets!!! ===---\n')
-							print('--> ' + obj + ' = ' + uvSet)
-						setsCheck = True
-		if setsCheck:
-			print('\n---=== UVSets have been set for all objects in RenderSets!!! ===---\n')
+		return touched
 
 
 	'''For selecting a single object in the RenderSet'''
 	def SingleSelectObject(self):
-		if self.renderSetsListWidget.currentItem() and self.objectsGroupTreeWidget.selectedItems():
-			setName = self.renderSetsListWidget.currentItem().text()
-			selItems = self.objectsGroupTreeWidget.selectedItems()
+		setName = self.ReturnCurrentRenderSet()
+		selItems = self.ReturnSelectedObjects()
 
+		if setName and selItems:
 			if len(selItems) == 1:
+				# only show the uvSet, dont apply it to the mesh again
+				self.uvSetComboBox.blockSignals(True)
+
 				for mesh in selItems:
-					self.uvSetComboBox.setCurrentIndex(self.renderSetsDict[setName]['objects'][mesh.text(0)])
+					self.uvSetComboBox.setCurrentIndex(self.renderSetsDict[setName]['objects'][mesh])
 
-				cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-				self.GetRenderSets()
+				self.uvSetComboBox.blockSignals(False)
 
 
-	'''Add renderLayers to current RenderSet.'''
-	def AddRenderLayersToRenderSet(self, toAllSets=False):
-		if self.renderSetsListWidget.currentItem():
-			setName = self.renderSetsListWidget.currentItem().text()
+	'''
+	Add renderLayers to current RenderSet.
+	renLayers = layers to add, defaults to the layers listed for the current RenderSet.
+	'''
+	def AddRenderLayersToRenderSet(self, toAllSets=False, renLayers=None):
+		setName = self.ReturnCurrentRenderSet()
 
+		if setName:
 			if not 'renderLayers' in self.renderSetsDict[setName]:
 				self.renderSetsDict[setName].setdefault('renderLayers',{})
 
-			renLayers = []
-			iterator = QTreeWidgetItemIterator(self.renLayerTreeWidget)
-
-			for item in iterator:
-				renLayers.append(item.value().text(0))
+			if renLayers is None:
+				renLayers = self.renLayersModel.Names()
 
 			if renLayers:
 				if toAllSets:
-					allSets = []
-					for index in range(self.renderSetsListWidget.count()):
-						allSets.append(self.renderSetsListWidget.item(index).text())
-
-					for set in allSets:
+					for set in self.renderSetsModel.Names():
 						if set != setName:
 							if not 'renderLayers' in self.renderSetsDict[set]:
 								self.renderSetsDict[set].setdefault('renderLayers',{})
@@ -1073,24 +1529,20 @@ class LightBakingTool(QDialog):
 					for renLayer in renLayers:
 						self.renderSetsDict[setName]['renderLayers'].setdefault(renLayer, 0)
 
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-			self.GetRenderSets()
+			self.CommitRenderSets(REFRESH_LAYERS)
 
 
 	'''Create a new renderLayers in current Scene, and add to current RenderSet.'''
 	def AddSelectedRenderLayer(self, allSets=False):
 		currentLayer = cmds.editRenderLayerGlobals(query=True, currentRenderLayer=True)
 
+		renLayers = self.renLayersModel.Names()
+
 		if currentLayer != 'defaultRenderLayer':
-			treeWidgetItem = QTreeWidgetItem([currentLayer, 0])
-			self.renLayerTreeWidget.addTopLevelItem(treeWidgetItem)
+			renLayers.append(currentLayer)
 
 			if allSets:
-				allSets = []
-				for index in range(self.renderSetsListWidget.count()):
-					allSets.append(self.renderSetsListWidget.item(index).text())
-
-				for set in allSets:
+				for set in self.renderSetsModel.Names():
 					if not 'renderLayers' in self.renderSetsDict[set]:
 						self.renderSetsDict[set].setdefault('renderLayers',{})
 
@@ -1101,92 +1553,63 @@ class LightBakingTool(QDialog):
 
 					self.renderSetsDict[set]['renderLayers'].setdefault(currentLayer, 0)
 
-		self.AddRenderLayersToRenderSet()
+		self.AddRenderLayersToRenderSet(renLayers=renLayers)
 
 
 	'''Get all renderLayers in current Scene, and add to current RenderSet.'''
 	def GetRenderLayers(self):
 		if cmds.objExists(self.renderSetsName):
-			renderLayers = cmds.ls(type='renderLayer')
-			self.renLayerTreeWidget.clear()
-
-			if renderLayers:
-				# dont add default render layer
-				if 'defaultRenderLayer' in renderLayers:
-					renderLayers.remove('defaultRenderLayer')
+			renderLayers = cmds.ls(type='renderLayer') or []
+			# dont add default render layer
+			if 'defaultRenderLayer' in renderLayers:
+				renderLayers.remove('defaultRenderLayer')
 
-				for renderLayer in renderLayers:
-					treeWidgetItem = QTreeWidgetItem([renderLayer, 0])
-					self.renLayerTreeWidget.addTopLevelItem(treeWidgetItem)
-
-			self.AddRenderLayersToRenderSet()
+			self.AddRenderLayersToRenderSet(renLayers=renderLayers)
 
 
 	'''Reorder the render layers so the PSD can be in the correct order.
 	   self.renderSetsDict[setName]['renderLayers'] will be converted to an OrderedDict.
 	'''
 	def MoveRenderLayer(self, up=True):
-		if self.renderSetsListWidget.currentItem() and self.renLayerTreeWidget.selectedItems():
-			setName = self.renderSetsListWidget.currentItem().text()
-			tempDict = OrderedDict()
-			currentSelected = []
-
-			for renLayer in self.renLayerTreeWidget.selectedItems():
-				layerCount = 0
-				iterator = QTreeWidgetItemIterator(self.renLayerTreeWidget)
-
-				for item in iterator:
-					layerCount += 1
-
-				blendLayer = self.renderSetsDict[setName]['renderLayers'][renLayer.text(0)]
-				index = self.renLayerTreeWidget.indexFromItem(renLayer).row()
+		setName = self.ReturnCurrentRenderSet()
+		selected = self.ReturnSelectedRenderLayers()
 
-				pos = index - 1
+		if setName and selected:
+			renLayers = self.renLayersModel.Names()
+			rows = sorted(self.renLayersModel.Row(x) for x in selected)
 
-				if not up:
-					pos = index + 1
+			if not up:
+				rows.reverse()
+			# move each selected layer one step, a selected block stops at the top/bottom as a whole
+			for row in rows:
+				pos = row - 1 if up else row + 1
 
-				if pos <= 0:
-					pos = 0
-				elif pos >= (layerCount - 1):
-					pos = layerCount - 1
-
-				self.renLayerTreeWidget.takeTopLevelItem(index)
-				self.renLayerTreeWidget.insertTopLevelItem(pos, renLayer)
-				currentSelected.append(renLayer.text(0))
+				if pos < 0 or pos >= len(renLayers) or renLayers[pos] in selected:
+					continue
 
-			iterator = QTreeWidgetItemIterator(self.renLayerTreeWidget)
-			renLayers = []
+				renLayers[pos], renLayers[row] = renLayers[row], renLayers[pos]
 
-			for item in iterator:
-				renLayers.append(item.value().text(0))
+			tempDict = OrderedDict()
 
 			for renLayer in renLayers:
 				if renLayer in self.renderSetsDict[setName]['renderLayers']:
 					tempDict.setdefault(renLayer, self.renderSetsDict[setName]['renderLayers'][renLayer])
 
 			self.renderSetsDict[setName]['renderLayers'] = tempDict
-
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-			self.GetRenderSets()
-
-			iterator = QTreeWidgetItemIterator(self.renLayerTreeWidget)
-			# make sure they stay selected
-			for item in iterator:
-				if item.value().text(0) in currentSelected:
-					item.value().setSelected(True)
+			# rows are moved, not rebuilt, so they stay selected
+			self.CommitRenderSets(REFRESH_LAYERS)
 
 
 	'''Remove renderLayer from selected RenderSet.'''
 	def DeleteRenderLayer(self):
-		if self.renderSetsListWidget.currentItem() and self.renLayerTreeWidget.selectedItems():
-			setName = self.renderSetsListWidget.currentItem().text()
+		setName = self.ReturnCurrentRenderSet()
+		selected = self.ReturnSelectedRenderLayers()
 
-			for renLayer in self.renLayerTreeWidget.selectedItems():
-				self.renderSetsDict[setName]['renderLayers'].pop(renLayer.text(0), None)
+		if setName and selected:
+			for renLayer in selected:
+				self.renderSetsDict[setName]['renderLayers'].pop(renLayer, None)
 
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-			self.GetRenderSets()
+			self.CommitRenderSets(REFRESH_LAYERS)
 
 
 	'''Copy all selected renderLayers from current RenderSet to all others.'''
@@ -1196,39 +1619,43 @@ class LightBakingTool(QDialog):
 
 	'''Change the Blend Mode for selected renderLayer. This will be used in Photoshop.'''
 	def ChangeRenderLayerBlend(self):
-		if self.renderSetsListWidget.currentItem() and self.renLayerTreeWidget.selectedItems():
-			setName = self.renderSetsListWidget.currentItem().text()
+		setName = self.ReturnCurrentRenderSet()
+		selected = self.ReturnSelectedRenderLayers()
 
-			for renLayer in self.renLayerTreeWidget.selectedItems():
-				self.renderSetsDict[setName]['renderLayers'][renLayer.text(0)] = self.layerBlendingComboBox.currentIndex()
+		if setName and selected:
+			for renLayer in selected:
+				self.renderSetsDict[setName]['renderLayers'][renLayer] = self.layerBlendingComboBox.currentIndex()
+				self.renLayersModel.SetValue(renLayer, self.layerBlendingComboBox.currentIndex())
 
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-			self.GetRenderSets()
+			self.CommitRenderSets(REFRESH_NONE)
 
 
 	'''For selecting a single renderlayer in the selected RenderSet'''
 	def SingleSelectRenLayer(self):
-		if self.renderSetsListWidget.currentItem() and self.renLayerTreeWidget.selectedItems():
-			setName = self.renderSetsListWidget.currentItem().text()
-			selItems = self.renLayerTreeWidget.selectedItems()
+		setName = self.ReturnCurrentRenderSet()
+		selItems = self.ReturnSelectedRenderLayers()
 
+		if setName and selItems:
 			if len(selItems) == 1:
+				self.layerBlendingComboBox.blockSignals(True)
+
 				for renLayer in selItems:
-					self.layerBlendingComboBox.setCurrentIndex(self.renderSetsDict[setName]['renderLayers'][renLayer.text(0)])
+					self.layerBlendingComboBox.setCurrentIndex(self.renderSetsDict[setName]['renderLayers'][renLayer])
 
-				cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-				self.GetRenderSets()
+				self.layerBlendingComboBox.blockSignals(False)
 
 
 	'''Set the value for the dictKeyName from a pyqtObj on selected RenderSet'''
 	def SetRenderSetValue(self, dictKeyName, pyqtObj):
-		if self.renderSetsListWidget.currentItem():
-			setName = self.renderSetsListWidget.currentItem().text()
+		setName = self.ReturnCurrentRenderSet()
 
-			self.renderSetsDict[setName][dictKeyName] = pyqtObj
+		if setName:
+			if self.renderSetsDict[setName].get(dictKeyName) == pyqtObj:
+				return
 
-			cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-			self.GetRenderSets()
+			self.renderSetsDict[setName][dictKeyName] = pyqtObj
+			# the widget already shows the value, wait for the slider/typing to settle before writing
+			self.CommitRenderSets(REFRESH_NONE, debounce=True)
 
 
 	'''Set the resolution value for the selected RenderSet'''
@@ -1258,108 +1685,99 @@ class LightBakingTool(QDialog):
 		self.SetRenderSetValue('layoutUVs', self.autoLayoutLightmapUVs.isChecked())
 
 
-	'''toggle the RenderMe Check Box for Render sets'''
-	def SetRenderMe(self):
-		for index in range(self.renderSetsListWidget.count()):
-			if self.renderSetsListWidget.item(index).text() in self.renderSetsDict:
-				if self.renderSetsListWidget.item(index).checkState() == Qt.Checked:
-					self.renderSetsDict[self.renderSetsListWidget.item(index).text()]['renderMe'] = True
-				else:
-					self.renderSetsDict[self.renderSetsListWidget.item(index).text()]['renderMe'] = False
+	'''Set and remember how EXRs are converted to TIFs after an Arnold bake'''
+	def SetExrConversionBackend(self):
+		self.exrConversionBackend = str(self.exrBackendComboBox.currentText())
+		cmds.optionVar(sv=(EXR_BACKEND_OPTIONVAR, self.exrConversionBackend))
+
+
+	'''Set and remember the bake cache folder and size'''
+	def SetBakeCacheSettings(self):
+		self.bakeCacheFolder = self.bakeCacheLineEdit.text().strip()
+		self.bakeCacheGB = self.bakeCacheSizeSpinBox.value()
+		cmds.optionVar(sv=(BAKE_CACHE_OPTIONVAR, self.bakeCacheFolder))
+		cmds.optionVar(iv=(BAKE_CACHE_SIZE_OPTIONVAR, self.bakeCacheGB))
+
 
-				cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
+	'''Set and remember the target texel density and memory budget of Auto Set Resolution'''
+	def SetAutoResolutionSettings(self):
+		self.texelsPerUnit = self.texelDensitySpinBox.value()
+		self.lightmapBudgetMB = self.lightmapBudgetSpinBox.value()
+		cmds.optionVar(fv=(TEXEL_DENSITY_OPTIONVAR, self.texelsPerUnit))
+		cmds.optionVar(iv=(LIGHTMAP_BUDGET_OPTIONVAR, self.lightmapBudgetMB))
+
+
+	'''Show the post bake image processing progress, the bake blocks the UI so process events here.'''
+	def UpdateBakeProgress(self, done, total, text):
+		self.bakeProgressBar.show()
+		self.bakeProgressBar.setMaximum(total)
+		self.bakeProgressBar.setValue(done)
+		self.bakeProgressBar.setFormat('{} - %v / %m Images Processed'.format(text))
+		QApplication.processEvents()
 
 
 	'''toggle the RenderMe Check Box for Render sets'''
 	def ToggleAllRenderMe(self):
-		if self.renderSetsListWidget.count() == 0:
-			return
-		state = True
+		renderSets = self.renderSetsModel.Names()
 
-		if self.renderSetsListWidget.item(0).checkState() == Qt.Checked:
-			state = False
-
-		for index in range(self.renderSetsListWidget.count()):
-			if self.renderSetsListWidget.item(index).text() in self.renderSetsDict:
-				self.renderSetsDict[self.renderSetsListWidget.item(index).text()]['renderMe'] = state
+		if not renderSets:
+			return
+		state = not self.renderSetsModel.IsRenderMe(renderSets[0])
 
-				cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
+		for setName in renderSets:
+			if setName in self.renderSetsDict:
+				self.renderSetsDict[setName]['renderMe'] = state
+				self.renderSetsModel.SetRenderMe(setName, state)
 
-		self.GetRenderSets(False)
+		self.CommitRenderSets(REFRESH_NONE)
 
 
 	'''
 	Validate that the current objects and renderLayers still exisit in the Scene.
+	The scene is gathered once with bulk ls calls, see LightBakingData.ValidateRenderSets.
+	validationResults = results worked out already, by the startup job.
 	'''
-	def ValidateRenderSets(self):
+	def ValidateRenderSets(self, validationResults=None):
 		ValPass = True
 
 		if self.CheckIfRenderSetsExist():
 			# get the library info
-			notesAttr = cmds.getAttr(self.renderSetsName + '.notes')
+			renderSets = self.ReturnRenderSets()
 
-			renderSets = eval(notesAttr)
-
-			invalidObjects = {}
 			invalidObjectsList = []
-			invalidObjectsString = ''
-			dialogPromptMessage = ''
 			fixMeMessage = 'Would you like to remove these from there corresponding Render Sets?\nYou CAN NOT bake until this is fixed!!!!'
 
 			if renderSets:
-				for renderSet in renderSets:
-					for key in ['objects', 'renderLayers']:
-						if key in self.renderSetsDict[renderSet] and self.renderSetsDict[renderSet][key]:
-							for obj in self.renderSetsDict[renderSet][key]:
-								invalid = False
-
-								if not cmds.objExists(obj):
-									invalid = True
-								elif key == 'objects' and not cmds.listRelatives(obj, ad=True, f=True, ni=True, type='mesh'):
-									invalid = True
-
-								if invalid:
-									if not renderSet in invalidObjects:
-										addRenderSetKey = {renderSet:{}}
-										invalidObjects.update(addRenderSetKey)
-
-									if not key in invalidObjects[renderSet]:
-										invalidObjects[renderSet].setdefault(key,[])
+				if validationResults is None:
+					validationResults = LightBakingData.ValidateRenderSets(renderSets)
 
-									invalidObjects[renderSet][key].append(obj)
+				# Render Sets deleted since the results were worked out are left out
+				self.validationResults = [x for x in validationResults if x['renderSet'] in self.renderSetsDict]
+				self.UpdateValidationViews()
+				invalidResults = [x for x in self.validationResults if not x['valid']]
 
-				if invalidObjects:
-					for renderSet in invalidObjects:
-						invalidObjectsString = renderSet + ' : '
+				for result in invalidResults:
+					invalidObjectsString = result['renderSet'] + ' : '
 
-						for key in ['objects', 'renderLayers']:
-							if key in invalidObjects[renderSet]:
-								invalidObjectsString += key + ' --> \n'
-								listCount = len(invalidObjects[renderSet][key])
+					for key in LightBakingData.VALIDATE_KEYS:
+						if result[key]:
+							invalidObjectsString += key + ' --> \n' + '\n'.join(result[key])
 
-								for i in range(len(invalidObjects[renderSet][key])):
-									divider = '\n'
+					invalidObjectsList.append(invalidObjectsString)
 
-									if i == (len(invalidObjects[renderSet][key]) - 1):
-										divider = ''
-
-									invalidObjectsString += invalidObjects[renderSet][key][i] + divider
-
-						invalidObjectsList.append(invalidObjectsString)
-
-				if invalidObjects:
+				if invalidResults:
 					dialogResult = cmds.layoutDialog(ui=lambda *args: SharedUtils.UniversalConfirmDialog(True,
 																		'Invalid Objects found in the following Render Sets:\n{}'.format(fixMeMessage),
 																		invalidObjectsList))
 					if dialogResult == 'CONTINUE':
-						for renderSet in invalidObjects:
-							for key in ['objects', 'renderLayers']:
-								if key in invalidObjects[renderSet]:
-									for obj in invalidObjects[renderSet][key]:
-										self.renderSetsDict[renderSet][key].pop(obj, None)
+						for result in invalidResults:
+							for key in LightBakingData.VALIDATE_KEYS:
+								for obj in result[key]:
+									self.renderSetsDict[result['renderSet']][key].pop(obj, None)
 
-						cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-						self.GetRenderSets()
+							result.update({'valid':True, 'objects':[], 'renderLayers':[], 'problems':{}})
+
+						self.CommitRenderSets(REFRESH_DETAILS)
 
 					else:
 						ValPass = False
@@ -1367,7 +1785,10 @@ class LightBakingTool(QDialog):
 		return ValPass
 
 
-	'''Bake out the light maps for each RenderSet. There will be 1 lightmap per RenderLayers in RenderSet'''
+	'''
+	Bake out the light maps for each RenderSet. There will be 1 lightmap per RenderLayers in RenderSet.
+	The bake itself is done by LightBakingEngine.BakeEngine, with the options from the UI.
+	'''
 	def BakeRenderLayers(self):
 		continueWithBake = cmds.confirmDialog(title='Confirm Bake!', message='Are you sure You want to continue with Bake?', button=['Yes','No'], defaultButton='Yes', cancelButton='No', dismissString='No')
 
@@ -1375,411 +1796,138 @@ class LightBakingTool(QDialog):
 			cmds.warning('Bake Canceled!')
 			return
 
-		if self.useMentalRay:
-			# Check is the initBakeSets exsist yet, if not, create them.
-			if not cmds.objExists('initialTextureBakeSet'):
-				mel.eval('createBakeSet("initialTextureBakeSet", "textureBakeSet");')
-			if not cmds.objExists('initialVertexBakeSet'):
-				mel.eval('createBakeSet("initialVertexBakeSet", "textureBakeSet");')
+		# write any edits still waiting on the debounce timer
+		self.FlushRenderSets(False)
+		# validated and uvSets set below
+		self.StopStartupJob()
 
-		if self.CheckIfRenderSetsExist():
-			validationPass = self.ValidateRenderSets()
-
-			if not validationPass:
-				cmds.warning('Bake Canceled, did not pass Validation. :(')
-				return
-			# gather all light transforms
-			lightShapes = cmds.ls(type='light')
-			lights = cmds.listRelatives(lightShapes, type='transform', p=True)
-
-			self.SetAllMeshUvSets()
-			# get the library info
-			notesAttr = cmds.getAttr(self.renderSetsName + '.notes')
-			# get current RenderLayer
-			currentRenderLayer = cmds.editRenderLayerGlobals(query=True, currentRenderLayer=True)
-			# hook up lightmap textures dict.
-			hookUpLMTexturesDict = {}
-			# Failed lightmap List #
-			failedLightMap = []
-
-			renderSets = eval(notesAttr)
-
-			if renderSets:
-				# create textures/LM folder structure if needed
-				fileLoc = cmds.file(q=True, sn=True)
-				currentFolder = os.path.dirname(fileLoc)
-				textureFolder = os.path.dirname(currentFolder) + '/textures'
-				# create textures folder
-				SharedUtils.CreateDir(textureFolder)
-
-				for renderSet in renderSets:
-					self.currentRenderset = renderSet
-					renLayersReturn = 'dismiss'
-					if self.renderSetsDict[renderSet]['renderMe']:
-						if 'renderLayers' in self.renderSetsDict[renderSet] and self.renderSetsDict[renderSet]['renderLayers']:
-							if 'objects' in self.renderSetsDict[renderSet] and self.renderSetsDict[renderSet]['objects']:
-								renLayersReturn = str(list(self.renderSetsDict[renderSet]['renderLayers'].keys()))
-
-								if self.doItAllCheckbox.isChecked() == False:
-									renLayersReturn = cmds.layoutDialog(ui=self.SetRenderLayerConfirmDialog)
-
-								allRenLayers = list(self.renderSetsDict[renderSet]['renderLayers'].keys())
-
-								if renLayersReturn == 'dismiss':
-									self.PrintMessage(renderSet + ' is being skipped!')
-									continue
-
-								# convert to list and remove unicode
-								renLayersReturn = [str(x) for x in ast.literal_eval(renLayersReturn)]
-
-								cmds.select(cl=True)
-								# get texture resolution
-								res = int(self.resComboBox.itemText(self.renderSetsDict[renderSet]['resolution']))
-								padding = self.renderSetsDict[renderSet]['fillTextureSeams']
-
-								if self.useMentalRay:
-									# create temp bake set
-									tmpBakeSet = mel.eval('createBakeSet("' + renderSet + 'TexturesBakeSet", "textureBakeSet");')
-									# add objects to temp bake set.
-									for mesh in self.renderSetsDict[renderSet]['objects']:
-										mel.eval('assignBakeSet("' + tmpBakeSet + '", "' + mesh + '");')
-
-									# set texture res of temp bake set
-									cmds.setAttr(tmpBakeSet + '.xResolution', res)
-									cmds.setAttr(tmpBakeSet + '.yResolution', res)
-									# set Color Mode of bake set
-									cmds.setAttr(tmpBakeSet + '.colorMode', self.renderSetsDict[renderSet]['colorMode'])
-									# set Fill Texture Seams value for bake set
-									cmds.setAttr(tmpBakeSet + '.fillTextureSeams', padding)
-									# set To TIFF defaultFileSaveType
-									cmds.setAttr(tmpBakeSet + '.fileFormat', 6)
-									# make sure there is only one map
-									cmds.setAttr(tmpBakeSet + '.bakeToOneMap', 1)
-
-								imageFileInfo = []
-								tifFileList = []
-								layerIndex = 0
-
-								for renLayer in renLayersReturn:
-									setLayerString = '{}_{}'.format(renderSet, renLayer)
-									lightMapName = self.renderSetsDict[renderSet]['lightMapPrefix'] + '_' + setLayerString + '_LM'
-									cmds.editRenderLayerGlobals(currentRenderLayer=renLayer)
-									setMembers = cmds.editRenderLayerMembers(renLayer, query=True)
-
-									if setMembers is None:
-										setMembers = []
-
-									objsToAdd = []
-									# add object to render layer if needed
-									for obj in self.renderSetsDict[renderSet]['objects']:
-										if obj not in setMembers:
-											objsToAdd.append(obj)
-											print('>-----=====| ' + obj + ' added to RenderLayer ' + renLayer + ' |=====-----<')
-
-									if objsToAdd:
-										if self.useMentalRay:
-											cmds.editRenderLayerMembers(renLayer, objsToAdd, nr=True)
-										else:
-											#self.AddObjectToCollection(renLayer, MISSING_OBJ_COL, objsToAdd)
-											cmds.editRenderLayerMembers(renLayer, objsToAdd, nr=True)
-
-									ext = '.tif'
-
-									if self.useMentalRay:
-										# Select the temp bake set
-										cmds.setAttr(tmpBakeSet + '.prefix', lightMapName, type='string')
-										cmds.select(tmpBakeSet)
-										# do some sweet magic
-										cmds.convertLightmapSetup(camera='persp', sh=True, keepOrgSG=True, showcpv=True, prj=textureFolder)
-									else:
-										# Add ShaderOverride to Collections if needed.
-										self.AddShaderOverridesIfNeeded()
-										#ext = '.exr'
-										meshes = list(self.renderSetsDict[renderSet]['objects'].keys())
-										exrPath = textureFolder + '/lightMap'
-										uvSet = self.ReturnCommonUvSet(renderSet)
-										SharedUtils.CreateDir(exrPath)
-										layoutUVs = False
-										# gather all light transforms
-										allLights = cmds.ls(lights=True, long=True)
-										allLightTransforms = list(set(cmds.listRelatives(allLights, parent=True, fullPath=True) if allLights else []))
-										allNodes = cmds.ls(long=True)
-										arnoldLightTypes = ['aiAreaLight', 'aiSkyDomeLight', 'aiMeshLight', 'aiPhotometricLight', 'aiLightPortal']
-										arnoldLights = [node for node in allNodes for lightType in arnoldLightTypes if lightType in cmds.nodeType(node)]
-										arnoldLightTransforms = cmds.listRelatives(arnoldLights, parent=True, fullPath=True) if arnoldLights else []
-										lights = list(set(allLightTransforms + arnoldLightTransforms))
-
-										if 'layoutUVs' in self.renderSetsDict[renderSet]:
-											layoutUVs = self.renderSetsDict[renderSet]['layoutUVs']
-										lightMapName = self.ArnoldLightmapBake(meshes,
-																			   res,
-																			   padding,
-																			   lightMapName,
-																			   renLayer,
-																			   exrPath,
-																			   uvSet,
-																			   lights,
-																			   layoutUVs)
-
-									fileName = '{}/lightMap/{}{}'.format(textureFolder, lightMapName, ext)
-
-									if not os.path.isfile(fileName):
-										self.PrintMessage('{} has been Skipped, {}{} could not be created!'.format(setLayerString,
-																													lightMapName,
-																													ext))
-										failedLightMap.append('{}_{} ---> {}{}'.format(renderSet, renLayer, lightMapName, ext))
-										continue
-
-									tifFileList.append(os.path.abspath(fileName))
-									self.PrintMessage(setLayerString + ' has been baked and saved to: ' + fileName)
-
-									imageFileInfo.append([fileName, renLayer, layerIndex])
-									layerIndex += 1
-
-								if self.useMentalRay:
-									# delete the bakeSet
-									cmds.delete(tmpBakeSet)
-
-								psdLoc = textureFolder + '/lightMap/' + renderSet + '.psd'
-								psdPathExists = False
-
-								if not tifFileList:
-									self.PrintMessage(renderSet + '.psd creation has been skipped, no tif files created to use!!!')
-									continue
-
-								if os.path.exists(psdLoc):
-									psdPathExists = True
-
-								# create PSD
-								if self.createPSDtCheckbox.isChecked():
-									if self.doItAllCheckbox.isChecked() == False:
-										if len(renLayersReturn) != len(allRenLayers):
-											self.PrintMessage(renderSet + '.psd creation has been skipped, must have all RenderLayers selected to create!!!')
-											continue
-
-										if psdPathExists:
-											self.PrintMessage('=== Overwriting PSD===')
-											#continuePSDCreation = cmds.confirmDialog(title='Continue with PSD Creation', message= renderSet + '.psd already exisit, are you sure you want to overwrite it?', button=['Yes','No'], defaultButton='Yes', cancelButton='No', dismissString='No')
-											#if continuePSDCreation == 'No':
-											#	self.PrintMessage(renderSet + '.psd creation has been skipped!!!')
-											#	continue
-
-									# Reverse it so the Psd layers are the correct order
-									#imageFileInfo.reverse()
-									maxIndex = max(sublist[2] for sublist in imageFileInfo)
-									for sublist in imageFileInfo:
-										sublist[2] = maxIndex - sublist[2]
-
-									# Close and delete the existing psd to allow for canvas size override
-									try:
-										print ("Linking to Photoshop instance")
-										psApp = comtypes.client.GetActiveObject('Photoshop.Application', dynamic=True)
-									except Exception as e:
-										print ("Creating Photoshop instance")
-										psApp = comtypes.client.CreateObject('Photoshop.Application', dynamic=True)
-										psApp.Visible = True
-									if psApp:
-										document_count = psApp.Documents.Count
-										for i in range(document_count):
-											doc = psApp.Documents[i+1]
-											try:
-												normalizedDocPath = os.path.normpath(doc.FullName).lower()
-												normalizedPsdPath = os.path.normpath(psdLoc).lower()
-											except Exception as e:
-												print(f"Skipped doc {doc.Name}: {e}")
-												continue
-											if normalizedDocPath == normalizedPsdPath:
-												try:
-													doc.Close(2)
-													if os.path.exists(psdLoc):
-														os.remove(psdLoc)
-												except Exception as e:
-													pass
-												break
-									else:
-										pass
-
-									# Add TIFFs to PSD
-									cmds.psdTextureFile(xr=res, yr=res, ifn=(imageFileInfo), psf=psdLoc)
-	
-									self.PrintMessage('A PSD has been created and saved to: ' + psdLoc)
-									
-									psdPathExists = True
-
-									# Make adjustments to PSD
-									self.ProcessPSDFile(os.path.normpath(psdLoc), OrderedDict([(str(k), v) for k, v in list(self.renderSetsDict[renderSet]['renderLayers'].items())]), tifFileList,)
-
-								# Create PNG from PSD
-								if self.combineImgCheckbox.isChecked():
-									if not psdPathExists:
-										self.PrintMessage(renderSet + '.psd does not exsist, Skipping PNG Creation!!!')
-										continue
-
-									# create LM folder if needed
-									if not os.path.exists(textureFolder + '/LM'):
-										os.makedirs(textureFolder + '/LM')
-
-									prefix = ''
-									suffix = ''
-
-									if self.combineImgPrefixLineEdit.text():
-										prefix = self.combineImgPrefixLineEdit.text() + '_'
-									if self.combineImgSuffixLineEdit.text():
-										suffix = '_' + self.combineImgSuffixLineEdit.text()
-
-									pngName = prefix + renderSet + suffix
-									pngLoc = textureFolder + '/LM/' + pngName + '.png'
-									
-									cmds.psdExport(ifn=psdLoc, ofn=pngLoc, format='png')
-									self.PrintMessage(pngLoc + ' has been created or updated!!!')
-
-									if self.hookUpLMTexturesCheckbox.isChecked():
-										hookUpLMTexturesDict.update({renderSet:{}})
-
-										for mesh in self.renderSetsDict[renderSet]['objects']:
-											hookUpLMTexturesDict[renderSet].setdefault(mesh, pngLoc)
-
-								if self.createUvSnapshotsCheckbox.isChecked():
-									uvSnapShotsFolder = textureFolder + '/uvSnapshots'
-									uvSnapshotName = uvSnapShotsFolder + '/' + renderSet + '_uvSnap' + '.png'
-
-									# create uvSnapshots folder if needed
-									if not os.path.exists(uvSnapShotsFolder):
-										os.makedirs(uvSnapShotsFolder)
-
-									cmds.select(cl=True)
-									cmds.select(list(self.renderSetsDict[renderSet]['objects'].keys()))
-									print('------------=======<<<<<<< uvSnapshot render >>>>>>>=======------------')
-									cmds.uvSnapshot(n=uvSnapshotName, aa=True, xr=res, yr=res, o=True, ff='png')
-									print('------------=======<<<<<<< uvSnapshot render >>>>>>>=======------------\n')
-									cmds.select(cl=True)
-
-							else:
-								self.PrintMessage(renderSet + ' is being skipped due to NO Objects loaded!')
-						else:
-							self.PrintMessage(renderSet + ' is being skipped due to NO Renderlayers being loaded!')
-
-			# set back to the current render layer
-			cmds.editRenderLayerGlobals(currentRenderLayer=currentRenderLayer)
-
-			if hookUpLMTexturesDict:
-				cmds.editRenderLayerGlobals(currentRenderLayer='defaultRenderLayer')
-				# Enable EuseLightmap if needed.
-				self.EnableUseLightmap(hookUpLMTexturesDict)
-				# Because we need to give the enabled settings a moment to register. #
-				cmds.pause(sec=5)
-				# Hook up the lightmap png files back to the materials.
-				self.HookUpLightMaps(hookUpLMTexturesDict)
-
-			self.PrintMessage('            --== BAKE COMPLETE, PLEASE LOOK ABOVE FOR DETAILS! ==--')
-
-			if failedLightMap:
-				cmds.layoutDialog(ui=lambda *args: SharedUtils.UniversalConfirmDialog(False,
-																	'The following lightmaps failed:',
-																	failedLightMap))
-
-
-	'''
-	Seems to work better if this is its own function.
-	Note: Not combined with HookUpLightMaps for a reason.
-	'''
-	def EnableUseLightmap(self, dict={}):
-		if dict == {}:
-			print('<<<<<<<< Materials Dict is Empty, no Light Maps to hook up!>>>>>>>>')
+		if not self.CheckIfRenderSetsExist():
 			return
-		print('\n||||||||>>>>>>>> Start Enable UseLightmap <<<<<<<<||||||||\n')
-		for key in dict:
-			for mesh in dict[key]:
-				shapeNode = SharedUtils.GetShape(mesh)
-
-				if shapeNode == False:
-					print('<<<<<< WARNING - No shapeNode found, skipping ' +  mesh + ' >>>>>>')
-					continue
 
-				if type(shapeNode) is list:
-					shapeNode = [x for x in shapeNode if not x.rstrip(string.digits).endswith("Orig")]
+		# the engine adds its spans to this one, so the profile covers validation and the uvSets as well
+		profiler = LightBakingProfile.Profiler()
 
-					if len(shapeNode) == 1:
-						shapeNode = shapeNode[0]
-					else:
-						print('<<<<<< WARNING - No shapeNode or more than one found, skipping ' +  mesh + ' >>>>>>')
-						continue
-
-				shadeEng = cmds.listConnections(shapeNode, type='shadingEngine')
-				materials = cmds.ls(cmds.listConnections(list(set(shadeEng))), materials=True)
-
-				if not materials:
-					print('<<<<<< WARNING - No Materials found, skipping ' +  mesh + ' >>>>>>')
-					continue
+		with profiler.Span('validation'):
+			validationPass = self.ValidateRenderSets()
 
-				for material in materials:
-					if key.lower().endswith('_locked'):
-						self.EnableShaderFxSettings(material, ['UseLightmap', 'UseLockedLightmap'])
-					else:
-						self.EnableShaderFxSettings(material, ['UseLightmap'])
+		if not validationPass:
+			cmds.warning('Bake Canceled, did not pass Validation. :(')
+			return
 
-		print('\n||||||||>>>>>>>> End Enable UseLightmap  <<<<<<<<||||||||\n')
+		with profiler.Span('setUvSets'):
+			self.SetAllMeshUvSets()
 
+		options = self.ReturnBakeOptions()
+		options.profiler = profiler
+		failedLightMap = []
 
-	'''Hook the light maps up to there respective material.'''
-	def HookUpLightMaps(self, dict={}):
-		if dict == {}:
-			print('<<<<<<<< Materials Dict is Empty, no Light Maps to hook up!>>>>>>>>')
-			return
-		print('\n||||||||>>>>>>>> Start LM Hookup <<<<<<<<||||||||\n')
-		for key in dict:
-			for mesh in dict[key]:
-				shapeNode = SharedUtils.GetShape(mesh)
+		if self.farmWorkersSpinBox.value() and not self.useMentalRay:
+			with profiler.Span('farmBake'):
+				farmReport = self.FarmBake(options)
 
-				if shapeNode == False:
-					print('<<<<<< WARNING - No shapeNode found, skipping ' +  mesh + ' >>>>>>')
-					continue
+			if farmReport is None:
+				return
 
-				if type(shapeNode) is list:
-					shapeNode = [x for x in shapeNode if not x.rstrip(string.digits).endswith("Orig")]
+			failedLightMap += farmReport['failed']
+			# the workers' lightmaps are all in the manifest, so this only makes the PNGs and hooks them up
+			options.onlyBakeChanges = True
+			options.batchBake = False
 
-					if len(shapeNode) == 1:
-						shapeNode = shapeNode[0]
-					else:
-						print('<<<<<< WARNING - No shapeNode or more than one found, skipping ' +  mesh + ' >>>>>>')
-						continue
+		engine = LightBakingEngine.BakeEngine(self.renderSetsDict, options, lightIndex=self.lightIndex)
 
-				shadeEng = cmds.listConnections(shapeNode, type='shadingEngine')
-				materials = cmds.ls(cmds.listConnections(list(set(shadeEng))), materials=True)
+		# the bake creates, renames and deletes a lot of nodes of its own
+		self.sceneWatcher.Unwatch()
 
-				if not materials:
-					print('<<<<<< WARNING - No Materials found, skipping ' +  mesh + ' >>>>>>')
-					continue
+		try:
+			report = engine.Run()
+		finally:
+			self.bakeProgressBar.hide()
+			self.sceneWatcher.Watch()
 
-				for material in materials:
-					if key.lower().endswith('_locked'):
-						if cmds.attributeQuery('LockLM', node=material, exists=True):
-							cmds.setAttr((material + '.LockLM'), dict[key][mesh], type='string')
-							print('<<<<<<<< ' + material + '.LockLM :: ' + dict[key][mesh] + ' >>>>>>>>')
-					else:
-						for attr in ['LightmapMap', 'Lightmap']:
-							if cmds.attributeQuery(attr, node=material, exists=True):
-								cmds.setAttr((material + '.' + attr), dict[key][mesh], type='string')
-								print('<<<<<<<< ' + (material + '.' + attr) + ' :: ' + dict[key][mesh] + ' >>>>>>>>')
+		failedLightMap += report['failed']
 
-		print('\n||||||||>>>>>>>> End LM Hookup <<<<<<<<||||||||\n')
+		# keep the atlas slots, so the next bake puts the Render Sets back on the same pages
+		if report.get('atlasChanged'):
+			self.CommitRenderSets(REFRESH_NONE, False)
 
+		if failedLightMap:
+			cmds.layoutDialog(ui=lambda *args: SharedUtils.UniversalConfirmDialog(False,
+																'The following lightmaps failed:',
+																failedLightMap))
 
-	''' Set ShaderFx Setting bool to True. '''
-	def EnableShaderFxSettings(self, material, settings=[]):
-		if not settings:
-			return
 
-		for setting in settings:
-			try:
-				temp = cmds.shaderfx(sfxnode=material, getNodeIDByName=setting)
-				isEnabled = cmds.shaderfx(sfxnode=material, getPropertyValue=(int(temp), 'value'))
+	'''
+	Bake the Render Sets with LightBakingFarm workers, each on a copy of the saved scene.
+	Returns the farm report, None if the bake was canceled.
+	'''
+	def FarmBake(self, options):
+		if options.askRenderLayers:
+			cmds.warning('Farm Workers needs Just do it all! checked, baking in this Maya instead.')
+			return {'failed':[]}
+
+		sceneName = cmds.file(q=True, sn=True)
+
+		if not sceneName or cmds.file(q=True, modified=True):
+			saveScene = cmds.confirmDialog(title='Save Scene?', message='The farm workers bake a copy of the saved scene, save it now?', button=['Save','Cancel'], defaultButton='Save', cancelButton='Cancel', dismissString='Cancel')
+
+			if saveScene == 'Cancel' or not sceneName:
+				cmds.warning('Bake Canceled, the scene needs saving for the farm workers!')
+				return None
+
+			cmds.file(save=True)
+
+		# triangle and light counts for the cost model, the workers are packed longest predicted bake first
+		engine = LightBakingEngine.BakeEngine(self.renderSetsDict, options, lightIndex=self.lightIndex)
+		farm = LightBakingFarm.FarmCoordinator(sceneName,
+											   self.renderSetsDict,
+											   options,
+											   self.farmWorkersSpinBox.value(),
+											   progressCallback=self.UpdateBakeProgress,
+											   triangles=dict((x, engine.ReturnTriangles(x)) for x in engine.ReturnRenderSetsToBake()),
+											   lights=len(self.lightIndex.Lights()),
+											   costModel=engine.ReturnCostModel(engine.ReturnTextureFolder()))
+
+		try:
+			return farm.Run()
+		finally:
+			farm.Cleanup()
+
+
+	'''Return the LightBakingEngine.BakeOptions for the current UI settings.'''
+	def ReturnBakeOptions(self):
+		askRenderLayers = None
+
+		if not self.doItAllCheckbox.isChecked():
+			askRenderLayers = self.AskRenderLayers
+
+		return LightBakingEngine.BakeOptions(useMentalRay=self.useMentalRay,
+											 createPsd=self.createPSDtCheckbox.isChecked(),
+											 combineImages=self.combineImgCheckbox.isChecked(),
+											 pngPrefix=self.combineImgPrefixLineEdit.text(),
+											 pngSuffix=self.combineImgSuffixLineEdit.text(),
+											 hookUpLightMaps=self.hookUpLMTexturesCheckbox.isChecked(),
+											 createUvSnapshots=self.createUvSnapshotsCheckbox.isChecked(),
+											 parallelPostBake=self.parallelPostBakeCheckbox.isChecked(),
+											 onlyBakeChanges=self.onlyBakeChangesCheckbox.isChecked(),
+											 batchBake=self.batchBakeCheckbox.isChecked(),
+											 atlas=self.atlasCheckbox.isChecked() and not self.useMentalRay,
+											 bakeCacheFolder=self.bakeCacheFolder,
+											 bakeCacheMaxBytes=self.bakeCacheGB * 1073741824,
+											 exrBackend=self.exrConversionBackend,
+											 askRenderLayers=askRenderLayers,
+											 progressCallback=self.UpdateBakeProgress)
+
+
+	'''Ask which RenderLayers of renderSet to bake, None if the Render Set is skipped.'''
+	def AskRenderLayers(self, renderSet):
+		self.currentRenderset = renderSet
+		renLayersReturn = cmds.layoutDialog(ui=self.SetRenderLayerConfirmDialog)
+
+		if renLayersReturn == 'dismiss':
+			return None
 
-				if not isEnabled:
-					cmds.shaderfx(sfxnode=material, edit_bool=(int(temp), 'value', True))
-					print('<<<<<<<< ' + material + '.' + setting + ' :: True >>>>>>>>')
-			except:
-				return
+		# convert to list and remove unicode
+		return [str(x) for x in ast.literal_eval(renLayersReturn) or []]
 
 
 	'''Instal comtypes to tools/Python2 in needed.'''
@@ -1833,14 +1981,16 @@ class LightBakingTool(QDialog):
 		if autoPopulateDict == None:
 			return
 
-		for key in autoPopulateDict:
-			self.CreateNewRenderSet(True, ['Continue', key], True)
+		# one write and one UI rebuild for everything
+		with self.RenderSetsEdit():
+			for key in autoPopulateDict:
+				self.CreateNewRenderSet(True, ['Continue', key], True)
 
-		for key in autoPopulateDict:
-			self.AddMeshToRenderSet(True, key, autoPopulateDict[key], True)
+			for key in autoPopulateDict:
+				self.AddMeshToRenderSet(True, key, autoPopulateDict[key], True)
 
-		self.GetRenderSets(True, False)
-		self.AutoSetRenderSetResolution(False)
+			self.AutoSetRenderSetResolution(False)
+			self.CommitRenderSets(REFRESH_ALL, False)
 
 
 	'''
@@ -1911,14 +2061,12 @@ class LightBakingTool(QDialog):
 			cmds.warning('No RenderSets Found!!')
 			return
 
-		selectedRenderSets = self.renderSetsListWidget.selectedItems()
+		selectedRenderSets = self.ReturnSelectedRenderSets()
 
 		if not selectedRenderSets:
 			return
-		selectedRenderSets = [match.text() for match in selectedRenderSets if match.text()]
 
-		dictInfo = cmds.getAttr(self.renderSetsName + '.notes')
-		renderSets = eval(dictInfo)
+		renderSets = self.ReturnRenderSets()
 
 		for renderSet in renderSets:
 			if not renderSet in selectedRenderSets:
@@ -1927,11 +2075,14 @@ class LightBakingTool(QDialog):
 			self.renderSetsDict[renderSet]['layoutUVs'] = enable
 			print('{} -- Auto Layout UVs set to {}'.format(renderSet, enable))
 
-		cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-		self.GetRenderSets(True, True)
+		self.CommitRenderSets(REFRESH_SETTINGS)
 
 
-	'''Auto set texture resolution based on objects in Render Set.'''
+	'''
+	Auto set texture resolution based on objects in Render Set.
+	Picks the resolution closest to the target texels per unit from the world and UV area of the set's meshes,
+	with the memory budget shared by all Render Sets, see LightBakingTexelDensity.
+	'''
 	def AutoSetRenderSetResolution(self, selected=True):
 		if not self.CheckIfRenderSetsExist():
 			cmds.warning('No RenderSets Found!!')
@@ -1940,11 +2091,10 @@ class LightBakingTool(QDialog):
 		selectedRenderSets = []
 
 		if selected:
-			selectedRenderSets = self.renderSetsListWidget.selectedItems()
-			selectedRenderSets = [match.text() for match in selectedRenderSets if match.text()]
+			selectedRenderSets = self.ReturnSelectedRenderSets()
 
-		dictInfo = cmds.getAttr(self.renderSetsName + '.notes')
-		renderSets = eval(dictInfo)
+		renderSets = self.ReturnRenderSets()
+		toPlan = []
 
 		for renderSet in renderSets:
 			objects = self.renderSetsDict[renderSet]['objects']
@@ -1955,30 +2105,26 @@ class LightBakingTool(QDialog):
 			if selected and not renderSet in selectedRenderSets:
 				continue
 
-			size = 0
-			for obj in objects:
-				bbox = cmds.exactWorldBoundingBox(obj)
-				size += (bbox[3]-bbox[0] + bbox[4]-bbox[1]  + bbox[5]-bbox[2]) / 3
-
-			resolution = 0
-			resString = '64'
-			if size > 1500:
-				resolution = 4
-				resString = '1024'
-			elif size > 700:
-				resolution = 3
-				resString = '512'
-			elif size > 300:
-				resolution = 2
-				resString = '256'
-			elif size > 80:
-				resolution = 1
-				resString = '128'
-			self.renderSetsDict[renderSet]['resolution'] = resolution
-			print('{} -- Resolution set to {}'.format(renderSet, resString))
-
-		cmds.setAttr(self.renderSetsName + '.notes', self.renderSetsDict, type='string')
-		self.GetRenderSets(True, selected)
+			toPlan.append(renderSet)
+
+		resolutions = LightBakingEngine.RESOLUTIONS
+		setAreas = LightBakingTexelDensity.ReturnRenderSetAreas(self.renderSetsDict, toPlan, self.uvSets)
+		# the Render Sets that are not planned keep their resolution, but still count against the budget
+		fixedBytes = sum(resolutions[self.renderSetsDict[x]['resolution']] ** 2 * LightBakingTexelDensity.BYTES_PER_TEXEL
+						 for x in renderSets if x not in setAreas)
+		memoryBudget = self.lightmapBudgetMB * 1048576 or None
+		plan, total = LightBakingTexelDensity.PlanResolutions(setAreas, resolutions, self.texelsPerUnit, memoryBudget, fixedBytes)
+
+		for renderSet in toPlan:
+			self.renderSetsDict[renderSet]['resolution'] = plan[renderSet]['resolution']
+			print('{} -- Resolution set to {}'.format(renderSet, plan[renderSet]['pixels']))
+
+		LightBakingTexelDensity.PrintDensityReport(plan, self.texelsPerUnit, total, memoryBudget)
+
+		if memoryBudget and total > memoryBudget:
+			cmds.warning('Lightmaps are {:.1f}MB even at the smallest resolutions, over the {}MB budget.'.format(total / 1048576.0, self.lightmapBudgetMB))
+
+		self.CommitRenderSets(REFRESH_SETTINGS, selected)
 
 
 	'''Add object to missing objs collection'''
@@ -1987,7 +2133,7 @@ class LightBakingTool(QDialog):
 			return
 
 		layerName = self.UpdateRenderlayerName(layerName)
-		renderLayer = renderSetup.instance().getRenderLayer(layerName)
+		renderLayer = ReturnRenderSetupModule('renderSetup').instance().getRenderLayer(layerName)
 		collectionNames = self.RetrunCollectionNames(layerName)
 
 		exists = [x for x in collectionNames if x.startswith(colName)]
@@ -2003,7 +2149,7 @@ class LightBakingTool(QDialog):
 	'''Return the desired RenderLayer Connection by name'''
 	def RetrunCollectionNames(self, layerName):
 		layerName = self.UpdateRenderlayerName(layerName)
-		renderLayer = renderSetup.instance().getRenderLayer(layerName)
+		renderLayer = ReturnRenderSetupModule('renderSetup').instance().getRenderLayer(layerName)
 
 		collections = renderLayer.getCollections()
 		collectionNames = []
@@ -2016,26 +2162,23 @@ class LightBakingTool(QDialog):
 
 	'''Make sure RenderLayer Name is not the old system nameing'''
 	def UpdateRenderlayerName(self, layerName):
-		if layerName.startswith('rs_'):
-			layerName = layerName[3:]
-
-		return layerName
+		return LightBakingEngine.ReturnRenderSetupLayerName(layerName)
 
 
 	'''Delete the desired RenderLayer Connection'''
 	def DeleteCollection(self, layerName, colName):
 		layerName = self.UpdateRenderlayerName(layerName)
-		renderLayer = renderSetup.instance().getRenderLayer(layerName)
+		renderLayer = ReturnRenderSetupModule('renderSetup').instance().getRenderLayer(layerName)
 		collectionNames = self.RetrunCollectionNames(layerName)
 
 		if colName in collectionNames:
 			collection = renderLayer.getCollectionByName(colName)
-			collectionTool.delete(collection)
+			ReturnRenderSetupModule('collection').delete(collection)
 
 
 	'''Return all renderlayer names'''
 	def RetrunRenderLayerNames(self):
-		renderLayers = renderSetup.instance().getRenderLayers()
+		renderLayers = ReturnRenderSetupModule('renderSetup').instance().getRenderLayers()
 		layerNames = []
 
 		for layer in renderLayers:
@@ -2044,120 +2187,6 @@ class LightBakingTool(QDialog):
 		return layerNames
 
 
-	'''
-	Add Shader Override collection and Override if needed.
-	'''
-	def AddShaderOverridesIfNeeded(self):
-		rs = renderSetup.instance()
-		layers = rs.getRenderLayers()
-
-		for layer in layers:
-			collections = layer.getCollections()
-
-			for collection in collections:
-				shadingEng = collection.getCollections()
-				createOverrideMat = True
-
-				for shade in shadingEng:
-					type = shade.getSelector().getFilterType()
-
-					if type == 11:
-						createOverrideMat = False
-
-				if not createOverrideMat:
-					continue
-				# Check if set to all #
-				currentType = collection.getSelector().getFilterType()
-				tempTypeChange = False
-				# Set to transform instead #
-				if currentType == 0:
-					collection.getSelector().setFilterType(1)
-					tempTypeChange = True
-				# Create aiLambert_OverrideShader if needed #
-				if not cmds.objExists('aiLambert_OverrideShader'):
-					cmds.createNode('aiLambert', n='aiLambert_OverrideShader')
-
-				shaderOverride = collection.createOverride('aiLambert', 'shaderOverride')
-				overrideName = shaderOverride.name()
-				cmds.connectAttr('aiLambert_OverrideShader.outColor', '{}.attrValue'.format(overrideName), f=True)
-
-				if tempTypeChange:
-					collection.getSelector().setFilterType(currentType)
-
-
-	'''Bake Lightmaps using Arnold'''
-	def ArnoldLightmapBake(self, meshes, resolution, padding, combinedName,renderLayer, dirPath, uvSet, lights, layoutUVs):
-		if not meshes:
-			return
-		# switch to current render layer
-		cmds.editRenderLayerGlobals(currentRenderLayer=renderLayer)
-		# triggered if 'Auto Layout Lightmap UVs' is checked
-		if layoutUVs:
-			for mesh in meshes:
-				uvSets = cmds.polyUVSet(mesh, query=True, allUVSets=True)
-				cmds.polyCopyUV(mesh, uvSetNameInput=uvSets[0], uvSetName=uvSet, ch=True)
-			cmds.polyMultiLayoutUV(meshes, lm=1, sc=1, rbf=1, fr=True, ps=padding, l=2, gu=1, gv=1, psc=0, su=1, ou=0, ov=0)
-		# duplicate objects
-		dups = cmds.duplicate(meshes)
-		# if only one object, name it combined. For multiple objects combine all duplicates
-		if len(dups) == 1:
-			combined = cmds.rename(dups[0], combinedName)
-		else:
-			combined = cmds.polyUnite(dups, ch=True, mergeUVSets=True, centerPivot=True, name=combinedName)[0]
-		# copy UVs from each mesh to the combined mesh
-		for mesh in meshes:
-			cmds.transferAttributes(mesh, combined, transferPositions=False, transferNormals=False, transferUVs=2, sampleSpace=4)
-		# apply uv set
-		cmds.polyUVSet(combined, currentUVSet=True, uvSet=uvSet)
-		# remove combined mesh history
-		cmds.delete(combined, constructionHistory=True)
-		# delete any leftover groups from the original duplicates
-		for dup in dups:
-			try:
-				if cmds.objExists(dup):
-					cmds.delete(dup)
-					parentGroup = cmds.listRelatives(dup, parent=True, fullPath=True)
-					if parentGroup:
-						children = cmds.listRelatives(parentGroup[0], children=True) or []
-						if not children:
-							cmds.delete(parentGroup[0])
-			except:
-				pass
-		# add combined mesh to renderlayer
-		cmds.select(combined, replace=True)
-		cmds.editRenderLayerMembers(renderLayer, combined, noRecurse=True)
-		# select combined geometry
-		cmds.select(combined, replace=True)
-		# render those lightmaps
-		cmds.arnoldRenderToTexture(f=dirPath,uvs=uvSet,r=resolution,ee=True)
-		# convert exr to tif
-		shapeName = cmds.listRelatives(combined, shapes=True)[0]
-		exrFilePath = os.path.join(dirPath, shapeName + ".exr")
-		tifFilePath = os.path.join(dirPath, shapeName + ".tif")
-		# check if a .tif file with the same name already exists and delete it if it does
-		#if os.path.exists(tifFilePath):
-		#	os.remove(tifFilePath)
-		# run the conversion command for EXR to TIF
-		subprocess.run(["magick",exrFilePath,"-define", "tiff:bits-per-sample=32","-compress", "none","-depth", "32",tifFilePath])
-		# remove the exr file
-		os.remove(exrFilePath)
-		# return shape nodes, there should only be one
-		shape = cmds.listRelatives(combined, shapes=True)
-		# get object name from shape node
-		exportName = combined
-		if shape:
-			exportName = shape[0]
-		# remove combined mesh from render layer
-		cmds.editRenderLayerMembers(renderLayer, combined, remove=True)
-		# prep combined mesh for deletion
-		cmds.editRenderLayerGlobals(currentRenderLayer='defaultRenderLayer')
-		cmds.lockNode(combined, lock=False)
-		# delete combined mesh
-		cmds.delete(combined)
-		# clear selection
-		cmds.select(cl=True)
-		return exportName
-
 	'''Test for Cyril, and possible work in progress.'''
 	def ExternalTextureHookup(self):
 		if self.CheckIfRenderSetsExist():
@@ -2166,10 +2195,9 @@ class LightBakingTool(QDialog):
 			if not validationPass:
 				return
 
-			notesAttr = cmds.getAttr(self.renderSetsName + '.notes')
 			# hook up lightmap textures dict.
 			hookUpLMTexturesDict = {}
-			renderSets = eval(notesAttr)
+			renderSets = self.ReturnRenderSets()
 
 			if not renderSets:
 				return
@@ -2184,7 +2212,7 @@ class LightBakingTool(QDialog):
 
 			for renderSet in renderSets:
 				#pngName = prefix + renderSet + suffix
-				pngName = renderSet
+				pngName = (self.renderSetsDict[renderSet].get('atlas') or {}).get('page', renderSet)
 				pngLoc = textureFolder + pngName + '.png'
 
 				if not os.path.exists(pngLoc):
@@ -2197,126 +2225,9 @@ class LightBakingTool(QDialog):
 					hookUpLMTexturesDict[renderSet].setdefault(mesh, pngLoc)
 
 			if hookUpLMTexturesDict:
-				# Enable EuseLightmap if needed. #
-				self.EnableUseLightmap(hookUpLMTexturesDict)
-				# Because we need to give the enabled settings a moment to register. #
-				cmds.pause(sec=5)
-				# Hook up the lightmap png files back to the materials.
-				self.HookUpLightMaps(hookUpLMTexturesDict)
-
-
-	'''
-	Set the PSD File Layer Blend Mode then Save and close if needed.
-	layers = OrderedDict
-	'''
-	def ProcessPSDFile(self, psdFile, layers=OrderedDict(), tifFiles=[]):
-		if layers and psdFile:
-			try:
-				psApp = comtypes.client.GetActiveObject('Photoshop.Application', dynamic=True)
-			except:
-				psApp = comtypes.client.CreateObject('Photoshop.Application', dynamic=True)
-			try:
-				psApp.DisplayDialogs = 3
-			except:
-				pass
-
-			psd = psApp.Open(psdFile)
-			doc = psApp.Application.ActiveDocument
-
-			# Make the document 32-bits/channel
-			s2t = psApp.StringIDToTypeID
-			desc = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
-			desc.putClass(s2t('to'), s2t('RGBColorMode'))
-			desc.putInteger(s2t('depth'), 32)
-			desc.putBoolean(s2t('merge'), False)
-			psApp.ExecuteAction(s2t('convertMode'), desc, 3)
-	
-			maxRetries = 5
-
-			for attempt in range(maxRetries):
-				try:
-					for index, layer in enumerate(doc.Layers):
-						if layer.name in layers:
-							if hasattr(layer, 'layers'):
-								gamma_created = False
-								for subLayer in layer.layers:
-									# Convert the sub-layer to a smart object and link the file
-									psApp.activeDocument.activeLayer = subLayer
-									psApp.ExecuteAction(psApp.StringIDToTypeID('newPlacedLayer'), None, 3)
-									desc3 = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
-									desc3.putPath(psApp.CharIDToTypeID('null'), tifFiles[index])
-									desc3.putInteger(psApp.CharIDToTypeID('PgNm'), 1)
-									psApp.ExecuteAction(psApp.StringIDToTypeID('placedLayerRelinkToFile'), desc3, 3)
-
-									# set layer blend mode
-									if list(layers.items())[index][1] == 0:
-										layer.blendMode = 11
-										self.PrintMessage(layer.name + ' Photoshop blendMode set to Additive.')
-									else:
-										layer.blendMode = 5
-										self.PrintMessage(layer.name + ' Photoshop blendMode set to Multiply.')
-
-									# make sure the active layer is inside this folder
-									if not gamma_created:
-										try:
-											if hasattr(layer, 'Layers') and layer.Layers.Count > 0:
-												psApp.activeDocument.activeLayer = layer.Layers[1]
-											elif hasattr(layer, 'artLayers') and layer.artLayers.Count > 0:
-												psApp.activeDocument.activeLayer = layer.artLayers[1]
-											else:
-												psApp.activeDocument.activeLayer = layer
-										except:
-											psApp.activeDocument.activeLayer = layer
-
-										# add gamma correction
-										try:
-											s2t = psApp.StringIDToTypeID
-											makeDesc = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
-											makeRef  = comtypes.client.CreateObject('Photoshop.ActionReference',  dynamic=True)
-											makeRef.putClass(s2t('adjustmentLayer'))
-											makeDesc.putReference(s2t('null'), makeRef)
-											adjDesc  = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
-											expsDesc = comtypes.client.CreateObject('Photoshop.ActionDescriptor', dynamic=True)
-											expsDesc.putDouble(s2t('exposure'), 0.0)
-											expsDesc.putDouble(s2t('offset'),   0.0)
-											try:
-												expsDesc.putDouble(s2t('gammaCorrection'), 0.4545)
-											except:
-												expsDesc.putDouble(s2t('gamma'), 0.4545)
-											adjDesc.putObject(s2t('type'), s2t('exposure'), expsDesc)
-											makeDesc.putObject(s2t('using'), s2t('adjustmentLayer'), adjDesc)
-											psApp.ExecuteAction(s2t('make'), makeDesc, 3)
-											psApp.ActiveDocument.ActiveLayer.Name = "Gamma Correction"
-											gamma_created = True
-										except Exception as e2:
-											print(f"Could not add Gamma layer for {getattr(layer, 'name', '(unknown)')}: {e2}")
-
-						elif layer.name == 'Background':
-							try:
-								# set Backgroundlayer to black.
-								blackColor = comtypes.client.CreateObject('Photoshop.SolidColor', dynamic=True)
-								blackColor.RGB.Red = 0
-								blackColor.RGB.Green = 0
-								blackColor.RGB.Blue = 0
-								psApp.activeDocument.activeLayer = (psApp.activeDocument.artLayers['Background'])
-								psApp.activeDocument.selection.selectAll()
-								psApp.activeDocument.selection.Fill(blackColor)
-							except:
-								print('>>>> Could not set Background to Black!!! <<<<')
-					break
-				# add in a retry/delay if photoshop is busy
-				except comtypes.COMError as e:
-					if e.hresult == -2147417846 and attempt < maxRetries - 1:
-						print(f"Photoshop is busy, retrying... (Attempt {attempt + 1}/{maxRetries})")
-						time.sleep(2)
-					else:
-						raise
-
-			doc.Save()
-			psd.Close(1)
-			#psApp.Quit()
+				engine = LightBakingEngine.BakeEngine(self.renderSetsDict, lightIndex=self.lightIndex)
+				engine.HookUpPngs(hookUpLMTexturesDict)
 
-			print(('*' * 20) + ' ProcessPSDFile has completed!!! ' + ('*' * 20))
 
 	'''For printing a message with flare....'''
 	def PrintMessage(self, text):
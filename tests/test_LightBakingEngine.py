@@ -0,0 +1,534 @@
+'''
+Tests for the headless bake engine and its mayapy command line, run against FakeMayaCmds instead of maya.cmds.
+The EXR -> TIF conversion is replaced by a small flat TIF per RenderLayer, the PNGs are composited for real.
+'''
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import LightBakingData
+import LightBakingEngine
+import LightBakingImageUtils
+
+'''
+Global variables
+'''
+TIF_SIZE = 8
+
+
+'''
+Stateful stand in for the maya.cmds calls of an Arnold bake.
+meshes = {longName:[points]}, renderLayers = {renderLayer:[long member names]}. Every mesh has the same UVs.
+materials = {longName:[material, [material attributes]]}, the ShaderFX settings of every material are already on.
+Combined bake meshes are made at the world root, arnoldRenderToTexture writes an EXR per selected mesh.
+'''
+class FakeMayaCmds(object):
+	def __init__(self, renderSets, sceneFolder, meshes, renderLayers, materials=None):
+		self.scenePath = sceneFolder + '/scenes/level.mb'
+		self.notes = LightBakingData.EncodeRenderSets(renderSets)
+		self.meshes = dict(meshes)
+		self.groups = set(['|grp'])
+		self.lights = {'|sun':{'intensity':1.0}}
+		self.renderLayers = dict((x, list(y)) for x, y in renderLayers.items())
+		self.currentRenderLayer = 'defaultRenderLayer'
+		self.optionVars = {}
+		self.selection = []
+		# combined bake meshes, long name -> points
+		self.combined = {}
+		self.bakes = 0
+		self.failBakes = set()
+		self.materials = materials or {}
+		# node.attr -> value set on the materials
+		self.attrs = {}
+		self.warnings = []
+
+	'''Return the long name of a node name, short names and partial paths work like in Maya.'''
+	def LongName(self, name):
+		nodes = list(self.meshes) + list(self.combined) + list(self.groups) + list(self.lights)
+
+		if name in nodes:
+			return name
+
+		matches = [x for x in nodes if x.endswith('|' + name.lstrip('|'))]
+		return matches[0] if len(matches) == 1 else None
+
+	def ShortName(self, name):
+		return name.split('|')[-1]
+
+	'''Rename or reparent a combined mesh, it stays in its RenderLayers like in Maya. newName None deletes it.'''
+	def MoveCombined(self, longName, newName):
+		points = self.combined.pop(longName)
+
+		if newName is not None:
+			self.combined[newName] = points
+
+		for members in self.renderLayers.values():
+			if longName in members:
+				members.remove(longName)
+
+				if newName is not None:
+					members.append(newName)
+
+	def optionVar(self, exists=None, q=None, sv=None, **kwargs):
+		if exists is not None:
+			return exists in self.optionVars
+		if q is not None:
+			return self.optionVars[q]
+		if sv is not None:
+			self.optionVars[sv[0]] = sv[1]
+
+	def objExists(self, name):
+		return name == 'renderSets' or self.LongName(name) is not None
+
+	def attributeQuery(self, attr, n=None, node=None, exists=False):
+		if (n or node) == 'renderSets':
+			return attr == 'notes'
+
+		return any(x[0] == node and attr in x[1] for x in self.materials.values())
+
+	def getAttr(self, attr):
+		if attr == 'renderSets.notes':
+			return self.notes
+
+		shape, attr = attr.rsplit('.', 1)
+		return self.lights[shape.rsplit('|', 1)[0]][attr]
+
+	def setAttr(self, attr, *values, **kwargs):
+		if attr == 'renderSets.notes':
+			self.notes = values[0]
+		else:
+			self.attrs[attr] = values[0] if len(values) == 1 else list(values)
+
+	def ls(self, *objects, **kwargs):
+		nodeType = kwargs.get('type')
+
+		if objects and kwargs.get('materials'):
+			return [x for x in objects[0] if any(x == y[0] for y in self.materials.values())]
+		if objects:
+			return [self.LongName(x) for x in objects[0] if self.LongName(x)]
+		if nodeType == 'renderLayer':
+			return list(self.renderLayers)
+		if nodeType == 'transform':
+			return sorted(self.groups) + sorted(self.meshes) + sorted(self.lights)
+		if nodeType == 'mesh':
+			return [x + '|' + self.ShortName(x) + 'Shape' for x in sorted(self.meshes)]
+		if isinstance(nodeType, list) and 'light' in nodeType:
+			return [x + '|' + self.ShortName(x) + 'Shape' for x in sorted(self.lights)]
+		return []
+
+	def nodeType(self, name, isTypeName=False):
+		return name == 'light'
+
+	def listRelatives(self, nodes, shapes=False, parent=False, fullPath=False, **kwargs):
+		if isinstance(nodes, list):
+			return [x.rsplit('|', 1)[0] for x in nodes] if parent else None
+
+		longName = self.LongName(nodes)
+
+		if kwargs.get('allDescendents') and kwargs.get('type') == 'mesh':
+			return [x + '|' + self.ShortName(x) + 'Shape' for x in sorted(self.meshes) if x == longName or x.startswith(longName + '|')]
+
+		if shapes and longName:
+			return [(longName + '|' if fullPath else '') + self.ShortName(longName) + 'Shape']
+
+		return None
+
+	'''shape -> shadingEngine -> material, the shadingEngine is the material name + SG.'''
+	def listConnections(self, node, type=None):
+		if type == 'shadingEngine':
+			material = self.materials.get(node.rsplit('|', 1)[0])
+			return [material[0] + 'SG'] if material else []
+
+		return [node[:-len('SG')]]
+
+	def shaderfx(self, sfxnode=None, getNodeIDByName=None, getPropertyValue=None, **kwargs):
+		if getNodeIDByName:
+			return 1
+
+		return True
+
+	def listAttr(self, shape, keyable=False):
+		return sorted(self.lights[shape.rsplit('|', 1)[0]])
+
+	def file(self, *args, **kwargs):
+		return self.scenePath
+
+	def editRenderLayerGlobals(self, query=False, currentRenderLayer=None):
+		if query:
+			return self.currentRenderLayer
+
+		self.currentRenderLayer = currentRenderLayer
+
+	def editRenderLayerMembers(self, renderLayer, *objects, **kwargs):
+		members = self.renderLayers[renderLayer]
+
+		if kwargs.get('query'):
+			return list(members) if kwargs.get('fullNames') else [self.ShortName(x) for x in members]
+
+		objects = objects[0] if isinstance(objects[0], list) else list(objects)
+
+		for obj in [self.LongName(x) for x in objects]:
+			if kwargs.get('remove'):
+				if obj in members:
+					members.remove(obj)
+			elif obj not in members:
+				members.append(obj)
+
+	def polyEvaluate(self, objects, triangle=False):
+		return 12 * len(objects)
+
+	def xform(self, name, **kwargs):
+		if name.endswith('.vtx[*]'):
+			return [x for point in self.meshes[self.LongName(name[:-len('.vtx[*]')])] for x in point]
+
+		return [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+
+	def polyEditUV(self, name, query=False, q=False, **kwargs):
+		if query or q:
+			return [0.0, 0.0, 1.0, 0.0, 0.0, 1.0]
+
+	def select(self, *objects, **kwargs):
+		if kwargs.get('cl'):
+			self.selection = []
+		elif objects:
+			self.selection = objects[0] if isinstance(objects[0], list) else list(objects)
+
+	def duplicate(self, meshes):
+		dups = []
+
+		for mesh in meshes:
+			dup = '|' + self.ShortName(mesh) + '_dup'
+			self.combined[dup] = self.meshes[self.LongName(mesh)]
+			dups.append(self.ShortName(dup))
+
+		return dups
+
+	def polyUnite(self, meshes, name=None, **kwargs):
+		points = []
+
+		for mesh in meshes:
+			points += self.combined.pop(self.LongName(mesh), [])
+
+		self.combined['|' + name] = points
+		return [name, name + '_polyUnite']
+
+	def rename(self, name, newName):
+		longName = self.LongName(name)
+
+		if longName in self.combined:
+			self.MoveCombined(longName, longName.rsplit('|', 1)[0] + '|' + newName)
+
+		return newName
+
+	def parent(self, name, group):
+		longName = self.LongName(name)
+		self.MoveCombined(longName, '|' + group + longName)
+		return [name]
+
+	def group(self, empty=False, world=False, name=None):
+		self.groups.add('|' + name)
+		return name
+
+	def delete(self, names, constructionHistory=False):
+		if constructionHistory:
+			return
+
+		for name in names if isinstance(names, list) else [names]:
+			longName = self.LongName(name)
+			self.groups.discard(longName)
+
+			for combined in [x for x in self.combined if x == longName or x.startswith(longName + '|')]:
+				self.MoveCombined(combined, None)
+
+	def arnoldRenderToTexture(self, f=None, **kwargs):
+		self.bakes += 1
+
+		for name in self.selection:
+			if name not in self.failBakes:
+				open(os.path.join(f, name + 'Shape.exr'), 'w').close()
+
+	def transferAttributes(self, *args, **kwargs):
+		pass
+
+	def polyUVSet(self, *args, **kwargs):
+		pass
+
+	def lockNode(self, *args, **kwargs):
+		pass
+
+	def warning(self, text):
+		self.warnings.append(text)
+
+
+'''Stand in for ConvertExrToTif, a flat TIF with the same value for every RenderLayer.'''
+def FakeConvertExrToTif(exrFilePath, tifFilePath, backend=None):
+	open(exrFilePath).close()
+	LightBakingImageUtils.WriteTif(tifFilePath, np.full((TIF_SIZE, TIF_SIZE, 3), 0.25, dtype=np.float32))
+	return backend
+
+
+class TestBakeCommandLine(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.reportPath = self.folder + '/report.json'
+		self.renderSets = {'RS_A':{'resolution':0, 'colorMode':0, 'fillTextureSeams':2.0, 'lightMapPrefix':'LM', 'renderMe':True,
+								   'objects':{'rock':0, 'wall':0}, 'renderLayers':{'Sun':0, 'AO':1}},
+						   'RS_B':{'resolution':1, 'colorMode':0, 'fillTextureSeams':2.0, 'lightMapPrefix':'LM', 'renderMe':True,
+								   'objects':{'crate':0}, 'renderLayers':{'Sun':0}}}
+		self.meshes = {'|grp|rock':[[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+					   '|grp|wall':[[0.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.0, 0.0, 2.0]],
+					   '|grp|crate':[[5.0, 0.0, 0.0], [6.0, 0.0, 0.0], [5.0, 1.0, 0.0]],
+					   '|grp|floor':[[-9.0, 0.0, -9.0], [9.0, 0.0, -9.0], [0.0, 0.0, 9.0]]}
+		# floor is an occluder in Sun, it is in no Render Set
+		self.renderLayers = {'defaultRenderLayer':[], 'Sun':['|grp|floor'], 'AO':[]}
+		patcher = mock.patch.object(LightBakingImageUtils, 'ConvertExrToTif', FakeConvertExrToTif)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.addCleanup(shutil.rmtree, self.folder, True)
+
+	def ReturnCmds(self, materials=None):
+		return FakeMayaCmds(self.renderSets, self.folder, self.meshes, self.renderLayers, materials)
+
+	'''Run the command line, returns the exit code and the report.'''
+	def Bake(self, mayaCmds, *args, **kwargs):
+		argv = ['level.mb', '--serial', '--cache-dir', '', '--report', self.reportPath] + list(args)
+
+		if not kwargs.get('hookUp'):
+			argv.append('--no-hookup')
+
+		exitCode = LightBakingEngine.main(argv, mayaCmds=mayaCmds)
+
+		with open(self.reportPath) as reportFile:
+			return exitCode, json.load(reportFile)
+
+	def ReturnLayerStatuses(self, report):
+		return dict(((x, y), z['status']) for x in report['renderSets'] for y, z in report['renderSets'][x]['renderLayers'].items())
+
+	def testBakeExitsOkWithReport(self):
+		mayaCmds = self.ReturnCmds()
+		exitCode, report = self.Bake(mayaCmds)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(report['status'], 'ok')
+		self.assertEqual(report['exitCode'], LightBakingEngine.EXIT_OK)
+		self.assertEqual(report['failed'], [])
+		self.assertEqual(set(report['renderSets']), set(['RS_A', 'RS_B']))
+		self.assertEqual(set(self.ReturnLayerStatuses(report).values()), set([LightBakingEngine.LAYER_BAKED]))
+		self.assertEqual(mayaCmds.bakes, 3)
+
+		for renderSet in self.renderSets:
+			pngLoc = report['renderSets'][renderSet]['png']
+			self.assertEqual(pngLoc, self.folder + '/textures/LM/' + renderSet + '.png')
+			self.assertTrue(os.path.isfile(pngLoc))
+
+		# the Render Set objects were added to their RenderLayers, the occluder stays
+		self.assertEqual(sorted(mayaCmds.renderLayers['Sun']), ['|grp|crate', '|grp|floor', '|grp|rock', '|grp|wall'])
+		self.assertEqual(mayaCmds.currentRenderLayer, 'defaultRenderLayer')
+		self.assertFalse(mayaCmds.combined)
+
+	def testUnchangedSecondBakeReusesEveryLayer(self):
+		mayaCmds = self.ReturnCmds()
+		self.Bake(mayaCmds)
+		pngTime = os.path.getmtime(self.folder + '/textures/LM/RS_A.png')
+		exitCode, report = self.Bake(mayaCmds)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(mayaCmds.bakes, 3)
+		self.assertEqual(set(self.ReturnLayerStatuses(report).values()), set([LightBakingEngine.LAYER_REUSED]))
+		self.assertEqual(report['renderSets']['RS_A']['status'], 'reused')
+		self.assertEqual(os.path.getmtime(self.folder + '/textures/LM/RS_A.png'), pngTime)
+
+	def testReuseDoesNotDependOnBakeOrder(self):
+		mayaCmds = self.ReturnCmds()
+		self.Bake(mayaCmds, '--dict-order')
+		exitCode, report = self.Bake(mayaCmds, '--render-sets', 'RS_B')
+		self.assertEqual(self.ReturnLayerStatuses(report), {('RS_B', 'Sun'):LightBakingEngine.LAYER_REUSED})
+
+		exitCode, report = self.Bake(mayaCmds)
+		self.assertEqual(mayaCmds.bakes, 3)
+		self.assertEqual(set(self.ReturnLayerStatuses(report).values()), set([LightBakingEngine.LAYER_REUSED]))
+
+	def testChangesOnlyRebakeWhatTheyTouch(self):
+		mayaCmds = self.ReturnCmds()
+		self.Bake(mayaCmds)
+		# move a crate vertex and add an occluder to AO
+		mayaCmds.meshes['|grp|crate'] = [[5.0, 0.0, 0.0], [7.0, 0.0, 0.0], [5.0, 1.0, 0.0]]
+		mayaCmds.renderLayers['AO'].append('|grp|floor')
+		exitCode, report = self.Bake(mayaCmds)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(self.ReturnLayerStatuses(report), {('RS_A', 'Sun'):LightBakingEngine.LAYER_REUSED,
+															('RS_A', 'AO'):LightBakingEngine.LAYER_BAKED,
+															('RS_B', 'Sun'):LightBakingEngine.LAYER_BAKED})
+
+	def testBatchBakeOnlyBakesTheLayersAskedFor(self):
+		self.renderSets['RS_B']['resolution'] = 0
+		self.renderSets['RS_B']['renderLayers'] = {'Sun':0, 'AO':1}
+		mayaCmds = self.ReturnCmds()
+		exitCode, report = self.Bake(mayaCmds, '--batch', '--layers', 'AO')
+		lightMapFolder = self.folder + '/textures/lightMap/'
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(self.ReturnLayerStatuses(report), {('RS_A', 'AO'):LightBakingEngine.LAYER_BAKED,
+															('RS_B', 'AO'):LightBakingEngine.LAYER_BAKED})
+		# both sets in one AO batch, no Sun render
+		self.assertEqual(mayaCmds.bakes, 1)
+		self.assertTrue(os.path.isfile(lightMapFolder + 'LM_RS_A_AO_LMShape.tif'))
+		self.assertFalse(os.path.exists(lightMapFolder + 'LM_RS_A_Sun_LMShape.tif'))
+		self.assertFalse(os.path.exists(lightMapFolder + 'LM_RS_B_Sun_LMShape.tif'))
+		self.assertEqual([x for x in os.listdir(lightMapFolder) if x.endswith('.exr')], [])
+
+	def testFullBakeRebakesEverything(self):
+		mayaCmds = self.ReturnCmds()
+		self.Bake(mayaCmds)
+		exitCode, report = self.Bake(mayaCmds, '--full')
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(mayaCmds.bakes, 6)
+		self.assertEqual(set(self.ReturnLayerStatuses(report).values()), set([LightBakingEngine.LAYER_BAKED]))
+
+	def testBakeCacheIsSharedBetweenScenes(self):
+		cacheFolder = self.folder + '/cache'
+		self.Bake(self.ReturnCmds(), '--cache-dir', cacheFolder)
+		# the same props in another scene, under other names
+		self.folder = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.folder, True)
+		self.meshes = dict((x.replace('|grp|', '|props|'), y) for x, y in self.meshes.items())
+		self.renderLayers['Sun'] = ['|props|floor']
+		mayaCmds = self.ReturnCmds()
+		mayaCmds.groups = set(['|props'])
+		exitCode, report = self.Bake(mayaCmds, '--cache-dir', cacheFolder)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(mayaCmds.bakes, 0)
+		self.assertEqual(set(self.ReturnLayerStatuses(report).values()), set([LightBakingEngine.LAYER_CACHED]))
+		self.assertTrue(os.path.isfile(report['renderSets']['RS_A']['png']))
+
+	def testBakeCacheMissesWithOtherSurroundings(self):
+		cacheFolder = self.folder + '/cache'
+		self.Bake(self.ReturnCmds(), '--cache-dir', cacheFolder)
+		# the same props in another scene, with the occluder somewhere else
+		self.folder = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.folder, True)
+		self.meshes['|grp|floor'] = [[-9.0, 3.0, -9.0], [9.0, 3.0, -9.0], [0.0, 3.0, 9.0]]
+		exitCode, report = self.Bake(self.ReturnCmds(), '--cache-dir', cacheFolder)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(self.ReturnLayerStatuses(report), {('RS_A', 'Sun'):LightBakingEngine.LAYER_BAKED,
+															('RS_A', 'AO'):LightBakingEngine.LAYER_CACHED,
+															('RS_B', 'Sun'):LightBakingEngine.LAYER_BAKED})
+
+	def testFailedBakeExitsFailed(self):
+		mayaCmds = self.ReturnCmds()
+		mayaCmds.failBakes.add('LM_RS_B_Sun_LM')
+		exitCode, report = self.Bake(mayaCmds)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_FAILED)
+		self.assertEqual(report['status'], 'failed')
+		self.assertEqual(len(report['failed']), 1)
+		self.assertTrue(report['failed'][0].startswith('RS_B_Sun'))
+		self.assertEqual(report['renderSets']['RS_B']['renderLayers']['Sun']['status'], LightBakingEngine.LAYER_FAILED)
+		self.assertEqual(report['renderSets']['RS_A']['status'], 'baked')
+
+		# the failed layer is baked again next time, the rest is reused
+		mayaCmds.failBakes.clear()
+		exitCode, report = self.Bake(mayaCmds)
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(report['renderSets']['RS_B']['renderLayers']['Sun']['status'], LightBakingEngine.LAYER_BAKED)
+		self.assertEqual(report['renderSets']['RS_A']['renderLayers']['Sun']['status'], LightBakingEngine.LAYER_REUSED)
+
+	def testFailedRebakeDoesNotKeepTheOldLightmap(self):
+		mayaCmds = self.ReturnCmds()
+		self.Bake(mayaCmds)
+		mayaCmds.failBakes.add('LM_RS_B_Sun_LM')
+		exitCode, report = self.Bake(mayaCmds, '--full')
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_FAILED)
+		self.assertEqual(report['renderSets']['RS_B']['renderLayers']['Sun']['status'], LightBakingEngine.LAYER_FAILED)
+		self.assertFalse(os.path.isfile(self.folder + '/textures/lightMap/LM_RS_B_Sun_LMShape.tif'))
+
+	def testInvalidRenderSetExitsInvalid(self):
+		self.renderSets['RS_B']['objects']['barrel'] = 0
+		mayaCmds = self.ReturnCmds()
+		exitCode, report = self.Bake(mayaCmds)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_INVALID)
+		self.assertEqual(report['status'], 'invalid')
+		self.assertIn('RS_B', report['error'])
+		self.assertEqual([x['objects'] for x in report['validation'] if not x['valid']], [['barrel']])
+		self.assertEqual(mayaCmds.bakes, 0)
+
+	def testRemoveInvalidBakesTheRest(self):
+		self.renderSets['RS_B']['objects']['barrel'] = 0
+		mayaCmds = self.ReturnCmds()
+		exitCode, report = self.Bake(mayaCmds, '--remove-invalid')
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(report['renderSets']['RS_B']['renderLayers']['Sun']['status'], LightBakingEngine.LAYER_BAKED)
+
+	def testUnknownRenderSetExitsError(self):
+		exitCode, report = self.Bake(self.ReturnCmds(), '--render-sets', 'RS_C')
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_ERROR)
+		self.assertEqual(report['status'], 'error')
+		self.assertIn('RS_C', report['error'])
+
+	def testMissingRenderSetsNodeExitsError(self):
+		mayaCmds = self.ReturnCmds()
+		mayaCmds.attributeQuery = lambda *args, **kwargs: False
+		exitCode, report = self.Bake(mayaCmds)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_ERROR)
+		self.assertIn('No renderSets node', report['error'])
+
+	def testExceptionExitsErrorWithTraceback(self):
+		mayaCmds = self.ReturnCmds()
+
+		def BrokenBake(**kwargs):
+			raise RuntimeError('Arnold is not loaded')
+
+		mayaCmds.arnoldRenderToTexture = BrokenBake
+		exitCode, report = self.Bake(mayaCmds)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_ERROR)
+		self.assertIn('Arnold is not loaded', report['error'])
+		self.assertIn('Traceback', report['traceback'])
+
+	def testAtlasLeavesOutSetsWithoutScaleOffset(self):
+		for renderSet in ['RS_A', 'RS_B', 'RS_C']:
+			self.renderSets[renderSet] = {'resolution':0, 'colorMode':0, 'fillTextureSeams':2.0, 'lightMapPrefix':'LM', 'renderMe':True,
+										  'objects':{}, 'renderLayers':{'Sun':0}}
+
+		self.renderSets['RS_A']['objects'] = {'rock':0}
+		self.renderSets['RS_B']['objects'] = {'wall':0}
+		self.renderSets['RS_C']['objects'] = {'crate':0}
+		attrs = ['LightmapMap', LightBakingEngine.LIGHTMAP_SCALE_OFFSET_ATTR]
+		mayaCmds = self.ReturnCmds({'|grp|rock':['rockMat', attrs], '|grp|wall':['wallMat', attrs], '|grp|crate':['crateMat', attrs[:1]]})
+		exitCode, report = self.Bake(mayaCmds, '--atlas', hookUp=True)
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual([list(x['renderSets']) for x in report['atlas'].values()], [['RS_A', 'RS_B']])
+		self.assertEqual(report['renderSets']['RS_A']['status'], 'atlas')
+		self.assertEqual(report['renderSets']['RS_C']['status'], 'baked')
+		self.assertTrue(any('RS_C' in x and 'crateMat' in x for x in mayaCmds.warnings))
+		pagePng = list(report['atlas'].values())[0]['png']
+		self.assertEqual(mayaCmds.attrs['rockMat.LightmapMap'], pagePng)
+		self.assertEqual(mayaCmds.attrs['rockMat.' + LightBakingEngine.LIGHTMAP_SCALE_OFFSET_ATTR], report['atlas'][os.path.basename(pagePng)[:-4]]['renderSets']['RS_A'])
+		self.assertEqual(mayaCmds.attrs['crateMat.LightmapMap'], report['renderSets']['RS_C']['png'])
+
+	def testDumpRenderSets(self):
+		exitCode, report = self.Bake(self.ReturnCmds(), '--dump-render-sets')
+
+		self.assertEqual(exitCode, LightBakingEngine.EXIT_OK)
+		self.assertEqual(report['renderSetsDict'], self.renderSets)
+		self.assertEqual(report['triangles'], {'RS_A':24, 'RS_B':12})
+		self.assertEqual(report['lights'], 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,113 @@
+'''
+Tests for the numpy lightmap compositor, against the Photoshop layer setup it replaces.
+'''
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+
+import LightBakingImageUtils
+
+
+'''Read an 8-bit PNG written by _PngWriter, filter type 0 rows only, into a (height, width, channels) uint8 array.'''
+def ReadPng(pngPath):
+	with open(pngPath, 'rb') as pngFile:
+		data = pngFile.read()[8:]
+
+	chunks = {}
+
+	while data:
+		length, chunkType = struct.unpack('>I4s', data[:8])
+		chunks[chunkType] = chunks.get(chunkType, b'') + data[8:8 + length]
+		data = data[12 + length:]
+
+	width, height, depth, colorType = struct.unpack('>IIBB', chunks[b'IHDR'][:10])
+	channels = {0:1, 2:3, 4:2, 6:4}[colorType]
+	rows = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8).reshape(height, 1 + width * channels)
+	return rows[:, 1:].reshape(height, width, channels)
+
+
+class TestCompositeLayers(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.folder, True)
+
+	def WriteLayer(self, name, pixels):
+		tifPath = os.path.join(self.folder, name + '.tif')
+		LightBakingImageUtils.WriteTif(tifPath, pixels)
+		return tifPath
+
+	'''Return the 8-bit PNG value of a linear composite value, like WritePng.'''
+	def ReturnPngValue(self, value):
+		return int(np.clip(value, 0.0, 1.0) ** (1.0 / LightBakingImageUtils.DISPLAY_GAMMA) * 255.0 + 0.5)
+
+	def testAdditiveLayersAreGammaCorrectedBeforeBlending(self):
+		gamma = LightBakingImageUtils.GAMMA_CORRECTION
+		layers = [[self.WriteLayer('sun', np.full((4, 4, 3), 0.25, dtype=np.float32)), LightBakingImageUtils.BLEND_ADDITIVE],
+				  [self.WriteLayer('bounce', np.full((4, 4, 3), 0.1, dtype=np.float32)), LightBakingImageUtils.BLEND_ADDITIVE]]
+		composite = LightBakingImageUtils.CompositeLayers(layers)
+		expected = 0.25 ** (1.0 / gamma) + 0.1 ** (1.0 / gamma)
+
+		np.testing.assert_allclose(composite, expected, rtol=1e-5)
+		self.assertNotAlmostEqual(float(composite[0, 0, 0]), 0.35 ** (1.0 / gamma), places=3)
+
+	def testMultiplyOverAdditive(self):
+		gamma = LightBakingImageUtils.GAMMA_CORRECTION
+		# the first layer is the top one
+		layers = [[self.WriteLayer('ao', np.full((4, 4, 3), 0.5, dtype=np.float32)), LightBakingImageUtils.BLEND_MULTIPLY],
+				  [self.WriteLayer('sun', np.full((4, 4, 3), 0.8, dtype=np.float32)), LightBakingImageUtils.BLEND_ADDITIVE]]
+		composite = LightBakingImageUtils.CompositeLayers(layers)
+
+		np.testing.assert_allclose(composite, (0.8 ** (1.0 / gamma)) * (0.5 ** (1.0 / gamma)), rtol=1e-5)
+
+	def testGrayAlphaLayer(self):
+		layer = np.zeros((4, 4, 2), dtype=np.float32)
+		layer[:, :, 0] = 0.5
+		layer[:, :2, 1] = 1.0
+		blended = LightBakingImageUtils.BlendLayer(np.full((4, 4, 3), 0.25, dtype=np.float32), layer, LightBakingImageUtils.BLEND_ADDITIVE)
+
+		self.assertEqual(blended.shape, (4, 4, 3))
+		np.testing.assert_allclose(blended[:, :2], 0.75)
+		np.testing.assert_allclose(blended[:, 2:], 0.25)
+
+	def testStreamedPngMatchesTheCompositeInMemory(self):
+		random = np.random.RandomState(7)
+		layers = [[self.WriteLayer('ao', random.rand(37, 23, 3).astype(np.float32)), LightBakingImageUtils.BLEND_MULTIPLY],
+				  [self.WriteLayer('sun', random.rand(37, 23, 4).astype(np.float32)), LightBakingImageUtils.BLEND_ADDITIVE],
+				  [self.WriteLayer('sky', random.rand(37, 23, 1).astype(np.float32) * 0.3), LightBakingImageUtils.BLEND_ADDITIVE]]
+		memoryPng = os.path.join(self.folder, 'memory.png')
+		streamedPng = os.path.join(self.folder, 'streamed.png')
+		LightBakingImageUtils.WritePng(memoryPng, LightBakingImageUtils.CompositeLayers(layers))
+		# a few rows per band, so the bands are written by several threads
+		LightBakingImageUtils.CompositeLayersToFile(layers, streamedPng, workers=3, bandBytes=23 * 16 * 4)
+
+		np.testing.assert_array_equal(ReadPng(streamedPng), ReadPng(memoryPng))
+
+	def testStreamedPngIsGammaCorrectedPerLayer(self):
+		layers = [[self.WriteLayer('sun', np.full((9, 5, 3), 0.2, dtype=np.float32)), LightBakingImageUtils.BLEND_ADDITIVE],
+				  [self.WriteLayer('bounce', np.full((9, 5, 3), 0.05, dtype=np.float32)), LightBakingImageUtils.BLEND_ADDITIVE]]
+		pngPath = os.path.join(self.folder, 'lightmap.png')
+		LightBakingImageUtils.CompositeLightmapPng(layers, pngPath)
+		gamma = LightBakingImageUtils.GAMMA_CORRECTION
+		pixels = ReadPng(pngPath)
+
+		self.assertEqual(pixels.shape, (9, 5, 3))
+		self.assertTrue((pixels == self.ReturnPngValue(0.2 ** (1.0 / gamma) + 0.05 ** (1.0 / gamma))).all())
+
+	def testMismatchedLayerSizesLeaveNoPng(self):
+		layers = [[self.WriteLayer('sun', np.zeros((4, 4, 3), dtype=np.float32)), LightBakingImageUtils.BLEND_ADDITIVE],
+				  [self.WriteLayer('ao', np.zeros((8, 8, 3), dtype=np.float32)), LightBakingImageUtils.BLEND_MULTIPLY]]
+		pngPath = os.path.join(self.folder, 'lightmap.png')
+
+		with self.assertRaises(ValueError):
+			LightBakingImageUtils.CompositeLightmapPng(layers, pngPath)
+
+		self.assertFalse(os.path.exists(pngPath))
+
+
+if __name__ == '__main__':
+	unittest.main()
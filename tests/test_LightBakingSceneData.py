@@ -0,0 +1,97 @@
+'''
+Tests for MeshData, run against FakeOpenMaya instead of maya.api.OpenMaya.
+'''
+import unittest
+
+import numpy as np
+
+import LightBakingSceneData
+
+
+class TestMeshData(unittest.TestCase):
+	def setUp(self):
+		self.scene = {'rock':{'points':[[0.0, 0.0, 0.0], [2.0, 1.0, 0.0], [0.0, 3.0, -1.0]],
+							  'triangles':12,
+							  'uvSets':['map1', 'uvSet'],
+							  'currentUvSet':'uvSet',
+							  'shadingEngines':['rockSG', 'rockSG', 'mossSG']},
+					  'wall':{'points':[[5.0, 0.0, 0.0], [6.0, 4.0, 2.0]],
+							  'triangles':2,
+							  'uvSets':['map1'],
+							  'shadingEngines':['wallSG']},
+					  'bare':{'triangles':4},
+					  'locator':{'shapes':0},
+					  'twins':{'shapes':2, 'triangles':8, 'uvSets':['map1']}}
+		self.meshData = LightBakingSceneData.MeshData(LightBakingSceneData.FakeOpenMaya(self.scene))
+
+	def testMissingTransformHasNoRecord(self):
+		self.assertEqual(self.meshData.Read(['rock', 'ghost']).keys(), set(['rock']))
+		self.assertIsNone(self.meshData.Record('ghost'))
+		self.assertIsNone(self.meshData.ReturnShape('ghost'))
+		self.assertIsNone(self.meshData.ReturnShadingEngines('ghost'))
+		self.assertIsNone(self.meshData.ReturnPoints('ghost'))
+
+	def testNoShapeOrSeveralShapes(self):
+		for mesh in ['locator', 'twins']:
+			record = self.meshData.Record(mesh)
+			self.assertIsNone(record['shape'])
+			self.assertEqual(record['uvSets'], [])
+			self.assertEqual(record['triangles'], 0)
+			self.assertIsNone(self.meshData.ReturnShadingEngines(mesh))
+			self.assertIsNone(self.meshData.ReturnPoints(mesh))
+
+		self.assertEqual(self.meshData.ReturnUvSets(['locator', 'twins']), {})
+
+	def testShape(self):
+		self.assertEqual(self.meshData.ReturnShape('rock'), '|rockShape')
+
+	def testUvSets(self):
+		self.assertEqual(self.meshData.ReturnUvSets(['rock', 'wall', 'bare', 'ghost']),
+						 {'rock':[['map1', 'uvSet'], 'uvSet'], 'wall':[['map1'], 'map1'], 'bare':[[], None]})
+		self.assertEqual(self.meshData.ReturnCurrentUvSet('rock'), 'uvSet')
+		self.assertIsNone(self.meshData.ReturnCurrentUvSet('bare'))
+
+	def testTriangles(self):
+		self.assertEqual(self.meshData.ReturnTriangles(['rock', 'wall', 'bare']), 18)
+		# meshes without a usable shape count nothing
+		self.assertEqual(self.meshData.ReturnTriangles(['twins', 'locator', 'ghost']), 0)
+
+	def testShadingEngines(self):
+		self.assertEqual(self.meshData.ReturnShadingEngines('rock'), ['rockSG', 'mossSG'])
+		self.assertEqual(self.meshData.ReturnShadingEngines('bare'), [])
+
+	def testPoints(self):
+		points = self.meshData.ReturnPoints('rock')
+		self.assertEqual(points.shape, (3, 3))
+		self.assertEqual(points.dtype, np.float64)
+		np.testing.assert_array_equal(points, self.scene['rock']['points'])
+		self.assertEqual(self.meshData.ReturnPoints('bare').shape, (0, 3))
+
+	def testBoundingBoxes(self):
+		boxes = self.meshData.ReturnBoundingBoxes(['rock', 'bare', 'wall'])
+		self.assertEqual(boxes.shape, (3, 2, 3))
+		np.testing.assert_array_equal(boxes[0], [[0.0, 0.0, -1.0], [2.0, 3.0, 0.0]])
+		self.assertTrue(np.isnan(boxes[1]).all())
+		np.testing.assert_array_equal(boxes[2], [[5.0, 0.0, 0.0], [6.0, 4.0, 2.0]])
+		self.assertEqual(self.meshData.ReturnBoundingBox(['rock', 'bare', 'wall']), [0.0, 0.0, -1.0, 6.0, 4.0, 2.0])
+		self.assertIsNone(self.meshData.ReturnBoundingBox(['bare', 'locator', 'ghost']))
+
+	def testRecordsAreReadOnce(self):
+		self.meshData.Read(['rock', 'wall'])
+		self.meshData.ReturnTriangles(['rock', 'wall'])
+		self.meshData.ReturnShadingEngines('rock')
+		self.assertEqual(self.meshData.reads, 2)
+		# missing transforms are remembered as well, without counting as a read
+		self.meshData.Read(['ghost', 'ghost'])
+		self.assertEqual(self.meshData.reads, 2)
+
+		self.meshData.Clear()
+		self.meshData.Read(['rock'])
+		self.assertEqual(self.meshData.reads, 3)
+
+	def testNoMeshDataForAStandIn(self):
+		self.assertIsNone(LightBakingSceneData.ReturnMeshData(object()))
+
+
+if __name__ == '__main__':
+	unittest.main()